@@ -11,6 +11,7 @@ def title_from_module_name(module_name):
         "activation_checkpointing": "ActivationCheckpointing",
         "activations": "Activations",
         "attention": "Attention",
+        "bbox_ops": "Bounding Box Operations",
         "bounding_boxes": "Bounding Boxes",
         "cait_3d": "CaiT3D",
         "class_balanced_cross_entropy_loss": "ClassBalancedCrossEntropyLoss",
@@ -21,11 +22,14 @@ def title_from_module_name(module_name):
         "cyclic": "Cyclic",
         "detection": "Detection",
         "detr_3d": "DETR3D",
+        "dice_ce_loss": "DiceCELoss",
         "ema_network": "Exponential Moving Average (EMA) Network",
         "embeddings": "Embeddings",
         "fpn_2d": "FPN2D",
         "fpn_3d": "FPN3D",
         "heads_3d": "Heads3D",
+        "intermediates": "Intermediate Outputs",
+        "label_maps": "Label Maps",
         "maxvit_3d": "MaxViT3D",
         "mbconv_3d": "MBConv3D",
         "noise": "Noise",
@@ -34,6 +38,7 @@ def title_from_module_name(module_name):
         "residuals": "Residual Connections",
         "resize": "Resize",
         "safetensors_reader": "SafeTensorsReader",
+        "segmentation": "Segmentation",
         "sigmoid": "Sigmoid",
         "spatial": "Spatial",
         "swin_3d": "Swin3D",
@@ -52,6 +57,7 @@ def title_from_module_name(module_name):
         "image_readers": "Image Readers",
         "latent_space": "Latent Space",
         "layers": "Layers",
+        "linear_assignment": "Linear Assignment",
         "losses": "Loss Functions",
         "lrs": "Learning Rate Schedulers",
         "metrics": "Metrics",
@@ -66,6 +72,7 @@ def title_from_module_name(module_name):
         "transforms": "Transforms",
         "upsample": "Upsampling",
         "utils": "Utils",
+        "windowing": "Window Partitioning",
     }
     title = mapping.get(module_name, f"{module_name} [Add to mapping]")
 
@@ -59,6 +59,8 @@ d = { 'settings': { 'branch': 'main',
                                                                                                 'vision_architectures/blocks/cnn.py'),
                                                  'vision_architectures.blocks.cnn._CNNBlock.__init__': ( 'blocks/cnn.html#_cnnblock.__init__',
                                                                                                          'vision_architectures/blocks/cnn.py'),
+                                                 'vision_architectures.blocks.cnn._CNNBlock._apply_sequence': ( 'blocks/cnn.html#_cnnblock._apply_sequence',
+                                                                                                                'vision_architectures/blocks/cnn.py'),
                                                  'vision_architectures.blocks.cnn._CNNBlock._forward': ( 'blocks/cnn.html#_cnnblock._forward',
                                                                                                          'vision_architectures/blocks/cnn.py'),
                                                  'vision_architectures.blocks.cnn._CNNBlock.forward': ( 'blocks/cnn.html#_cnnblock.forward',
@@ -82,7 +84,9 @@ d = { 'settings': { 'branch': 'main',
                                                       'vision_architectures.blocks.heads_3d.SegmentationHead3D': ( 'blocks/heads_3d.html#segmentationhead3d',
                                                                                                                    'vision_architectures/blocks/heads_3d.py'),
                                                       'vision_architectures.blocks.heads_3d.SegmentationHead3D.__init__': ( 'blocks/heads_3d.html#segmentationhead3d.__init__',
-                                                                                                                            'vision_architectures/blocks/heads_3d.py')},
+                                                                                                                            'vision_architectures/blocks/heads_3d.py'),
+                                                      'vision_architectures.blocks.heads_3d.SegmentationHead3D.predict_labels': ( 'blocks/heads_3d.html#segmentationhead3d.predict_labels',
+                                                                                                                                  'vision_architectures/blocks/heads_3d.py')},
             'vision_architectures.blocks.mbconv_3d': { 'vision_architectures.blocks.mbconv_3d.MBConv3D': ( 'blocks/mbconv_3d.html#mbconv3d',
                                                                                                            'vision_architectures/blocks/mbconv_3d.py'),
                                                        'vision_architectures.blocks.mbconv_3d.MBConv3D.__init__': ( 'blocks/mbconv_3d.html#mbconv3d.__init__',
@@ -119,14 +123,22 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                              'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention1DMLPConfig': ( 'blocks/transformer.html#attention1dmlpconfig',
                                                                                                                            'vision_architectures/blocks/transformer.py'),
+                                                         'vision_architectures.blocks.transformer.Attention1DMLPConfig.validate': ( 'blocks/transformer.html#attention1dmlpconfig.validate',
+                                                                                                                                    'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention1DWithMLP': ( 'blocks/transformer.html#attention1dwithmlp',
                                                                                                                          'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention1DWithMLP.__init__': ( 'blocks/transformer.html#attention1dwithmlp.__init__',
                                                                                                                                   'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention1DWithMLP._forward': ( 'blocks/transformer.html#attention1dwithmlp._forward',
                                                                                                                                   'vision_architectures/blocks/transformer.py'),
+                                                         'vision_architectures.blocks.transformer.Attention1DWithMLP._fuse_mlp_residual': ( 'blocks/transformer.html#attention1dwithmlp._fuse_mlp_residual',
+                                                                                                                                            'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention1DWithMLP.forward': ( 'blocks/transformer.html#attention1dwithmlp.forward',
                                                                                                                                  'vision_architectures/blocks/transformer.py'),
+                                                         'vision_architectures.blocks.transformer.Attention1DWithMLP.precompute_key_value': ( 'blocks/transformer.html#attention1dwithmlp.precompute_key_value',
+                                                                                                                                              'vision_architectures/blocks/transformer.py'),
+                                                         'vision_architectures.blocks.transformer.Attention1DWithMLP.precompute_query': ( 'blocks/transformer.html#attention1dwithmlp.precompute_query',
+                                                                                                                                          'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention1DWithMLPConfig': ( 'blocks/transformer.html#attention1dwithmlpconfig',
                                                                                                                                'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention3DMLP': ( 'blocks/transformer.html#attention3dmlp',
@@ -145,8 +157,14 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                   'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention3DWithMLP._forward': ( 'blocks/transformer.html#attention3dwithmlp._forward',
                                                                                                                                   'vision_architectures/blocks/transformer.py'),
+                                                         'vision_architectures.blocks.transformer.Attention3DWithMLP._fuse_mlp_residual': ( 'blocks/transformer.html#attention3dwithmlp._fuse_mlp_residual',
+                                                                                                                                            'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention3DWithMLP.forward': ( 'blocks/transformer.html#attention3dwithmlp.forward',
                                                                                                                                  'vision_architectures/blocks/transformer.py'),
+                                                         'vision_architectures.blocks.transformer.Attention3DWithMLP.precompute_key_value': ( 'blocks/transformer.html#attention3dwithmlp.precompute_key_value',
+                                                                                                                                              'vision_architectures/blocks/transformer.py'),
+                                                         'vision_architectures.blocks.transformer.Attention3DWithMLP.precompute_query': ( 'blocks/transformer.html#attention3dwithmlp.precompute_query',
+                                                                                                                                          'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.Attention3DWithMLPConfig': ( 'blocks/transformer.html#attention3dwithmlpconfig',
                                                                                                                                'vision_architectures/blocks/transformer.py'),
                                                          'vision_architectures.blocks.transformer.TransformerDecoderBlock1D': ( 'blocks/transformer.html#transformerdecoderblock1d',
@@ -215,16 +233,54 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                        'vision_architectures/layers/attention.py'),
                                                        'vision_architectures.layers.attention.Attention3D.forward': ( 'layers/attention.html#attention3d.forward',
                                                                                                                       'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.Attention3D.precompute_key_value': ( 'layers/attention.html#attention3d.precompute_key_value',
+                                                                                                                                   'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.Attention3D.precompute_query': ( 'layers/attention.html#attention3d.precompute_query',
+                                                                                                                               'vision_architectures/layers/attention.py'),
                                                        'vision_architectures.layers.attention.Attention3DConfig': ( 'layers/attention.html#attention3dconfig',
                                                                                                                     'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.DeformableAttention3D': ( 'layers/attention.html#deformableattention3d',
+                                                                                                                        'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.DeformableAttention3D.__init__': ( 'layers/attention.html#deformableattention3d.__init__',
+                                                                                                                                 'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.DeformableAttention3D._forward': ( 'layers/attention.html#deformableattention3d._forward',
+                                                                                                                                 'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.DeformableAttention3D._reset_sampling_parameters': ( 'layers/attention.html#deformableattention3d._reset_sampling_parameters',
+                                                                                                                                                   'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.DeformableAttention3D.forward': ( 'layers/attention.html#deformableattention3d.forward',
+                                                                                                                                'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.DeformableAttention3DConfig': ( 'layers/attention.html#deformableattention3dconfig',
+                                                                                                                              'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.DeformableAttention3DConfig.per_head_dim': ( 'layers/attention.html#deformableattention3dconfig.per_head_dim',
+                                                                                                                                           'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention.DeformableAttention3DConfig.validate': ( 'layers/attention.html#deformableattention3dconfig.validate',
+                                                                                                                                       'vision_architectures/layers/attention.py'),
                                                        'vision_architectures.layers.attention._Attention': ( 'layers/attention.html#_attention',
                                                                                                              'vision_architectures/layers/attention.py'),
                                                        'vision_architectures.layers.attention._Attention.__init__': ( 'layers/attention.html#_attention.__init__',
                                                                                                                       'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention._Attention._apply_rotary_position_embeddings': ( 'layers/attention.html#_attention._apply_rotary_position_embeddings',
+                                                                                                                                               'vision_architectures/layers/attention.py'),
                                                        'vision_architectures.layers.attention._Attention._forward': ( 'layers/attention.html#_attention._forward',
                                                                                                                       'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention._Attention._get_batch_chunk': ( 'layers/attention.html#_attention._get_batch_chunk',
+                                                                                                                              'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention._Attention._get_final_key_value': ( 'layers/attention.html#_attention._get_final_key_value',
+                                                                                                                                  'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention._Attention._get_final_query': ( 'layers/attention.html#_attention._get_final_query',
+                                                                                                                              'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention._Attention._get_input_mode': ( 'layers/attention.html#_attention._get_input_mode',
+                                                                                                                             'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention._Attention._get_repeated_batch_views': ( 'layers/attention.html#_attention._get_repeated_batch_views',
+                                                                                                                                       'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention._Attention._split_heads': ( 'layers/attention.html#_attention._split_heads',
+                                                                                                                          'vision_architectures/layers/attention.py'),
                                                        'vision_architectures.layers.attention._Attention.forward': ( 'layers/attention.html#_attention.forward',
-                                                                                                                     'vision_architectures/layers/attention.py')},
+                                                                                                                     'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention._Attention.precompute_key_value': ( 'layers/attention.html#_attention.precompute_key_value',
+                                                                                                                                  'vision_architectures/layers/attention.py'),
+                                                       'vision_architectures.layers.attention._Attention.precompute_query': ( 'layers/attention.html#_attention.precompute_query',
+                                                                                                                              'vision_architectures/layers/attention.py')},
             'vision_architectures.layers.codebook': { 'vision_architectures.layers.codebook.Codebook': ( 'layers/codebook.html#codebook',
                                                                                                          'vision_architectures/layers/codebook.py'),
                                                       'vision_architectures.layers.codebook.Codebook.__init__': ( 'layers/codebook.html#codebook.__init__',
@@ -397,6 +453,8 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                             'vision_architectures/layers/scale.py'),
                                                    'vision_architectures.layers.scale.PixelShuffleDownsample3D._forward': ( 'layers/scale.html#pixelshuffledownsample3d._forward',
                                                                                                                             'vision_architectures/layers/scale.py'),
+                                                   'vision_architectures.layers.scale.PixelShuffleDownsample3D._fused_contract': ( 'layers/scale.html#pixelshuffledownsample3d._fused_contract',
+                                                                                                                                   'vision_architectures/layers/scale.py'),
                                                    'vision_architectures.layers.scale.PixelShuffleDownsample3D.forward': ( 'layers/scale.html#pixelshuffledownsample3d.forward',
                                                                                                                            'vision_architectures/layers/scale.py'),
                                                    'vision_architectures.layers.scale.PixelShuffleScaleConfig': ( 'layers/scale.html#pixelshufflescaleconfig',
@@ -407,12 +465,22 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                           'vision_architectures/layers/scale.py'),
                                                    'vision_architectures.layers.scale.PixelShuffleUpsample3D._forward': ( 'layers/scale.html#pixelshuffleupsample3d._forward',
                                                                                                                           'vision_architectures/layers/scale.py'),
+                                                   'vision_architectures.layers.scale.PixelShuffleUpsample3D._fused_expand': ( 'layers/scale.html#pixelshuffleupsample3d._fused_expand',
+                                                                                                                               'vision_architectures/layers/scale.py'),
                                                    'vision_architectures.layers.scale.PixelShuffleUpsample3D.forward': ( 'layers/scale.html#pixelshuffleupsample3d.forward',
-                                                                                                                         'vision_architectures/layers/scale.py')},
+                                                                                                                         'vision_architectures/layers/scale.py'),
+                                                   'vision_architectures.layers.scale._get_fused_conv_padding': ( 'layers/scale.html#_get_fused_conv_padding',
+                                                                                                                  'vision_architectures/layers/scale.py'),
+                                                   'vision_architectures.layers.scale.conv3d_pixel_shuffle': ( 'layers/scale.html#conv3d_pixel_shuffle',
+                                                                                                               'vision_architectures/layers/scale.py'),
+                                                   'vision_architectures.layers.scale.pixel_unshuffle_conv3d': ( 'layers/scale.html#pixel_unshuffle_conv3d',
+                                                                                                                 'vision_architectures/layers/scale.py')},
             'vision_architectures.losses.class_balanced_cross_entropy_loss': { 'vision_architectures.losses.class_balanced_cross_entropy_loss.ClassBalancedCrossEntropyLoss': ( 'losses/class_balanced_cross_entropy_loss.html#classbalancedcrossentropyloss',
                                                                                                                                                                                 'vision_architectures/losses/class_balanced_cross_entropy_loss.py'),
                                                                                'vision_architectures.losses.class_balanced_cross_entropy_loss.ClassBalancedCrossEntropyLoss.__init__': ( 'losses/class_balanced_cross_entropy_loss.html#classbalancedcrossentropyloss.__init__',
                                                                                                                                                                                          'vision_architectures/losses/class_balanced_cross_entropy_loss.py'),
+                                                                               'vision_architectures.losses.class_balanced_cross_entropy_loss.ClassBalancedCrossEntropyLoss._compute_class_weights': ( 'losses/class_balanced_cross_entropy_loss.html#classbalancedcrossentropyloss._compute_class_weights',
+                                                                                                                                                                                                       'vision_architectures/losses/class_balanced_cross_entropy_loss.py'),
                                                                                'vision_architectures.losses.class_balanced_cross_entropy_loss.ClassBalancedCrossEntropyLoss.forward': ( 'losses/class_balanced_cross_entropy_loss.html#classbalancedcrossentropyloss.forward',
                                                                                                                                                                                         'vision_architectures/losses/class_balanced_cross_entropy_loss.py'),
                                                                                'vision_architectures.losses.class_balanced_cross_entropy_loss.ClassBalancedCrossEntropyLoss.get_class_prevalences': ( 'losses/class_balanced_cross_entropy_loss.html#classbalancedcrossentropyloss.get_class_prevalences',
@@ -423,6 +491,18 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                                                                                          'vision_architectures/losses/class_balanced_cross_entropy_loss.py'),
                                                                                'vision_architectures.losses.class_balanced_cross_entropy_loss.ClassBalancedCrossEntropyLossConfig': ( 'losses/class_balanced_cross_entropy_loss.html#classbalancedcrossentropylossconfig',
                                                                                                                                                                                       'vision_architectures/losses/class_balanced_cross_entropy_loss.py')},
+            'vision_architectures.losses.dice_ce_loss': { 'vision_architectures.losses.dice_ce_loss.DiceCELoss': ( 'losses/dice_ce_loss.html#diceceloss',
+                                                                                                                   'vision_architectures/losses/dice_ce_loss.py'),
+                                                          'vision_architectures.losses.dice_ce_loss.DiceCELoss.__init__': ( 'losses/dice_ce_loss.html#diceceloss.__init__',
+                                                                                                                            'vision_architectures/losses/dice_ce_loss.py'),
+                                                          'vision_architectures.losses.dice_ce_loss.DiceCELoss._chunk_statistics': ( 'losses/dice_ce_loss.html#diceceloss._chunk_statistics',
+                                                                                                                                     'vision_architectures/losses/dice_ce_loss.py'),
+                                                          'vision_architectures.losses.dice_ce_loss.DiceCELoss._reduce': ( 'losses/dice_ce_loss.html#diceceloss._reduce',
+                                                                                                                           'vision_architectures/losses/dice_ce_loss.py'),
+                                                          'vision_architectures.losses.dice_ce_loss.DiceCELoss.forward': ( 'losses/dice_ce_loss.html#diceceloss.forward',
+                                                                                                                           'vision_architectures/losses/dice_ce_loss.py'),
+                                                          'vision_architectures.losses.dice_ce_loss.DiceCELossConfig': ( 'losses/dice_ce_loss.html#dicecelossconfig',
+                                                                                                                         'vision_architectures/losses/dice_ce_loss.py')},
             'vision_architectures.metrics.detection': { 'vision_architectures.metrics.detection.AveragePrecision': ( 'metrics/detection.html#averageprecision',
                                                                                                                      'vision_architectures/metrics/detection.py'),
                                                         'vision_architectures.metrics.detection.AveragePrecision.__init__': ( 'metrics/detection.html#averageprecision.__init__',
@@ -447,8 +527,56 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                                               'vision_architectures/metrics/detection.py'),
                                                         'vision_architectures.metrics.detection._MeanAveragePrecisionMeanAverageRecallBase.update': ( 'metrics/detection.html#_meanaverageprecisionmeanaveragerecallbase.update',
                                                                                                                                                       'vision_architectures/metrics/detection.py'),
+                                                        'vision_architectures.metrics.detection._average_precisions_recalls_from_records': ( 'metrics/detection.html#_average_precisions_recalls_from_records',
+                                                                                                                                             'vision_architectures/metrics/detection.py'),
+                                                        'vision_architectures.metrics.detection._get_detection_records': ( 'metrics/detection.html#_get_detection_records',
+                                                                                                                           'vision_architectures/metrics/detection.py'),
                                                         'vision_architectures.metrics.detection.mean_average_precision_mean_average_recall': ( 'metrics/detection.html#mean_average_precision_mean_average_recall',
                                                                                                                                                'vision_architectures/metrics/detection.py')},
+            'vision_architectures.metrics.segmentation': { 'vision_architectures.metrics.segmentation.DiceScore': ( 'metrics/segmentation.html#dicescore',
+                                                                                                                    'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation.DiceScore.__init__': ( 'metrics/segmentation.html#dicescore.__init__',
+                                                                                                                             'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation.DiceScore.compute': ( 'metrics/segmentation.html#dicescore.compute',
+                                                                                                                            'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation.DiceScore.update': ( 'metrics/segmentation.html#dicescore.update',
+                                                                                                                           'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation.HausdorffDistance': ( 'metrics/segmentation.html#hausdorffdistance',
+                                                                                                                            'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation.HausdorffDistance.__init__': ( 'metrics/segmentation.html#hausdorffdistance.__init__',
+                                                                                                                                     'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation.HausdorffDistance._metric_from_surface_distances': ( 'metrics/segmentation.html#hausdorffdistance._metric_from_surface_distances',
+                                                                                                                                                           'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation.SurfaceDiceScore': ( 'metrics/segmentation.html#surfacedicescore',
+                                                                                                                           'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation.SurfaceDiceScore.__init__': ( 'metrics/segmentation.html#surfacedicescore.__init__',
+                                                                                                                                    'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation.SurfaceDiceScore._metric_from_surface_distances': ( 'metrics/segmentation.html#surfacedicescore._metric_from_surface_distances',
+                                                                                                                                                          'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._SurfaceDistanceMetricBase': ( 'metrics/segmentation.html#_surfacedistancemetricbase',
+                                                                                                                                     'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._SurfaceDistanceMetricBase.__init__': ( 'metrics/segmentation.html#_surfacedistancemetricbase.__init__',
+                                                                                                                                              'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._SurfaceDistanceMetricBase._metric_from_surface_distances': ( 'metrics/segmentation.html#_surfacedistancemetricbase._metric_from_surface_distances',
+                                                                                                                                                                    'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._SurfaceDistanceMetricBase.compute': ( 'metrics/segmentation.html#_surfacedistancemetricbase.compute',
+                                                                                                                                             'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._SurfaceDistanceMetricBase.update': ( 'metrics/segmentation.html#_surfacedistancemetricbase.update',
+                                                                                                                                            'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._average': ( 'metrics/segmentation.html#_average',
+                                                                                                                   'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._get_boundaries': ( 'metrics/segmentation.html#_get_boundaries',
+                                                                                                                          'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._get_class_counts': ( 'metrics/segmentation.html#_get_class_counts',
+                                                                                                                            'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._get_distance_transform': ( 'metrics/segmentation.html#_get_distance_transform',
+                                                                                                                                  'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._get_foreground_slices': ( 'metrics/segmentation.html#_get_foreground_slices',
+                                                                                                                                 'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._get_surface_distances': ( 'metrics/segmentation.html#_get_surface_distances',
+                                                                                                                                 'vision_architectures/metrics/segmentation.py'),
+                                                           'vision_architectures.metrics.segmentation._to_labels': ( 'metrics/segmentation.html#_to_labels',
+                                                                                                                     'vision_architectures/metrics/segmentation.py')},
             'vision_architectures.nets.cait_3d': { 'vision_architectures.nets.cait_3d.CaiT1D': ( 'nets/cait_3d.html#cait1d',
                                                                                                  'vision_architectures/nets/cait_3d.py'),
                                                    'vision_architectures.nets.cait_3d.CaiT1D.__init__': ( 'nets/cait_3d.html#cait1d.__init__',
@@ -503,12 +631,16 @@ d = { 'settings': { 'branch': 'main',
                                                                                                           'vision_architectures/nets/detr_3d.py'),
                                                    'vision_architectures.nets.detr_3d.DETR3D._update_class_prevalences': ( 'nets/detr_3d.html#detr3d._update_class_prevalences',
                                                                                                                            'vision_architectures/nets/detr_3d.py'),
+                                                   'vision_architectures.nets.detr_3d.DETR3D.batched_pairwise_bbox_giou': ( 'nets/detr_3d.html#detr3d.batched_pairwise_bbox_giou',
+                                                                                                                            'vision_architectures/nets/detr_3d.py'),
                                                    'vision_architectures.nets.detr_3d.DETR3D.bbox_giou': ( 'nets/detr_3d.html#detr3d.bbox_giou',
                                                                                                            'vision_architectures/nets/detr_3d.py'),
                                                    'vision_architectures.nets.detr_3d.DETR3D.bbox_iou': ( 'nets/detr_3d.html#detr3d.bbox_iou',
                                                                                                           'vision_architectures/nets/detr_3d.py'),
                                                    'vision_architectures.nets.detr_3d.DETR3D.bipartite_matching_loss': ( 'nets/detr_3d.html#detr3d.bipartite_matching_loss',
                                                                                                                          'vision_architectures/nets/detr_3d.py'),
+                                                   'vision_architectures.nets.detr_3d.DETR3D.detect_tiled': ( 'nets/detr_3d.html#detr3d.detect_tiled',
+                                                                                                              'vision_architectures/nets/detr_3d.py'),
                                                    'vision_architectures.nets.detr_3d.DETR3D.forward': ( 'nets/detr_3d.html#detr3d.forward',
                                                                                                          'vision_architectures/nets/detr_3d.py'),
                                                    'vision_architectures.nets.detr_3d.DETR3D.hungarian_matching': ( 'nets/detr_3d.html#detr3d.hungarian_matching',
@@ -539,6 +671,8 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                       'vision_architectures/nets/detr_3d.py'),
                                                    'vision_architectures.nets.detr_3d.DETR3DDecoderLayer.forward': ( 'nets/detr_3d.html#detr3ddecoderlayer.forward',
                                                                                                                      'vision_architectures/nets/detr_3d.py'),
+                                                   'vision_architectures.nets.detr_3d.DETR3DDecoderLayerConfig': ( 'nets/detr_3d.html#detr3ddecoderlayerconfig',
+                                                                                                                   'vision_architectures/nets/detr_3d.py'),
                                                    'vision_architectures.nets.detr_3d.DETR3DEncoder': ( 'nets/detr_3d.html#detr3dencoder',
                                                                                                         'vision_architectures/nets/detr_3d.py'),
                                                    'vision_architectures.nets.detr_3d.DETR3DEncoder.__init__': ( 'nets/detr_3d.html#detr3dencoder.__init__',
@@ -645,8 +779,6 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                              'vision_architectures/nets/maxvit_3d.py'),
                                                      'vision_architectures.nets.maxvit_3d.MaxViT3DGridAttention': ( 'nets/maxvit_3d.html#maxvit3dgridattention',
                                                                                                                     'vision_architectures/nets/maxvit_3d.py'),
-                                                     'vision_architectures.nets.maxvit_3d.MaxViT3DGridAttention._get_rearrange_patterns': ( 'nets/maxvit_3d.html#maxvit3dgridattention._get_rearrange_patterns',
-                                                                                                                                            'vision_architectures/nets/maxvit_3d.py'),
                                                      'vision_architectures.nets.maxvit_3d.MaxViT3DStem': ( 'nets/maxvit_3d.html#maxvit3dstem',
                                                                                                            'vision_architectures/nets/maxvit_3d.py'),
                                                      'vision_architectures.nets.maxvit_3d.MaxViT3DStem.__init__': ( 'nets/maxvit_3d.html#maxvit3dstem.__init__',
@@ -685,8 +817,16 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                        'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.Perceiver3DDecoder.__init__': ( 'nets/perceiver_3d.html#perceiver3ddecoder.__init__',
                                                                                                                                 'vision_architectures/nets/perceiver_3d.py'),
+                                                        'vision_architectures.nets.perceiver_3d.Perceiver3DDecoder._apply': ( 'nets/perceiver_3d.html#perceiver3ddecoder._apply',
+                                                                                                                              'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.Perceiver3DDecoder._forward': ( 'nets/perceiver_3d.html#perceiver3ddecoder._forward',
                                                                                                                                 'vision_architectures/nets/perceiver_3d.py'),
+                                                        'vision_architectures.nets.perceiver_3d.Perceiver3DDecoder._get_first_layer_queries': ( 'nets/perceiver_3d.html#perceiver3ddecoder._get_first_layer_queries',
+                                                                                                                                                'vision_architectures/nets/perceiver_3d.py'),
+                                                        'vision_architectures.nets.perceiver_3d.Perceiver3DDecoder._get_initial_queries': ( 'nets/perceiver_3d.html#perceiver3ddecoder._get_initial_queries',
+                                                                                                                                            'vision_architectures/nets/perceiver_3d.py'),
+                                                        'vision_architectures.nets.perceiver_3d.Perceiver3DDecoder._get_window_queries': ( 'nets/perceiver_3d.html#perceiver3ddecoder._get_window_queries',
+                                                                                                                                           'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.Perceiver3DDecoder.forward': ( 'nets/perceiver_3d.html#perceiver3ddecoder.forward',
                                                                                                                                'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.Perceiver3DDecoderConfig': ( 'nets/perceiver_3d.html#perceiver3ddecoderconfig',
@@ -719,6 +859,8 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                      'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.Perceiver3DEncoderEncodeConfig': ( 'nets/perceiver_3d.html#perceiver3dencoderencodeconfig',
                                                                                                                                    'vision_architectures/nets/perceiver_3d.py'),
+                                                        'vision_architectures.nets.perceiver_3d.Perceiver3DEncoderEncodeConfig.validate': ( 'nets/perceiver_3d.html#perceiver3dencoderencodeconfig.validate',
+                                                                                                                                            'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.Perceiver3DEncoderProcess': ( 'nets/perceiver_3d.html#perceiver3dencoderprocess',
                                                                                                                               'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.Perceiver3DEncoderProcess.__init__': ( 'nets/perceiver_3d.html#perceiver3dencoderprocess.__init__',
@@ -731,6 +873,14 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                     'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.Perceiver3DEncoderProcessConfig.validate': ( 'nets/perceiver_3d.html#perceiver3dencoderprocessconfig.validate',
                                                                                                                                              'vision_architectures/nets/perceiver_3d.py'),
+                                                        'vision_architectures.nets.perceiver_3d._compute_fold_index_3d': ( 'nets/perceiver_3d.html#_compute_fold_index_3d',
+                                                                                                                           'vision_architectures/nets/perceiver_3d.py'),
+                                                        'vision_architectures.nets.perceiver_3d._get_fold_index_3d': ( 'nets/perceiver_3d.html#_get_fold_index_3d',
+                                                                                                                       'vision_architectures/nets/perceiver_3d.py'),
+                                                        'vision_architectures.nets.perceiver_3d._get_window_positions_3d': ( 'nets/perceiver_3d.html#_get_window_positions_3d',
+                                                                                                                             'vision_architectures/nets/perceiver_3d.py'),
+                                                        'vision_architectures.nets.perceiver_3d._iter_window_batches_3d': ( 'nets/perceiver_3d.html#_iter_window_batches_3d',
+                                                                                                                            'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.fold_back_3d': ( 'nets/perceiver_3d.html#fold_back_3d',
                                                                                                                  'vision_architectures/nets/perceiver_3d.py'),
                                                         'vision_architectures.nets.perceiver_3d.unfold_with_roll_3d': ( 'nets/perceiver_3d.html#unfold_with_roll_3d',
@@ -799,8 +949,6 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                'vision_architectures/nets/swin_3d.py'),
                                                    'vision_architectures.nets.swin_3d.Swin3DLayer._forward': ( 'nets/swin_3d.html#swin3dlayer._forward',
                                                                                                                'vision_architectures/nets/swin_3d.py'),
-                                                   'vision_architectures.nets.swin_3d.Swin3DLayer._get_rearrange_patterns': ( 'nets/swin_3d.html#swin3dlayer._get_rearrange_patterns',
-                                                                                                                              'vision_architectures/nets/swin_3d.py'),
                                                    'vision_architectures.nets.swin_3d.Swin3DLayer.forward': ( 'nets/swin_3d.html#swin3dlayer.forward',
                                                                                                               'vision_architectures/nets/swin_3d.py'),
                                                    'vision_architectures.nets.swin_3d.Swin3DPatchMerging': ( 'nets/swin_3d.html#swin3dpatchmerging',
@@ -809,6 +957,8 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                       'vision_architectures/nets/swin_3d.py'),
                                                    'vision_architectures.nets.swin_3d.Swin3DPatchMerging._forward': ( 'nets/swin_3d.html#swin3dpatchmerging._forward',
                                                                                                                       'vision_architectures/nets/swin_3d.py'),
+                                                   'vision_architectures.nets.swin_3d.Swin3DPatchMerging._fused_merge': ( 'nets/swin_3d.html#swin3dpatchmerging._fused_merge',
+                                                                                                                          'vision_architectures/nets/swin_3d.py'),
                                                    'vision_architectures.nets.swin_3d.Swin3DPatchMerging.forward': ( 'nets/swin_3d.html#swin3dpatchmerging.forward',
                                                                                                                      'vision_architectures/nets/swin_3d.py'),
                                                    'vision_architectures.nets.swin_3d.Swin3DPatchMergingConfig': ( 'nets/swin_3d.html#swin3dpatchmergingconfig',
@@ -823,6 +973,8 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                         'vision_architectures/nets/swin_3d.py'),
                                                    'vision_architectures.nets.swin_3d.Swin3DPatchSplitting._forward': ( 'nets/swin_3d.html#swin3dpatchsplitting._forward',
                                                                                                                         'vision_architectures/nets/swin_3d.py'),
+                                                   'vision_architectures.nets.swin_3d.Swin3DPatchSplitting._fused_split': ( 'nets/swin_3d.html#swin3dpatchsplitting._fused_split',
+                                                                                                                            'vision_architectures/nets/swin_3d.py'),
                                                    'vision_architectures.nets.swin_3d.Swin3DPatchSplitting.forward': ( 'nets/swin_3d.html#swin3dpatchsplitting.forward',
                                                                                                                        'vision_architectures/nets/swin_3d.py'),
                                                    'vision_architectures.nets.swin_3d.Swin3DPatchSplittingConfig': ( 'nets/swin_3d.html#swin3dpatchsplittingconfig',
@@ -907,6 +1059,10 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                            'vision_architectures/nets/unetr_3d_decoder.py'),
                                                             'vision_architectures.nets.unetr_3d_decoder.UNetR3DDecoder.__init__': ( 'nets/unetr_3d_decoder.html#unetr3ddecoder.__init__',
                                                                                                                                     'vision_architectures/nets/unetr_3d_decoder.py'),
+                                                            'vision_architectures.nets.unetr_3d_decoder.UNetR3DDecoder._decode_embeddings': ( 'nets/unetr_3d_decoder.html#unetr3ddecoder._decode_embeddings',
+                                                                                                                                              'vision_architectures/nets/unetr_3d_decoder.py'),
+                                                            'vision_architectures.nets.unetr_3d_decoder.UNetR3DDecoder._final_layers': ( 'nets/unetr_3d_decoder.html#unetr3ddecoder._final_layers',
+                                                                                                                                         'vision_architectures/nets/unetr_3d_decoder.py'),
                                                             'vision_architectures.nets.unetr_3d_decoder.UNetR3DDecoder._reduce': ( 'nets/unetr_3d_decoder.html#unetr3ddecoder._reduce',
                                                                                                                                    'vision_architectures/nets/unetr_3d_decoder.py'),
                                                             'vision_architectures.nets.unetr_3d_decoder.UNetR3DDecoder.cross_entropy_loss_fn': ( 'nets/unetr_3d_decoder.html#unetr3ddecoder.cross_entropy_loss_fn',
@@ -915,6 +1071,8 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                    'vision_architectures/nets/unetr_3d_decoder.py'),
                                                             'vision_architectures.nets.unetr_3d_decoder.UNetR3DDecoder.loss_fn': ( 'nets/unetr_3d_decoder.html#unetr3ddecoder.loss_fn',
                                                                                                                                    'vision_architectures/nets/unetr_3d_decoder.py'),
+                                                            'vision_architectures.nets.unetr_3d_decoder.UNetR3DDecoder.predict_labels': ( 'nets/unetr_3d_decoder.html#unetr3ddecoder.predict_labels',
+                                                                                                                                          'vision_architectures/nets/unetr_3d_decoder.py'),
                                                             'vision_architectures.nets.unetr_3d_decoder.UNetR3DDecoder.soft_dice_loss_fn': ( 'nets/unetr_3d_decoder.html#unetr3ddecoder.soft_dice_loss_fn',
                                                                                                                                              'vision_architectures/nets/unetr_3d_decoder.py'),
                                                             'vision_architectures.nets.unetr_3d_decoder.UNetR3DDecoderConfig': ( 'nets/unetr_3d_decoder.html#unetr3ddecoderconfig',
@@ -943,22 +1101,32 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                 'vision_architectures/nets/upernet_2d.py'),
                                                       'vision_architectures.nets.upernet_2d.UPerNet2DFusion.__init__': ( 'nets/upernet_2d.html#upernet2dfusion.__init__',
                                                                                                                          'vision_architectures/nets/upernet_2d.py'),
+                                                      'vision_architectures.nets.upernet_2d.UPerNet2DFusion._can_project_before_interpolation': ( 'nets/upernet_2d.html#upernet2dfusion._can_project_before_interpolation',
+                                                                                                                                                  'vision_architectures/nets/upernet_2d.py'),
                                                       'vision_architectures.nets.upernet_2d.UPerNet2DFusion._forward': ( 'nets/upernet_2d.html#upernet2dfusion._forward',
                                                                                                                          'vision_architectures/nets/upernet_2d.py'),
+                                                      'vision_architectures.nets.upernet_2d.UPerNet2DFusion._get_fused_shape': ( 'nets/upernet_2d.html#upernet2dfusion._get_fused_shape',
+                                                                                                                                 'vision_architectures/nets/upernet_2d.py'),
                                                       'vision_architectures.nets.upernet_2d.UPerNet2DFusion.concat_features': ( 'nets/upernet_2d.html#upernet2dfusion.concat_features',
                                                                                                                                 'vision_architectures/nets/upernet_2d.py'),
                                                       'vision_architectures.nets.upernet_2d.UPerNet2DFusion.forward': ( 'nets/upernet_2d.html#upernet2dfusion.forward',
                                                                                                                         'vision_architectures/nets/upernet_2d.py'),
                                                       'vision_architectures.nets.upernet_2d.UPerNet2DFusion.fuse_features': ( 'nets/upernet_2d.html#upernet2dfusion.fuse_features',
                                                                                                                               'vision_architectures/nets/upernet_2d.py'),
+                                                      'vision_architectures.nets.upernet_2d.UPerNet2DFusion.project_and_interpolate_features': ( 'nets/upernet_2d.html#upernet2dfusion.project_and_interpolate_features',
+                                                                                                                                                 'vision_architectures/nets/upernet_2d.py'),
                                                       'vision_architectures.nets.upernet_2d.UPerNet2DFusionConfig': ( 'nets/upernet_2d.html#upernet2dfusionconfig',
                                                                                                                       'vision_architectures/nets/upernet_2d.py')},
             'vision_architectures.nets.upernet_3d': { 'vision_architectures.nets.upernet_3d.UPerNet3D': ( 'nets/upernet_3d.html#upernet3d',
                                                                                                           'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3D.__init__': ( 'nets/upernet_3d.html#upernet3d.__init__',
                                                                                                                    'vision_architectures/nets/upernet_3d.py'),
+                                                      'vision_architectures.nets.upernet_3d.UPerNet3D._fpn_features': ( 'nets/upernet_3d.html#upernet3d._fpn_features',
+                                                                                                                        'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3D.forward': ( 'nets/upernet_3d.html#upernet3d.forward',
                                                                                                                   'vision_architectures/nets/upernet_3d.py'),
+                                                      'vision_architectures.nets.upernet_3d.UPerNet3D.predict_labels': ( 'nets/upernet_3d.html#upernet3d.predict_labels',
+                                                                                                                         'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3DConfig': ( 'nets/upernet_3d.html#upernet3dconfig',
                                                                                                                 'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3DConfig.validate': ( 'nets/upernet_3d.html#upernet3dconfig.validate',
@@ -969,14 +1137,20 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                 'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3DFusion.__init__': ( 'nets/upernet_3d.html#upernet3dfusion.__init__',
                                                                                                                          'vision_architectures/nets/upernet_3d.py'),
+                                                      'vision_architectures.nets.upernet_3d.UPerNet3DFusion._can_project_before_interpolation': ( 'nets/upernet_3d.html#upernet3dfusion._can_project_before_interpolation',
+                                                                                                                                                  'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3DFusion._forward': ( 'nets/upernet_3d.html#upernet3dfusion._forward',
                                                                                                                          'vision_architectures/nets/upernet_3d.py'),
+                                                      'vision_architectures.nets.upernet_3d.UPerNet3DFusion._get_fused_shape': ( 'nets/upernet_3d.html#upernet3dfusion._get_fused_shape',
+                                                                                                                                 'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3DFusion.concat_features': ( 'nets/upernet_3d.html#upernet3dfusion.concat_features',
                                                                                                                                 'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3DFusion.forward': ( 'nets/upernet_3d.html#upernet3dfusion.forward',
                                                                                                                         'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3DFusion.fuse_features': ( 'nets/upernet_3d.html#upernet3dfusion.fuse_features',
                                                                                                                               'vision_architectures/nets/upernet_3d.py'),
+                                                      'vision_architectures.nets.upernet_3d.UPerNet3DFusion.project_and_interpolate_features': ( 'nets/upernet_3d.html#upernet3dfusion.project_and_interpolate_features',
+                                                                                                                                                 'vision_architectures/nets/upernet_3d.py'),
                                                       'vision_architectures.nets.upernet_3d.UPerNet3DFusionConfig': ( 'nets/upernet_3d.html#upernet3dfusionconfig',
                                                                                                                       'vision_architectures/nets/upernet_3d.py')},
             'vision_architectures.nets.vit_3d': { 'vision_architectures.nets.vit_3d.ViT3DDecoder': ( 'nets/vit_3d.html#vit3ddecoder',
@@ -1207,24 +1381,38 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                                                  'vision_architectures/utils/activation_checkpointing.py')},
             'vision_architectures.utils.activations': { 'vision_architectures.utils.activations.get_act_layer': ( 'utils/activations.html#get_act_layer',
                                                                                                                   'vision_architectures/utils/activations.py')},
-            'vision_architectures.utils.bounding_boxes': { 'vision_architectures.utils.bounding_boxes._IndexedConfidenceScore': ( 'utils/bounding_boxes.html#_indexedconfidencescore',
-                                                                                                                                  'vision_architectures/utils/bounding_boxes.py'),
-                                                           'vision_architectures.utils.bounding_boxes._IndexedConfidenceScore.__ge__': ( 'utils/bounding_boxes.html#_indexedconfidencescore.__ge__',
-                                                                                                                                         'vision_architectures/utils/bounding_boxes.py'),
-                                                           'vision_architectures.utils.bounding_boxes._IndexedConfidenceScore.__gt__': ( 'utils/bounding_boxes.html#_indexedconfidencescore.__gt__',
-                                                                                                                                         'vision_architectures/utils/bounding_boxes.py'),
-                                                           'vision_architectures.utils.bounding_boxes._IndexedConfidenceScore.__init__': ( 'utils/bounding_boxes.html#_indexedconfidencescore.__init__',
-                                                                                                                                           'vision_architectures/utils/bounding_boxes.py'),
-                                                           'vision_architectures.utils.bounding_boxes._IndexedConfidenceScore.__le__': ( 'utils/bounding_boxes.html#_indexedconfidencescore.__le__',
-                                                                                                                                         'vision_architectures/utils/bounding_boxes.py'),
-                                                           'vision_architectures.utils.bounding_boxes._IndexedConfidenceScore.__lt__': ( 'utils/bounding_boxes.html#_indexedconfidencescore.__lt__',
-                                                                                                                                         'vision_architectures/utils/bounding_boxes.py'),
-                                                           'vision_architectures.utils.bounding_boxes._IndexedConfidenceScore.__repr__': ( 'utils/bounding_boxes.html#_indexedconfidencescore.__repr__',
-                                                                                                                                           'vision_architectures/utils/bounding_boxes.py'),
-                                                           'vision_architectures.utils.bounding_boxes._IndexedConfidenceScore.from_batch': ( 'utils/bounding_boxes.html#_indexedconfidencescore.from_batch',
-                                                                                                                                             'vision_architectures/utils/bounding_boxes.py'),
+            'vision_architectures.utils.bbox_ops': { 'vision_architectures.utils.bbox_ops._from_corners': ( 'utils/bbox_ops.html#_from_corners',
+                                                                                                            'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops._overlaps': ( 'utils/bbox_ops.html#_overlaps',
+                                                                                                        'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops._pairwise_overlaps': ( 'utils/bbox_ops.html#_pairwise_overlaps',
+                                                                                                                 'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops._sort_by_scores': ( 'utils/bbox_ops.html#_sort_by_scores',
+                                                                                                              'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops._to_corners': ( 'utils/bbox_ops.html#_to_corners',
+                                                                                                          'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops.batched_nms': ( 'utils/bbox_ops.html#batched_nms',
+                                                                                                          'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops.bbox_giou': ( 'utils/bbox_ops.html#bbox_giou',
+                                                                                                        'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops.bbox_iou': ( 'utils/bbox_ops.html#bbox_iou',
+                                                                                                       'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops.convert_bboxes': ( 'utils/bbox_ops.html#convert_bboxes',
+                                                                                                             'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops.pairwise_bbox_giou': ( 'utils/bbox_ops.html#pairwise_bbox_giou',
+                                                                                                                 'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops.pairwise_bbox_iou': ( 'utils/bbox_ops.html#pairwise_bbox_iou',
+                                                                                                                'vision_architectures/utils/bbox_ops.py'),
+                                                     'vision_architectures.utils.bbox_ops.weighted_box_fusion': ( 'utils/bbox_ops.html#weighted_box_fusion',
+                                                                                                                  'vision_architectures/utils/bbox_ops.py')},
+            'vision_architectures.utils.bounding_boxes': { 'vision_architectures.utils.bounding_boxes.BBoxMatching': ( 'utils/bounding_boxes.html#bboxmatching',
+                                                                                                                       'vision_architectures/utils/bounding_boxes.py'),
+                                                           'vision_architectures.utils.bounding_boxes._greedy_match': ( 'utils/bounding_boxes.html#_greedy_match',
+                                                                                                                        'vision_architectures/utils/bounding_boxes.py'),
                                                            'vision_architectures.utils.bounding_boxes.get_tps_fps_fns': ( 'utils/bounding_boxes.html#get_tps_fps_fns',
-                                                                                                                          'vision_architectures/utils/bounding_boxes.py')},
+                                                                                                                          'vision_architectures/utils/bounding_boxes.py'),
+                                                           'vision_architectures.utils.bounding_boxes.match_bboxes': ( 'utils/bounding_boxes.html#match_bboxes',
+                                                                                                                       'vision_architectures/utils/bounding_boxes.py')},
             'vision_architectures.utils.clamping': { 'vision_architectures.utils.clamping.ceil_softplus_clamp': ( 'utils/clampling.html#ceil_softplus_clamp',
                                                                                                                   'vision_architectures/utils/clamping.py'),
                                                      'vision_architectures.utils.clamping.floor_softplus_clamp': ( 'utils/clampling.html#floor_softplus_clamp',
@@ -1259,6 +1447,20 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                          'vision_architectures/utils/ema_network.py'),
                                                         'vision_architectures.utils.ema_network.EMANetwork.update_decay': ( 'utils/ema_network.html#emanetwork.update_decay',
                                                                                                                             'vision_architectures/utils/ema_network.py')},
+            'vision_architectures.utils.intermediates': { 'vision_architectures.utils.intermediates.get_capture_indices': ( 'utils/intermediates.html#get_capture_indices',
+                                                                                                                            'vision_architectures/utils/intermediates.py'),
+                                                          'vision_architectures.utils.intermediates.get_local_capture_indices': ( 'utils/intermediates.html#get_local_capture_indices',
+                                                                                                                                  'vision_architectures/utils/intermediates.py')},
+            'vision_architectures.utils.label_maps': { 'vision_architectures.utils.label_maps._to_tuple': ( 'utils/label_maps.html#_to_tuple',
+                                                                                                            'vision_architectures/utils/label_maps.py'),
+                                                       'vision_architectures.utils.label_maps.tiled_argmax': ( 'utils/label_maps.html#tiled_argmax',
+                                                                                                               'vision_architectures/utils/label_maps.py')},
+            'vision_architectures.utils.linear_assignment': { 'vision_architectures.utils.linear_assignment._auction_phase': ( 'utils/linear_assignment.html#_auction_phase',
+                                                                                                                               'vision_architectures/utils/linear_assignment.py'),
+                                                              'vision_architectures.utils.linear_assignment.auction_linear_sum_assignment': ( 'utils/linear_assignment.html#auction_linear_sum_assignment',
+                                                                                                                                              'vision_architectures/utils/linear_assignment.py'),
+                                                              'vision_architectures.utils.linear_assignment.batched_linear_sum_assignment': ( 'utils/linear_assignment.html#batched_linear_sum_assignment',
+                                                                                                                                              'vision_architectures/utils/linear_assignment.py')},
             'vision_architectures.utils.normalizations': { 'vision_architectures.utils.normalizations.DyT': ( 'utils/normalizations.html#dyt',
                                                                                                               'vision_architectures/utils/normalizations.py'),
                                                            'vision_architectures.utils.normalizations.DyT.__init__': ( 'utils/normalizations.html#dyt.__init__',
@@ -1289,10 +1491,16 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                            'vision_architectures/utils/pipeline_parallelism.py'),
                                                                  'vision_architectures.utils.pipeline_parallelism.unparallelize_pipeline': ( 'utils/pipeline_parallelism.html#unparallelize_pipeline',
                                                                                                                                              'vision_architectures/utils/pipeline_parallelism.py')},
-            'vision_architectures.utils.rearrange': { 'vision_architectures.utils.rearrange.make_channels_first': ( 'utils/rearrange.html#make_channels_first',
+            'vision_architectures.utils.rearrange': { 'vision_architectures.utils.rearrange._scale_factor_3d': ( 'utils/rearrange.html#_scale_factor_3d',
+                                                                                                                 'vision_architectures/utils/rearrange.py'),
+                                                      'vision_architectures.utils.rearrange.make_channels_first': ( 'utils/rearrange.html#make_channels_first',
                                                                                                                     'vision_architectures/utils/rearrange.py'),
                                                       'vision_architectures.utils.rearrange.make_channels_last': ( 'utils/rearrange.html#make_channels_last',
                                                                                                                    'vision_architectures/utils/rearrange.py'),
+                                                      'vision_architectures.utils.rearrange.pixel_shuffle_3d': ( 'utils/rearrange.html#pixel_shuffle_3d',
+                                                                                                                 'vision_architectures/utils/rearrange.py'),
+                                                      'vision_architectures.utils.rearrange.pixel_unshuffle_3d': ( 'utils/rearrange.html#pixel_unshuffle_3d',
+                                                                                                                   'vision_architectures/utils/rearrange.py'),
                                                       'vision_architectures.utils.rearrange.rearrange_channels': ( 'utils/rearrange.html#rearrange_channels',
                                                                                                                    'vision_architectures/utils/rearrange.py')},
             'vision_architectures.utils.residuals': { 'vision_architectures.utils.residuals.Residual': ( 'utils/residuals.html#residual',
@@ -1311,10 +1519,32 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                              'vision_architectures/utils/residuals.py'),
                                                       'vision_architectures.utils.residuals.remove_stochastic_depth_dropout': ( 'utils/residuals.html#remove_stochastic_depth_dropout',
                                                                                                                                 'vision_architectures/utils/residuals.py')},
-            'vision_architectures.utils.splitter_merger': { 'vision_architectures.utils.splitter_merger.Merger': ( 'utils/splitter_merger.html#merger',
+            'vision_architectures.utils.splitter_merger': { 'vision_architectures.utils.splitter_merger.ArraySource': ( 'utils/splitter_merger.html#arraysource',
+                                                                                                                        'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.ArraySource.__getitem__': ( 'utils/splitter_merger.html#arraysource.__getitem__',
+                                                                                                                                    'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.ArraySource.shape': ( 'utils/splitter_merger.html#arraysource.shape',
+                                                                                                                              'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Merger': ( 'utils/splitter_merger.html#merger',
                                                                                                                    'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Merger.__call__': ( 'utils/splitter_merger.html#merger.__call__',
+                                                                                                                            'vision_architectures/utils/splitter_merger.py'),
                                                             'vision_architectures.utils.splitter_merger.Merger.__init__': ( 'utils/splitter_merger.html#merger.__init__',
                                                                                                                             'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Merger.add': ( 'utils/splitter_merger.html#merger.add',
+                                                                                                                       'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Merger.add_batched': ( 'utils/splitter_merger.html#merger.add_batched',
+                                                                                                                               'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Merger.get_split_weights': ( 'utils/splitter_merger.html#merger.get_split_weights',
+                                                                                                                                     'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Merger.merge': ( 'utils/splitter_merger.html#merger.merge',
+                                                                                                                         'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Merger.reset': ( 'utils/splitter_merger.html#merger.reset',
+                                                                                                                         'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.MergerConfig': ( 'utils/splitter_merger.html#mergerconfig',
+                                                                                                                         'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.MergerConfig.validate': ( 'utils/splitter_merger.html#mergerconfig.validate',
+                                                                                                                                  'vision_architectures/utils/splitter_merger.py'),
                                                             'vision_architectures.utils.splitter_merger.Splitter': ( 'utils/splitter_merger.html#splitter',
                                                                                                                      'vision_architectures/utils/splitter_merger.py'),
                                                             'vision_architectures.utils.splitter_merger.Splitter.__call__': ( 'utils/splitter_merger.html#splitter.__call__',
@@ -1323,6 +1553,10 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                               'vision_architectures/utils/splitter_merger.py'),
                                                             'vision_architectures.utils.splitter_merger.Splitter._check_input_shape': ( 'utils/splitter_merger.html#splitter._check_input_shape',
                                                                                                                                         'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Splitter._get_positions': ( 'utils/splitter_merger.html#splitter._get_positions',
+                                                                                                                                    'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Splitter._get_split': ( 'utils/splitter_merger.html#splitter._get_split',
+                                                                                                                                'vision_architectures/utils/splitter_merger.py'),
                                                             'vision_architectures.utils.splitter_merger.Splitter.expand': ( 'utils/splitter_merger.html#splitter.expand',
                                                                                                                             'vision_architectures/utils/splitter_merger.py'),
                                                             'vision_architectures.utils.splitter_merger.Splitter.get_expanded_shape': ( 'utils/splitter_merger.html#splitter.get_expanded_shape',
@@ -1333,13 +1567,31 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                    'vision_architectures/utils/splitter_merger.py'),
                                                             'vision_architectures.utils.splitter_merger.Splitter.split': ( 'utils/splitter_merger.html#splitter.split',
                                                                                                                            'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger.Splitter.split_batched': ( 'utils/splitter_merger.html#splitter.split_batched',
+                                                                                                                                   'vision_architectures/utils/splitter_merger.py'),
                                                             'vision_architectures.utils.splitter_merger.SplitterConfig': ( 'utils/splitter_merger.html#splitterconfig',
                                                                                                                            'vision_architectures/utils/splitter_merger.py'),
                                                             'vision_architectures.utils.splitter_merger.SplitterConfig.validate': ( 'utils/splitter_merger.html#splitterconfig.validate',
-                                                                                                                                    'vision_architectures/utils/splitter_merger.py')},
+                                                                                                                                    'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger._get_source_shape': ( 'utils/splitter_merger.html#_get_source_shape',
+                                                                                                                              'vision_architectures/utils/splitter_merger.py'),
+                                                            'vision_architectures.utils.splitter_merger._read_source': ( 'utils/splitter_merger.html#_read_source',
+                                                                                                                         'vision_architectures/utils/splitter_merger.py')},
             'vision_architectures.utils.timesteps': { 'vision_architectures.utils.timesteps.TimestepSampler': ( 'utils/timesteps.html#timestepsampler',
                                                                                                                 'vision_architectures/utils/timesteps.py'),
                                                       'vision_architectures.utils.timesteps.TimestepSampler.__init__': ( 'utils/timesteps.html#timestepsampler.__init__',
                                                                                                                          'vision_architectures/utils/timesteps.py'),
                                                       'vision_architectures.utils.timesteps.TimestepSampler.forward': ( 'utils/timesteps.html#timestepsampler.forward',
-                                                                                                                        'vision_architectures/utils/timesteps.py')}}}
+                                                                                                                        'vision_architectures/utils/timesteps.py')},
+            'vision_architectures.utils.windowing': { 'vision_architectures.utils.windowing._get_window_token_regions': ( 'utils/windowing.html#_get_window_token_regions',
+                                                                                                                          'vision_architectures/utils/windowing.py'),
+                                                      'vision_architectures.utils.windowing.get_window_attention_mask': ( 'utils/windowing.html#get_window_attention_mask',
+                                                                                                                          'vision_architectures/utils/windowing.py'),
+                                                      'vision_architectures.utils.windowing.get_window_partition_indices': ( 'utils/windowing.html#get_window_partition_indices',
+                                                                                                                             'vision_architectures/utils/windowing.py'),
+                                                      'vision_architectures.utils.windowing.pad_to_window_multiple_3d': ( 'utils/windowing.html#pad_to_window_multiple_3d',
+                                                                                                                          'vision_architectures/utils/windowing.py'),
+                                                      'vision_architectures.utils.windowing.window_partition_3d': ( 'utils/windowing.html#window_partition_3d',
+                                                                                                                    'vision_architectures/utils/windowing.py'),
+                                                      'vision_architectures.utils.windowing.window_unpartition_3d': ( 'utils/windowing.html#window_unpartition_3d',
+                                                                                                                      'vision_architectures/utils/windowing.py')}}}
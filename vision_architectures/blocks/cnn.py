@@ -196,15 +196,7 @@ class _CNNBlock(nn.Module):
         x = rearrange_channels(x, channels_first, True)
         # Now x is (b, in_channels, [z], y, x)
 
-        for layer in self.config.sequence:
-            if layer == "C":
-                x = self.conv(x)
-            if layer == "A":
-                x = self.act(x)
-            elif layer == "D":
-                x = self.dropout(x)
-            elif layer == "N":
-                x = self.norm(x)
+        x = self._apply_sequence(x, self.config.sequence)
         # (b, out_channels, [z], y, x)
 
         x = rearrange_channels(x, True, channels_first)
@@ -216,6 +208,20 @@ class _CNNBlock(nn.Module):
     def forward(self, *args, **kwargs):
         return self.checkpointing_level1(self._forward, *args, **kwargs)
 
+    def _apply_sequence(self, x: torch.Tensor, sequence: str) -> torch.Tensor:
+        # Apply the given sequence of layers of the block on channels first input. Useful to apply only the layers that
+        # follow the convolution when the convolution has been computed in a different way.
+        for layer in sequence:
+            if layer == "C":
+                x = self.conv(x)
+            if layer == "A":
+                x = self.act(x)
+            elif layer == "D":
+                x = self.dropout(x)
+            elif layer == "N":
+                x = self.norm(x)
+        return x
+
 # %% ../../nbs/blocks/04_cnn.ipynb #6f475cfb
 @populate_docstring
 class CNNBlock3D(_CNNBlock):
@@ -4,9 +4,11 @@
 __all__ = ['ClassificationHead3D', 'SegmentationHead3D']
 
 # %% ../../nbs/blocks/01_heads_3d.ipynb #e2c5b63d
+import torch
 from torch import nn
 
 from ..utils.activations import get_act_layer
+from ..utils.label_maps import tiled_argmax
 
 # %% ../../nbs/blocks/01_heads_3d.ipynb #40cb7a6d
 class ClassificationHead3D(nn.Sequential):
@@ -64,3 +66,37 @@ class SegmentationHead3D(nn.Sequential):
         upsampling = nn.Upsample(scale_factor=upsampling, mode="trilinear") if upsampling > 1 else nn.Identity()
         activation = get_act_layer(activation)
         super().__init__(conv3d, upsampling, activation)
+
+    @torch.no_grad()
+    def predict_labels(
+        self, x: torch.Tensor, tile_size: int | tuple[int, int, int] = 64, return_probabilities: bool = False
+    ) -> torch.Tensor | tuple[torch.Tensor, torch.Tensor]:
+        """Predict the label map without materializing the logits of all classes for the full volume. Logits are
+        computed one tile at a time and reduced immediately. The activation is skipped, as it is expected to preserve
+        the order of the classes, so probabilities are the softmax of the logits. Should be used in eval mode.
+
+        Args:
+            x: Input of shape (b, in_channels, d, h, w).
+            tile_size: Size of the tiles of the input on which logits are computed at once.
+            return_probabilities: Whether to return the probabilities of the predicted classes too.
+
+        Returns:
+            Label map of shape (b, d * upsampling, h * upsampling, w * upsampling), along with the float16
+            probabilities of the predicted classes of the same shape if ``return_probabilities`` is True.
+        """
+        conv3d, upsampling, _ = self
+
+        scale_factor = 1
+        if isinstance(upsampling, nn.Upsample):
+            scale_factor = upsampling.scale_factor
+            if scale_factor != int(scale_factor):
+                raise ValueError(f"Label maps can only be predicted for integer upsampling, got {scale_factor}")
+            scale_factor = int(scale_factor)
+
+        # Linear interpolation needs one neighbouring voxel on each side
+        halo = tuple(padding + (scale_factor > 1) for padding in conv3d.padding)
+
+        def fn(x_tile: torch.Tensor) -> torch.Tensor:
+            return upsampling(conv3d(x_tile))
+
+        return tiled_argmax(fn, x, tile_size, halo, scale_factor, return_probabilities)
@@ -19,7 +19,7 @@ from ..layers.attention import Attention1D, Attention1DConfig, Attention3D, Atte
 from ..layers.embeddings import RelativePositionEmbeddings
 from ..utils.activation_checkpointing import ActivationCheckpointing
 from ..utils.activations import get_act_layer
-from ..utils.custom_base_model import CustomBaseModel, Field
+from ..utils.custom_base_model import CustomBaseModel, Field, model_validator
 from ..utils.rearrange import rearrange_channels
 from ..utils.residuals import Residual
 
@@ -29,6 +29,21 @@ class Attention1DMLPConfig(CustomBaseModel):
     mlp_ratio: int = Field(4, description="Ratio of the hidden dimension in the MLP to the input dimension.")
     activation: str = Field("gelu", description="Activation function for the MLP.")
     mlp_drop_prob: float = Field(0.0, description="Dropout probability for the MLP.")
+    mlp_chunk_size: int = Field(
+        -1,
+        ge=-1,
+        description=(
+            "Runs the MLP by splitting the tokens into chunks of this size that are processed sequentially. -1 means "
+            "no chunking. Peak memory of the hidden activation is then bounded by the chunk size instead of the number "
+            "of tokens. Combine with activation checkpointing to bound it during training as well."
+        ),
+    )
+
+    @model_validator(mode="after")
+    def validate(self):
+        super().validate()
+        assert self.mlp_chunk_size != 0, "mlp_chunk_size must be positive, or -1 for no chunking"
+        return self
 
 
 class Attention3DMLPConfig(Attention1DMLPConfig):
@@ -94,11 +109,14 @@ class Attention1DMLP(nn.Module):
         self.checkpointing_level1 = ActivationCheckpointing(1, checkpointing_level)
         self.checkpointing_level2 = ActivationCheckpointing(2, checkpointing_level)
 
-    def _forward(self, hidden_states: torch.Tensor) -> torch.Tensor:
+    @populate_docstring
+    def _forward(self, hidden_states: torch.Tensor, residual: torch.Tensor | None = None) -> torch.Tensor:
         """Forward pass of the Attention1DMLP block.
 
         Args:
             hidden_states: {INPUT_1D_DOC}
+            residual: If provided, this is added to the output. When the MLP is chunked, the addition is done chunk by
+                chunk. Should have the same shape as ``hidden_states``.
 
         Returns:
             {OUTPUT_1D_DOC}
@@ -115,9 +133,32 @@ class Attention1DMLP(nn.Module):
             hidden_states = self.dropout(hidden_states)
             return hidden_states
 
-        hidden_states = self.checkpointing_level1(first_half, hidden_states)
-        hidden_states = self.checkpointing_level1(second_half, hidden_states)
-        return hidden_states
+        def mlp(hidden_states, residual):
+            hidden_states = self.checkpointing_level1(first_half, hidden_states)
+            # (b, T, dim * mlp_ratio)
+            hidden_states = self.checkpointing_level1(second_half, hidden_states)
+            # (b, T, dim)
+            if residual is not None:
+                hidden_states = hidden_states + residual
+            return hidden_states
+
+        chunk_size = self.config.mlp_chunk_size
+        num_tokens = hidden_states.shape[1]
+        if chunk_size == -1 or chunk_size >= num_tokens:
+            return mlp(hidden_states, residual)
+
+        # Process chunks of tokens sequentially and write them into the output, so that the largest intermediate
+        # tensor is (b, chunk_size, dim * mlp_ratio)
+        output = None
+        for start in range(0, num_tokens, chunk_size):
+            end = start + chunk_size
+            chunk = mlp(hidden_states[:, start:end], residual[:, start:end] if residual is not None else None)
+            # (b, chunk_size, dim)
+            if output is None:
+                # Allocate based on the first chunk to respect autocast
+                output = chunk.new_empty((*hidden_states.shape[:-1], chunk.shape[-1]))
+            output[:, start:end] = chunk
+        return output
 
     @wraps(_forward)
     def forward(self, *args, **kwargs):
@@ -140,19 +181,32 @@ class Attention3DMLP(Attention1DMLP):
         super().__init__(config, checkpointing_level, **kwargs)
 
     @populate_docstring
-    def _forward(self, hidden_states: torch.Tensor, channels_first: bool = True) -> torch.Tensor:
+    def _forward(
+        self, hidden_states: torch.Tensor, channels_first: bool = True, residual: torch.Tensor | None = None
+    ) -> torch.Tensor:
         """Forward pass of the Attention3DMLP block.
 
         Args:
             hidden_states: {INPUT_3D_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
+            residual: If provided, this is added to the output. When the MLP is chunked, the addition is done chunk by
+                chunk. Should have the same shape and format as ``hidden_states``.
 
         Returns:
             {OUTPUT_3D_DOC}
         """
         # hidden_states: (b, dim, z, y, x) or (b, z, y, x, dim)
         hidden_states = rearrange_channels(hidden_states, channels_first, False)
-        hidden_states = super()._forward(hidden_states)
+        # (b, z, y, x, dim)
+        if residual is not None:
+            residual = rearrange_channels(residual, channels_first, False).flatten(1, -2)
+            # (b, T, dim)
+
+        grid_shape = hidden_states.shape[1:-1]
+        hidden_states = super()._forward(hidden_states.flatten(1, -2), residual)
+        hidden_states = hidden_states.unflatten(1, grid_shape)
+        # (b, z, y, x, dim)
+
         hidden_states = rearrange_channels(hidden_states, False, channels_first)
         return hidden_states
 
@@ -204,14 +258,64 @@ class Attention1DWithMLP(nn.Module):
 
         self.checkpointing_level3 = ActivationCheckpointing(3, checkpointing_level)
 
+    def _fuse_mlp_residual(self) -> bool:
+        # The residual can be added within the (chunked) MLP only when nothing happens between the MLP and the residual,
+        # and when it is a plain addition (stochastic depth needs the whole tensor to sample per-sample masks)
+        return self.config.norm_location == "pre" and type(self.residual) is Residual
+
+    @populate_docstring
+    def precompute_key_value(self, key: torch.Tensor, value: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+        """Normalize and project keys and values once so that they can be reused across several forward passes. Pass
+        the result to the forward pass as ``precomputed_key_value``.
+
+        Args:
+            key: {INPUT_1D_DOC}
+            value: {INPUT_1D_DOC}
+
+        Returns:
+            Tuple of normalized keys and values, each of shape (b, num_kv_heads, T_kv, per_head_dim).
+        """
+        if self.config.norm_location == "pre":
+            key = self.layernorm1(key)
+            value = self.layernorm1(value)
+            # (b, T, dim)
+
+        return self.attn.precompute_key_value(key, value)
+
+    @populate_docstring
+    def precompute_query(self, query: torch.Tensor) -> torch.Tensor:
+        """Normalize and project queries ahead of the forward pass, e.g. to cache the projection of queries that do not
+        change between calls. Pass the result to the forward pass as ``precomputed_query``.
+
+        Args:
+            query: {INPUT_1D_DOC}
+
+        Returns:
+            Normalized and scaled queries of shape (b, num_heads, T_q, per_head_dim).
+        """
+        if self.config.norm_location == "pre":
+            query = self.layernorm1(query)
+            # (b, T, dim)
+
+        return self.attn.precompute_query(query)
+
     @populate_docstring
-    def _forward(self, query: torch.Tensor, key: torch.Tensor, value: torch.Tensor) -> torch.Tensor:
+    def _forward(
+        self,
+        query: torch.Tensor,
+        key: torch.Tensor | None = None,
+        value: torch.Tensor | None = None,
+        precomputed_key_value: tuple[torch.Tensor, torch.Tensor] | None = None,
+        precomputed_query: torch.Tensor | None = None,
+    ) -> torch.Tensor:
         """Forward pass of the Attention1DWithMLP block.
 
         Args:
             query: {INPUT_1D_DOC}
             key: {INPUT_1D_DOC}
             value: {INPUT_1D_DOC}
+            precomputed_key_value: {PRECOMPUTED_KEY_VALUE_DOC}
+            precomputed_query: {PRECOMPUTED_QUERY_DOC}
 
         Returns:
             {OUTPUT_1D_DOC}
@@ -221,12 +325,20 @@ class Attention1DWithMLP(nn.Module):
         # (b, T, dim)
 
         if self.config.norm_location == "pre":
-            query = self.layernorm1(query)
-            key = self.layernorm1(key)
-            value = self.layernorm1(value)
+            if precomputed_query is None:
+                query = self.layernorm1(query)
+            if precomputed_key_value is None:
+                key = self.layernorm1(key)
+                value = self.layernorm1(value)
             # (b, T, dim)
 
-        hidden_states = self.attn(query, key, value)
+        hidden_states = self.attn(
+            query,
+            key,
+            value,
+            precomputed_key_value=precomputed_key_value,
+            precomputed_query=precomputed_query,
+        )
         # (b, T, dim)
 
         if self.config.norm_location == "post":
@@ -241,15 +353,19 @@ class Attention1DWithMLP(nn.Module):
             hidden_states = self.layernorm2(hidden_states)
             # (b, T, dim)
 
-        hidden_states = self.mlp(hidden_states)
-        # (b, T, dim)
-
-        if self.config.norm_location == "post":
-            hidden_states = self.layernorm2(hidden_states)
+        if self._fuse_mlp_residual():
+            hidden_states = self.mlp(hidden_states, residual=res_connection2)
+            # (b, T, dim)
+        else:
+            hidden_states = self.mlp(hidden_states)
             # (b, T, dim)
 
-        hidden_states = self.residual(hidden_states, res_connection2)
-        # (b, T, dim)
+            if self.config.norm_location == "post":
+                hidden_states = self.layernorm2(hidden_states)
+                # (b, T, dim)
+
+            hidden_states = self.residual(hidden_states, res_connection2)
+            # (b, T, dim)
 
         return hidden_states
 
@@ -301,15 +417,84 @@ class Attention3DWithMLP(nn.Module):
 
         self.checkpointing_level3 = ActivationCheckpointing(3, checkpointing_level)
 
+    def _fuse_mlp_residual(self) -> bool:
+        # The residual can be added within the (chunked) MLP only when nothing happens between the MLP and the residual,
+        # and when it is a plain addition (stochastic depth needs the whole tensor to sample per-sample masks)
+        return self.config.norm_location == "pre" and type(self.residual) is Residual
+
     @populate_docstring
-    def _forward(
+    def precompute_key_value(
         self,
-        query: torch.Tensor,
         key: torch.Tensor,
         value: torch.Tensor,
         channels_first: bool = True,
+        key_grid_shape: tuple[int, int, int] | None = None,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Normalize and project keys and values once so that they can be reused across several forward passes, e.g.
+        when many query windows attend to the same tokens. Pass the result to the forward pass as
+        ``precomputed_key_value``.
+
+        Args:
+            key: {INPUT_3D_OR_1D_DOC}
+            value: {INPUT_3D_OR_1D_DOC}
+            channels_first: {CHANNELS_FIRST_DOC}
+            key_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+
+        Returns:
+            Tuple of normalized keys and values, each of shape (b, num_kv_heads, T_kv, per_head_dim).
+        """
+        if key.ndim == 5:
+            key = rearrange_channels(key, channels_first, False)
+            value = rearrange_channels(value, channels_first, False)
+            # (b, tokens_z, tokens_y, tokens_x, dim)
+
+        if self.config.norm_location == "pre":
+            key = self.layernorm1(key)
+            value = self.layernorm1(value)
+            # (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
+
+        return self.attn.precompute_key_value(key, value, channels_first=False, key_grid_shape=key_grid_shape)
+
+    @populate_docstring
+    def precompute_query(
+        self,
+        query: torch.Tensor,
+        channels_first: bool = True,
+        query_grid_shape: tuple[int, int, int] | None = None,
+    ) -> torch.Tensor:
+        """Normalize and project queries ahead of the forward pass, e.g. to cache the projection of queries that do not
+        change between calls. Pass the result to the forward pass as ``precomputed_query``.
+
+        Args:
+            query: {INPUT_3D_OR_1D_DOC}
+            channels_first: {CHANNELS_FIRST_DOC}
+            query_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+
+        Returns:
+            Normalized and scaled queries of shape (b, num_heads, T_q, per_head_dim).
+        """
+        if query.ndim == 5:
+            query = rearrange_channels(query, channels_first, False)
+            # (b, tokens_z, tokens_y, tokens_x, dim)
+
+        if self.config.norm_location == "pre":
+            query = self.layernorm1(query)
+            # (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
+
+        return self.attn.precompute_query(query, channels_first=False, query_grid_shape=query_grid_shape)
+
+    @populate_docstring
+    def _forward(
+        self,
+        query: torch.Tensor,
+        key: torch.Tensor | None = None,
+        value: torch.Tensor | None = None,
+        channels_first: bool = True,
         query_grid_shape: tuple[int, int, int] | None = None,
         key_grid_shape: tuple[int, int, int] | None = None,
+        attention_mask: torch.Tensor | None = None,
+        precomputed_key_value: tuple[torch.Tensor, torch.Tensor] | None = None,
+        precomputed_query: torch.Tensor | None = None,
     ) -> torch.Tensor:
         """Forward pass of the Attention3DWithMLP block.
 
@@ -320,30 +505,46 @@ class Attention3DWithMLP(nn.Module):
             channels_first: {CHANNELS_FIRST_DOC}
             query_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
             key_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+            attention_mask: {ATTENTION_MASK_DOC}
+            precomputed_key_value: {PRECOMPUTED_KEY_VALUE_DOC}
+            precomputed_query: {PRECOMPUTED_QUERY_DOC}
 
         Returns:
             {OUTPUT_3D_OR_1D_DOC}
         """
+        use_key_value = precomputed_key_value is None
+
         if query.ndim == 3:
             # Each is (b, T, d)
             pass
         if query.ndim == 5:
             query = rearrange_channels(query, channels_first, False)
-            key = rearrange_channels(key, channels_first, False)
-            value = rearrange_channels(value, channels_first, False)
+            if use_key_value:
+                key = rearrange_channels(key, channels_first, False)
+                value = rearrange_channels(value, channels_first, False)
             # (b, tokens_z, tokens_y, tokens_x, dim)
 
         res_connection1 = query
         # (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
 
         if self.config.norm_location == "pre":
-            query = self.layernorm1(query)
-            key = self.layernorm1(key)
-            value = self.layernorm1(value)
+            if precomputed_query is None:
+                query = self.layernorm1(query)
+            if use_key_value:
+                key = self.layernorm1(key)
+                value = self.layernorm1(value)
             # (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
 
         hidden_states = self.attn(
-            query, key, value, channels_first=False, query_grid_shape=query_grid_shape, key_grid_shape=key_grid_shape
+            query,
+            key,
+            value,
+            channels_first=False,
+            query_grid_shape=query_grid_shape,
+            key_grid_shape=key_grid_shape,
+            attention_mask=attention_mask,
+            precomputed_key_value=precomputed_key_value,
+            precomputed_query=precomputed_query,
         )
         # (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
 
@@ -359,15 +560,19 @@ class Attention3DWithMLP(nn.Module):
             hidden_states = self.layernorm2(hidden_states)
             # (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
 
-        hidden_states = self.mlp(hidden_states, channels_first=False)
-        # (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
+        if self._fuse_mlp_residual():
+            hidden_states = self.mlp(hidden_states, channels_first=False, residual=res_connection2)
+            # (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
+        else:
+            hidden_states = self.mlp(hidden_states, channels_first=False)
+            # (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
 
-        if self.config.norm_location == "post":
-            hidden_states = self.layernorm2(hidden_states)
-            #  (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
+            if self.config.norm_location == "post":
+                hidden_states = self.layernorm2(hidden_states)
+                #  (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
 
-        hidden_states = self.residual(hidden_states, res_connection2)
-        #  (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
+            hidden_states = self.residual(hidden_states, res_connection2)
+            #  (b, T, d) or (b, tokens_z, tokens_y, tokens_x, dim)
 
         if query.ndim == 5:
             hidden_states = rearrange_channels(hidden_states, False, channels_first)
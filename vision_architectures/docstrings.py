@@ -3,10 +3,10 @@
 # %% auto #0
 __all__ = ['CHANNELS_FIRST_DOC', 'CONFIG_INSTANCE_DOC', 'CONFIG_KWARGS_DOC', 'CHECKPOINTING_LEVEL_DOC', 'INPUT_1D_DOC',
            'INPUT_2D_DOC', 'INPUT_3D_DOC', 'INPUT_3D_OR_1D_DOC', 'OUTPUT_1D_DOC', 'OUTPUT_2D_DOC', 'OUTPUT_3D_DOC',
-           'OUTPUT_3D_OR_1D_DOC', 'RELATIVE_POSITION_BIAS_DOC', 'LOGIT_SCALE_DOC',
-           'ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC', 'CLASS_DESCRIPTION_1D_DOC', 'CLASS_DESCRIPTION_2D_DOC',
-           'CLASS_DESCRIPTION_3D_DOC', 'SPACINGS_DOC', 'RETURN_INTERMEDIATES_DOC', 'BOUNDING_BOXES_FORMAT_DOC',
-           'populate_docstring']
+           'OUTPUT_3D_OR_1D_DOC', 'RELATIVE_POSITION_BIAS_DOC', 'ATTENTION_MASK_DOC', 'LOGIT_SCALE_DOC',
+           'PRECOMPUTED_KEY_VALUE_DOC', 'PRECOMPUTED_QUERY_DOC', 'ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC',
+           'CLASS_DESCRIPTION_1D_DOC', 'CLASS_DESCRIPTION_2D_DOC', 'CLASS_DESCRIPTION_3D_DOC', 'SPACINGS_DOC',
+           'RETURN_INTERMEDIATES_DOC', 'CAPTURE_INTERMEDIATES_DOC', 'BOUNDING_BOXES_FORMAT_DOC', 'populate_docstring']
 
 # %% ../nbs/docstrings.ipynb #ae9e7aa8
 CHANNELS_FIRST_DOC = "Whether the inputs are in channels first format `(B, C, ...)` or not `(B, ..., C)`."
@@ -34,7 +34,21 @@ OUTPUT_3D_OR_1D_DOC = (
 )
 
 RELATIVE_POSITION_BIAS_DOC = "Relative position embeddings for the attention mechanism."
+ATTENTION_MASK_DOC = (
+    "Optional additive attention mask of shape `(B', 1 or num_heads, T_q, T_kv)`. It is added to the attention logits "
+    "(along with the relative position bias, if any). `B'` should divide the batch size, in which case the mask is "
+    "repeated along the batch dimension, e.g. one mask per window that is shared across all batch elements."
+)
 LOGIT_SCALE_DOC = "Optional scaling factor for the attention logits."
+PRECOMPUTED_KEY_VALUE_DOC = (
+    "Optional keys and values returned by ``precompute_key_value``. If provided, ``key`` and ``value`` are ignored and "
+    "are not projected again. Their batch size `B'` should divide the batch size of the query, in which case they are "
+    "repeated along the batch dimension, e.g. one set of keys and values that is shared across all query windows."
+)
+PRECOMPUTED_QUERY_DOC = (
+    "Optional queries returned by ``precompute_query``. If provided, the query is not projected again and is only "
+    "used for its shape (and as the residual, where applicable). Should have the same batch size as the query."
+)
 
 ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC = (
     "Shape of the tokens in 3D. Used to identify the actual 3D matrix and separate it from extra tokens (eg. class "
@@ -47,6 +61,11 @@ CLASS_DESCRIPTION_2D_DOC = "This class is designed for 2D input eg. natural imag
 CLASS_DESCRIPTION_3D_DOC = "This class is designed for 3D input eg. medical images, videos etc."
 SPACINGS_DOC = "Spacing information of shape `(B, 3)` of the input features."
 RETURN_INTERMEDIATES_DOC = "Return intermediate outputs such as layer/block/stage outputs."
+CAPTURE_INTERMEDIATES_DOC = (
+    "Which intermediate outputs to retain when ``return_intermediates`` is True. One of ``'all'``, ``'none'``, "
+    "``'final'``, ``'stages'`` or a sequence of layer indices. Intermediate outputs that are not captured are not kept "
+    "alive, which reduces peak memory. See :py:func:`~vision_architectures.utils.intermediates.get_capture_indices`."
+)
 
 BOUNDING_BOXES_FORMAT_DOC = (
     "The bounding boxes are in the format (z_center, y_center, x_center, z_size, y_size, x_size), where the centers "
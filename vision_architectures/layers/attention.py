@@ -1,9 +1,11 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/layers/01_attention.ipynb.
 
 # %% auto #0
-__all__ = ['Attention1DConfig', 'Attention3DConfig', 'Attention1D', 'Attention3D']
+__all__ = ['Attention1DConfig', 'Attention3DConfig', 'Attention1D', 'Attention3D', 'DeformableAttention3DConfig',
+           'DeformableAttention3D']
 
 # %% ../../nbs/layers/01_attention.ipynb #70207962
+import math
 from functools import partial, wraps
 from typing import Literal
 
@@ -159,14 +161,190 @@ class _Attention(nn.Module):
         self.checkpointing_level1 = ActivationCheckpointing(1, checkpointing_level)
         self.checkpointing_level2 = ActivationCheckpointing(2, checkpointing_level)
 
+    def _get_input_mode(self, tensor: torch.Tensor) -> Literal["true_3d", "true_1d", "3d_as_1d"]:
+        if tensor.ndim == 3:
+            if self._input_dimensionality == "1d":
+                return "true_1d"  # input data is truly 1D
+            return "3d_as_1d"  # input data is 3D but is flattened and appears to be 1D
+        elif tensor.ndim == 5:
+            return "true_3d"  # input data is truly 3D
+        raise NotImplementedError
+
+    def _apply_rotary_position_embeddings(
+        self,
+        tensor: torch.Tensor,
+        input_mode: Literal["true_3d", "true_1d", "3d_as_1d"],
+        grid_shape: tuple[int, int, int] | None,
+    ) -> torch.Tensor:
+        kwargs = {}
+        if input_mode in {"true_3d", "3d_as_1d"}:
+            kwargs["channels_first"] = False
+
+        if input_mode != "3d_as_1d":
+            return self.rotary_position_embeddings(tensor, **kwargs)
+
+        # 3D tokens have been provided as 1D (probably to include class tokens etc.), so we need to rearrange them
+        # temporarily for rotary position embeddings
+        T = tensor.shape[1]
+        z, y, x = grid_shape
+        N = z * y * x
+
+        extra_tokens, tensor = tensor.split([T - N, N], dim=1)
+        tensor = rearrange(tensor, "b (z y x) d -> b z y x d", z=z, y=y, x=x).contiguous()
+
+        tensor = self.rotary_position_embeddings(tensor, **kwargs)
+
+        # Revert back to the original structure
+        tensor = torch.cat([extra_tokens, rearrange(tensor, "b z y x d -> b (z y x) d").contiguous()], dim=1)
+        return tensor
+
+    @staticmethod
+    def _split_heads(tensor: torch.Tensor, num_heads: int) -> torch.Tensor:
+        if tensor.ndim == 5:
+            tensor = tensor.flatten(1, 3)
+        tensor = rearrange(tensor, "b T (num_heads d) -> b num_heads T d", num_heads=num_heads).contiguous()
+        return tensor
+
+    @staticmethod
+    def _get_repeated_batch_views(tensors: list[torch.Tensor]) -> tuple[list[torch.Tensor], int, int]:
+        # Tensors can have a batch size of 1 (shared by all batch elements), the full batch size, or a period that
+        # divides it (repeated along the batch dimension, e.g. one mask per window shared across all batch elements).
+        # Instead of materializing the repetition, every tensor is viewed as (num_repeats or 1, period or 1, ...).
+        batch_size = max(tensor.size(0) for tensor in tensors)
+        periods = {tensor.size(0) for tensor in tensors} - {1, batch_size}
+        if len(periods) > 1 or any(batch_size % period != 0 for period in periods):
+            raise ValueError(
+                f"Batch sizes {[tensor.size(0) for tensor in tensors]} of queries, keys, values and attention mask "
+                "must be 1 or divide the largest batch size, and at most one of them can be repeated along the batch"
+            )
+        period = periods.pop() if periods else batch_size
+        num_repeats = batch_size // period
+
+        views = []
+        for tensor in tensors:
+            if tensor.size(0) == batch_size:
+                views.append(tensor.unflatten(0, (num_repeats, period)))
+            else:
+                views.append(tensor.unsqueeze(0))
+        return views, num_repeats, period
+
+    @staticmethod
+    def _get_batch_chunk(
+        tensor: torch.Tensor, repeat_start: int, repeat_chunk_size: int, chunk_start: int, chunk_size: int
+    ) -> torch.Tensor:
+        # Select a chunk along the repeats and the period of a view returned by _get_repeated_batch_views without
+        # copying. Dimensions of size 1 are broadcast by the attention.
+        if tensor.size(0) > 1:
+            tensor = tensor[repeat_start : repeat_start + repeat_chunk_size]
+        if tensor.size(1) > 1:
+            tensor = tensor[:, chunk_start : chunk_start + chunk_size]
+        return tensor
+
+    def _get_final_query(self, query: torch.Tensor, query_grid_shape: tuple[int, int, int] | None) -> torch.Tensor:
+        """Computing query tokens after passing to the weight matrix. Useful for activation checkpointing"""
+        input_mode = self._get_input_mode(query)
+
+        query = self.W_q(query)
+
+        if self.rotary_position_embeddings is not None:
+            query = self._apply_rotary_position_embeddings(query, input_mode, query_grid_shape)
+
+        query = self._split_heads(query, self.config.num_heads)
+        # (b, num_heads, T, per_head_dim)
+
+        if isinstance(self.logit_scale, nn.Module):
+            logit_scale = self.logit_scale()
+        else:
+            logit_scale = self.logit_scale
+
+        query_normalized = F.normalize(query, dim=-1)
+
+        query_normalized_and_scaled = query_normalized * logit_scale  # Scale the query beforehand
+
+        return query_normalized_and_scaled
+
+    def _get_final_key_value(
+        self, key: torch.Tensor, value: torch.Tensor, key_grid_shape: tuple[int, int, int] | None
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Computing key and value tokens after passing to the weight matrices. Useful for activation checkpointing"""
+        input_mode = self._get_input_mode(key)
+
+        key = self.W_k(key)
+        value = self.W_v(value)
+
+        if self.rotary_position_embeddings is not None:
+            key = self._apply_rotary_position_embeddings(key, input_mode, key_grid_shape)
+
+        key = self._split_heads(key, self.config.num_kv_heads)
+        value = self._split_heads(value, self.config.num_kv_heads)
+        # key: (b, num_kv_heads, T, per_head_dim)
+        # value: (b, num_kv_heads, T, per_head_dim)
+
+        key_normalized = F.normalize(key, dim=-1)
+
+        return key_normalized, value
+
+    @populate_docstring
+    def precompute_query(
+        self, query: torch.Tensor, query_grid_shape: tuple[int, int, int] | None = None
+    ) -> torch.Tensor:
+        """Project queries ahead of the forward pass, e.g. to cache the projection of queries that do not change
+        between calls. Pass the result to the forward pass as ``precomputed_query``.
+
+        Args:
+            query: Tensor of shape (b, T_q, dim_qk) or (b, z_q, y_q, x_q, dim_qk) representing the input to the query
+                matrix.
+            query_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+
+        Returns:
+            Normalized and scaled queries of shape (b, num_heads, T_q, per_head_dim).
+        """
+        if (
+            self.rotary_position_embeddings is not None
+            and self._get_input_mode(query) == "3d_as_1d"
+            and query_grid_shape is None
+        ):
+            raise ValueError("query_grid_shape must be provided if 3D tokens are provided as 1D")
+
+        return self.checkpointing_level1(self._get_final_query, query, query_grid_shape)
+
+    @populate_docstring
+    def precompute_key_value(
+        self, key: torch.Tensor, value: torch.Tensor, key_grid_shape: tuple[int, int, int] | None = None
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Project keys and values once so that they can be reused across several forward passes, e.g. when many
+        query windows attend to the same tokens. Pass the result to the forward pass as ``precomputed_key_value``.
+
+        Args:
+            key: Tensor of shape (b, T_kv, dim_qk) or (b, z_kv, y_kv, x_kv, dim_qk) representing the input to the key
+                matrix.
+            value: Tensor of shape (b, T_kv, dim_v) or (b, z_kv, y_kv, x_kv, dim_v) representing the input to the
+                value matrix.
+            key_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+
+        Returns:
+            Tuple of normalized keys and values, each of shape (b, num_kv_heads, T_kv, per_head_dim).
+        """
+        if (
+            self.rotary_position_embeddings is not None
+            and self._get_input_mode(key) == "3d_as_1d"
+            and key_grid_shape is None
+        ):
+            raise ValueError("key_grid_shape must be provided if 3D tokens are provided as 1D")
+
+        return self.checkpointing_level1(self._get_final_key_value, key, value, key_grid_shape)
+
     @populate_docstring
     def _forward(
         self,
         query: torch.Tensor,
-        key: torch.Tensor,
-        value: torch.Tensor,
+        key: torch.Tensor | None,
+        value: torch.Tensor | None,
         query_grid_shape: tuple[int, int, int] | None,
         key_grid_shape: tuple[int, int, int] | None,
+        attention_mask: torch.Tensor | None = None,
+        precomputed_key_value: tuple[torch.Tensor, torch.Tensor] | None = None,
+        precomputed_query: torch.Tensor | None = None,
     ):
         """Forward pass of the Attention1D module.
 
@@ -178,157 +356,115 @@ class _Attention(nn.Module):
             value: Tensor of shape (b, T_kv, dim_v) representing the input to the value matrix.
             query_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
             key_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+            attention_mask: {ATTENTION_MASK_DOC}
+            precomputed_key_value: {PRECOMPUTED_KEY_VALUE_DOC}
+            precomputed_query: {PRECOMPUTED_QUERY_DOC}
 
         Returns:
             Tensor of shape (b, T_q, dim_qk) representing output tokens.
         """
-        input_mode: Literal[
-            "true_3d",  # input data is truly 3D
-            "true_1d",  # input data is truly 1D
-            "3d_as_1d",  # input data is 3D but is flattened and appears to be 1D
-        ] = ...
-
-        if query.ndim == 3:
-            if self._input_dimensionality == "1d":
-                input_mode = "true_1d"
-            else:
-                input_mode = "3d_as_1d"
-                if self.rotary_position_embeddings is not None:
-                    if query_grid_shape is None:
-                        raise ValueError("query_grid_shape must be provided if 3D tokens are provided as 1D")
-                    if key_grid_shape is None:
-                        key_grid_shape = query_grid_shape
-
-            forward_rearrange_partial = partial(rearrange, pattern="b T (num_heads d) -> b num_heads T d")
-            backward_rearrange_partial = partial(rearrange, pattern="b num_heads T d -> b T (num_heads d)")
-        elif query.ndim == 5:
-            input_mode = "true_3d"
+        input_mode = self._get_input_mode(query)
+
+        if input_mode == "3d_as_1d" and self.rotary_position_embeddings is not None:
+            if query_grid_shape is None:
+                raise ValueError("query_grid_shape must be provided if 3D tokens are provided as 1D")
+            if key_grid_shape is None:
+                key_grid_shape = query_grid_shape
+
+            if self._warn_mismatched_extra_tokens and precomputed_key_value is None:
+                num_extra_query_tokens = query.shape[1] - math.prod(query_grid_shape)
+                num_extra_key_tokens = key.shape[1] - math.prod(key_grid_shape)
+                if num_extra_query_tokens != num_extra_key_tokens:
+                    logger.warning(
+                        f"Query was provided with {num_extra_query_tokens} extra tokens, whereas key was "
+                        f"provided with {num_extra_key_tokens} extra tokens. This may fail silently. Please "
+                        "ensure this is as expected."
+                    )
+                    self._warn_mismatched_extra_tokens = False  # Warn only once
 
+        if input_mode == "true_3d":
             z_q, y_q, x_q = query.shape[1:4]
-            forward_rearrange_partial = partial(rearrange, pattern="b z y x (num_heads d) -> b num_heads (z y x) d")
             backward_rearrange_partial = partial(
                 rearrange, pattern="b num_heads (z y x) d -> b z y x (num_heads d)", z=z_q, y=y_q, x=x_q
             )
         else:
-            raise NotImplementedError
-
-        def get_final_query_key_value(query: torch.Tensor, key: torch.Tensor, value: torch.Tensor):
-            """Computing query, key, and value tokens after passing to the weight matrices. Useful for activation
-            checkpointing"""
-            query = self.W_q(query)
-            key = self.W_k(key)
-            value = self.W_v(value)
-
-            if self.rotary_position_embeddings is not None:
-                kwargs = {}
-                if input_mode in {"true_3d", "3d_as_1d"}:
-                    kwargs["channels_first"] = False
-
-                if input_mode in {"3d_as_1d"}:
-                    # 3D tokens have been provided as 1D (probably to include class tokens etc.), so we need to
-                    # rearrange them temporarily for rotary position embeddings
-
-                    T_q = query.shape[1]
-                    T_k = key.shape[1]
-                    z_q, y_q, x_q = query_grid_shape
-                    z_k, y_k, x_k = key_grid_shape
-                    N_q = z_q * y_q * x_q
-                    N_k = z_k * y_k * x_k
-
-                    extra_query_tokens, query = query.split([T_q - N_q, N_q], dim=1)
-                    extra_key_tokens, key = key.split([T_k - N_k, N_k], dim=1)
-
-                    if self._warn_mismatched_extra_tokens and extra_query_tokens.shape[1] != extra_key_tokens.shape[1]:
-                        logger.warning(
-                            f"Query was provided with {extra_query_tokens.shape[1]} extra tokens, whereas key was "
-                            f"provided with {extra_key_tokens.shape[1]} extra tokens. This may fail silently. Please "
-                            "ensure this is as expected."
-                        )
-                        self._warn_mismatched_extra_tokens = False  # Warn only once
-
-                    query = rearrange(
-                        query, "b (z_q y_q x_q) d -> b z_q y_q x_q d", z_q=z_q, y_q=y_q, x_q=x_q
-                    ).contiguous()
-                    key = rearrange(key, "b (z_k y_k x_k) d -> b z_k y_k x_k d", z_k=z_k, y_k=y_k, x_k=x_k).contiguous()
-
-                query = self.rotary_position_embeddings(query, **kwargs)
-                key = self.rotary_position_embeddings(key, **kwargs)
-
-                if input_mode in {"3d_as_1d"}:
-                    # Revert back to the original structure
-                    query = torch.cat(
-                        [
-                            extra_query_tokens,
-                            rearrange(
-                                query, "b z_q y_q x_q d -> b (z_q y_q x_q) d", z_q=z_q, y_q=y_q, x_q=x_q
-                            ).contiguous(),
-                        ],
-                        dim=1,
-                    )
-                    key = torch.cat(
-                        [
-                            extra_key_tokens,
-                            rearrange(
-                                key, "b z_k y_k x_k d -> b (z_k y_k x_k) d", z_k=z_k, y_k=y_k, x_k=x_k
-                            ).contiguous(),
-                        ],
-                        dim=1,
-                    )
-
-            query = forward_rearrange_partial(query, num_heads=self.config.num_heads).contiguous()
-            key = forward_rearrange_partial(key, num_heads=self.config.num_kv_heads).contiguous()
-            value = forward_rearrange_partial(value, num_heads=self.config.num_kv_heads).contiguous()
-            # query: (b, num_heads, T, per_head_dim)
-            # key: (b, num_kv_heads, T, per_head_dim)
-            # value: (b, num_kv_heads, T, per_head_dim)
-
-            if isinstance(self.logit_scale, nn.Module):
-                logit_scale = self.logit_scale()
-            else:
-                logit_scale = self.logit_scale
-
-            query_normalized = F.normalize(query, dim=-1)
-            key_normalized = F.normalize(key, dim=-1)
-
-            query_normalized_and_scaled = query_normalized * logit_scale  # Scale the query beforehand
-
-            return query_normalized_and_scaled, key_normalized, value
+            backward_rearrange_partial = partial(rearrange, pattern="b num_heads T d -> b T (num_heads d)")
 
-        query_normalized_and_scaled, key_normalized, value = self.checkpointing_level1(
-            get_final_query_key_value, query, key, value
-        )
+        if precomputed_query is None:
+            query_normalized_and_scaled = self.checkpointing_level1(self._get_final_query, query, query_grid_shape)
+        else:
+            query_normalized_and_scaled = precomputed_query
+        if precomputed_key_value is None:
+            key_normalized, value = self.checkpointing_level1(self._get_final_key_value, key, value, key_grid_shape)
+        else:
+            key_normalized, value = precomputed_key_value
+        # query: (b or 1, num_heads, T, per_head_dim)
+        # key: (b or b', num_kv_heads, T, per_head_dim)
+        # value: (b or b', num_kv_heads, T, per_head_dim)
 
         relative_position_bias = None
         if self.relative_position_bias is not None:
             relative_position_bias = self.relative_position_bias()
 
-        # Split tensors into batches and perform attention
+        attention_inputs = [query_normalized_and_scaled, key_normalized, value]
+        if attention_mask is not None:
+            attention_inputs.append(attention_mask.to(query_normalized_and_scaled.dtype))
+        attention_inputs, num_repeats, period = self._get_repeated_batch_views(attention_inputs)
+        # Each is (num_repeats or 1, period or 1, ...)
+
+        torch250plus_kwargs = {}
+        if torch.__version__ >= "2.5":
+            torch250plus_kwargs["enable_gqa"] = self.config.gqa_mqa_enabled
+
+        # Split tensors into chunks along the repeats and the period and perform attention. All repeats of a chunk are
+        # attended in a single broadcast call, and chunks hold at most max_attention_batch_size batch elements.
+        max_batch_size = self.config.max_attention_batch_size
+        if max_batch_size == -1:
+            max_batch_size = num_repeats * period
+        repeat_chunk_size = min(num_repeats, max_batch_size)
+        chunk_size = max(max_batch_size // repeat_chunk_size, 1)
+
         output = []
-        chunk_size = self.config.max_attention_batch_size
-        if chunk_size == -1:
-            chunk_size = query_normalized_and_scaled.size(0)
-        for query_normalized_and_scaled_chunk, key_normalized_chunk, value_chunk in zip(
-            torch.split(query_normalized_and_scaled, chunk_size, dim=0),
-            torch.split(key_normalized, chunk_size, dim=0),
-            torch.split(value, chunk_size, dim=0),
-        ):
-            torch250plus_kwargs = {}
-            if torch.__version__ >= "2.5":
-                torch250plus_kwargs["enable_gqa"] = self.config.gqa_mqa_enabled
-
-            output_chunk = F.scaled_dot_product_attention(
-                query_normalized_and_scaled_chunk,
-                key_normalized_chunk,
-                value_chunk,
-                attn_mask=relative_position_bias,  # Use this as a way to introduce relative position bias
-                dropout_p=self.config.attn_drop_prob,
-                is_causal=False,
-                scale=1.0,  # Already scaled the vectors
-                **torch250plus_kwargs,
-            )
-            output.append(output_chunk)
-            # (chunk_size, num_heads, T, per_head_dim)
-        output = torch.cat(output, dim=0)
+        for repeat_start in range(0, num_repeats, repeat_chunk_size):
+            repeat_output = []
+            for chunk_start in range(0, period, chunk_size):
+                query_chunk, key_chunk, value_chunk, *attention_mask_chunk = [
+                    self._get_batch_chunk(tensor, repeat_start, repeat_chunk_size, chunk_start, chunk_size)
+                    for tensor in attention_inputs
+                ]
+                if repeat_chunk_size == 1:
+                    # With a single repeat the inputs are kept 4D, for which the fused attention kernels are available
+                    query_chunk, key_chunk, value_chunk, *attention_mask_chunk = [
+                        tensor[0] for tensor in (query_chunk, key_chunk, value_chunk, *attention_mask_chunk)
+                    ]
+                # query: ([repeat_chunk_size or 1], chunk_size or 1, num_heads, T_q, per_head_dim)
+                # key, value: ([repeat_chunk_size or 1], chunk_size or 1, num_kv_heads, T_kv, per_head_dim)
+                # attention_mask: ([repeat_chunk_size or 1], chunk_size or 1, num_heads or 1, T_q, T_kv)
+
+                attn_mask = relative_position_bias  # Use this as a way to introduce relative position bias
+                if attention_mask_chunk:
+                    if attn_mask is None:
+                        attn_mask = attention_mask_chunk[0]
+                    else:
+                        attn_mask = attn_mask + attention_mask_chunk[0]
+
+                output_chunk = F.scaled_dot_product_attention(
+                    query_chunk,
+                    key_chunk,
+                    value_chunk,
+                    attn_mask=attn_mask,
+                    dropout_p=self.config.attn_drop_prob,
+                    is_causal=False,
+                    scale=1.0,  # Already scaled the vectors
+                    **torch250plus_kwargs,
+                )
+                if repeat_chunk_size == 1:
+                    output_chunk = output_chunk.unsqueeze(0)
+                repeat_output.append(output_chunk)
+                # (repeat_chunk_size, chunk_size, num_heads, T, per_head_dim)
+            output.append(torch.cat(repeat_output, dim=1))
+            # (repeat_chunk_size, period, num_heads, T, per_head_dim)
+        output = torch.cat(output, dim=0).flatten(0, 1)
         # (b, num_heads, T, per_head_dim)
 
         output = backward_rearrange_partial(output).contiguous()
@@ -353,7 +489,16 @@ class _Attention(nn.Module):
 class Attention1D(_Attention):
     _input_dimensionality: Literal["1d", "3d"] = "1d"
 
-    def _forward(self, query: torch.Tensor, key: torch.Tensor, value: torch.Tensor):
+    @populate_docstring
+    def _forward(
+        self,
+        query: torch.Tensor,
+        key: torch.Tensor | None,
+        value: torch.Tensor | None,
+        attention_mask: torch.Tensor | None = None,
+        precomputed_key_value: tuple[torch.Tensor, torch.Tensor] | None = None,
+        precomputed_query: torch.Tensor | None = None,
+    ):
         """Forward pass of the Attention1D module.
 
         Terminology: T => number of tokens, b => batch size
@@ -362,11 +507,16 @@ class Attention1D(_Attention):
             query: Tensor of shape (b, T_q, dim_qk) representing the input to the query matrix.
             key: Tensor of shape (b, T_kv, dim_qk) representing the input to the key matrix.
             value: Tensor of shape (b, T_kv, dim_v) representing the input to the value matrix.
+            attention_mask: {ATTENTION_MASK_DOC}
+            precomputed_key_value: {PRECOMPUTED_KEY_VALUE_DOC}
+            precomputed_query: {PRECOMPUTED_QUERY_DOC}
 
         Returns:
             Tensor of shape (b, T_q, dim_qk) representing output tokens.
         """
-        return super()._forward(query, key, value, None, None)
+        return super()._forward(
+            query, key, value, None, None, attention_mask, precomputed_key_value, precomputed_query
+        )
 
 # %% ../../nbs/layers/01_attention.ipynb #760eb158
 @populate_docstring
@@ -396,14 +546,71 @@ class Attention3D(_Attention):
             self.rotary_position_embeddings = RotaryPositionEmbeddings3D(self.config.rotary_position_embeddings_config)
 
     @populate_docstring
-    def _forward(
+    def precompute_key_value(
         self,
-        query: torch.Tensor,
         key: torch.Tensor,
         value: torch.Tensor,
         channels_first: bool = True,
+        key_grid_shape: tuple[int, int, int] | None = None,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Project keys and values once so that they can be reused across several forward passes, e.g. when many
+        query windows attend to the same tokens. Pass the result to the forward pass as ``precomputed_key_value``.
+
+        Args:
+            key: Tensor of shape (b, [dim_qk], z_kv, y_kv, x_kv, [dim_qk]) or (b, T_kv, dim_qk) representing the input
+                to the key matrix.
+            value: Tensor of shape (b, [dim_v], z_kv, y_kv, x_kv, [dim_v]) or (b, T_kv, dim_v) representing the input
+                to the value matrix.
+            channels_first: {CHANNELS_FIRST_DOC}
+            key_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+
+        Returns:
+            Tuple of normalized keys and values, each of shape (b, num_kv_heads, T_kv, per_head_dim).
+        """
+        if key.ndim == 5:
+            key = rearrange_channels(key, channels_first, False)
+            value = rearrange_channels(value, channels_first, False)
+            # Each is now (b, z, y, x, d)
+
+        return super().precompute_key_value(key, value, key_grid_shape)
+
+    @populate_docstring
+    def precompute_query(
+        self,
+        query: torch.Tensor,
+        channels_first: bool = True,
+        query_grid_shape: tuple[int, int, int] | None = None,
+    ) -> torch.Tensor:
+        """Project queries ahead of the forward pass, e.g. to cache the projection of queries that do not change
+        between calls. Pass the result to the forward pass as ``precomputed_query``.
+
+        Args:
+            query: Tensor of shape (b, [dim_qk], z_q, y_q, x_q, [dim_qk]) or (b, T_q, dim_qk) representing the input to
+                the query matrix.
+            channels_first: {CHANNELS_FIRST_DOC}
+            query_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+
+        Returns:
+            Normalized and scaled queries of shape (b, num_heads, T_q, per_head_dim).
+        """
+        if query.ndim == 5:
+            query = rearrange_channels(query, channels_first, False)
+            # (b, z, y, x, d)
+
+        return super().precompute_query(query, query_grid_shape)
+
+    @populate_docstring
+    def _forward(
+        self,
+        query: torch.Tensor,
+        key: torch.Tensor | None,
+        value: torch.Tensor | None,
+        channels_first: bool = True,
         query_grid_shape: tuple[int, int, int] | None = None,
         key_grid_shape: tuple[int, int, int] | None = None,
+        attention_mask: torch.Tensor | None = None,
+        precomputed_key_value: tuple[torch.Tensor, torch.Tensor] | None = None,
+        precomputed_query: torch.Tensor | None = None,
     ):
         """Forward pass of the Attention3D module.
 
@@ -419,6 +626,9 @@ class Attention3D(_Attention):
             channels_first: {CHANNELS_FIRST_DOC}
             query_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
             key_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+            attention_mask: {ATTENTION_MASK_DOC}
+            precomputed_key_value: {PRECOMPUTED_KEY_VALUE_DOC}
+            precomputed_query: {PRECOMPUTED_QUERY_DOC}
 
         Returns:
             Tensor of shape (b, [dim_qk], z_q, y_q, x_q, [dim_qk]) or (b, T_q, dim_qk) representing output tokens.
@@ -428,13 +638,23 @@ class Attention3D(_Attention):
             pass
         elif query.ndim == 5:
             query = rearrange_channels(query, channels_first, False)
-            key = rearrange_channels(key, channels_first, False)
-            value = rearrange_channels(value, channels_first, False)
+            if precomputed_key_value is None:
+                key = rearrange_channels(key, channels_first, False)
+                value = rearrange_channels(value, channels_first, False)
             # Each is now (b, z, y, x, d)
         else:
             raise ValueError("Input tensors must have 3 or 5 dimensions")
 
-        output = super()._forward(query, key, value, query_grid_shape, key_grid_shape)
+        output = super()._forward(
+            query,
+            key,
+            value,
+            query_grid_shape,
+            key_grid_shape,
+            attention_mask,
+            precomputed_key_value,
+            precomputed_query,
+        )
         # (b, z, y, x, d)
 
         if output.ndim == 5:
@@ -446,3 +666,146 @@ class Attention3D(_Attention):
     @wraps(_forward)
     def forward(self, *args, **kwargs):
         return self.checkpointing_level2(self._forward, *args, **kwargs)
+
+# %% ../../nbs/layers/01_attention.ipynb #d4f8a6b1
+class DeformableAttention3DConfig(CustomBaseModel):
+    dim: int = Field(..., description="Dimension of the input features.")
+    num_heads: int = Field(..., description="Number of attention heads.")
+    num_points: int = Field(4, description="Number of sampling points per attention head for every query.")
+    proj_drop_prob: float = Field(0.0, description="Dropout probability for the projection layer.")
+
+    @property
+    def per_head_dim(self) -> int:
+        return self.dim // self.num_heads
+
+    @model_validator(mode="after")
+    def validate(self):
+        super().validate()
+        assert self.dim % self.num_heads == 0, "dimension must be divisible by number of heads"
+        return self
+
+
+@populate_docstring
+class DeformableAttention3D(nn.Module):
+    """Performs deformable cross attention (as proposed in Deformable DETR) from 1D queries to 3D features. Every query
+    predicts a few sampling offsets around its reference point for every head, samples the features at those locations
+    using trilinear interpolation, and combines them using predicted attention weights. The cost of this is independent
+    of the size of the 3D features. {CLASS_DESCRIPTION_3D_DOC}"""
+
+    @populate_docstring
+    def __init__(self, config: DeformableAttention3DConfig = {}, checkpointing_level: int = 0, **kwargs):
+        """Initializes the DeformableAttention3D module. Activation checkpointing level 2.
+
+        Args:
+            config: {CONFIG_INSTANCE_DOC}
+            checkpointing_level: {CHECKPOINTING_LEVEL_DOC}
+            **kwargs: {CONFIG_KWARGS_DOC}
+        """
+        super().__init__()
+
+        self.config = DeformableAttention3DConfig.model_validate(config | kwargs)
+
+        dim = self.config.dim
+        num_heads = self.config.num_heads
+        num_points = self.config.num_points
+
+        self.sampling_offsets = nn.Linear(dim, num_heads * num_points * 3)
+        self.attention_weights = nn.Linear(dim, num_heads * num_points)
+        self.W_v = nn.Linear(dim, dim)
+        self.proj = nn.Linear(dim, dim)
+        self.proj_drop = nn.Dropout(self.config.proj_drop_prob)
+
+        self._reset_sampling_parameters()
+
+        self.checkpointing_level2 = ActivationCheckpointing(2, checkpointing_level)
+
+    @torch.no_grad()
+    def _reset_sampling_parameters(self):
+        # Initially, the sampling points of every head lie along a different direction around the reference point (at
+        # increasing distances) and are weighed equally. Directions are spread evenly over a sphere.
+        num_heads = self.config.num_heads
+        num_points = self.config.num_points
+
+        indices = torch.arange(num_heads, dtype=torch.float32) + 0.5
+        cos_polar = 1 - 2 * indices / num_heads
+        sin_polar = (1 - cos_polar**2).sqrt()
+        azimuth = math.pi * (3 - math.sqrt(5)) * indices  # golden angle increments
+        directions = torch.stack([cos_polar, sin_polar * azimuth.sin(), sin_polar * azimuth.cos()], dim=-1)
+        directions = directions / directions.abs().amax(dim=-1, keepdim=True)
+        # (num_heads, 3)
+
+        offsets = directions[:, None, :] * torch.arange(1, num_points + 1, dtype=torch.float32)[:, None]
+        # (num_heads, num_points, 3)
+
+        nn.init.zeros_(self.sampling_offsets.weight)
+        self.sampling_offsets.bias.copy_(offsets.flatten())
+        nn.init.zeros_(self.attention_weights.weight)
+        nn.init.zeros_(self.attention_weights.bias)
+
+    @populate_docstring
+    def _forward(
+        self,
+        query: torch.Tensor,
+        value: torch.Tensor,
+        reference_points: torch.Tensor,
+        channels_first: bool = True,
+    ) -> torch.Tensor:
+        """Forward pass of the DeformableAttention3D module.
+
+        Terminology: T => number of tokens, b => batch size
+
+        Args:
+            query: Tensor of shape (b, T, dim) representing the queries.
+            value: Tensor of shape (b, [dim], z, y, x, [dim]) representing the features to be sampled.
+            reference_points: Tensor of shape (b, T, 3) containing the (z, y, x) location around which every query
+                samples, normalized to the range [0, 1] corresponding to the extent of ``value``.
+            channels_first: {CHANNELS_FIRST_DOC} This only applies to ``value``.
+
+        Returns:
+            Tensor of shape (b, T, dim) representing output tokens.
+        """
+        value = rearrange_channels(value, channels_first, False)
+        # (b, z, y, x, dim)
+
+        b, z, y, x, _ = value.shape
+        T = query.shape[1]
+        num_heads = self.config.num_heads
+        num_points = self.config.num_points
+
+        value = self.W_v(value)
+        value = rearrange(value, "b z y x (h d) -> (b h) d z y x", h=num_heads)
+        # (b*num_heads, per_head_dim, z, y, x)
+
+        # Sampling offsets are predicted in units of voxels of the value grid
+        sampling_offsets = self.sampling_offsets(query).view(b, T, num_heads, num_points, 3)
+        normalizer = torch.tensor([z, y, x], dtype=sampling_offsets.dtype, device=sampling_offsets.device)
+        sampling_locations = reference_points[:, :, None, None, :] + sampling_offsets / normalizer
+        # (b, T, num_heads, num_points, 3)
+
+        # grid_sample expects locations in (x, y, z) order in the range [-1, 1]
+        sampling_grid = rearrange(sampling_locations.flip(-1) * 2 - 1, "b t h p c -> (b h) t p 1 c")
+        # (b*num_heads, T, num_points, 1, 3)
+
+        sampled_values = F.grid_sample(
+            value, sampling_grid.to(value.dtype), mode="bilinear", padding_mode="zeros", align_corners=False
+        )
+        # (b*num_heads, per_head_dim, T, num_points, 1)
+
+        attention_weights = self.attention_weights(query).view(b, T, num_heads, num_points).softmax(dim=-1)
+        attention_weights = rearrange(attention_weights, "b t h p -> (b h) 1 t p 1")
+        # (b*num_heads, 1, T, num_points, 1)
+
+        output = (sampled_values * attention_weights).sum(dim=(-2, -1))
+        # (b*num_heads, per_head_dim, T)
+        output = rearrange(output, "(b h) d t -> b t (h d)", b=b)
+        # (b, T, dim)
+
+        output = self.proj(output)
+        output = self.proj_drop(output)
+        # (b, T, dim)
+
+        return output
+
+    @wraps(_forward)
+    def forward(self, *args, **kwargs):
+        return self.checkpointing_level2(self._forward, *args, **kwargs)
@@ -1,24 +1,126 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/layers/05_scale.ipynb.
 
 # %% auto #0
-__all__ = ['PixelShuffleScaleConfig', 'PixelShuffleUpsample3D', 'PixelShuffleDownsample3D']
+__all__ = ['PixelShuffleScaleConfig', 'pixel_unshuffle_conv3d', 'conv3d_pixel_shuffle', 'PixelShuffleUpsample3D',
+           'PixelShuffleDownsample3D']
 
 # %% ../../nbs/layers/05_scale.ipynb #3918aa1e
 from functools import wraps
 
 import torch
-from einops import rearrange
 from torch import nn
+from torch.nn import functional as F
 
 from ..blocks.cnn import CNNBlock3D, CNNBlockConfig
 from ..docstrings import populate_docstring
 from ..utils.activation_checkpointing import ActivationCheckpointing
 from ..utils.custom_base_model import Field
-from ..utils.rearrange import rearrange_channels
+from ..utils.rearrange import pixel_shuffle_3d, pixel_unshuffle_3d, rearrange_channels
 
 # %% ../../nbs/layers/05_scale.ipynb #32bfb78e
 class PixelShuffleScaleConfig(CNNBlockConfig):
     scale_factor: int = Field(2, description="Scale factor for upsampling / downsampling.")
+    fused: bool = Field(
+        False,
+        description="Whether to fold the pixel shuffle into the convolution weights and run a single strided "
+        "convolution / transposed convolution instead of materializing the rearranged tensor. Uses the same "
+        "parameters, so existing checkpoints can be loaded either way.",
+    )
+
+# %% ../../nbs/layers/05_scale.ipynb #5e8d13c7
+def _get_fused_conv_padding(conv: nn.Conv3d) -> tuple[int, int, int] | None:
+    """Get the padding of a convolution if it can be folded together with a pixel shuffle, else None."""
+    if conv.stride != (1, 1, 1) or conv.dilation != (1, 1, 1) or conv.groups != 1 or conv.padding_mode != "zeros":
+        return None
+    if conv.padding == "valid":
+        return (0, 0, 0)
+    if conv.padding == "same":
+        if any(kernel_size % 2 == 0 for kernel_size in conv.kernel_size):
+            return None
+        return tuple((kernel_size - 1) // 2 for kernel_size in conv.kernel_size)
+    if any(padding > kernel_size - 1 for padding, kernel_size in zip(conv.padding, conv.kernel_size)):
+        return None
+    return tuple(conv.padding)
+
+
+def pixel_unshuffle_conv3d(
+    x: torch.Tensor,
+    weight: torch.Tensor,
+    bias: torch.Tensor | None,
+    scale_factor: int | tuple[int, int, int],
+    padding: tuple[int, int, int] = (0, 0, 0),
+) -> torch.Tensor:
+    """Compute ``conv3d(pixel_unshuffle_3d(x, scale_factor), weight, bias, padding=padding)`` as a single strided
+    convolution on ``x``, without materializing the space-to-depth tensor.
+
+    Args:
+        x: Input tensor of shape ``(b, c, z, y, x)``.
+        weight: Weight of the convolution that follows the space-to-depth, of shape
+            ``(out_channels, c * s_z * s_y * s_x, k_z, k_y, k_x)``.
+        bias: Bias of the convolution that follows the space-to-depth, of shape ``(out_channels,)``.
+        scale_factor: Size of the blocks along (z, y, x).
+        padding: Zero padding of the convolution that follows the space-to-depth.
+
+    Returns:
+        Tensor of shape ``(b, out_channels, z', y', x')``.
+    """
+    s_z, s_y, s_x = (scale_factor,) * 3 if isinstance(scale_factor, int) else scale_factor
+    out_channels, in_channels, k_z, k_y, k_x = weight.shape
+
+    # Every tap of the original kernel becomes a (s_z, s_y, s_x) block of taps of the fused kernel
+    weight = weight.reshape(out_channels, in_channels // (s_z * s_y * s_x), s_z, s_y, s_x, k_z, k_y, k_x)
+    weight = weight.permute(0, 1, 5, 2, 6, 3, 7, 4)
+    weight = weight.reshape(out_channels, in_channels // (s_z * s_y * s_x), k_z * s_z, k_y * s_y, k_x * s_x)
+    # (out_channels, c, k_z * s_z, k_y * s_y, k_x * s_x)
+
+    padding = (padding[0] * s_z, padding[1] * s_y, padding[2] * s_x)
+    return F.conv3d(x, weight, bias, stride=(s_z, s_y, s_x), padding=padding)
+
+
+def conv3d_pixel_shuffle(
+    x: torch.Tensor,
+    weight: torch.Tensor,
+    bias: torch.Tensor | None,
+    scale_factor: int | tuple[int, int, int],
+    padding: tuple[int, int, int] = (0, 0, 0),
+) -> torch.Tensor:
+    """Compute ``pixel_shuffle_3d(conv3d(x, weight, bias, padding=padding), scale_factor)`` as a single strided
+    transposed convolution on ``x``, without materializing the tensor before the depth-to-space.
+
+    Args:
+        x: Input tensor of shape ``(b, in_channels, z, y, x)``.
+        weight: Weight of the convolution that precedes the depth-to-space, of shape
+            ``(c * s_z * s_y * s_x, in_channels, k_z, k_y, k_x)``.
+        bias: Bias of the convolution that precedes the depth-to-space, of shape ``(c * s_z * s_y * s_x,)``.
+        scale_factor: Size of the blocks along (z, y, x).
+        padding: Zero padding of the convolution that precedes the depth-to-space. Should not be more than
+            ``kernel_size - 1``.
+
+    Returns:
+        Tensor of shape ``(b, c, z' * s_z, y' * s_y, x' * s_x)``.
+    """
+    s_z, s_y, s_x = (scale_factor,) * 3 if isinstance(scale_factor, int) else scale_factor
+    out_channels, in_channels, k_z, k_y, k_x = weight.shape
+    channels = out_channels // (s_z * s_y * s_x)
+
+    # A transposed convolution correlates with the flipped kernel, and every tap becomes a block of taps
+    weight = weight.reshape(channels, s_z, s_y, s_x, in_channels, k_z, k_y, k_x).flip(5, 6, 7)
+    weight = weight.permute(4, 0, 5, 1, 6, 2, 7, 3)
+    weight = weight.reshape(in_channels, channels, k_z * s_z, k_y * s_y, k_x * s_x)
+    # (in_channels, c, k_z * s_z, k_y * s_y, k_x * s_x)
+
+    padding = ((k_z - 1 - padding[0]) * s_z, (k_y - 1 - padding[1]) * s_y, (k_x - 1 - padding[2]) * s_x)
+    x = F.conv_transpose3d(x, weight, stride=(s_z, s_y, s_x), padding=padding)
+    # (b, c, z' * s_z, y' * s_y, x' * s_x)
+
+    if bias is not None:
+        # The bias depends on the position within each block. Add it in-place through a blocked view.
+        z, y, x_ = x.shape[2:]
+        blocked = x.unflatten(2, (z // s_z, s_z)).unflatten(4, (y // s_y, s_y)).unflatten(6, (x_ // s_x, s_x))
+        # (b, c, z', s_z, y', s_y, x', s_x)
+        blocked.add_(bias.reshape(channels, 1, s_z, 1, s_y, 1, s_x))
+
+    return x
 
 # %% ../../nbs/layers/05_scale.ipynb #44ea4b83
 @populate_docstring
@@ -42,8 +144,30 @@ class PixelShuffleUpsample3D(nn.Module):
         expand_config.out_channels = expand_config.out_channels * (self.config.scale_factor**3)
         self.expand = CNNBlock3D(expand_config, checkpointing_level)
 
+        self._fused_padding = None
+        if self.config.fused:
+            # Operations after the convolution would act on the channels before depth-to-space. Only elementwise ones
+            # can be moved after the depth-to-space.
+            self._fused_padding = _get_fused_conv_padding(self.expand.conv)
+            norm_on_shuffled_side = "N" in self.expand.config.sequence.split("C")[1]
+            if self.config.transposed or self._fused_padding is None or norm_on_shuffled_side:
+                raise ValueError(
+                    "fused=True requires a non-transposed, non-strided, non-dilated, non-grouped convolution with "
+                    "zero padding of at most kernel_size - 1, and no normalization after the convolution."
+                )
+
         self.checkpointing_level1 = ActivationCheckpointing(1, checkpointing_level)
 
+    def _fused_expand(self, x: torch.Tensor) -> torch.Tensor:
+        # Same sequence of operations as self.expand, with the convolution and the depth-to-space fused together
+        before_conv, after_conv = self.expand.config.sequence.split("C")
+        x = self.expand._apply_sequence(x, before_conv)
+        x = conv3d_pixel_shuffle(
+            x, self.expand.conv.weight, self.expand.conv.bias, self.config.scale_factor, self._fused_padding
+        )
+        x = self.expand._apply_sequence(x, after_conv)
+        return x
+
     @populate_docstring
     def _forward(self, x: torch.Tensor, channels_first: bool = True) -> torch.Tensor:
         """Forward pass of the PixelShuffleUpsample3D layer.
@@ -60,16 +184,14 @@ class PixelShuffleUpsample3D(nn.Module):
         x = rearrange_channels(x, channels_first, True)
         # (b, in_channels, z, y, x)
 
-        x = self.expand(x)
-        # (b, out_channels * scale_factor**3, z, y, x)
-        x = rearrange(
-            x,
-            "b (c s1 s2 s3) z y x -> b c (z s1) (y s2) (x s3)",
-            s1=self.config.scale_factor,
-            s2=self.config.scale_factor,
-            s3=self.config.scale_factor,
-        ).contiguous()
-        # (b, out_channels, z * scale_factor, y * scale_factor, x * scale_factor)
+        if self.config.fused:
+            x = self._fused_expand(x)
+            # (b, out_channels, z * scale_factor, y * scale_factor, x * scale_factor)
+        else:
+            x = self.expand(x)
+            # (b, out_channels * scale_factor**3, z, y, x)
+            x = pixel_shuffle_3d(x, self.config.scale_factor)
+            # (b, out_channels, z * scale_factor, y * scale_factor, x * scale_factor)
 
         x = rearrange_channels(x, True, channels_first)
         # (b, [out_channels], z * scale_factor, y * scale_factor, x * scale_factor, [out_channels])
@@ -102,8 +224,30 @@ class PixelShuffleDownsample3D(nn.Module):
         contract_config.in_channels = contract_config.in_channels * (self.config.scale_factor**3)
         self.contract = CNNBlock3D(contract_config, checkpointing_level)
 
+        self._fused_padding = None
+        if self.config.fused:
+            # Operations before the convolution would act on the channels after space-to-depth. Only elementwise ones
+            # can be moved before the space-to-depth.
+            self._fused_padding = _get_fused_conv_padding(self.contract.conv)
+            norm_on_shuffled_side = "N" in self.contract.config.sequence.split("C")[0]
+            if self.config.transposed or self._fused_padding is None or norm_on_shuffled_side:
+                raise ValueError(
+                    "fused=True requires a non-transposed, non-strided, non-dilated, non-grouped convolution with "
+                    "zero padding of at most kernel_size - 1, and no normalization before the convolution."
+                )
+
         self.checkpointing_level1 = ActivationCheckpointing(1, checkpointing_level)
 
+    def _fused_contract(self, x: torch.Tensor) -> torch.Tensor:
+        # Same sequence of operations as self.contract, with the space-to-depth and the convolution fused together
+        before_conv, after_conv = self.contract.config.sequence.split("C")
+        x = self.contract._apply_sequence(x, before_conv)
+        x = pixel_unshuffle_conv3d(
+            x, self.contract.conv.weight, self.contract.conv.bias, self.config.scale_factor, self._fused_padding
+        )
+        x = self.contract._apply_sequence(x, after_conv)
+        return x
+
     @populate_docstring
     def _forward(self, x: torch.Tensor, channels_first: bool = True) -> torch.Tensor:
         """Forward pass of the PixelShuffleDownsample3D layer.
@@ -120,16 +264,14 @@ class PixelShuffleDownsample3D(nn.Module):
         x = rearrange_channels(x, channels_first, True)
         # (b, in_channels, z, y, x)
 
-        x = rearrange(
-            x,
-            "b c (z s1) (y s2) (x s3) -> b (c s1 s2 s3) z y x",
-            s1=self.config.scale_factor,
-            s2=self.config.scale_factor,
-            s3=self.config.scale_factor,
-        ).contiguous()
-        # (b, in_channels * scale_factor**3, z // scale_factor, y // scale_factor, x // scale_factor)
-        x = self.contract(x)
-        # (b, out_channels, z // scale_factor, y // scale_factor, x // scale_factor)
+        if self.config.fused:
+            x = self._fused_contract(x)
+            # (b, out_channels, z // scale_factor, y // scale_factor, x // scale_factor)
+        else:
+            x = pixel_unshuffle_3d(x, self.config.scale_factor)
+            # (b, in_channels * scale_factor**3, z // scale_factor, y // scale_factor, x // scale_factor)
+            x = self.contract(x)
+            # (b, out_channels, z // scale_factor, y // scale_factor, x // scale_factor)
 
         x = rearrange_channels(x, True, channels_first)
         # (b, [out_channels], z * scale_factor, y * scale_factor, x * scale_factor, [out_channels])
@@ -4,9 +4,8 @@
 __all__ = ['ClassBalancedCrossEntropyLossConfig', 'ClassBalancedCrossEntropyLoss']
 
 # %% ../../nbs/losses/01_class_balanced_cross_entropy_loss.ipynb #7ecd3d26
-from collections import Counter
-
 import torch
+import torch.distributed as dist
 from torch import nn
 from torch.nn import functional as F
 
@@ -19,6 +18,13 @@ class ClassBalancedCrossEntropyLossConfig(CustomBaseModel):
     ema_decay: float = Field(
         0.99, description="Exponential moving average decay. By default 0.99 is used which has a half life of ~69 steps"
     )
+    sync_across_ranks: bool = Field(
+        False,
+        description=(
+            "Whether to sum class counts across all distributed (DDP) ranks before updating class prevalences, so "
+            "that all ranks track the same prevalences. Only used if torch.distributed is initialized."
+        ),
+    )
 
 # %% ../../nbs/losses/01_class_balanced_cross_entropy_loss.ipynb #59f20615
 class ClassBalancedCrossEntropyLoss(nn.Module):
@@ -47,8 +53,15 @@ class ClassBalancedCrossEntropyLoss(nn.Module):
         self.config = ClassBalancedCrossEntropyLossConfig.model_validate(config | kwargs)
 
         # Save class prevalence percentages to weight the cross entropy loss
-        self.class_prevalences = [None] * self.config.num_classes
-        # Initialized with None as we don't know the initial class prevalence estimates.
+        self.register_buffer(
+            "class_prevalences",
+            torch.full((self.config.num_classes,), torch.nan, dtype=torch.float32),
+            persistent=False,
+        )
+        # Initialized with NaN as we don't know the initial class prevalence estimates.
+
+        # Class weights are cached until the class prevalences are updated
+        self._class_weights: torch.Tensor | None = None
 
     @torch.no_grad()
     def update_class_prevalences(self, target: torch.Tensor, ignore_index: int = -100):
@@ -64,33 +77,34 @@ class ClassBalancedCrossEntropyLoss(nn.Module):
                 [0, num_classes-1] are ignored.
             ignore_index: A class index to ignore during updates.
         """
-        # Count the number of times each class is encountered
-        class_counts = Counter(target.flatten().int().tolist())
-
-        # Remove ignore_index if present
-        class_counts.pop(ignore_index, None)
-
-        # Remove those counts that exceed the number of classes that are being tracked
-        class_counts = {k: v for k, v in class_counts.items() if k < self.config.num_classes}
-
-        # Calculate prevalence of each class
-        total_count = sum(class_counts.values())
-        new_prevalences = (
-            {class_id: count / total_count for class_id, count in class_counts.items()} if total_count > 0 else {}
+        num_classes = self.config.num_classes
+
+        # Count the number of times each class is encountered. Invalid classes and ignore_index are counted in an extra
+        # bin which is then removed.
+        target = target.flatten().long()
+        is_valid = (target != ignore_index) & (target >= 0) & (target < num_classes)
+        class_counts = torch.bincount(torch.where(is_valid, target, num_classes), minlength=num_classes + 1)
+        class_counts = class_counts[:num_classes]
+        # (num_classes,)
+
+        if self.config.sync_across_ranks and dist.is_available() and dist.is_initialized():
+            dist.all_reduce(class_counts)
+
+        # Calculate prevalence of each class. All are zero if there are no counts.
+        class_counts = class_counts.to(self.class_prevalences.device, torch.float32)
+        new_prevalences = class_counts / class_counts.sum().clamp(min=1)
+
+        # when encountered for the first time, assume each class was equally prevalent at the start
+        class_prevalences = torch.where(
+            self.class_prevalences.isnan() & (class_counts > 0), 1 / num_classes, self.class_prevalences
         )
 
-        # Update current prevalences using EMA to allow for distribution shift in data
+        # Update current prevalences using EMA to allow for distribution shift in data. Classes that have never been
+        # encountered remain NaN.
         decay = self.config.ema_decay
-        for i in range(self.config.num_classes):
-            # when encountered for the first time, assume each class was equally prevalent at the start
-            if self.class_prevalences[i] is None and i in new_prevalences:
-                self.class_prevalences[i] = 1 / self.config.num_classes
+        self.class_prevalences.copy_(class_prevalences * decay + new_prevalences * (1 - decay))
 
-            # update to the new value using EMA
-            if self.class_prevalences[i] is not None:
-                self.class_prevalences[i] = self.class_prevalences[i] * decay + new_prevalences.get(i, 0.0) * (
-                    1 - decay
-                )
+        self._class_weights = None
 
     @torch.no_grad()
     def get_class_prevalences(self, device=torch.device("cpu")) -> torch.Tensor:
@@ -107,16 +121,7 @@ class ClassBalancedCrossEntropyLoss(nn.Module):
             Tensor of shape (num_classes,) with dtype float32 containing per-class
             prevalence estimates in [0, 1] or NaN for unseen classes.
         """
-
-        # Get class prevalences and replace None with nan
-        class_prevalences = [
-            prevalence if prevalence is not None else torch.nan for prevalence in self.class_prevalences
-        ]
-
-        # Calculate weights as inverse of class prevalences
-        class_prevalences = torch.tensor(class_prevalences, dtype=torch.float32, device=device)
-
-        return class_prevalences
+        return self.class_prevalences.to(device, copy=True)
 
     @torch.no_grad()
     def get_class_weights(self, device=torch.device("cpu")) -> torch.Tensor:
@@ -133,22 +138,32 @@ class ClassBalancedCrossEntropyLoss(nn.Module):
             device: The device on which to place the returned tensor.
 
         Returns:
-            Tensor of shape (num_classes,) containing normalized class weights.
+            Tensor of shape (num_classes,) containing normalized class weights. This is cached until the class
+            prevalences are updated and should not be modified in-place.
         """
+        if self._class_weights is None:
+            self._class_weights = self._compute_class_weights()
+        return self._class_weights.to(device)
+
+    def _compute_class_weights(self) -> torch.Tensor:
         # Get class prevalences
-        class_prevalences = self.get_class_prevalences(device)
+        class_prevalences = self.class_prevalences
 
         # If there were no class prevalences, then all weights will be nan; handle this
-        if class_prevalences.isnan().all():
-            class_prevalences = class_prevalences.nan_to_num(1.0)
+        class_prevalences = torch.where(
+            class_prevalences.isnan().all(), class_prevalences.nan_to_num(1.0), class_prevalences
+        )
 
         # Calculate weights as inverse of class prevalences
         weights = 1 / class_prevalences
 
         # Substitute nan values with mean and clamp weights to a limit
         # Assumption: all classes are visited at least once in the dataset
-        mu, std = weights.nanmean(), weights[~weights.isnan()].std()
-        weights = weights.nan_to_num(nan=mu, posinf=mu, neginf=mu)
+        # Statistics of the observed weights are computed without boolean indexing or python scalars to avoid device
+        # syncs
+        mu = weights.nanmean()
+        std = (((weights - mu) ** 2).nansum() / ((~weights.isnan()).sum() - 1)).sqrt()
+        weights = torch.where(weights.isfinite(), weights, mu)
         weights = weights.clamp(mu - 3 * std, mu + 3 * std)
 
         # Add failsafe just in case nans are still present
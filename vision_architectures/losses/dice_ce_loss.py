@@ -0,0 +1,143 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/losses/02_dice_ce_loss.ipynb.
+
+# %% auto #0
+__all__ = ['DiceCELossConfig', 'DiceCELoss']
+
+# %% ../../nbs/losses/02_dice_ce_loss.ipynb #5d8a1f3e
+from typing import Literal
+
+import torch
+from torch import nn
+
+from ..docstrings import populate_docstring
+from ..utils.activation_checkpointing import ActivationCheckpointing
+from ..utils.custom_base_model import CustomBaseModel, Field
+
+# %% ../../nbs/losses/02_dice_ce_loss.ipynb #b3e9c7d2
+class DiceCELossConfig(CustomBaseModel):
+    weight_dsc: float = Field(1.0, description="Weight of the soft dice loss.")
+    weight_ce: float = Field(1.0, description="Weight of the cross entropy loss.")
+    ignore_index: int = Field(-100, description="Label of voxels that are ignored in both losses.")
+    smooth: float = Field(1e-5, description="Smoothing term of the dice ratios and of the logarithms.")
+    reduction: Literal["mean", "sum"] | None = Field("mean", description="Reduction of the per sample losses.")
+    chunk_size: int = Field(
+        2**18, gt=0, description="Number of voxels per sample whose class probabilities are computed at once."
+    )
+
+# %% ../../nbs/losses/02_dice_ce_loss.ipynb #f4a06b19
+class DiceCELoss(nn.Module):
+    @populate_docstring
+    def __init__(self, config: DiceCELossConfig = {}, checkpointing_level: int = 0, **kwargs):
+        """Fused soft dice and cross entropy loss for segmentation computed from logits and integer label maps.
+
+        This computes the same values as ``UNetR3DDecoder.loss_fn`` on softmax probabilities and one-hot targets, but
+        neither one-hot targets nor dense ignore masks are ever created. Voxels are processed in chunks: the softmax of
+        each chunk is reduced immediately to per-class intersections, sums of squared probabilities and class counts
+        using ``scatter_add``, along with the log likelihoods of the target classes.
+
+        Notes:
+            - Targets must be integer class indices in [0, num_classes-1] or ``ignore_index``.
+            - With a ``checkpointing_level`` of at least 1, the probabilities of every chunk are recomputed during the
+              backward pass instead of being stored, so memory used by the loss does not grow with the number of
+              classes during training either.
+
+        Args:
+            config: {CONFIG_INSTANCE_DOC}
+            checkpointing_level: {CHECKPOINTING_LEVEL_DOC}
+            **kwargs: {CONFIG_KWARGS_DOC}
+        """
+        super().__init__()
+
+        self.config = DiceCELossConfig.model_validate(config | kwargs)
+
+        self.checkpointing_level1 = ActivationCheckpointing(1, checkpointing_level)
+
+    def _chunk_statistics(
+        self, logits: torch.Tensor, target: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        # logits: (b, num_classes, chunk_size)
+        # target: (b, chunk_size)
+        b, num_classes = logits.shape[:2]
+
+        probabilities = logits.float().softmax(dim=1)
+        # (b, num_classes, chunk_size)
+
+        is_valid = target != self.config.ignore_index
+        target = torch.where(is_valid, target, 0)
+        # (b, chunk_size)
+
+        target_probabilities = probabilities.gather(1, target.unsqueeze(1)).squeeze(1) * is_valid
+        # (b, chunk_size)
+
+        zeros = torch.zeros((b, num_classes), dtype=probabilities.dtype, device=probabilities.device)
+        intersections = zeros.scatter_add(1, target, target_probabilities)
+        prediction_squares = (probabilities.square() * is_valid.unsqueeze(1)).sum(dim=2)
+        target_counts = zeros.scatter_add(1, target, is_valid.to(probabilities.dtype))
+        # (b, num_classes)
+
+        log_likelihoods = (torch.log(target_probabilities + self.config.smooth) * is_valid).sum(dim=1)
+        # (b,)
+
+        return intersections, prediction_squares, target_counts, log_likelihoods
+
+    def _reduce(self, loss: torch.Tensor) -> torch.Tensor:
+        if self.config.reduction is None:
+            return loss
+        elif self.config.reduction == "mean":
+            return loss.mean()
+        elif self.config.reduction == "sum":
+            return loss.sum()
+
+    def forward(
+        self, input: torch.Tensor, target: torch.Tensor, return_components: bool = False
+    ) -> torch.Tensor | tuple[torch.Tensor, list[torch.Tensor]]:
+        """Compute the weighted sum of the soft dice loss and the cross entropy loss.
+
+        Args:
+            input: Logits of shape (b, num_classes, ...).
+            target: Integer class indices of shape (b, ...).
+            return_components: If True, also return the dice and cross entropy losses.
+
+        Returns:
+            If return_components is False: the loss, reduced as per the config.
+            If True: a tuple (loss, [dice_loss, cross_entropy_loss]).
+        """
+        if target.shape != input.shape[:1] + input.shape[2:]:
+            raise ValueError(
+                f"target must have the shape of input without the channel dimension, got {tuple(target.shape)} and "
+                f"{tuple(input.shape)}"
+            )
+
+        num_classes = input.shape[1]
+        num_voxels = input.shape[2:].numel()
+        smooth = self.config.smooth
+
+        input = input.flatten(2)
+        target = target.flatten(1).long()
+        # (b, num_classes, num_voxels) and (b, num_voxels)
+
+        statistics = None
+        for start in range(0, num_voxels, self.config.chunk_size):
+            end = start + self.config.chunk_size
+            chunk_statistics = self.checkpointing_level1(
+                self._chunk_statistics, input[:, :, start:end], target[:, start:end]
+            )
+            if statistics is None:
+                statistics = chunk_statistics
+            else:
+                statistics = [total + chunk for total, chunk in zip(statistics, chunk_statistics)]
+        intersections, prediction_squares, target_counts, log_likelihoods = statistics
+        # (b, num_classes), (b, num_classes), (b, num_classes), (b,)
+
+        dice_loss = 1 - (1 / num_classes) * (
+            (2 * intersections + smooth) / (prediction_squares + target_counts + smooth)
+        ).sum(dim=1)
+        cross_entropy_loss = -log_likelihoods / num_voxels
+        # (b,)
+
+        loss = self.config.weight_dsc * dice_loss + self.config.weight_ce * cross_entropy_loss
+        loss = self._reduce(loss)
+
+        if return_components:
+            return loss, [self._reduce(dice_loss), self._reduce(cross_entropy_loss)]
+        return loss
@@ -7,49 +7,28 @@ __all__ = ['map_mar', 'mean_average_precision_recall', 'mean_average_precision_m
 # %% ../../nbs/metrics/01_detection.ipynb #080fbf87
 from typing import Literal
 
+import numpy as np
 import torch
 from torchmetrics import Metric
+from torchmetrics.utilities import dim_zero_cat
 
-from ..utils.bounding_boxes import _IndexedConfidenceScore, get_tps_fps_fns
+from ..utils.bounding_boxes import match_bboxes
 
 # %% ../../nbs/metrics/01_detection.ipynb #8ce6f796
-def mean_average_precision_mean_average_recall(
+def _get_detection_records(
     pred_bboxes: list[torch.Tensor],
     pred_confidence_scores: list[torch.Tensor],
     target_bboxes: list[torch.Tensor],
     target_classes: list[torch.Tensor],
-    iou_thresholds: list[float] = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95],
-    average_precision_num_points: int = 101,
+    iou_thresholds: list[float],
     min_confidence_threshold: float = 0.0,
     max_bboxes_per_image: int | None = 100,
-    return_intermediates: bool = False,
-) -> tuple[float, float] | tuple[float, float, dict[float, dict[int, float]], dict[float, dict[int, float]]]:
-    """Calculate the COCO mean average precision (mAP) for object detection.
-
-    Args:
-        pred_bboxes: A list of length B containing tensors of shape (NP, 4) or (NP, 6) containing the predicted bounding
-            box parameters in xyxy or xyzxyz format.
-        pred_confidence_scores: A list of length B containing tensors of shape (NP, 1+num_classes) containing the
-            predicted confidence scores for each class. Note that the first column corresponds to the "no-object" class,
-            and bounding boxes which fall in this category are ignored.
-        target_bboxes: A list of length B containing tensors of shape (NT, 4) or (NT, 6) containing the target bounding
-            box parameters in xyxy or xyzxyz format.
-        target_classes: A list of length B containing tensors of shape (NT,) containing the target class labels for the
-            objects in the image.
-        iou_thresholds: A list of IoU thresholds to use for calculating mAP and mAR.
-        average_precision_num_points: Number of points over which to calculate average precision.
-        min_confidence_threshold: Minimum confidence probability threshold to consider a prediction.
-        max_bboxes_per_image: Maximum number of bounding boxes to consider per image. If more are present, only the top
-            `max_bboxes_per_image` boxes based on confidence scores are considered. If set to None, all bounding boxes
-            are considered.
-        return_intermediates: If True, return intermediate values used to calculate mAP and mAR.
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+    # Match predictions to targets for every class at all IOU thresholds and reduce the result to compact records: the
+    # confidence score, class and per threshold TP flag of every considered prediction, and the number of targets of
+    # every class. Average precision and recall can be calculated from these records alone, and records of different
+    # batches can simply be concatenated. Arguments are the same as mean_average_precision_mean_average_recall.
 
-    Returns:
-        The mean average precision (mAP) and mean average recall (mAR) across all classes and IoU thresholds for the
-        entire dataset.
-        If `return_intermediates` is True, also returns two dictionaries containing the average precision and average
-        recall for each class at each IoU threshold.
-    """
     # Some basic tests
     assert len(pred_bboxes) == len(pred_confidence_scores) == len(target_bboxes) == len(target_classes), (
         f"All input lists must have the same length. Got lengths: {len(pred_bboxes)}, {len(pred_confidence_scores)}, "
@@ -93,8 +72,17 @@ def mean_average_precision_mean_average_recall(
         pred_classes = torch.argmax(pred_confidence_scores[b], dim=-1)
         # (NP,)
 
+        # Limit number of bounding boxes per image if applicable. "no-object" boxes are never considered.
+        is_kept = torch.ones_like(pred_classes, dtype=torch.bool)
+        if max_bboxes_per_image is not None:
+            pred_class_confidence_scores = pred_confidence_scores[b].gather(1, pred_classes.unsqueeze(1)).squeeze(1)
+            pred_class_confidence_scores = pred_class_confidence_scores.masked_fill(pred_classes == 0, -torch.inf)
+            topk_indices = pred_class_confidence_scores.argsort(descending=True, stable=True)[:max_bboxes_per_image]
+            is_kept = torch.zeros_like(is_kept).index_fill_(0, topk_indices, True)
+        # (NP,)
+
         for c in range(num_classes):
-            pred_classes_mask = pred_classes == (c + 1)
+            pred_classes_mask = (pred_classes == (c + 1)) & is_kept
             # (NP,)
             target_classes_mask = target_classes[b] == (c + 1)
             # (NT,)
@@ -106,94 +94,109 @@ def mean_average_precision_mean_average_recall(
             target_bboxes_by_class[c].append(target_bboxes[b][target_classes_mask])
             # (NT,)
 
-    # Limit number of bounding boxes per image if applicable
-    if max_bboxes_per_image is not None:
-        for b in range(B):
-            _confidence_scores = []
-            for c in range(num_classes):
-                if pred_bboxes_by_class[c][b].numel() > 0:
-                    _confidence_scores.extend(
-                        _IndexedConfidenceScore.from_batch(
-                            pred_confidences_scores_by_class[c][b], batch_index=b, class_index=c
-                        )
-                    )
-            if len(_confidence_scores) == 0:
-                continue
-
-            if len(_confidence_scores) > max_bboxes_per_image:
-                _confidence_scores = sorted(_confidence_scores, reverse=True)
-                topk_confidences = _confidence_scores[:max_bboxes_per_image]
-                for c in range(num_classes):
-                    topk_confidences_with_class = [x for x in topk_confidences if x.class_index == c]
-
-                    pred_bboxes_by_class[c][b] = torch.stack(
-                        [pred_bboxes_by_class[c][b][x.offset_index] for x in topk_confidences_with_class],
-                        dim=0,
-                        dtype=pred_bboxes_by_class[c][b].dtype,
-                        device=pred_bboxes_by_class[c][b].device,
-                    )
-                    # (NP', 4) or (NP', 6)
-                    pred_confidences_scores_by_class[c][b] = torch.stack(
-                        [x.score for x in topk_confidences_with_class],
-                        dim=0,
-                        dtype=pred_confidences_scores_by_class[c][b].dtype,
-                        device=pred_confidences_scores_by_class[c][b].device,
-                    )
-                    # (NP',)
-
-    # For each IOU threshold, calculate average precision and average recall
-    average_precisions = {}
-    average_recalls = {}
-    for iou_threshold in iou_thresholds:
-        # For each class calculate average precision and average recall
-        class_average_precisions = {}
-        class_average_recalls = {}
-        for c in range(num_classes):
-            # If no target boxes for this class, skip it
-            if all(target_bbox.numel() == 0 for target_bbox in target_bboxes_by_class[c]):
-                class_average_precisions[c + 1] = float("nan")
-                class_average_recalls[c + 1] = float("nan")
-                continue
-
-            _, _, _, intermediate_counts = get_tps_fps_fns(
-                pred_bboxes=pred_bboxes_by_class[c],
-                pred_confidence_scores=pred_confidences_scores_by_class[c],
-                target_bboxes=target_bboxes_by_class[c],
-                iou_threshold=iou_threshold,
-                matching_method="coco",
-                min_confidence_threshold=min_confidence_threshold,
-                max_bboxes_per_image=None,  # As this has already been done across classes
-                return_intermediate_counts=True,
-            )
-            intermediate_counts = torch.tensor(intermediate_counts, device=pred_bboxes[0].device, dtype=torch.float32)
-            # (NC, 3) where the first column is TP, second is FP and third is FN for each prediction considered
-            precisions = (intermediate_counts[:, 0] + 1e-5) / (
-                intermediate_counts[:, 0] + intermediate_counts[:, 1] + 1e-5
-            )
-            recalls = (intermediate_counts[:, 0] + 1e-5) / (
-                intermediate_counts[:, 0] + intermediate_counts[:, 2] + 1e-5
-            )
-            # (NC,) each
+    # Match all batch elements for every class at all IOU thresholds at once. IOUs and the order of predictions are
+    # computed only once per class.
+    T = len(iou_thresholds)
+    device = pred_bboxes[0].device
+    confidence_scores = [torch.empty(0, dtype=torch.float64, device=device)]
+    classes = [torch.empty(0, dtype=torch.long, device=device)]
+    is_tp = [torch.empty((0, T), dtype=torch.bool, device=device)]
+    num_targets = torch.zeros(num_classes, dtype=torch.long, device=device)
+    for c in range(num_classes):
+        num_targets[c] = sum(target_bbox.shape[0] for target_bbox in target_bboxes_by_class[c])
+
+        matching = match_bboxes(
+            pred_bboxes=pred_bboxes_by_class[c],
+            pred_confidence_scores=pred_confidences_scores_by_class[c],
+            target_bboxes=target_bboxes_by_class[c],
+            iou_threshold=list(iou_thresholds),
+            matching_method="coco",
+            min_confidence_threshold=min_confidence_threshold,
+            max_bboxes_per_image=None,  # As this has already been done across classes
+        )
+        confidence_scores.append(torch.from_numpy(matching.confidence_scores).to(device))
+        classes.append(torch.full((len(matching.confidence_scores),), c + 1, dtype=torch.long, device=device))
+        is_tp.append(torch.from_numpy(np.ascontiguousarray(matching.target_indices.T >= 0)).to(device))
 
-            # Precision envelope: P_interp(r) = max_{r' >= r} P(r')
-            enveloped_precisions = precisions.clone()
-            for i in range(len(enveloped_precisions) - 2, -1, -1):
-                if enveloped_precisions[i] < enveloped_precisions[i + 1]:
-                    enveloped_precisions[i] = enveloped_precisions[i + 1]
+    confidence_scores = torch.cat(confidence_scores)
+    classes = torch.cat(classes)
+    is_tp = torch.cat(is_tp)
+    # (N,), (N,), (N, T)
 
-            # Calculate average precision using step-wise interpolation
-            recall_samples = torch.linspace(0, 1, average_precision_num_points, device=recalls.device)
-            idxs = torch.searchsorted(recalls, recall_samples, side="left")
-            valid = idxs < enveloped_precisions.numel()
-            enveloped_precisions_at_t = torch.zeros_like(recall_samples)
-            enveloped_precisions_at_t[valid] = enveloped_precisions[idxs[valid]]
-            class_average_precisions[c + 1] = enveloped_precisions_at_t.mean().item()
+    return confidence_scores, classes, is_tp, num_targets
 
-            # Calculate average recall i.e. maximum recall achieved at this IoU threshold
-            class_average_recalls[c + 1] = recalls.max().item() if recalls.numel() > 0 else 0.0
 
-        average_precisions[iou_threshold] = class_average_precisions
-        average_recalls[iou_threshold] = class_average_recalls
+def _average_precisions_recalls_from_records(
+    confidence_scores: torch.Tensor,
+    classes: torch.Tensor,
+    is_tp: torch.Tensor,
+    num_targets: torch.Tensor,
+    iou_thresholds: list[float],
+    average_precision_num_points: int = 101,
+) -> tuple[float, float, dict[float, dict[int, float]], dict[float, dict[int, float]]]:
+    # Calculate mAP and mAR along with the average precision and average recall of every class at every IOU threshold
+    # from the records returned by _get_detection_records. Records are expected in the order of batch elements.
+    T = len(iou_thresholds)
+    num_classes = num_targets.shape[0]
+    num_targets = num_targets.tolist()
+
+    average_precisions = {iou_threshold: {} for iou_threshold in iou_thresholds}
+    average_recalls = {iou_threshold: {} for iou_threshold in iou_thresholds}
+    for c in range(num_classes):
+        # If no target boxes for this class, skip it
+        if num_targets[c] == 0:
+            for iou_threshold in iou_thresholds:
+                average_precisions[iou_threshold][c + 1] = float("nan")
+                average_recalls[iou_threshold][c + 1] = float("nan")
+            continue
+
+        # Sort predictions of this class by descending confidence score. Ties are resolved by the order of the records
+        # i.e. by batch element.
+        class_mask = classes == (c + 1)
+        order = confidence_scores[class_mask].argsort(descending=True, stable=True)
+        class_is_tp = is_tp[class_mask][order].T
+        # (T, NC)
+
+        cumulative_tps = class_is_tp.cumsum(dim=-1)
+        cumulative_fps = (~class_is_tp).cumsum(dim=-1)
+        cumulative_fns = num_targets[c] - cumulative_tps
+        intermediate_counts = torch.stack([cumulative_tps, cumulative_fps, cumulative_fns], dim=-1).float()
+        # (T, NC, 3) where the first column is TP, second is FP and third is FN for each prediction considered
+        precisions = (intermediate_counts[..., 0] + 1e-5) / (
+            intermediate_counts[..., 0] + intermediate_counts[..., 1] + 1e-5
+        )
+        recalls = (intermediate_counts[..., 0] + 1e-5) / (
+            intermediate_counts[..., 0] + intermediate_counts[..., 2] + 1e-5
+        )
+        # (T, NC) each
+
+        # Precision envelope: P_interp(r) = max_{r' >= r} P(r')
+        enveloped_precisions = precisions.flip(-1).cummax(dim=-1).values.flip(-1)
+        # (T, NC)
+
+        # Calculate average precision using step-wise interpolation
+        recall_samples = torch.linspace(0, 1, average_precision_num_points, device=recalls.device)
+        idxs = torch.searchsorted(recalls, recall_samples.expand(T, -1).contiguous(), side="left")
+        valid = idxs < enveloped_precisions.shape[-1]
+        enveloped_precisions_at_t = torch.zeros((T, average_precision_num_points), device=recalls.device)
+        if enveloped_precisions.shape[-1] > 0:
+            enveloped_precisions_at_t = torch.where(
+                valid, enveloped_precisions.gather(-1, idxs.clamp(max=enveloped_precisions.shape[-1] - 1)), 0.0
+            )
+        # (T, average_precision_num_points)
+        class_average_precisions = [
+            threshold_enveloped_precisions_at_t.mean().item()
+            for threshold_enveloped_precisions_at_t in enveloped_precisions_at_t
+        ]
+
+        # Calculate average recall i.e. maximum recall achieved at this IoU threshold
+        class_average_recalls = recalls.amax(dim=-1).tolist() if recalls.shape[-1] > 0 else [0.0] * T
+
+        for iou_threshold, average_precision, average_recall in zip(
+            iou_thresholds, class_average_precisions, class_average_recalls
+        ):
+            average_precisions[iou_threshold][c + 1] = average_precision
+            average_recalls[iou_threshold][c + 1] = average_recall
 
     map_metric = torch.nanmean(
         torch.stack([torch.tensor(ap) for iou_aps in average_precisions.values() for ap in iou_aps.values()])
@@ -202,6 +205,59 @@ def mean_average_precision_mean_average_recall(
         torch.stack([torch.tensor(ar) for iou_ars in average_recalls.values() for ar in iou_ars.values()])
     ).item()
 
+    return map_metric, mar_metric, average_precisions, average_recalls
+
+
+def mean_average_precision_mean_average_recall(
+    pred_bboxes: list[torch.Tensor],
+    pred_confidence_scores: list[torch.Tensor],
+    target_bboxes: list[torch.Tensor],
+    target_classes: list[torch.Tensor],
+    iou_thresholds: list[float] = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95],
+    average_precision_num_points: int = 101,
+    min_confidence_threshold: float = 0.0,
+    max_bboxes_per_image: int | None = 100,
+    return_intermediates: bool = False,
+) -> tuple[float, float] | tuple[float, float, dict[float, dict[int, float]], dict[float, dict[int, float]]]:
+    """Calculate the COCO mean average precision (mAP) for object detection.
+
+    Args:
+        pred_bboxes: A list of length B containing tensors of shape (NP, 4) or (NP, 6) containing the predicted bounding
+            box parameters in xyxy or xyzxyz format.
+        pred_confidence_scores: A list of length B containing tensors of shape (NP, 1+num_classes) containing the
+            predicted confidence scores for each class. Note that the first column corresponds to the "no-object" class,
+            and bounding boxes which fall in this category are ignored.
+        target_bboxes: A list of length B containing tensors of shape (NT, 4) or (NT, 6) containing the target bounding
+            box parameters in xyxy or xyzxyz format.
+        target_classes: A list of length B containing tensors of shape (NT,) containing the target class labels for the
+            objects in the image.
+        iou_thresholds: A list of IoU thresholds to use for calculating mAP and mAR.
+        average_precision_num_points: Number of points over which to calculate average precision.
+        min_confidence_threshold: Minimum confidence probability threshold to consider a prediction.
+        max_bboxes_per_image: Maximum number of bounding boxes to consider per image. If more are present, only the top
+            `max_bboxes_per_image` boxes based on confidence scores are considered. If set to None, all bounding boxes
+            are considered.
+        return_intermediates: If True, return intermediate values used to calculate mAP and mAR.
+
+    Returns:
+        The mean average precision (mAP) and mean average recall (mAR) across all classes and IoU thresholds for the
+        entire dataset.
+        If `return_intermediates` is True, also returns two dictionaries containing the average precision and average
+        recall for each class at each IoU threshold.
+    """
+    records = _get_detection_records(
+        pred_bboxes,
+        pred_confidence_scores,
+        target_bboxes,
+        target_classes,
+        iou_thresholds=iou_thresholds,
+        min_confidence_threshold=min_confidence_threshold,
+        max_bboxes_per_image=max_bboxes_per_image,
+    )
+    map_metric, mar_metric, average_precisions, average_recalls = _average_precisions_recalls_from_records(
+        *records, iou_thresholds=iou_thresholds, average_precision_num_points=average_precision_num_points
+    )
+
     if return_intermediates:
         return map_metric, mar_metric, average_precisions, average_recalls
     return map_metric, mar_metric
@@ -246,10 +302,13 @@ class _MeanAveragePrecisionMeanAverageRecallBase(Metric):
         self.min_confidence_threshold = min_confidence_threshold
         self.max_bboxes_per_image = max_bboxes_per_image
 
-        self.add_state("pred_bboxes", [], dist_reduce_fx=None, persistent=False)
-        self.add_state("pred_confidence_scores", [], dist_reduce_fx=None, persistent=False)
-        self.add_state("target_bboxes", [], dist_reduce_fx=None, persistent=False)
-        self.add_state("target_classes", [], dist_reduce_fx=None, persistent=False)
+        # Matching is done as soon as a batch is received, so only compact per prediction records and per class target
+        # counts are stored. Memory grows with the number of considered predictions and not with the size of the inputs,
+        # and only these records need to be gathered across processes.
+        self.add_state("confidence_scores", [], dist_reduce_fx="cat", persistent=False)
+        self.add_state("pred_classes", [], dist_reduce_fx="cat", persistent=False)
+        self.add_state("is_tp", [], dist_reduce_fx="cat", persistent=False)
+        self.add_state("num_targets", [], dist_reduce_fx="cat", persistent=False)
 
     def update(
         self,
@@ -258,27 +317,43 @@ class _MeanAveragePrecisionMeanAverageRecallBase(Metric):
         target_bboxes: list[torch.Tensor],
         target_classes: list[torch.Tensor],
     ):
-        self.pred_bboxes.extend(pred_bboxes)
-        self.pred_confidence_scores.extend(pred_confidence_scores)
-        self.target_bboxes.extend(target_bboxes)
-        self.target_classes.extend(target_classes)
+        if len(pred_bboxes) == 0:
+            return
+
+        confidence_scores, pred_classes, is_tp, num_targets = _get_detection_records(
+            pred_bboxes,
+            pred_confidence_scores,
+            target_bboxes,
+            target_classes,
+            iou_thresholds=self.iou_thresholds,
+            min_confidence_threshold=self.min_confidence_threshold,
+            max_bboxes_per_image=self.max_bboxes_per_image,
+        )
+        self.confidence_scores.append(confidence_scores.to(self.device))
+        self.pred_classes.append(pred_classes.to(self.device))
+        self.is_tp.append(is_tp.to(self.device))
+        self.num_targets.append(num_targets.unsqueeze(0).to(self.device))
+        # (N,), (N,), (N, T), (1, num_classes)
 
     def run_functional(self, return_metrics: Literal["map_only", "mar_only"]):
-        map_metric, mar_metric = mean_average_precision_mean_average_recall(
-            self.pred_bboxes,
-            self.pred_confidence_scores,
-            self.target_bboxes,
-            self.target_classes,
+        if return_metrics not in ("map_only", "mar_only"):
+            raise NotImplementedError('Only "map_only" and "mar_only" are supported.')
+        if len(self.num_targets) == 0:
+            return torch.tensor(float("nan"), device=self.device)
+
+        # Records are concatenated in the order in which batches were received, so ties in confidence scores are
+        # resolved in the same way as when all batches are passed to the functional version at once.
+        map_metric, mar_metric, _, _ = _average_precisions_recalls_from_records(
+            dim_zero_cat(self.confidence_scores),
+            dim_zero_cat(self.pred_classes),
+            dim_zero_cat(self.is_tp),
+            dim_zero_cat(self.num_targets).sum(dim=0),
             iou_thresholds=self.iou_thresholds,
             average_precision_num_points=self.average_precision_num_points,
-            min_confidence_threshold=self.min_confidence_threshold,
-            max_bboxes_per_image=self.max_bboxes_per_image,
         )
         if return_metrics == "map_only":
-            return torch.tensor(map_metric, device=self.pred_bboxes[0].device)
-        elif return_metrics == "mar_only":
-            return torch.tensor(mar_metric, device=self.pred_bboxes[0].device)
-        raise NotImplementedError('Only "map_only" and "mar_only" are supported.')
+            return torch.tensor(map_metric, device=self.device)
+        return torch.tensor(mar_metric, device=self.device)
 
 # %% ../../nbs/metrics/01_detection.ipynb #f1887862
 class MeanAveragePrecision(_MeanAveragePrecisionMeanAverageRecallBase):
@@ -0,0 +1,326 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/metrics/02_segmentation.ipynb.
+
+# %% auto #0
+__all__ = ['DiceScore', 'HausdorffDistance', 'SurfaceDiceScore']
+
+# %% ../../nbs/metrics/02_segmentation.ipynb #3c7a9e15
+from typing import Literal
+
+import torch
+from torch.nn import functional as F
+from torchmetrics import Metric
+
+# %% ../../nbs/metrics/02_segmentation.ipynb #d8e2b4a1
+def _to_labels(preds: torch.Tensor, target: torch.Tensor) -> torch.Tensor:
+    # Logits or probabilities of shape (b, num_classes, ...) are converted to label maps of shape (b, ...)
+    if preds.ndim == target.ndim + 1:
+        preds = preds.argmax(dim=1)
+    if preds.shape != target.shape:
+        raise ValueError(
+            f"preds and target must have the same spatial shape, got {tuple(preds.shape)} and {tuple(target.shape)}"
+        )
+    return preds
+
+
+def _get_class_counts(
+    preds: torch.Tensor, target: torch.Tensor, num_classes: int, ignore_index: int | None = None
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    # Voxels of ignore_index are counted in an extra bin which is then removed
+    preds = preds.flatten().long()
+    target = target.flatten().long()
+    if ignore_index is not None:
+        is_valid = target != ignore_index
+        preds = torch.where(is_valid, preds, num_classes)
+        target = torch.where(is_valid, target, num_classes)
+
+    intersections = torch.bincount(torch.where(preds == target, target, num_classes), minlength=num_classes + 1)
+    pred_counts = torch.bincount(preds, minlength=num_classes + 1)
+    target_counts = torch.bincount(target, minlength=num_classes + 1)
+    # (num_classes + 1,)
+
+    return intersections[:num_classes], pred_counts[:num_classes], target_counts[:num_classes]
+
+
+def _average(values: torch.Tensor, average: Literal["macro", "none"]) -> torch.Tensor:
+    if average == "macro":
+        return values.nanmean()
+    if average == "none":
+        return values
+    raise ValueError(f"Invalid average: {average}. Should be one of macro, none.")
+
+# %% ../../nbs/metrics/02_segmentation.ipynb #5b0f7c3e
+class DiceScore(Metric):
+    """Calculate the Dice score of label maps for every class, accumulated over all voxels of the dataset."""
+
+    is_differentiable: bool = False
+    higher_is_better: bool = True
+    plot_lower_bound: float = 0.0
+    plot_upper_bound: float = 1.0
+
+    def __init__(
+        self,
+        num_classes: int,
+        include_background: bool = True,
+        ignore_index: int | None = None,
+        average: Literal["macro", "none"] = "macro",
+        *args,
+        **kwargs
+    ):
+        """Initialize the DiceScore metric.
+
+        Args:
+            num_classes: Number of classes, including the background class 0.
+            include_background: Whether to include the background class in the result.
+            ignore_index: Target label of voxels that are ignored.
+            average: ``"macro"`` returns the mean over classes that are present in either the predictions or the
+                targets. ``"none"`` returns the score of every class, NaN if a class is absent from both.
+        """
+        super().__init__(*args, **kwargs)
+
+        self.num_classes = num_classes
+        self.include_background = include_background
+        self.ignore_index = ignore_index
+        self.average = average
+
+        # Only per class counts are stored, so memory does not grow with the size or number of the inputs and
+        # synchronizing across processes is a single sum of three small tensors.
+        self.add_state("intersections", torch.zeros(num_classes, dtype=torch.long), dist_reduce_fx="sum")
+        self.add_state("pred_counts", torch.zeros(num_classes, dtype=torch.long), dist_reduce_fx="sum")
+        self.add_state("target_counts", torch.zeros(num_classes, dtype=torch.long), dist_reduce_fx="sum")
+
+    def update(self, preds: torch.Tensor, target: torch.Tensor):
+        """Accumulate class counts of a batch.
+
+        Args:
+            preds: Predicted label maps of shape (b, ...) or logits / probabilities of shape (b, num_classes, ...).
+            target: Target label maps of shape (b, ...).
+        """
+        preds = _to_labels(preds, target)
+        intersections, pred_counts, target_counts = _get_class_counts(
+            preds, target, self.num_classes, self.ignore_index
+        )
+        self.intersections += intersections
+        self.pred_counts += pred_counts
+        self.target_counts += target_counts
+
+    def compute(self):
+        denominators = self.pred_counts + self.target_counts
+        dice_scores = torch.where(denominators > 0, 2 * self.intersections / denominators.clamp(min=1), torch.nan)
+        # (num_classes,)
+        if not self.include_background:
+            dice_scores = dice_scores[1:]
+        return _average(dice_scores, self.average)
+
+# %% ../../nbs/metrics/02_segmentation.ipynb #a4e61d92
+def _get_boundaries(masks: torch.Tensor) -> torch.Tensor:
+    # masks: (n, *spatial) boolean. Boundary voxels are the voxels of a mask with at least one face-connected
+    # neighbour outside the mask. Voxels outside the volume count as outside the mask.
+    spatial_dims = masks.ndim - 1
+    padded = F.pad(masks.to(torch.uint8), (1, 1) * spatial_dims, value=0).bool()
+
+    is_interior = masks.clone()
+    for dim in range(spatial_dims):
+        for shift in (slice(0, -2), slice(2, None)):
+            slices = [slice(None)] + [slice(1, -1)] * spatial_dims
+            slices[dim + 1] = shift
+            is_interior &= padded[tuple(slices)]
+
+    return masks & ~is_interior
+
+
+def _get_distance_transform(masks: torch.Tensor, spacing: torch.Tensor, chunk_size: int) -> torch.Tensor:
+    # masks: (n, *spatial) boolean. Exact Euclidean distance from every voxel to the nearest voxel of its mask, inf if
+    # the mask is empty. The squared distance transform is separable, so it is computed as one 1D lower envelope of
+    # parabolas per spatial dimension. Lines are processed in chunks so that at most chunk_size ** 2 candidate
+    # distances exist at once.
+    squared_distances = torch.where(masks, 0.0, torch.inf).to(spacing.dtype)
+    for dim in range(masks.ndim - 1):
+        lines = squared_distances.movedim(dim + 1, -1)
+        line_shape = lines.shape
+        length = line_shape[-1]
+        lines = lines.reshape(-1, length)
+        # (num_lines, length)
+
+        coordinates = torch.arange(length, dtype=spacing.dtype, device=spacing.device) * spacing[dim]
+        offsets = (coordinates[:, None] - coordinates[None, :]).square()
+        # (length, length)
+
+        lines_per_chunk = max(chunk_size**2 // length**2, 1)
+        lines = torch.cat(
+            [
+                (lines[start : start + lines_per_chunk, None, :] + offsets).amin(dim=-1)
+                for start in range(0, len(lines), lines_per_chunk)
+            ]
+        )
+        squared_distances = lines.reshape(line_shape).movedim(-1, dim + 1)
+    return squared_distances.sqrt()
+
+
+def _get_foreground_slices(mask: torch.Tensor) -> tuple[slice, ...]:
+    # Bounding box of the foreground of a non-empty mask, computed from per-dimension projections
+    slices = []
+    for dim in range(mask.ndim):
+        is_occupied = mask.any(dim=[d for d in range(mask.ndim) if d != dim]).nonzero()
+        slices.append(slice(int(is_occupied[0]), int(is_occupied[-1]) + 1))
+    return tuple(slices)
+
+
+def _get_surface_distances(
+    pred_mask: torch.Tensor, target_mask: torch.Tensor, spacing: torch.Tensor, chunk_size: int
+) -> tuple[torch.Tensor, torch.Tensor]:
+    # Distances from every boundary voxel of each mask to the nearest boundary voxel of the other mask. Both boundaries
+    # lie within the bounding box of the two masks, so boundaries and distance transforms are only computed within it.
+    is_foreground = pred_mask | target_mask
+    if not is_foreground.any():
+        empty = torch.zeros(0, dtype=spacing.dtype, device=spacing.device)
+        return empty, empty
+    slices = _get_foreground_slices(is_foreground)
+
+    boundaries = _get_boundaries(torch.stack([pred_mask[slices], target_mask[slices]]))
+    pred_boundary_distances, target_boundary_distances = _get_distance_transform(boundaries, spacing, chunk_size)
+    pred_boundary, target_boundary = boundaries
+    # (*bounding_box_shape)
+
+    pred_distances = target_boundary_distances[pred_boundary]
+    target_distances = pred_boundary_distances[target_boundary]
+    # (N_pred,), (N_target,)
+
+    return pred_distances, target_distances
+
+# %% ../../nbs/metrics/02_segmentation.ipynb #e7c35f08
+class _SurfaceDistanceMetricBase(Metric):
+    """Calculate a metric from the distances between the boundaries of the predicted and target masks of every class
+    and every sample, averaged over samples."""
+
+    is_differentiable: bool = False
+
+    def __init__(
+        self,
+        num_classes: int,
+        include_background: bool = False,
+        spacing: tuple[float, ...] | None = None,
+        chunk_size: int = 4096,
+        average: Literal["macro", "none"] = "macro",
+        *args,
+        **kwargs
+    ):
+        """Initialize the surface distance metric.
+
+        Args:
+            num_classes: Number of classes, including the background class 0.
+            include_background: Whether to include the background class in the result.
+            spacing: Physical size of a voxel along every spatial dimension. If None, a spacing of 1 is used. Can be
+                overridden for every batch in ``update``.
+            chunk_size: Bounds the memory of the distance transform to ``chunk_size ** 2`` candidate distances at
+                once.
+            average: ``"macro"`` returns the mean over classes. ``"none"`` returns the value of every class.
+        """
+        super().__init__(*args, **kwargs)
+
+        self.num_classes = num_classes
+        self.include_background = include_background
+        self.spacing = spacing
+        self.chunk_size = chunk_size
+        self.average = average
+
+        # Only per class sums of the per sample values and the number of samples for which they are defined are
+        # stored, so synchronizing across processes is a single sum of two small tensors.
+        self.add_state("metric_sums", torch.zeros(num_classes, dtype=torch.float64), dist_reduce_fx="sum")
+        self.add_state("metric_counts", torch.zeros(num_classes, dtype=torch.long), dist_reduce_fx="sum")
+
+    def _metric_from_surface_distances(
+        self, pred_distances: torch.Tensor, target_distances: torch.Tensor
+    ) -> torch.Tensor:
+        raise NotImplementedError
+
+    def update(self, preds: torch.Tensor, target: torch.Tensor, spacing: tuple[float, ...] | None = None):
+        """Accumulate the metric of every class of every sample of a batch.
+
+        Args:
+            preds: Predicted label maps of shape (b, ...) or logits / probabilities of shape (b, num_classes, ...).
+            target: Target label maps of shape (b, ...).
+            spacing: Physical size of a voxel of this batch along every spatial dimension. If None, the spacing of the
+                metric is used.
+        """
+        preds = _to_labels(preds, target)
+
+        spatial_dims = target.ndim - 1
+        if spacing is None:
+            spacing = self.spacing
+        if spacing is None:
+            spacing = (1.0,) * spatial_dims
+        if len(spacing) != spatial_dims:
+            raise ValueError(f"spacing must have {spatial_dims} values, got {tuple(spacing)}")
+        spacing = torch.tensor(spacing, dtype=torch.float32, device=target.device)
+
+        first_class = 0 if self.include_background else 1
+        for pred, target_ in zip(preds, target):
+            # Classes absent from both masks are undefined, and are skipped without extracting any boundaries
+            _, pred_counts, target_counts = _get_class_counts(pred, target_, self.num_classes)
+            is_present = (pred_counts + target_counts) > 0
+            is_present[:first_class] = False
+
+            values = torch.full((self.num_classes,), torch.nan, dtype=torch.float64, device=self.device)
+            for class_index in is_present.nonzero().flatten().tolist():
+                pred_distances, target_distances = _get_surface_distances(
+                    pred == class_index, target_ == class_index, spacing, self.chunk_size
+                )
+                values[class_index] = self._metric_from_surface_distances(pred_distances, target_distances)
+            # (num_classes,)
+
+            # Values are NaN when they are not defined for a class, e.g. if the class is absent from both masks
+            self.metric_sums += values.nan_to_num(0.0)
+            self.metric_counts += ~values.isnan()
+
+    def compute(self):
+        values = torch.where(
+            self.metric_counts > 0, self.metric_sums / self.metric_counts.clamp(min=1), torch.nan
+        ).float()
+        # (num_classes,)
+        if not self.include_background:
+            values = values[1:]
+        return _average(values, self.average)
+
+# %% ../../nbs/metrics/02_segmentation.ipynb #2f9d6b84
+class HausdorffDistance(_SurfaceDistanceMetricBase):
+    """Calculate the percentile (95 by default i.e. HD95) Hausdorff distance between the boundaries of the predicted
+    and target masks of every class, averaged over samples. Samples in which a class is absent from either mask are
+    not counted for that class."""
+
+    higher_is_better: bool = False
+    plot_lower_bound: float = 0.0
+
+    def __init__(self, num_classes: int, percentile: float = 95.0, *args, **kwargs):
+        super().__init__(num_classes, *args, **kwargs)
+        self.percentile = percentile
+
+    def _metric_from_surface_distances(
+        self, pred_distances: torch.Tensor, target_distances: torch.Tensor
+    ) -> torch.Tensor:
+        if len(pred_distances) == 0 or len(target_distances) == 0:
+            return torch.tensor(torch.nan)
+        q = self.percentile / 100
+        return torch.maximum(pred_distances.quantile(q), target_distances.quantile(q))
+
+# %% ../../nbs/metrics/02_segmentation.ipynb #c1a8e5f7
+class SurfaceDiceScore(_SurfaceDistanceMetricBase):
+    """Calculate the normalized surface Dice score i.e. the fraction of boundary voxels of the predicted and target
+    masks that are within a tolerance of the other boundary, for every class and averaged over samples. Samples in
+    which a class is absent from both masks are not counted for that class."""
+
+    higher_is_better: bool = True
+    plot_lower_bound: float = 0.0
+    plot_upper_bound: float = 1.0
+
+    def __init__(self, num_classes: int, tolerance: float = 1.0, *args, **kwargs):
+        super().__init__(num_classes, *args, **kwargs)
+        self.tolerance = tolerance
+
+    def _metric_from_surface_distances(
+        self, pred_distances: torch.Tensor, target_distances: torch.Tensor
+    ) -> torch.Tensor:
+        num_boundary_voxels = len(pred_distances) + len(target_distances)
+        if num_boundary_voxels == 0:
+            return torch.tensor(torch.nan)
+        num_within_tolerance = (pred_distances <= self.tolerance).sum() + (target_distances <= self.tolerance).sum()
+        return num_within_tolerance / num_boundary_voxels
@@ -17,6 +17,11 @@ from ..docstrings import populate_docstring
 from ..layers.attention import Attention1D, Attention1DConfig
 from ..utils.activation_checkpointing import ActivationCheckpointing
 from ..utils.custom_base_model import Field, model_validator
+from vision_architectures.utils.intermediates import (
+    CaptureIntermediatesPolicy,
+    get_capture_indices,
+    get_local_capture_indices,
+)
 from ..utils.rearrange import rearrange_channels
 
 # %% ../../nbs/nets/05_cait_3d.ipynb #7e9e0b6e
@@ -140,12 +145,18 @@ class CaiTStage1(nn.Module, PyTorchModelHubMixin):
         self.checkpointing_level4 = ActivationCheckpointing(4, checkpointing_level)
 
     @populate_docstring
-    def _forward(self, embeddings: torch.Tensor, return_intermediates: bool = False) -> torch.Tensor:
+    def _forward(
+        self,
+        embeddings: torch.Tensor,
+        return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
+    ) -> torch.Tensor:
         """Pass the input embeddings through the CaiT stage 1 layers.
 
         Args:
             embeddings: {INPUT_1D_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC}
 
         Returns:
             {OUTPUT_1D_DOC} If `return_intermediates` is True, returns a tuple of the output embeddings and a list of
@@ -153,11 +164,15 @@ class CaiTStage1(nn.Module, PyTorchModelHubMixin):
         # embeddings: (b, num_tokens, dim)
 
         layer_outputs = []
-        for encoder_layer in self.layers:
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.layers)
+        )
+        for i, encoder_layer in enumerate(self.layers):
             embeddings = encoder_layer(embeddings, embeddings)
             # (b, num_tokens, dim)
 
-            layer_outputs.append(embeddings)
+            if i in capture_indices:
+                layer_outputs.append(embeddings)
 
         if return_intermediates:
             return embeddings, layer_outputs
@@ -197,7 +212,11 @@ class CaiTStage2(nn.Module, PyTorchModelHubMixin):
 
     @populate_docstring
     def _forward(
-        self, class_tokens: torch.Tensor, embeddings: torch.Tensor, return_intermediates: bool = False
+        self,
+        class_tokens: torch.Tensor,
+        embeddings: torch.Tensor,
+        return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor:
         """Pass the input embeddings through the CaiT stage 2 layers.
 
@@ -206,6 +225,7 @@ class CaiTStage2(nn.Module, PyTorchModelHubMixin):
             class_tokens: {INPUT_1D_DOC}
             embeddings: {INPUT_1D_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC}
 
         Returns:
             {OUTPUT_1D_DOC} If `return_intermediates` is True, returns a tuple of the output embeddings and a list of
@@ -215,11 +235,15 @@ class CaiTStage2(nn.Module, PyTorchModelHubMixin):
         class_embeddings = class_tokens
 
         layer_outputs = []
-        for encoder_layer in self.layers:
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.layers)
+        )
+        for i, encoder_layer in enumerate(self.layers):
             class_embeddings = encoder_layer(class_embeddings, embeddings)
             # (b, num_tokens, dim)
 
-            layer_outputs.append(class_embeddings)
+            if i in capture_indices:
+                layer_outputs.append(class_embeddings)
 
         if return_intermediates:
             return class_embeddings, layer_outputs
@@ -256,24 +280,47 @@ class CaiT1D(nn.Module, PyTorchModelHubMixin):
         self.checkpointing_level5 = ActivationCheckpointing(5, checkpointing_level)
 
     @populate_docstring
-    def _forward(self, tokens: torch.Tensor, return_intermediates: bool = False) -> torch.Tensor | tuple:
+    def _forward(
+        self,
+        tokens: torch.Tensor,
+        return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
+    ) -> torch.Tensor | tuple:
         """Pass the input embeddings through the CaiT layers. Expects flattened input.
 
         Args:
             tokens: {INPUT_1D_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC} Layer indices are counted across stage 1 followed by
+                stage 2, and ``'stages'`` retains the last layer output of each stage.
 
         Returns:
             {OUTPUT_1D_DOC}
         """
         # tokens: (b, num_embedding_tokens, dim)
 
-        embeddings, layer_outputs1 = self.self_attention(tokens, return_intermediates=True)
+        num_layers1, num_layers2 = len(self.self_attention.layers), len(self.class_attention.layers)
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none",
+            num_layers1 + num_layers2,
+            [num_layers1 - 1, num_layers1 + num_layers2 - 1],
+        )
+
+        embeddings, layer_outputs1 = self.self_attention(
+            tokens,
+            return_intermediates=True,
+            capture_intermediates=get_local_capture_indices(capture_indices, 0, num_layers1),
+        )
 
         class_tokens = repeat(self.class_tokens, "1 n d -> b n d", b=embeddings.shape[0])
         # (b, num_class_tokens, dim)
 
-        class_embeddings, layer_outputs2 = self.class_attention(class_tokens, embeddings, return_intermediates=True)
+        class_embeddings, layer_outputs2 = self.class_attention(
+            class_tokens,
+            embeddings,
+            return_intermediates=True,
+            capture_intermediates=get_local_capture_indices(capture_indices, num_layers1, num_layers1 + num_layers2),
+        )
         # class_embeddings: (b, num_class_tokens, dim)
         # layer_outputs: list of (b, num_embedding_tokens, dim)
 
@@ -298,7 +345,11 @@ class CaiT3D(CaiT1D):
 
     @populate_docstring
     def _forward(
-        self, tokens: torch.Tensor, channels_first: bool = True, return_intermediates: bool = False
+        self,
+        tokens: torch.Tensor,
+        channels_first: bool = True,
+        return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | tuple:
         """Pass the input embeddings through the CaiT layers. Expects flattened input.
 
@@ -306,6 +357,7 @@ class CaiT3D(CaiT1D):
             tokens: {INPUT_3D_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC} See :py:meth:`CaiT1D._forward`.
 
         Returns:
             {OUTPUT_1D_DOC}
@@ -317,4 +369,4 @@ class CaiT3D(CaiT1D):
         tokens = rearrange(tokens, "b z y x dim -> b (z y x) dim").contiguous()
         # (b, T, dim)
 
-        return super()._forward(tokens, return_intermediates)
+        return super()._forward(tokens, return_intermediates, capture_intermediates)
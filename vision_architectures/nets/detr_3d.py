@@ -1,8 +1,8 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/nets/06_detr_3d.ipynb.
 
 # %% auto #0
-__all__ = ['DETR3DEncoderConfig', 'DETR3DDecoderConfig', 'DETRBBoxMLPConfig', 'DETR3DConfig', 'DETR3DEncoderLayer',
-           'DETR3DDecoderLayer', 'DETR3DEncoder', 'DETR3DDecoder', 'DETRBBoxMLP', 'DETR3D']
+__all__ = ['DETR3DEncoderConfig', 'DETR3DDecoderLayerConfig', 'DETR3DDecoderConfig', 'DETRBBoxMLPConfig', 'DETR3DConfig',
+           'DETR3DEncoderLayer', 'DETR3DDecoderLayer', 'DETR3DEncoder', 'DETR3DDecoder', 'DETRBBoxMLP', 'DETR3D']
 
 # %% ../../nbs/nets/06_detr_3d.ipynb #6766733b
 from collections.abc import Callable
@@ -12,12 +12,11 @@ from typing import Literal
 import torch
 from einops import rearrange, repeat
 from huggingface_hub import PyTorchModelHubMixin
-from monai.data.box_utils import box_giou, box_iou, box_pair_giou, convert_box_mode
-from scipy.optimize import linear_sum_assignment
 from torch import nn
 from torch.nn import functional as F
 from torch.nn.utils.rnn import pad_sequence
 
+from ..layers.attention import DeformableAttention3D
 from vision_architectures.blocks.transformer import (
     Attention1D,
     Attention1DMLP,
@@ -34,16 +33,41 @@ from vision_architectures.losses.class_balanced_cross_entropy_loss import (
 )
 from ..utils.activation_checkpointing import ActivationCheckpointing
 from ..utils.activations import get_act_layer
+from vision_architectures.utils.bbox_ops import (
+    batched_nms,
+    bbox_giou,
+    bbox_iou,
+    pairwise_bbox_giou,
+    pairwise_bbox_iou,
+    weighted_box_fusion,
+)
 from ..utils.custom_base_model import CustomBaseModel, Field, model_validator
+from ..utils.intermediates import CaptureIntermediatesPolicy, get_capture_indices
+from ..utils.linear_assignment import batched_linear_sum_assignment
 from ..utils.rearrange import rearrange_channels
 from ..utils.residuals import Residual
+from ..utils.splitter_merger import Splitter
 
 # %% ../../nbs/nets/06_detr_3d.ipynb #bdc24eeb
 class DETR3DEncoderConfig(TransformerEncoderBlock3DConfig, AbsolutePositionEmbeddings3DConfig):
     num_encoder_layers: int = Field(..., description="Number of transformer encoder layers.")
 
 
-class DETR3DDecoderConfig(TransformerDecoderBlock1DConfig, AbsolutePositionEmbeddings3DConfig):
+class DETR3DDecoderLayerConfig(TransformerDecoderBlock1DConfig):
+    cross_attention_type: Literal["full", "deformable"] = Field(
+        "full",
+        description=(
+            'Type of cross attention to the encoder tokens. "full" attends to all encoder tokens. "deformable" attends '
+            "to a few sampled locations around a predicted reference point for every object query, making the cost "
+            "independent of the number of encoder tokens."
+        ),
+    )
+    num_deformable_points: int = Field(
+        4, description="Number of sampling points per attention head for deformable cross attention."
+    )
+
+
+class DETR3DDecoderConfig(DETR3DDecoderLayerConfig, AbsolutePositionEmbeddings3DConfig):
     num_decoder_layers: int = Field(..., description="Number of transformer decoder layers.")
 
 
@@ -79,6 +103,15 @@ class DETR3DConfig(DETR3DEncoderConfig, DETR3DDecoderConfig, DETRBBoxMLPConfig):
     classification_loss_fn: (
         Literal["cross_entropy", "class_balanced_cross_entropy"] | dict | ClassBalancedCrossEntropyLossConfig
     ) = Field("cross_entropy", description="Loss function for bbox classification.")
+    matching_solver: Literal["scipy", "auction"] = Field(
+        "scipy",
+        description=(
+            'Solver used for Hungarian matching. "scipy" solves the assignment problems of all batch elements '
+            'concurrently on the CPU and is exact. "auction" solves them on the device of the predictions and is '
+            "approximate."
+        ),
+    )
+    matching_num_threads: int = Field(4, description='Number of threads used by the "scipy" matching solver.')
 
     @model_validator(mode="after")
     def validate(self):
@@ -215,7 +248,7 @@ class DETR3DDecoderLayer(nn.Module):
     """A cross attention transformer block. {CLASS_DESCRIPTION_3D_DOC}"""
 
     @populate_docstring
-    def __init__(self, config: TransformerDecoderBlock1DConfig = {}, checkpointing_level: int = 0, **kwargs):
+    def __init__(self, config: DETR3DDecoderLayerConfig = {}, checkpointing_level: int = 0, **kwargs):
         """Initialize a DETR3DDecoderLayer block. Activation checkpointing level 3.
 
         This transformer decoder layer allows modifying query and key values independent of the residual connection.
@@ -227,7 +260,7 @@ class DETR3DDecoderLayer(nn.Module):
         """
         super().__init__()
 
-        self.config = TransformerDecoderBlock1DConfig.model_validate(config | kwargs)
+        self.config = DETR3DDecoderLayerConfig.model_validate(config | kwargs)
 
         dim = self.config.dim
         num_heads = self.config.num_heads
@@ -244,12 +277,20 @@ class DETR3DDecoderLayer(nn.Module):
             proj_drop_prob=proj_drop_prob,
         )
         self.layernorm1 = nn.LayerNorm(dim, eps=layer_norm_eps)
-        self.attn2 = Attention1D(
-            dim=dim,
-            num_heads=num_heads,
-            attn_drop_prob=attn_drop_prob,
-            proj_drop_prob=proj_drop_prob,
-        )
+        if self.config.cross_attention_type == "deformable":
+            self.attn2 = DeformableAttention3D(
+                dim=dim,
+                num_heads=num_heads,
+                num_points=self.config.num_deformable_points,
+                proj_drop_prob=proj_drop_prob,
+            )
+        else:
+            self.attn2 = Attention1D(
+                dim=dim,
+                num_heads=num_heads,
+                attn_drop_prob=attn_drop_prob,
+                proj_drop_prob=proj_drop_prob,
+            )
         self.layernorm2 = nn.LayerNorm(dim, eps=layer_norm_eps)
         self.mlp = Attention1DMLP(dim=dim, mlp_ratio=mlp_ratio, mlp_drop_prob=mlp_drop_prob)
         self.layernorm3 = nn.LayerNorm(dim, eps=layer_norm_eps)
@@ -268,6 +309,7 @@ class DETR3DDecoderLayer(nn.Module):
         q2_modifier: Callable | None = None,
         k2_modifier: Callable | None = None,
         channels_first: bool = True,
+        reference_points: torch.Tensor | None = None,
     ) -> torch.Tensor:
         """Forward pass of the TransformerDecoderBlock1D block.
 
@@ -281,8 +323,11 @@ class DETR3DDecoderLayer(nn.Module):
             q2_modifier: If provided, the cross-attention query tensor will be passed through the callable before the
                 attention operation.
             k2_modifier: If provided, the cross-attention key tensor will be passed through the callable before the
-                attention operation.
+                attention operation. Not used for deformable cross attention as it has no keys.
             channels_first: {CHANNELS_FIRST_DOC}
+            reference_points: Tensor of shape `(b, num_possible_objects, 3)` containing the normalized (z, y, x)
+                locations around which every object query samples the encoder tokens. Required for deformable cross
+                attention only.
 
         Returns:
             {OUTPUT_3D_DOC}
@@ -326,20 +371,28 @@ class DETR3DDecoderLayer(nn.Module):
         if q2_modifier is not None:
             q2 = q2_modifier(q2)
             # (b, num_possible_objects, dim)
-        if k2_modifier is not None:
-            k2 = k2_modifier(k2)
-            # (b, tokens_z, tokens_y, tokens_x, dim)
-
-        k2 = rearrange(k2, "b z y x d -> b (z y x) d").contiguous()
-        v2 = rearrange(v2, "b z y x d -> b (z y x) d").contiguous()
-        # (b, num_possible_objects, dim)
 
         if self.config.norm_location == "pre":
             q2 = self.layernorm2(q2)
             # (b, num_possible_objects, dim)
 
-        hidden_states = self.attn2(q2, k2, v2)
-        # (b, num_possible_objects, dim)
+        if self.config.cross_attention_type == "deformable":
+            if reference_points is None:
+                raise ValueError("reference_points are required for deformable cross attention")
+
+            hidden_states = self.attn2(q2, v2, reference_points, channels_first=False)
+            # (b, num_possible_objects, dim)
+        else:
+            if k2_modifier is not None:
+                k2 = k2_modifier(k2)
+                # (b, tokens_z, tokens_y, tokens_x, dim)
+
+            k2 = rearrange(k2, "b z y x d -> b (z y x) d").contiguous()
+            v2 = rearrange(v2, "b z y x d -> b (z y x) d").contiguous()
+            # (b, tokens_z * tokens_y * tokens_x, dim)
+
+            hidden_states = self.attn2(q2, k2, v2)
+            # (b, num_possible_objects, dim)
 
         if self.config.norm_location == "post":
             hidden_states = self.layernorm2(hidden_states)
@@ -400,6 +453,7 @@ class DETR3DEncoder(nn.Module, PyTorchModelHubMixin):
         spacings: torch.Tensor | None = None,
         return_intermediates: bool = False,
         channels_first: bool = True,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | tuple[torch.Tensor, list[torch.Tensor]]:
         """Forward pass of the DETR3D encoder.
 
@@ -408,6 +462,7 @@ class DETR3DEncoder(nn.Module, PyTorchModelHubMixin):
             spacings: {SPACINGS_DOC}
             return_intermediates: If True, also returns the outputs of all layers. Defaults to False.
             channels_first: {CHANNELS_FIRST_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC}
 
         Returns:
             If return_intermediates is True, returns the final object embeddings and a list of outputs from all layers.
@@ -421,14 +476,18 @@ class DETR3DEncoder(nn.Module, PyTorchModelHubMixin):
         position_embeddings_modifier = partial(self.position_embeddings, spacings=spacings, channels_first=False)
 
         layer_outputs = []
-        for layer in self.layers:
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.layers)
+        )
+        for i, layer in enumerate(self.layers):
             embeddings = layer(
                 qkv=embeddings,
                 q_modifier=position_embeddings_modifier,
                 k_modifier=position_embeddings_modifier,
                 channels_first=False,
             )
-            layer_outputs.append(embeddings)
+            if i in capture_indices:
+                layer_outputs.append(embeddings)
 
         embeddings = rearrange_channels(embeddings, False, channels_first)
 
@@ -462,6 +521,11 @@ class DETR3DDecoder(nn.Module, PyTorchModelHubMixin):
             [DETR3DDecoderLayer(config, checkpointing_level) for _ in range(self.config.num_decoder_layers)]
         )
 
+        # Deformable cross attention samples around reference points predicted from the object queries
+        self.reference_points = None
+        if self.config.cross_attention_type == "deformable":
+            self.reference_points = nn.Linear(self.config.dim, 3)
+
         self.checkpointing_level4 = ActivationCheckpointing(4, checkpointing_level)
 
     @populate_docstring
@@ -472,6 +536,7 @@ class DETR3DDecoder(nn.Module, PyTorchModelHubMixin):
         spacings: torch.Tensor | None = None,
         return_intermediates: bool = False,
         channels_first: bool = True,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | tuple[torch.Tensor, list[torch.Tensor]]:
         """Forward pass of the DETR3D decoder.
 
@@ -481,6 +546,7 @@ class DETR3DDecoder(nn.Module, PyTorchModelHubMixin):
             spacings: {SPACINGS_DOC}
             return_intermediates: If True, also returns the outputs of all layers. Defaults to False.
             channels_first: {CHANNELS_FIRST_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC}
 
         Returns:
             If return_intermediates is True, returns the final object embeddings and a list of outputs from all layers.
@@ -499,8 +565,16 @@ class DETR3DDecoder(nn.Module, PyTorchModelHubMixin):
                 return ten  # don't add object queries for the first decoder layer
             return ten + object_queries
 
+        reference_points = None
+        if self.reference_points is not None:
+            reference_points = self.reference_points(object_queries).sigmoid()
+            # (b, num_possible_objects, 3)
+
         object_embeddings = object_queries
         layer_outputs = []
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.layers)
+        )
         for i, layer in enumerate(self.layers):
             object_queries_modifier = partial(add_object_queries, iteration=i)
             object_embeddings = layer(
@@ -511,8 +585,10 @@ class DETR3DDecoder(nn.Module, PyTorchModelHubMixin):
                 q2_modifier=object_queries_modifier,
                 k2_modifier=position_embeddings_modifier,
                 channels_first=False,
+                reference_points=reference_points,
             )
-            layer_outputs.append(object_embeddings)
+            if i in capture_indices:
+                layer_outputs.append(object_embeddings)
 
         if return_intermediates:
             return object_embeddings, layer_outputs
@@ -617,6 +693,7 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         channels_first: bool = True,
         return_intermediates: bool = False,
         process_intermediates: bool = True,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | tuple[torch.Tensor, torch.Tensor, list[torch.Tensor], list[torch.Tensor]]:
         """Forward pass of the DETR3D.
 
@@ -627,6 +704,8 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
             return_intermediates: If True, also returns the outputs of all layers. Defaults to False.
             process_intermediates: If True, passes the layer outputs through the bbox_mlp too. Requires
                 `return_intermediates` to be True too.
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC} The policy is applied to the encoder and the decoder
+                independently, i.e. layer indices are relative to each of them.
 
         Returns:
             A tuple containing bounding boxes, object embeddings, decoder layer outputs, and encoder layer outputs if
@@ -638,8 +717,15 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         embeddings = rearrange_channels(embeddings, channels_first, False)
         # (b, num_tokens_z, num_tokens_y, num_tokens_x, dim)
 
+        if not return_intermediates:
+            capture_intermediates = "none"
+
         embeddings, encoder_layer_outputs = self.encoder(
-            embeddings, spacings=spacings, return_intermediates=True, channels_first=False
+            embeddings,
+            spacings=spacings,
+            return_intermediates=True,
+            channels_first=False,
+            capture_intermediates=capture_intermediates,
         )
         # embeddings: (b, num_tokens_z, num_tokens_y, num_tokens_x, dim)
         # encoder_layer_outputs: list of (b, num_tokens_z, num_tokens_y, num_tokens_x, dim)
@@ -648,7 +734,12 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         # (b, num_possible_objects, dim)
 
         object_embeddings, decoder_layer_outputs = self.decoder(
-            object_queries, embeddings, spacings=spacings, return_intermediates=True, channels_first=False
+            object_queries,
+            embeddings,
+            spacings=spacings,
+            return_intermediates=True,
+            channels_first=False,
+            capture_intermediates=capture_intermediates,
         )
         # object_embeddings: (b, num_possible_objects, dim)
         # decoder_layer_outputs: list of (b, num_possible_objects, dim)
@@ -657,9 +748,11 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         # (b, num_possible_objects, 6 + 1 + num_classes)
 
         if return_intermediates:
-            if process_intermediates:
-                for i in range(len(decoder_layer_outputs)):
-                    decoder_layer_outputs[i] = self.bbox_mlp(decoder_layer_outputs[i])
+            if process_intermediates and decoder_layer_outputs:
+                # Process all layer outputs together
+                decoder_layer_outputs = list(
+                    self.bbox_mlp(torch.cat(decoder_layer_outputs)).split(object_embeddings.shape[0])
+                )
             return bboxes, object_embeddings, decoder_layer_outputs, encoder_layer_outputs
 
         return bboxes
@@ -668,6 +761,141 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
     def forward(self, *args, **kwargs):
         return self.checkpointing_level4(self._forward, *args, **kwargs)
 
+    @torch.no_grad()
+    def detect_tiled(
+        self,
+        volume: torch.Tensor,
+        tile_size: int | tuple[int, int, int],
+        tile_stride: int | tuple[int, int, int],
+        backbone: Callable[[torch.Tensor], torch.Tensor] | None = None,
+        spacings: torch.Tensor | None = None,
+        tile_batch_size: int = 4,
+        min_confidence_threshold: float = 0.05,
+        merge_method: Literal["nms", "wbf"] = "nms",
+        merge_iou_threshold: float = 0.5,
+        max_detections: int | None = None,
+    ) -> list[torch.Tensor]:
+        """Detect objects in entire volumes at their native resolution by tiling them with overlap. Tiles are passed
+        through ``backbone`` (if provided) and DETR3D in batches of ``tile_batch_size``, so memory is bounded by the
+        tile batch and not by the size of the volume. Boxes predicted in every tile are mapped to the voxel coordinates
+        of the volume using the position of the tile. Duplicates are merged using 3D NMS or weighted box fusion, first
+        within every tile and then across overlapping tiles, so that the cross-tile merge only handles the few
+        detections that survive in every tile.
+
+        Args:
+            volume: Tensor of shape `(B, C, Z, Y, X)` containing the volumes. Volumes that are smaller than a tile or
+                are not covered exactly by the tiles are zero padded equally on both sides.
+            tile_size: Size of the tiles in voxels.
+            tile_stride: Stride between consecutive tiles in voxels. Tiles overlap if this is smaller than
+                ``tile_size``.
+            backbone: Module or function mapping a batch of tiles to the channels first input features of DETR3D. If
+                None, ``volume`` is expected to already contain the input features.
+            spacings: Spacing information of shape `(B, 3)` passed to DETR3D for every tile of the corresponding volume.
+            tile_batch_size: Number of tiles of every volume processed together.
+            min_confidence_threshold: Predictions with a lower confidence score are discarded before merging.
+            merge_method: ``"nms"`` keeps only the highest scoring of overlapping boxes of the same class. ``"wbf"``
+                fuses them into their score weighted average.
+            merge_iou_threshold: Boxes of the same class that overlap with an IoU greater than this are merged.
+            max_detections: If not None, keep at most these many detections per tile before the cross-tile merge, and
+                per volume after it.
+
+        Returns:
+            A list of length `B` containing tensors of shape `(num_detections, 8)` sorted by descending confidence
+            score. The last dimension contains the bounding box in the voxel coordinates of the volume in the format
+            (z_center, y_center, x_center, z_size, y_size, x_size), followed by the confidence score and the class
+            label (from 1 to num_classes). Sizes predicted with the ``"softplus"`` activation are absolute and are
+            returned as predicted, while ``"sigmoid"`` sizes are scaled by the tile size.
+        """
+        if merge_method not in ("nms", "wbf"):
+            raise ValueError(f"Invalid merge_method: {merge_method}. Should be one of nms, wbf.")
+
+        B = volume.shape[0]
+        device = volume.device
+
+        splitter = Splitter(split_size=tile_size, stride=tile_stride, extend_mode="pad")
+        tile_size = torch.tensor(splitter.config.split_size, dtype=torch.float32, device=device)
+        volume_shape = torch.tensor(volume.shape[-3:], dtype=torch.float32, device=device)
+        # Splitter pads volumes equally on both sides, so tile positions are shifted back by the padding
+        expanded_shape = splitter.get_expanded_shape(volume)
+        padding_before = torch.tensor([(e - a) // 2 for e, a in zip(expanded_shape, volume.shape[-3:])])
+        # (3,)
+
+        detections = [[] for _ in range(B)]
+
+        for tiles, positions in splitter.split_batched(volume, tile_batch_size):
+            # tiles: (num_tiles, B, C, *tile_size)
+            # positions: (num_tiles, 3)
+            num_tiles = len(tiles)
+            tiles = tiles.flatten(0, 1)
+            # (num_tiles * B, C, *tile_size)
+            features = backbone(tiles) if backbone is not None else tiles
+            tile_spacings = spacings.repeat(num_tiles, 1) if spacings is not None else None
+
+            pred = self(features, spacings=tile_spacings).float()
+            # (num_tiles * B, num_possible_objects, 6 + 1 + num_classes)
+            scores, classes = pred[..., 6:].softmax(dim=-1).max(dim=-1)
+            # (num_tiles * B, num_possible_objects) each
+
+            # Map boxes from normalized tile coordinates to voxel coordinates of the volume
+            offsets = (positions - padding_before).to(device).repeat_interleave(B, dim=0)
+            # (num_tiles * B, 3)
+            centers = pred[..., :3] * tile_size + offsets.unsqueeze(1)
+            sizes = pred[..., 3:6]
+            if self.config.bbox_size_activation == "sigmoid":
+                sizes = sizes * tile_size  # softplus sizes are already absolute
+            # (num_tiles * B, num_possible_objects, 3) each
+
+            # "no-object" predictions, low confidence predictions and predictions centered in the padding are dropped
+            is_kept = (classes > 0) & (scores >= min_confidence_threshold)
+            is_kept &= ((centers >= 0) & (centers < volume_shape)).all(dim=-1)
+            # (num_tiles * B, num_possible_objects)
+
+            # Duplicates within every tile are merged, and only the top detections of every tile are kept, so that the
+            # global merge below only handles the few detections that every tile contributes
+            bboxes = torch.cat([centers, sizes], dim=-1)
+            if merge_method == "nms":
+                is_kept = batched_nms(
+                    bboxes, scores, merge_iou_threshold, classes=classes, mask=is_kept, max_outputs=max_detections
+                )
+            else:
+                bboxes, scores, classes, is_kept = weighted_box_fusion(
+                    bboxes, scores, merge_iou_threshold, classes=classes, mask=is_kept
+                )
+                if max_detections is not None:
+                    is_kept[:, max_detections:] = False  # fused boxes are sorted by descending score
+            tile_detections = torch.cat([bboxes, scores.unsqueeze(-1), classes.unsqueeze(-1).float()], dim=-1)
+            # (num_tiles * B, num_possible_objects, 8)
+
+            tile_detections = tile_detections.unflatten(0, (num_tiles, B))
+            is_kept = is_kept.unflatten(0, (num_tiles, B))
+            for b in range(B):
+                detections[b].append(tile_detections[:, b][is_kept[:, b]])
+
+        # Merge detections of all tiles of every volume together
+        detections = [torch.cat(volume_detections) for volume_detections in detections]
+        num_detections = torch.tensor([len(volume_detections) for volume_detections in detections], device=device)
+        detections = pad_sequence(detections, batch_first=True)
+        mask = torch.arange(detections.shape[1], device=device) < num_detections.unsqueeze(1)
+        bboxes, scores, classes = detections[..., :6], detections[..., 6], detections[..., 7].long()
+        # (B, N, 6), (B, N), (B, N), (B, N)
+
+        if merge_method == "nms":
+            is_kept = batched_nms(bboxes, scores, merge_iou_threshold, classes=classes, mask=mask)
+        else:
+            bboxes, scores, classes, is_kept = weighted_box_fusion(
+                bboxes, scores, merge_iou_threshold, classes=classes, mask=mask
+            )
+        detections = torch.cat([bboxes, scores.unsqueeze(-1), classes.unsqueeze(-1).float()], dim=-1)
+        # (B, N, 8)
+
+        merged_detections = []
+        for b in range(B):
+            volume_detections = detections[b][is_kept[b]]
+            volume_detections = volume_detections[volume_detections[:, 6].argsort(descending=True, stable=True)]
+            merged_detections.append(volume_detections[:max_detections])
+
+        return merged_detections
+
     def bipartite_matching_loss(
         self,
         pred: torch.Tensor,
@@ -676,7 +904,8 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         classification_cost_weight: float = 1.0,
         bbox_l1_cost_weight: float = 1.0,
         bbox_giou_cost_weight: float = 1.0,
-        matched_indices: tuple[list[int], list[int]] | None = None,
+        matched_indices: list[tuple[list[int], list[int]]] | list[list[tuple[list[int], list[int]]]] | None = None,
+        match_intermediate_preds: bool = False,
         update_class_prevalences: bool = True,
         reduction: str = "mean",
         return_matching: bool = False,
@@ -704,8 +933,8 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
                 should have less than or equal to the number of objects in `pred`. The number of classes can either be
                 the exact same as in `pred`, or it should be 1 argmax (one-cold) decoding.
             intermediate_preds: A list of any intermediate decoder outputs to use for auxiliary losses. If provided,
-                returned loss values become a list instead of single values. The matching used is the one used for the
-                final prediction i.e. `pred`.
+                returned loss values become a list instead of single values. Unless ``match_intermediate_preds`` is
+                True, the matching used is the one used for the final prediction i.e. `pred`.
             classification_cost_weight: Weight for the classification cost in hungarian matching. Only used when
                 matched_indices is None.
             bbox_l1_cost_weight: Weight for the bounding box L1 loss cost in hungarian matching. Only used when
@@ -713,7 +942,11 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
             bbox_giou_cost_weight: Weight for the bounding box IoU cost in hungarian matching. Only used when
                 matched_indices is None.
             matched_indices: Hungarian matching is done only if this is None, else this is used to match pred and target
-                boxes. Useful when calculating auxiliary losses with intermediate layers of DETR3D.
+                boxes. Useful when calculating auxiliary losses with intermediate layers of DETR3D. If
+                ``match_intermediate_preds`` is True, this should be a list of matchings, one for each pred.
+            match_intermediate_preds: Whether to match every intermediate pred to the target separately instead of
+                reusing the matching of `pred`. The matchings of all preds are computed together in a single batched
+                pass.
             update_class_prevalences: Whether or not to update class prevalences in the class balanced cross entropy
                 loss. Useful when calculating auxiliary losses with intermediate layers of DETR3D.
             reduction: Specifies the reduction to apply to the output.
@@ -728,7 +961,8 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
 
             If `return_matching` is True, also returns a list of tuples containing matched indices for predictions and
             targets. Each tuple is of the form `(pred_indices, target_indices)`, where `pred_indices` and
-            `target_indices` are lists of indices for the matched predictions and targets, respectively.
+            `target_indices` are lists of indices for the matched predictions and targets, respectively. If
+            ``match_intermediate_preds`` is True, it is a list of the same for all preds.
 
             If `return_loss_components` is True, also returns a dict of each loss component reduced based on
             `reduction`. If `intermediate_preds` were also provided, it is a list of the same.
@@ -744,101 +978,143 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
             if target[i].shape[-1] > 7:  # 6 bbox + 1 class
                 target[i] = torch.cat([target[i][:, :6], target[i][:, 6:].argmax(-1, keepdims=True)], dim=-1)
 
-        # Perform hungarian matching
-        if matched_indices is None:
-            matched_indices = self.hungarian_matching(
-                pred, target, classification_cost_weight, bbox_l1_cost_weight, bbox_giou_cost_weight
-            )
-
-        # Update class prevalences in class balanced cross entropy loss
-        if update_class_prevalences:
-            self._update_class_prevalences(target)
-
         # Get a combined list of all preds
         all_preds = [pred]
         if intermediate_preds is not None:
             all_preds += intermediate_preds
 
-        # Calculate losses for all preds
-        loss = []
-        loss_components = []
-        for pred in all_preds:  # pred is overwritten here
-            batch_loss_components = {
-                "classification_loss": [],
-                "bbox_l1_loss": [],
-                "bbox_giou_loss": [],
-                "total_loss": [],
-            }
-            for i in range(B):
-                batch_losses = {}
-
-                pred_indices, target_indices = matched_indices[i]
-
-                # Classification loss for ALL predictions
-                all_class_labels = torch.zeros_like(pred[i][:, 6], dtype=torch.long)
-                all_class_labels[pred_indices] = target[i][target_indices, 6].long()
-                all_pred_classes = pred[i][..., 6:]
-                if self.class_balanced_cross_entropy_loss is None:
-                    batch_losses["classification_loss"] = F.cross_entropy(all_pred_classes, all_class_labels)
-                else:
-                    batch_losses["classification_loss"] = self.class_balanced_cross_entropy_loss(
-                        all_pred_classes, all_class_labels, update_class_prevalences=False
-                    )
-
-                # Calculate all other losses only if prediction and target have objects
-                if pred_indices != [] and target_indices != []:
-                    matched_pred = pred[i][pred_indices]
-                    matched_target = target[i][target_indices]
-
-                    pred_bboxes = matched_pred[:, :6].clone()
-                    target_bboxes = matched_target[:, :6].clone()
-
-                    # Compute losses for matched pairs
-                    # BBox L1 loss
-                    batch_losses["bbox_l1_loss"] = F.l1_loss(pred_bboxes, target_bboxes)
-
-                    # For IOU calculation, it does not matter if bboxes are in actual pixel lengths or normalized based on
-                    # image size, metric value will be the same.
-
-                    # BBox IOU loss
-                    batch_losses["bbox_giou_loss"] = 1 - DETR3D.bbox_giou(pred_bboxes, target_bboxes).mean()
-
-                # Total loss for this batch element
-                total_loss = (
-                    classification_cost_weight * batch_losses.get("classification_loss", 0.0)
-                    + bbox_l1_cost_weight * batch_losses.get("bbox_l1_loss", 0.0)
-                    + bbox_giou_cost_weight * batch_losses.get("bbox_giou_loss", 0.0)
-                )
-
-                # Add to losses
-                batch_loss_components["classification_loss"].append(
-                    batch_losses.get("classification_loss", torch.tensor(torch.nan, device=pred.device)),
-                )
-                batch_loss_components["bbox_l1_loss"].append(
-                    batch_losses.get("bbox_l1_loss", torch.tensor(torch.nan, device=pred.device)),
+        # Perform hungarian matching
+        if matched_indices is None:
+            if match_intermediate_preds:
+                # Match all preds together in a single batched pass
+                matched_indices = self.hungarian_matching(
+                    torch.stack(all_preds),
+                    target,
+                    classification_cost_weight,
+                    bbox_l1_cost_weight,
+                    bbox_giou_cost_weight,
                 )
-                batch_loss_components["bbox_giou_loss"].append(
-                    batch_losses.get("bbox_giou_loss", torch.tensor(torch.nan, device=pred.device)),
+            else:
+                matched_indices = self.hungarian_matching(
+                    pred, target, classification_cost_weight, bbox_l1_cost_weight, bbox_giou_cost_weight
                 )
-                batch_loss_components["total_loss"].append(total_loss)
-
-            # Stack batch losses and apply reduction
-            for key in batch_loss_components:
-                batch_loss_component = torch.stack(batch_loss_components[key])
-
-                if reduction == "mean":
-                    batch_loss_component = batch_loss_component.nanmean()
-                elif reduction == "sum":
-                    batch_loss_component = batch_loss_component.nansum()
-                elif reduction == "none" or reduction is None:
-                    pass
-                else:
-                    raise ValueError(f"Invalid reduction mode: {reduction}")
+        if match_intermediate_preds:
+            if len(matched_indices) != len(all_preds):
+                raise ValueError(f"Expected {len(all_preds)} matchings, one for each pred, got {len(matched_indices)}")
+            all_matched_indices = matched_indices
+        else:
+            all_matched_indices = [matched_indices] * len(all_preds)
 
-                batch_loss_components[key] = batch_loss_component
+        # Update class prevalences in class balanced cross entropy loss
+        if update_class_prevalences:
+            self._update_class_prevalences(target)
 
-            loss.append(batch_loss_components.pop("total_loss"))
-            loss_components.append(batch_loss_components)
+        # Calculate losses for all preds and batch elements together
+        L = len(all_preds)
+        all_preds = torch.stack(all_preds).flatten(0, 1)
+        # (L*B, num_objects, 6 + 1 + num_classes)
+        N = all_preds.shape[1]
+        device = all_preds.device
+
+        padded_target = pad_sequence([target_element[:, :7] for target_element in target], batch_first=True)
+        padded_target = padded_target.to(device).repeat(L, 1, 1)
+        # (L*B, <=num_objects, 7)
+
+        # Pad the matched indices of all preds into tensors
+        num_matches = [len(pred_indices) for layer in all_matched_indices for pred_indices, _ in layer]
+        K = max(num_matches, default=0)
+        padded_matched_indices = torch.tensor(
+            [
+                [list(indices) + [0] * (K - len(indices)) for indices in element_matched_indices]
+                for layer in all_matched_indices
+                for element_matched_indices in layer
+            ],
+            dtype=torch.long,
+        ).to(device)
+        # (L*B, 2, K)
+        matched_pred_indices, matched_target_indices = padded_matched_indices.unbind(1)
+        num_matches = torch.tensor(num_matches, device=device)
+        is_matched = torch.arange(K, device=device) < num_matches.unsqueeze(1)
+        has_matches = num_matches > 0
+        # (L*B, K), (L*B, K), (L*B,)
+
+        # Classification loss for ALL predictions
+        matched_target_classes = padded_target[..., 6].long().gather(1, matched_target_indices)
+        # (L*B, K)
+        all_class_labels = torch.zeros((L * B, N + 1), dtype=torch.long, device=device)  # Last column is a sink
+        all_class_labels.scatter_(1, torch.where(is_matched, matched_pred_indices, N), matched_target_classes)
+        all_class_labels = all_class_labels[:, :N]
+        # (L*B, num_objects)
+        class_weights = None
+        if self.class_balanced_cross_entropy_loss is not None:
+            class_weights = self.class_balanced_cross_entropy_loss.get_class_weights(device)
+        classification_loss = F.cross_entropy(
+            all_preds[..., 6:].transpose(1, 2), all_class_labels, weight=class_weights, reduction="none"
+        )
+        # (L*B, num_objects)
+        # Reduce in the same way as F.cross_entropy with reduction="mean" for every element
+        if class_weights is None:
+            classification_loss = classification_loss.mean(1)
+        else:
+            classification_loss = classification_loss.sum(1) / class_weights[all_class_labels].sum(1)
+        # (L*B,)
+
+        # Calculate all other losses only for elements where prediction and target have objects
+        matched_pred_bboxes = all_preds[..., :6].gather(1, matched_pred_indices.unsqueeze(-1).expand(-1, -1, 6))
+        matched_target_bboxes = padded_target[..., :6].gather(1, matched_target_indices.unsqueeze(-1).expand(-1, -1, 6))
+        # (L*B, K, 6)
+
+        # BBox L1 loss
+        bbox_l1_loss = (matched_pred_bboxes - matched_target_bboxes).abs().sum(-1).masked_fill(~is_matched, 0.0)
+        bbox_l1_loss = bbox_l1_loss.sum(1) / (6 * num_matches).clamp(min=1)
+        # (L*B,)
+
+        # For IOU calculation, it does not matter if bboxes are in actual pixel lengths or normalized based on image
+        # size, metric value will be the same.
+
+        # BBox IOU loss
+        if K > 0:
+            gious = bbox_giou(matched_pred_bboxes.flatten(0, 1), matched_target_bboxes.flatten(0, 1))
+            gious = gious.reshape(L * B, K).masked_fill(~is_matched, 0.0)
+            bbox_giou_loss = 1 - gious.sum(1) / num_matches.clamp(min=1)
+        else:
+            bbox_giou_loss = torch.ones_like(bbox_l1_loss)
+        # (L*B,)
+
+        # Total loss for every element
+        total_loss = (
+            classification_cost_weight * classification_loss
+            + bbox_l1_cost_weight * torch.where(has_matches, bbox_l1_loss, 0.0)
+            + bbox_giou_cost_weight * torch.where(has_matches, bbox_giou_loss, 0.0)
+        )
+        # (L*B,)
+
+        # Apply reduction for every pred
+        all_loss_components = {
+            "classification_loss": classification_loss,
+            "bbox_l1_loss": torch.where(has_matches, bbox_l1_loss, torch.nan),
+            "bbox_giou_loss": torch.where(has_matches, bbox_giou_loss, torch.nan),
+            "total_loss": total_loss,
+        }
+        for key in all_loss_components:
+            loss_component = all_loss_components[key].reshape(L, B)
+
+            if reduction == "mean":
+                loss_component = loss_component.nanmean(1)
+            elif reduction == "sum":
+                loss_component = loss_component.nansum(1)
+            elif reduction == "none" or reduction is None:
+                pass
+            else:
+                raise ValueError(f"Invalid reduction mode: {reduction}")
+
+            all_loss_components[key] = loss_component.unbind(0)
+
+        loss = list(all_loss_components.pop("total_loss"))
+        loss_components = [
+            dict(zip(all_loss_components.keys(), pred_loss_components))
+            for pred_loss_components in zip(*all_loss_components.values())
+        ]
 
         # Finalize return value
         if len(loss) == 1:
@@ -866,14 +1142,17 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         classification_cost_weight: float = 1.0,
         bbox_l1_cost_weight: float = 1.0,
         bbox_giou_cost_weight: float = 1.0,
-    ) -> list[tuple[list[int], list[int]]]:
-        """Hungarian matching between predictions and targets.
+    ) -> list[tuple[list[int], list[int]]] | list[list[tuple[list[int], list[int]]]]:
+        """Hungarian matching between predictions and targets. The cost matrices of all batch elements (and all
+        decoder layers) are computed together in a single padded pass, and the assignment problems are solved together
+        using the solver specified by ``matching_solver`` in the config.
 
         Args:
             pred: Predicted bounding boxes and class scores. It should be of shape
                 `(B, num_objects, 6 + 1 + num_classes)`. Number of objects and number of classes will be inferred from
-                here.
-            target: Target bounding boxes and class scores. This is expected in argmax encoding or one-hot encoding.
+                here. Predictions of multiple decoder layers can be matched together by providing a tensor of shape
+                `(num_layers, B, num_objects, 6 + 1 + num_classes)`.
+            target: Target bounding boxes and class scores. This is expected in argmax encoding.
             classification_cost_weight: Weight for the classification cost.
             bbox_l1_cost_weight: Weight for the bounding box L1 loss cost.
             bbox_giou_cost_weight: Weight for the bounding box IoU cost.
@@ -881,50 +1160,60 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         Returns:
             A list of tuples containing matched indices for predictions and targets. Each tuple is of the form
             `(pred_indices, target_indices)`, where `pred_indices` and `target_indices` are lists of indices for the
-            matched predictions and targets, respectively.
+            matched predictions and targets, respectively. If `pred` has a layers dimension, a list of the same for
+            every layer is returned.
         """
-        B = pred.shape[0]
-
-        matched_indices = []
-        for i in range(B):
-            pred_bboxes = pred[i, :, :6]  # (num_objects, 6)
-            target_bboxes = target[i][:, :6]  # (<=num_objects, 6)
-
-            # If either prediction or target has no objects, skip matching
-            if pred_bboxes.shape[0] == 0 or target_bboxes.shape[0] == 0:
-                matched_indices.append(([], []))
-                continue
+        if pred.ndim not in {3, 4}:
+            raise ValueError(f"pred must be of shape (B, N, C) or (L, B, N, C), got {tuple(pred.shape)}")
+
+        has_layers_dim = pred.ndim == 4
+        if not has_layers_dim:
+            pred = pred.unsqueeze(0)
+        L, B, N, _ = pred.shape
+        pred = pred.flatten(0, 1)
+        # (L*B, num_objects, 6 + 1 + num_classes)
+
+        # Pad the targets so that all cost matrices can be computed together. Padded columns are ignored by the solver.
+        target = [target_element[:, :7].to(pred.device, pred.dtype) for target_element in target]
+        num_targets = [target_element.shape[0] for target_element in target] * L
+        M = max(num_targets, default=0)
+
+        # If either prediction or target has no objects, skip matching
+        if N == 0 or M == 0:
+            matched_indices = [([], []) for _ in range(L * B)]
+        else:
+            padded_target = pad_sequence(target, batch_first=True).repeat(L, 1, 1)
+            # (L*B, M, 7)
 
-            pred_class_logits = pred[i, :, 6:]  # (num_objects, num_classes)
-            target_class_labels = target[i][:, 6].long()  # (<=num_objects,) this is in argmax encoding
+            pred_bboxes = pred[..., :6]  # (L*B, num_objects, 6)
+            target_bboxes = padded_target[..., :6]  # (L*B, M, 6)
+            pred_class_logits = pred[..., 6:]  # (L*B, num_objects, num_classes)
+            target_class_labels = padded_target[..., 6].long()  # (L*B, M) this is in argmax encoding
 
             # ----- Cost matrix calculation -----
 
             # Classification cost
             if self.config.classification_cost_fn == "softmax":
-                pred_class_probabilities = F.softmax(pred_class_logits, dim=-1)
-                # (num_objects, num_classes)
-                classification_cost = -pred_class_probabilities[:, target_class_labels]
-                # (num_objects, <=num_objects)
+                pred_class_scores = F.softmax(pred_class_logits, dim=-1)
             elif self.config.classification_cost_fn == "log_softmax":
-                pred_class_log_probabilities = F.log_softmax(pred_class_logits, dim=-1)
-                # (num_objects, num_classes)
-                classification_cost = -pred_class_log_probabilities[:, target_class_labels]
-                # (num_objects, <=num_objects)
+                pred_class_scores = F.log_softmax(pred_class_logits, dim=-1)
+            # (L*B, num_objects, num_classes)
+            classification_cost = -pred_class_scores.gather(-1, target_class_labels.unsqueeze(1).expand(-1, N, -1))
+            # (L*B, num_objects, M)
 
             # Weigh by class-balancing weights (to align matching with the training objective)
             if self.class_balanced_cross_entropy_loss is not None:
                 class_weights = self.class_balanced_cross_entropy_loss.get_class_weights(pred.device)  # (C,)
-                target_weights = class_weights[target_class_labels]  # (<=num_objects,)
-                classification_cost = classification_cost * target_weights  # broadcast across rows
+                target_weights = class_weights[target_class_labels]  # (L*B, M)
+                classification_cost = classification_cost * target_weights.unsqueeze(1)  # broadcast across rows
 
             # L1 loss for bounding boxes
-            bbox_l1_cost = torch.cdist(pred_bboxes, target_bboxes, p=1)
-            # (num_objects, <=num_objects)
+            bbox_l1_cost = torch.cdist(pred_bboxes.float(), target_bboxes.float(), p=1)
+            # (L*B, num_objects, M)
 
             # IOU cost for bounding boxes
-            bbox_giou_cost = 1 - DETR3D.pairwise_bbox_giou(pred_bboxes, target_bboxes)
-            # (num_objects, <=num_objects)
+            bbox_giou_cost = 1 - pairwise_bbox_giou(pred_bboxes, target_bboxes)
+            # (L*B, num_objects, M)
 
             # Total cost matrix
             cost_matrix = (
@@ -932,14 +1221,19 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
                 + bbox_l1_cost_weight * bbox_l1_cost
                 + bbox_giou_cost_weight * bbox_giou_cost
             )
-            # (num_objects, <=num_objects)
+            # (L*B, num_objects, M)
 
             # Hungarian matching
-            pred_indices_element, target_indices_element = linear_sum_assignment(cost_matrix.detach().cpu().numpy())
-
-            matched_indices.append((list(pred_indices_element), list(target_indices_element)))
+            matched_indices = batched_linear_sum_assignment(
+                cost_matrix,
+                num_targets,
+                solver=self.config.matching_solver,
+                num_threads=self.config.matching_num_threads,
+            )
 
-        return matched_indices
+        if not has_layers_dim:
+            return matched_indices
+        return [matched_indices[i * B : (i + 1) * B] for i in range(L)]
 
     @staticmethod
     @populate_docstring
@@ -956,28 +1250,7 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         Returns:
             A tensor containing the IoU.
         """
-        pred_corners = convert_box_mode(pred_bboxes, "cccwhd", "xyzxyz")
-        target_corners = convert_box_mode(target_bboxes, "cccwhd", "xyzxyz")
-
-        # Monai does not have a function to calculate pairwise IOUs
-
-        # Intersection corners
-        max_min = torch.max(pred_corners[:, :3], target_corners[:, :3])
-        min_max = torch.min(pred_corners[:, 3:], target_corners[:, 3:])
-        inter_dims = (min_max - max_min).clamp(min=0)
-        inter_vol = inter_dims.prod(dim=1)
-
-        # Volumes
-        pred_dims = pred_corners[:, 3:] - pred_corners[:, :3]
-        target_dims = target_corners[:, 3:] - target_corners[:, :3]
-        pred_vol = pred_dims.prod(dim=1)
-        target_vol = target_dims.prod(dim=1)
-        union_vol = pred_vol + target_vol - inter_vol
-
-        # IOU
-        ious = inter_vol / union_vol.clamp(min=1e-5)
-
-        return ious
+        return bbox_iou(pred_bboxes, target_bboxes)
 
     @staticmethod
     @populate_docstring
@@ -994,14 +1267,7 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         Returns:
             A tensor containing the IoU losses of all combinations.
         """
-        # Monai requires input in corner coordinates format
-        pred_corners = convert_box_mode(pred_bboxes, "cccwhd", "xyzxyz")
-        target_corners = convert_box_mode(target_bboxes, "cccwhd", "xyzxyz")
-
-        # Calculate GIOUs
-        gious = box_iou(pred_corners, target_corners)
-
-        return gious
+        return pairwise_bbox_iou(pred_bboxes, target_bboxes)
 
     @staticmethod
     @populate_docstring
@@ -1018,14 +1284,7 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         Returns:
             A tensor containing the IoU loss.
         """
-        # Monai requires input in corner coordinates format
-        pred_corners = convert_box_mode(pred_bboxes, "cccwhd", "xyzxyz")
-        target_corners = convert_box_mode(target_bboxes, "cccwhd", "xyzxyz")
-
-        # Calculate GIOUs
-        gious = box_pair_giou(pred_corners, target_corners)
-
-        return gious
+        return bbox_giou(pred_bboxes, target_bboxes)
 
     @staticmethod
     @populate_docstring
@@ -1042,14 +1301,25 @@ class DETR3D(nn.Module, PyTorchModelHubMixin):
         Returns:
             A tensor containing the IoU losses of all combinations.
         """
-        # Monai requires input in corner coordinates format
-        pred_corners = convert_box_mode(pred_bboxes, "cccwhd", "xyzxyz")
-        target_corners = convert_box_mode(target_bboxes, "cccwhd", "xyzxyz")
+        return pairwise_bbox_giou(pred_bboxes, target_bboxes)
+
+    @staticmethod
+    @populate_docstring
+    def batched_pairwise_bbox_giou(
+        pred_bboxes: torch.Tensor,
+        target_bboxes: torch.Tensor,
+    ) -> torch.Tensor:
+        """Compute the Generalized IoUs between all combinations of predicted and target bounding boxes for a batch of
+        elements together.
 
-        # Calculate GIOUs
-        gious = box_giou(pred_corners, target_corners)
+        Args:
+            pred_bboxes: Predicted bounding boxes of shape `(..., num_objects, 6)`. {BOUNDING_BOXES_FORMAT_DOC}
+            target_bboxes: Target bounding boxes of shape `(..., <=num_objects, 6)`. {BOUNDING_BOXES_FORMAT_DOC}
 
-        return gious
+        Returns:
+            A tensor of shape `(..., num_objects, <=num_objects)` containing the GIoUs of all combinations.
+        """
+        return pairwise_bbox_giou(pred_bboxes, target_bboxes)
 
     def _update_class_prevalences(self, target: list[torch.Tensor]):
         """Update the class prevalences based on the classes present in the ground truth
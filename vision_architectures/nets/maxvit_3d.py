@@ -6,6 +6,7 @@ __all__ = ['MaxViT3DStem0Config', 'MaxViT3DBlockConfig', 'MaxViT3DStemConfig', '
 
 # %% ../../nbs/nets/07_maxvit_3d.ipynb #3961bbaf
 from functools import wraps
+from typing import Literal
 
 import torch
 from torch import nn
@@ -17,6 +18,7 @@ from ..docstrings import populate_docstring
 from .swinv2_3d import SwinV23DLayer
 from ..utils.activation_checkpointing import ActivationCheckpointing
 from ..utils.custom_base_model import CustomBaseModel, Field, model_validator
+from ..utils.intermediates import CaptureIntermediatesPolicy, get_capture_indices
 from ..utils.rearrange import rearrange_channels
 
 # %% ../../nbs/nets/07_maxvit_3d.ipynb #ffd078d5
@@ -177,17 +179,7 @@ class MaxViT3DGridAttention(SwinV23DLayer):
     would vary very with every input size.
     """
 
-    @staticmethod
-    def _get_rearrange_patterns() -> tuple[str, str]:
-        forward_pattern = (
-            "b (window_size_z num_windows_z) (window_size_y num_windows_y) (window_size_x num_windows_x) dim -> "
-            "(b num_windows_z num_windows_y num_windows_x) window_size_z window_size_y window_size_x dim "
-        )
-        reverse_pattern = (
-            "(b num_windows_z num_windows_y num_windows_x) window_size_z window_size_y window_size_x dim -> "
-            "b (window_size_z num_windows_z) (window_size_y num_windows_y) (window_size_x num_windows_x) dim"
-        )
-        return forward_pattern, reverse_pattern
+    _window_partition_pattern: Literal["block", "grid"] = "grid"
 
 # %% ../../nbs/nets/07_maxvit_3d.ipynb #bd284098
 @populate_docstring
@@ -348,13 +340,21 @@ class MaxViT3DEncoder(nn.Module):
         self.checkpointing_level5 = ActivationCheckpointing(5, checkpointing_level)
 
     @populate_docstring
-    def _forward(self, x: torch.Tensor, return_intermediates: bool = False, channels_first: bool = True):
+    def _forward(
+        self,
+        x: torch.Tensor,
+        return_intermediates: bool = False,
+        channels_first: bool = True,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
+    ):
         """Pass the input through the 3D MaxViT encoder.
 
         Args:
             x: {INPUT_3D_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC} Each stem is treated as a stage, and layer indices
+                refer to stems.
 
         Returns:
             {OUTPUT_3D_DOC}. If return_intermediates is True, returns a tuple of the output and a list of intermediate
@@ -366,9 +366,13 @@ class MaxViT3DEncoder(nn.Module):
         # (b, z, y, x, in_channels)
 
         features = []
-        for stem in self.stems:
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.stems), range(len(self.stems))
+        )
+        for i, stem in enumerate(self.stems):
             x = stem(x, channels_first=False)
-            features.append(x)
+            if i in capture_indices:
+                features.append(x)
 
         x = rearrange_channels(x, False, channels_first)
         # (b, [in_channels], z1, y1, x1, [in_channels])
@@ -7,8 +7,11 @@ __all__ = ['Perceiver3DChannelMappingConfig', 'Perceiver3DEncoderEncodeConfig',
            'Perceiver3DEncoder', 'Perceiver3DDecoder']
 
 # %% ../../nbs/nets/13_perceiver_3d.ipynb #9cb3740a
+from functools import lru_cache
+
 import torch
-from einops import rearrange, repeat
+import torch.nn.functional as F
+from einops import repeat
 from huggingface_hub import PyTorchModelHubMixin
 from torch import nn
 
@@ -20,6 +23,11 @@ from vision_architectures.layers.embeddings import (
 )
 from ..utils.activation_checkpointing import ActivationCheckpointing
 from ..utils.custom_base_model import CustomBaseModel, Field, model_validator
+from vision_architectures.utils.intermediates import (
+    CaptureIntermediatesPolicy,
+    get_capture_indices,
+    get_local_capture_indices,
+)
 
 # %% ../../nbs/nets/13_perceiver_3d.ipynb #c128c7b6
 class Perceiver3DChannelMappingConfig(CustomBaseModel):
@@ -31,6 +39,15 @@ class Perceiver3DEncoderEncodeConfig(Attention3DWithMLPConfig):
     dim: int
     num_layers: int
     latent_grid_size: tuple[int, int, int]
+    max_window_batch_size: int = Field(
+        -1, ge=-1, description="Maximum number of key/value windows attended to in a single call. -1 means all."
+    )
+
+    @model_validator(mode="after")
+    def validate(self):
+        super().validate()
+        assert self.max_window_batch_size != 0, "max_window_batch_size must be positive, or -1 for all windows"
+        return self
 
 
 class Perceiver3DEncoderProcessConfig(Attention3DWithMLPConfig):
@@ -113,6 +130,46 @@ class Perceiver3DConfig(Perceiver3DEncoderConfig):
         assert self.encode.dim == self.decode.dim, "encode and decode dims must be equal"
         return self
 
+# %% ../../nbs/nets/13_perceiver_3d.ipynb #3e81b5a0
+@lru_cache(maxsize=64)
+def _get_window_positions_3d(
+    grid_shape: tuple[int, int, int], stride: tuple[int, int, int], device: torch.device | None = None
+) -> torch.Tensor:
+    # Start positions of all windows in (z, y, x) order. Cached, so it must not be modified in-place.
+    positions = [torch.arange(0, size, step, device=device) for size, step in zip(grid_shape, stride)]
+    positions = torch.stack(torch.meshgrid(*positions, indexing="ij"), dim=-1).reshape(-1, 3)
+    # (num_windows, 3)
+    return positions
+
+
+def _compute_fold_index_3d(
+    positions: torch.Tensor, window_size: tuple[int, int, int], output_shape: tuple[int, int, int]
+) -> tuple[torch.Tensor, torch.Tensor]:
+    # Flat index into the (z, y, x) output of every voxel of every window, wrapping around the edges as the roll in
+    # unfold_with_roll_3d does. Also returns how many windows cover each output voxel.
+    z, y, x = output_shape
+    offsets = [torch.arange(size, device=positions.device) for size in window_size]
+    iz, iy, ix = [(positions[:, i, None] + offsets[i]) % output_shape[i] for i in range(3)]
+    # each (num_windows, w)
+    index = iz[:, :, None, None] * (y * x) + iy[:, None, :, None] * x + ix[:, None, None, :]
+    index = index.flatten()
+    # (num_windows * wz * wy * wx,)
+    count = torch.bincount(index, minlength=z * y * x).reshape(z, y, x)
+    # (z, y, x)
+    return index, count
+
+
+@lru_cache(maxsize=64)
+def _get_fold_index_3d(
+    output_shape: tuple[int, int, int],
+    window_size: tuple[int, int, int],
+    stride: tuple[int, int, int],
+    device: torch.device | None = None,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    # Cached version of _compute_fold_index_3d for windows generated by unfold_with_roll_3d
+    positions = _get_window_positions_3d(output_shape, stride, device)
+    return _compute_fold_index_3d(positions, window_size, output_shape)
+
 # %% ../../nbs/nets/13_perceiver_3d.ipynb #cd2634c7
 def unfold_with_roll_3d(
     ten: torch.Tensor,
@@ -120,9 +177,17 @@ def unfold_with_roll_3d(
     stride: tuple[int, int, int] | None,
     raise_large_window_error: bool = False,
     raise_large_stride_error: bool = True,
+    flatten_windows: bool = True,
 ):
+    # When flatten_windows is False, windows are returned as a strided view of shape
+    # (nz, ny, nx, b, d, wz, wy, wx) over the rolled tensor i.e. without copying every window. Otherwise, they are
+    # returned as (num_windows, b, d, wz, wy, wx).
+
     if window_size is None or stride is None:
-        return ten.unsqueeze(0), torch.tensor([[0, 0, 0]], device=ten.device)
+        windows = ten.unsqueeze(0)
+        if not flatten_windows:
+            windows = windows[None, None]
+        return windows, torch.tensor([[0, 0, 0]], device=ten.device)
 
     window_size = list(window_size)
     for i in range(3):
@@ -133,83 +198,80 @@ def unfold_with_roll_3d(
         if stride[i] > window_size[i] and raise_large_stride_error:
             raise ValueError(f"stride[{i}] must be less than or equal to window_size[{i}]")
     window_size = tuple(window_size)
+    stride = tuple(stride)
 
     _, _, z, y, x = ten.shape
     wz, wy, wx = window_size
     sz, sy, sx = stride
 
-    positions_z = torch.arange(0, z, sz, device=ten.device)
-    positions_y = torch.arange(0, y, sy, device=ten.device)
-    positions_x = torch.arange(0, x, sx, device=ten.device)
-    positions = torch.stack(torch.meshgrid(positions_z, positions_y, positions_x, indexing="ij"), dim=-1)
-    positions = rearrange(positions, "z y x three -> (z y x) three").contiguous()
-
-    # If required, number of patches along each dimension is calculated here:
-    # nz = positions_z.shape[0]
-    # ny = positions_y.shape[0]
-    # nx = positions_x.shape[0]
-    # n = nz * ny * nx
-
-    pad_z = positions_z[-1] + wz - z
-    pad_y = positions_y[-1] + wy - y
-    pad_x = positions_x[-1] + wx - x
-    if pad_z > 0:
-        ten = torch.cat([ten, ten[:, :, :pad_z]], dim=2)
-    if pad_y > 0:
-        ten = torch.cat([ten, ten[:, :, :, :pad_y]], dim=3)
-    if pad_x > 0:
-        ten = torch.cat([ten, ten[:, :, :, :, :pad_x]], dim=4)
-
-    windows = []
-    for i, j, k in positions:
-        window = ten[:, :, i : i + wz, j : j + wy, k : k + wx]
-        windows.append(window)
-    windows = torch.stack(windows, dim=0)
+    positions = _get_window_positions_3d((z, y, x), stride, ten.device)
+    # (num_windows, 3)
+
+    # Wrap the tensor around so that the last window along each dimension fits. The padding is always smaller than the
+    # dimension as window_size is clipped to it.
+    pad_z = (z - 1) // sz * sz + wz - z
+    pad_y = (y - 1) // sy * sy + wy - y
+    pad_x = (x - 1) // sx * sx + wx - x
+    if pad_z > 0 or pad_y > 0 or pad_x > 0:
+        ten = F.pad(ten, (0, pad_x, 0, pad_y, 0, pad_z), mode="circular")
+
+    windows = ten.unfold(2, wz, sz).unfold(3, wy, sy).unfold(4, wx, sx)
+    # (b, d, nz, ny, nx, wz, wy, wx)
+    windows = windows.permute(2, 3, 4, 0, 1, 5, 6, 7)
+    # (nz, ny, nx, b, d, wz, wy, wx)
+
+    if flatten_windows:
+        windows = windows.flatten(0, 2)
+        # (num_windows, b, d, wz, wy, wx)
 
     return windows, positions
 
+# %% ../../nbs/nets/13_perceiver_3d.ipynb #5b2f9d84
+def _iter_window_batches_3d(windows: torch.Tensor, max_batch_size: int = -1):
+    # Iterate over the windows returned by unfold_with_roll_3d(..., flatten_windows=False) in batches of at most
+    # max_batch_size windows stacked along the batch dimension. Windows are gathered from the strided view one batch at
+    # a time, so all windows are never copied together.
+    nz, ny, nx = windows.shape[:3]
+    num_windows = nz * ny * nx
+    if max_batch_size == -1:
+        max_batch_size = num_windows
+
+    for start in range(0, num_windows, max_batch_size):
+        index = torch.arange(start, min(start + max_batch_size, num_windows), device=windows.device)
+        window_batch = windows[index // (ny * nx), index // nx % ny, index % nx]
+        # (m, b, d, wz, wy, wx)
+        yield window_batch.flatten(0, 1)
+        # (m * b, d, wz, wy, wx)
+
 # %% ../../nbs/nets/13_perceiver_3d.ipynb #d7ce0b5d
 def fold_back_3d(
     windows: torch.Tensor,
     positions: torch.Tensor,
     output_shape: tuple[int, int, int],
     reduction="mean",
+    stride: tuple[int, int, int] | None = None,
 ):
+    # If stride is provided, positions are assumed to be those generated by unfold_with_roll_3d and the scatter indices
+    # are fetched from a cache instead of being recomputed.
     z, y, x = output_shape
-    b, d, wz, wy, wx = windows.shape[1:]
-
-    ez, ey, ex = positions[-1] + torch.tensor([wz, wy, wx], device=windows.device)
-
-    output = torch.zeros(b, d, ez, ey, ex, dtype=windows.dtype, device=windows.device)
-    count = torch.zeros(b, d, ez, ey, ex, dtype=windows.dtype, device=windows.device)
-
-    for (pz, py, px), window in zip(positions, windows):
-        output[:, :, pz : pz + wz, py : py + wy, px : px + wx] += window
-        count[:, :, pz : pz + wz, py : py + wy, px : px + wx] += 1
-
-    if ez > z:
-        pad_z = ez - z
-        output[:, :, :pad_z] += output[:, :, -pad_z:]
-        count[:, :, :pad_z] += count[:, :, -pad_z:]
-        output = output[:, :, :z]
-        count = count[:, :, :z]
-    if ey > y:
-        pad_y = ey - y
-        output[:, :, :, :pad_y] += output[:, :, :, -pad_y:]
-        count[:, :, :, :pad_y] += count[:, :, :, -pad_y:]
-        output = output[:, :, :, :y]
-        count = count[:, :, :, :y]
-    if ex > x:
-        pad_x = ex - x
-        output[:, :, :, :, :pad_x] += output[:, :, :, :, -pad_x:]
-        count[:, :, :, :, :pad_x] += count[:, :, :, :, -pad_x:]
-        output = output[:, :, :, :, :x]
-        count = count[:, :, :, :, :x]
+    num_windows, b, d, wz, wy, wx = windows.shape
+
+    if stride is not None:
+        index, count = _get_fold_index_3d(tuple(output_shape), (wz, wy, wx), tuple(stride), windows.device)
+    else:
+        index, count = _compute_fold_index_3d(positions, (wz, wy, wx), tuple(output_shape))
+    # index: (num_windows * wz * wy * wx,), count: (z, y, x)
+
+    windows = windows.permute(1, 2, 0, 3, 4, 5).reshape(b, d, -1)
+    # (b, d, num_windows * wz * wy * wx)
+    output = windows.new_zeros(b, d, z * y * x).index_add_(2, index, windows)
+    output = output.reshape(b, d, z, y, x)
+    # (b, d, z, y, x)
 
     if reduction == "sum":
         pass
     elif reduction == "mean":
-        output = output / count
+        output = output / count.to(output.dtype)
     else:
         raise NotImplementedError(f"reduction={reduction} is not implemented")
 
@@ -291,6 +353,7 @@ class Perceiver3DEncoderEncode(nn.Module):
         sliding_window: tuple[int, int, int] | None = None,  # Sliding window may be beneficial during inference time
         sliding_stride: tuple[int, int, int] | None = None,
         return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | dict[str, torch.Tensor]:
         # x: [(b, in_channels, z, y, x), ...]
 
@@ -306,34 +369,46 @@ class Perceiver3DEncoderEncode(nn.Module):
                 else:
                     mapped = x[i]
                 # (b, dim, z, y, x)
-                mapped_windows, _ = unfold_with_roll_3d(mapped, sliding_window, sliding_stride)
-                # (num_windows, b, dim, *sliding_window])
+                mapped_windows, _ = unfold_with_roll_3d(
+                    mapped, sliding_window, sliding_stride, flatten_windows=False
+                )
+                # (nz, ny, nx, b, dim, *sliding_window)
                 kvs.append(mapped_windows)
             return kvs
 
         kvs = self.checkpointing_level1(prepare_keys_values, x)
-        # list of (num_windows, b, dim, *sliding_window)
+        # list of (nz, ny, nx, b, dim, *sliding_window)
 
         # Prepare queries
-        b = kvs[0].shape[1]
+        b = kvs[0].shape[3]
         q = repeat(self.latent_tokens, "d zl yl xl -> b d zl yl xl", b=b)
         if self.position_embeddings is not None:
-            q = self.position_embeddings(q, device=q.device)
+            q = self.position_embeddings(q)
         # (b, dim, zl, yl, xl)
 
         # Perform attention
         embeddings = []
-        for cross_attention_layer in self.cross_attention:
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.cross_attention)
+        )
+        for i, cross_attention_layer in enumerate(self.cross_attention):
             embedding = torch.zeros_like(q)
             for kv_windows in kvs:
-                for kv_window in kv_windows:
-                    embedding_window = cross_attention_layer(q, kv_window, kv_window)
-                    embedding = embedding + embedding_window
+                for kv_window_batch in _iter_window_batches_3d(kv_windows, self.config.max_window_batch_size):
+                    # (num_windows * b, dim, *sliding_window)
+                    num_windows = kv_window_batch.shape[0] // b
+                    q_batch = q.unsqueeze(0).expand(num_windows, *q.shape).flatten(0, 1)
+                    # (num_windows * b, dim, zl, yl, xl)
+                    embedding_windows = cross_attention_layer(q_batch, kv_window_batch, kv_window_batch)
+                    embedding_windows = embedding_windows.unflatten(0, (num_windows, b))
+                    # (num_windows, b, dim, zl, yl, xl)
+                    embedding = embedding + embedding_windows.sum(0)
             q = embedding  # To pass to the next layer
-            embeddings.append(embedding)
+            if i in capture_indices:
+                embeddings.append(embedding)
         # (b, latent_grid_size, dim)
 
-        encoded = embeddings[-1]
+        encoded = q
         # (b, latent_grid_size, dim)
 
         if return_intermediates:
@@ -381,17 +456,26 @@ class Perceiver3DEncoderProcess(nn.Module):
 
         self.checkpointing_level4 = ActivationCheckpointing(4, checkpointing_level)
 
-    def _forward(self, qkv, return_intermediates: bool = False) -> torch.Tensor | dict[str, torch.Tensor]:
+    def _forward(
+        self,
+        qkv,
+        return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
+    ) -> torch.Tensor | dict[str, torch.Tensor]:
         # qkv: (b, dim, zl, yl, xl)
 
         embeddings = []
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.self_attention)
+        )
         embedding = qkv
-        for self_attention_layer in self.self_attention:
+        for i, self_attention_layer in enumerate(self.self_attention):
             embedding = self_attention_layer(embedding, embedding, embedding)
-            embeddings.append(embedding)
+            if i in capture_indices:
+                embeddings.append(embedding)
         # (b, dim, zl, yl, xl)
 
-        encoded = embeddings[-1]
+        encoded = embedding
         # (b, dim, zl, yl, xl)
 
         if return_intermediates:
@@ -425,25 +509,43 @@ class Perceiver3DEncoder(nn.Module, PyTorchModelHubMixin):
         sliding_window: int | None = None,
         sliding_stride: int | None = None,
         return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | dict[str, torch.Tensor]:
         # x: (b, in_channels, z, y, x)
 
+        # Layer indices are counted across the encode layers followed by the process layers
+        num_encode_layers, num_process_layers = len(self.encode.cross_attention), len(self.process.self_attention)
+        num_layers = num_encode_layers + num_process_layers
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none",
+            num_layers,
+            [num_encode_layers - 1, num_layers - 1],
+        )
+
         return_value = {}
 
-        _, encode_embeddings = self.encode(x, sliding_window, sliding_stride, return_intermediates=True)
+        embeddings, encode_embeddings = self.encode(
+            x,
+            sliding_window,
+            sliding_stride,
+            return_intermediates=True,
+            capture_intermediates=get_local_capture_indices(capture_indices, 0, num_encode_layers),
+        )
         return_value["encode_embeddings"] = encode_embeddings
-        embeddings = encode_embeddings[-1]
         # (b, dim, zl, yl, xl)
 
-        _, process_embeddings = self.process(embeddings, return_intermediates=True)
+        embeddings, process_embeddings = self.process(
+            embeddings,
+            return_intermediates=True,
+            capture_intermediates=get_local_capture_indices(capture_indices, num_encode_layers, num_layers),
+        )
         return_value["process_embeddings"] = process_embeddings
-        embeddings = process_embeddings[-1]
         # (b, dim, zl, yl, xl)
 
         return_value["embeddings"] = embeddings
 
         if return_intermediates:
-            return_value = return_value
+            return return_value
         return return_value["embeddings"]
 
     def forward(self, *args, **kwargs):
@@ -485,8 +587,76 @@ class Perceiver3DDecoder(nn.Module, PyTorchModelHubMixin):
 
         self.channel_mapping = Perceiver3DChannelMapping(in_channels=dim, out_channels=self.config.out_channels)
 
+        self.first_layer_queries_cache = None
+
         self.checkpointing_level4 = ActivationCheckpointing(4, checkpointing_level)
 
+    def _get_initial_queries(self, out_shape: tuple[int, int, int], crop_offsets: torch.Tensor | None = None):
+        # Queries are built for a single batch element and broadcast over the batch later. They only have more than one
+        # batch element if different crop offsets are provided for each one.
+        z, y, x = out_shape
+        q = repeat(self.empty_token, "d 1 -> 1 d z y x", z=z, y=y, x=x)
+        # (1, dim, z, y, x)
+        if self.position_embeddings is not None:
+            q = self.position_embeddings(q, crop_offsets=crop_offsets)
+        # (1 or b, dim, z, y, x)
+        return q
+
+    @staticmethod
+    def _get_window_queries(
+        cross_attention_layer: Attention3DWithMLP,
+        q: torch.Tensor,
+        sliding_window: tuple[int, int, int] | None,
+        sliding_stride: tuple[int, int, int] | None,
+    ):
+        # All windows attend to the same tokens and all operations other than attention are per token, so the windows
+        # are concatenated along z and processed as a single sequence of queries. Queries are projected window by window
+        # so that any position embeddings applied within the attention stay relative to each window.
+        q_windows, q_positions = unfold_with_roll_3d(q, sliding_window, sliding_stride)
+        # (num_windows, 1 or b, dim, *sliding_window)
+        num_windows = q_windows.shape[0]
+        precomputed_q = cross_attention_layer.precompute_query(q_windows.flatten(0, 1))
+        # (num_windows * (1 or b), num_heads, T_window, per_head_dim)
+        precomputed_q = precomputed_q.unflatten(0, (num_windows, -1)).permute(1, 2, 0, 3, 4).flatten(2, 3)
+        # (1 or b, num_heads, num_windows * T_window, per_head_dim)
+        q_windows = q_windows.permute(1, 2, 0, 3, 4, 5).flatten(2, 3)
+        # (1 or b, dim, num_windows * window_z, window_y, window_x)
+        return q_windows, q_positions, precomputed_q
+
+    def _get_first_layer_queries(
+        self,
+        out_shape: tuple[int, int, int],
+        sliding_window: tuple[int, int, int] | None,
+        sliding_stride: tuple[int, int, int] | None,
+    ):
+        # Without crop offsets, the windowed first layer queries and their projection depend only on the shapes, so they
+        # are cached. Only the latest shapes are kept as they are usually the same across calls. Parameter versions are
+        # tracked to recompute them if the weights are modified.
+        cache_key = (
+            tuple(out_shape),
+            tuple(sliding_window) if sliding_window is not None else None,
+            tuple(sliding_stride) if sliding_stride is not None else None,
+            self.empty_token.device,
+            self.empty_token.dtype,
+            torch.is_autocast_enabled(),
+        )
+        parameter_versions = tuple(parameter._version for parameter in self.parameters())
+
+        cached = self.first_layer_queries_cache
+        if cached is None or cached[0] != cache_key or cached[1] != parameter_versions:
+            self.first_layer_queries_cache = None  # Release the previous entry before computing the new one
+            q = self._get_initial_queries(out_shape)
+            window_queries = self._get_window_queries(self.cross_attention[0], q, sliding_window, sliding_stride)
+            cached = (cache_key, parameter_versions, *window_queries)
+            self.first_layer_queries_cache = cached
+
+        return cached[2:]
+
+    def _apply(self, fn, *args, **kwargs):
+        # Cached queries are derived from the parameters, so they are dropped when the module is moved or cast
+        self.first_layer_queries_cache = None
+        return super()._apply(fn, *args, **kwargs)
+
     def _forward(
         self,
         kv: torch.Tensor,
@@ -495,34 +665,56 @@ class Perceiver3DDecoder(nn.Module, PyTorchModelHubMixin):
         sliding_stride: tuple[int, int, int] | None = None,
         crop_offsets: torch.Tensor = None,
         return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | dict[str, torch.Tensor]:
         # kv: (b, dim, zl, yl, xl)
 
         # Prepare queries
-        b = kv.shape[0]
-        z, y, x = out_shape
-        q = repeat(self.empty_token, "d 1 -> b d z y x", b=b, z=z, y=y, x=x)
-        # (b, dim, z, y, x)
-        if self.position_embeddings is not None:
-            q = self.position_embeddings(q, device=q.device, crop_offsets=crop_offsets)
-        # (b, dim, z, y, x)
+        first_layer_queries = None
+        if not self.training and not torch.is_grad_enabled() and crop_offsets is None:
+            first_layer_queries = self._get_first_layer_queries(out_shape, sliding_window, sliding_stride)
+        else:
+            q = self._get_initial_queries(out_shape, crop_offsets)
+            # (1 or b, dim, z, y, x)
 
         # Perform attention
         outputs = []
-        for cross_attention_layer in self.cross_attention:
-            q_windows, q_positions = unfold_with_roll_3d(q, sliding_window, sliding_stride)
-            # (num_windows, b, dim, *sliding_window)
-            new_q_windows = []
-            for q_window in q_windows:
-                output_window = cross_attention_layer(q_window, kv, kv)
-                new_q_windows.append(output_window)
-            new_q_windows = torch.stack(new_q_windows, dim=0)
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.cross_attention)
+        )
+        for i, cross_attention_layer in enumerate(self.cross_attention):
+            # The latent tokens are the same for all query windows, so they are projected only once per layer
+            precomputed_kv = cross_attention_layer.precompute_key_value(kv, kv)
+            # (b, num_kv_heads, zl * yl * xl, per_head_dim) each
+
+            if i == 0 and first_layer_queries is not None:
+                q_windows, q_positions, precomputed_q = first_layer_queries
+            else:
+                q_windows, q_positions, precomputed_q = self._get_window_queries(
+                    cross_attention_layer, q, sliding_window, sliding_stride
+                )
+            # (1 or b, dim, num_windows * window_z, window_y, window_x)
+            # (1 or b, num_heads, num_windows * T_window, per_head_dim)
+            num_windows = q_positions.shape[0]
+
+            # Queries without a batch dimension are broadcast against the keys and values of each batch element
+            new_q_windows = cross_attention_layer(
+                q_windows, precomputed_key_value=precomputed_kv, precomputed_query=precomputed_q
+            )
+            # (b, dim, num_windows * window_z, window_y, window_x)
+            new_q_windows = new_q_windows.unflatten(2, (num_windows, -1)).permute(2, 0, 1, 3, 4, 5)
             # (num_windows, b, dim, *sliding_window)
-            q = fold_back_3d(new_q_windows, q_positions, q.shape[2:])
-            outputs.append(q)
+            q = fold_back_3d(
+                new_q_windows,
+                q_positions,
+                out_shape,
+                stride=sliding_stride if sliding_window is not None else None,
+            )
+            if i in capture_indices:
+                outputs.append(q)
         # list of (b, dim, z, y, x)
 
-        output = outputs[-1]
+        output = q
         # (b, dim, z, y, x)
 
         output = self.channel_mapping(output)
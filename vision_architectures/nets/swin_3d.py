@@ -8,16 +8,18 @@ __all__ = ['Swin3DPatchMergingConfig', 'Swin3DPatchSplittingConfig', 'Swin3DBloc
 
 # %% ../../nbs/nets/01_swin_3d.ipynb #4be2d275
 from functools import wraps
+from typing import Literal
 
 import numpy as np
 import torch
-from einops import rearrange
 from huggingface_hub import PyTorchModelHubMixin
 from loguru import logger
 from torch import nn
+from torch.nn import functional as F
 
 from ..blocks.transformer import Attention3DWithMLP, Attention3DWithMLPConfig
 from ..docstrings import populate_docstring
+from ..layers.scale import conv3d_pixel_shuffle, pixel_unshuffle_conv3d
 from vision_architectures.layers.embeddings import (
     AbsolutePositionEmbeddings3D,
     PatchEmbeddings3D,
@@ -26,13 +28,29 @@ from vision_architectures.layers.embeddings import (
 )
 from ..utils.activation_checkpointing import ActivationCheckpointing
 from ..utils.custom_base_model import CustomBaseModel, Field, computed_field, model_validator
-from ..utils.rearrange import rearrange_channels
+from ..utils.rearrange import pixel_shuffle_3d, pixel_unshuffle_3d, rearrange_channels
+from vision_architectures.utils.intermediates import (
+    CaptureIntermediatesPolicy,
+    get_capture_indices,
+    get_local_capture_indices,
+)
+from vision_architectures.utils.windowing import (
+    get_window_attention_mask,
+    pad_to_window_multiple_3d,
+    window_partition_3d,
+    window_unpartition_3d,
+)
 
 # %% ../../nbs/nets/01_swin_3d.ipynb #88f532ee
 class Swin3DPatchMergingConfig(CustomBaseModel):
     in_dim: int = Field(..., description="Input dimension before merging")
     out_dim: int = Field(..., description="Output dimension after merging")
     merge_window_size: tuple[int, int, int] = Field(..., description="Size of the window for merging patches")
+    fused: bool = Field(
+        False,
+        description="Whether to compute the merge as a single strided convolution built from the layer norm and "
+        "projection weights, instead of materializing the merged tensor. Uses the same parameters.",
+    )
 
     @computed_field(description="Factor by which the dimension is increased after merging")
     @property
@@ -57,6 +75,11 @@ class Swin3DPatchSplittingConfig(CustomBaseModel):
     in_dim: int = Field(..., description="Input dimension before splitting")
     out_dim: int = Field(..., description="Output dimension after splitting")
     final_window_size: tuple[int, int, int] = Field(..., description="Size of the window to split patches into")
+    fused: bool = Field(
+        False,
+        description="Whether to compute the split as a single strided transposed convolution built from the "
+        "projection weights, instead of materializing the tensor before splitting. Uses the same parameters.",
+    )
 
     @computed_field(description="Factor by which the dimension is decreased after splitting")
     @property
@@ -81,6 +104,12 @@ class Swin3DBlockConfig(Attention3DWithMLPConfig):
     window_size: tuple[int, int, int] = Field(..., description="Size of the window to apply attention over")
 
     use_relative_position_bias: bool = Field(False, description="Whether to use relative position bias")
+    mask_shifted_windows: bool = Field(
+        False,
+        description="Whether to mask attention between tokens that are brought together in a shifted window only "
+        "because of the cyclic shift, as described in the Swin paper. Disabled by default to remain compatible with "
+        "models trained without it.",
+    )
     patch_merging: Swin3DPatchMergingConfig | None = Field(
         None, description="Patch merging config if desired. Patch merging is applied before attention."
     )
@@ -242,6 +271,8 @@ class Swin3DLayer(nn.Module):
     """Swin 3D Layer applying windowed attention with optional relative position embeddings.
     {CLASS_DESCRIPTION_3D_DOC}"""
 
+    _window_partition_pattern: Literal["block", "grid"] = "block"
+
     @populate_docstring
     def __init__(
         self,
@@ -263,6 +294,7 @@ class Swin3DLayer(nn.Module):
         self._all_kwargs = config | kwargs
         self._window_size = self._all_kwargs.get("window_size")
         self._use_relative_position_bias = self._all_kwargs.get("use_relative_position_bias")
+        self._mask_shifted_windows = self._all_kwargs.get("mask_shifted_windows", False)
 
         self.embeddings_config = RelativePositionEmbeddings3DConfig.model_validate(
             self._all_kwargs | {"grid_size": self._window_size}
@@ -281,25 +313,26 @@ class Swin3DLayer(nn.Module):
 
         self.checkpointing_level3 = ActivationCheckpointing(3, checkpointing_level)
 
-    @staticmethod
-    def _get_rearrange_patterns() -> tuple[str, str]:
-        """Note that the patterns will be applied on tensors that are in channels_last format"""
-        forward_pattern = (
-            "b (num_windows_z window_size_z) (num_windows_y window_size_y) (num_windows_x window_size_x) dim -> "
-            "(b num_windows_z num_windows_y num_windows_x) window_size_z window_size_y window_size_x dim "
-        )
-        reverse_pattern = (
-            "(b num_windows_z num_windows_y num_windows_x) window_size_z window_size_y window_size_x dim -> "
-            "b (num_windows_z window_size_z) (num_windows_y window_size_y) (num_windows_x window_size_x) dim"
-        )
-        return forward_pattern, reverse_pattern
-
-    def _forward(self, hidden_states: torch.Tensor, channels_first: bool = True) -> torch.Tensor:
-        """Window the input features and apply self attention on each window.
+    @populate_docstring
+    def _forward(
+        self,
+        hidden_states: torch.Tensor,
+        channels_first: bool = True,
+        shifts: tuple[int, int, int] = (0, 0, 0),
+        unpadded_grid_shape: tuple[int, int, int] | None = None,
+    ) -> torch.Tensor:
+        """Window the input features and apply self attention on each window. Inputs that are not divisible by the
+        window size are padded with the minimum number of tokens, padding tokens are masked out of attention, and the
+        output is cropped back to the input size.
 
         Args:
             hidden_states: {INPUT_3D_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
+            shifts: Number of patches to shift (roll) the windows by along each axis. The shift is fused with
+                windowing and is reversed before returning.
+            unpadded_grid_shape: If provided, the input is assumed to already be padded to a multiple of the window
+                size, with only the leading ``unpadded_grid_shape`` patches being valid. The output is then returned
+                without cropping. Useful to pad only once for a group of layers.
 
         Returns:
             {OUTPUT_3D_DOC}
@@ -309,41 +342,48 @@ class Swin3DLayer(nn.Module):
         hidden_states = rearrange_channels(hidden_states, channels_first, False)
         # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
-        _, num_patches_z, num_patches_y, num_patches_x, _ = hidden_states.shape
+        crop_output = unpadded_grid_shape is None
+        if crop_output:
+            unpadded_grid_shape = tuple(hidden_states.shape[1:4])
+            hidden_states = pad_to_window_multiple_3d(hidden_states, self._window_size)
+            # (b, padded_num_patches_z, padded_num_patches_y, padded_num_patches_x, dim)
+
+        padded_grid_shape = tuple(hidden_states.shape[1:4])
+
+        # Perform shifting and windowing in a single gather
+        hidden_states = window_partition_3d(
+            hidden_states, self._window_size, shifts=shifts, pattern=self._window_partition_pattern
+        )
+        # (b * num_windows, window_size_z, window_size_y, window_size_x, dim)
+
+        attention_mask = get_window_attention_mask(
+            tuple(unpadded_grid_shape),
+            padded_grid_shape,
+            tuple(self._window_size),
+            tuple(shifts),
+            self._window_partition_pattern,
+            self._mask_shifted_windows,
+            hidden_states.device,
+            hidden_states.dtype,
+        )
+        # (num_windows, 1, window_size_z * window_size_y * window_size_x, window_size_z * window_size_y * window_size_x)
+        # or None
 
-        forward_pattern, reverse_pattern = self._get_rearrange_patterns()
+        hidden_states = self.transformer(
+            hidden_states, hidden_states, hidden_states, channels_first=False, attention_mask=attention_mask
+        )
+        # (b * num_windows, window_size_z, window_size_y, window_size_x, dim)
 
-        # Perform windowing
-        window_size_z, window_size_y, window_size_x = self._window_size
-        num_windows_z, num_windows_y, num_windows_x = (
-            num_patches_z // window_size_z,
-            num_patches_y // window_size_y,
-            num_patches_x // window_size_x,
+        # Undo windowing and shifting in a single gather
+        output = window_unpartition_3d(
+            hidden_states, padded_grid_shape, shifts=shifts, pattern=self._window_partition_pattern
         )
-        hidden_states = rearrange(
-            hidden_states,
-            forward_pattern,
-            num_windows_z=num_windows_z,
-            num_windows_y=num_windows_y,
-            num_windows_x=num_windows_x,
-            window_size_z=window_size_z,
-            window_size_y=window_size_y,
-            window_size_x=window_size_x,
-        ).contiguous()
-
-        hidden_states = self.transformer(hidden_states, hidden_states, hidden_states, channels_first=False)
-
-        # Undo windowing
-        output = rearrange(
-            hidden_states,
-            reverse_pattern,
-            num_windows_z=num_windows_z,
-            num_windows_y=num_windows_y,
-            num_windows_x=num_windows_x,
-            window_size_z=window_size_z,
-            window_size_y=window_size_y,
-            window_size_x=window_size_x,
-        ).contiguous()
+        # (b, padded_num_patches_z, padded_num_patches_y, padded_num_patches_x, dim)
+
+        if crop_output and padded_grid_shape != unpadded_grid_shape:
+            num_patches_z, num_patches_y, num_patches_x = unpadded_grid_shape
+            output = output[:, :num_patches_z, :num_patches_y, :num_patches_x].contiguous()
+            # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
         output = rearrange_channels(output, False, channels_first)
         # (b, [dim], num_patches_z, num_patches_y, num_patches_x, [dim])
@@ -378,7 +418,12 @@ class Swin3DBlock(nn.Module):
 
     @populate_docstring
     def forward(
-        self, hidden_states: torch.Tensor, channels_first: bool = True, return_intermediates: bool = False
+        self,
+        hidden_states: torch.Tensor,
+        channels_first: bool = True,
+        return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
+        unpadded_grid_shape: tuple[int, int, int] | None = None,
     ) -> torch.Tensor | tuple[torch.Tensor, list[torch.Tensor]]:
         """Apply window attention and shifted window attention on the input features.
 
@@ -386,6 +431,10 @@ class Swin3DBlock(nn.Module):
             hidden_states: {INPUT_3D_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC}
+            unpadded_grid_shape: If provided, the input is assumed to already be padded to a multiple of the window
+                size, with only the leading ``unpadded_grid_shape`` patches being valid. See
+                :py:meth:`Swin3DLayer._forward`.
 
         Returns:
             {OUTPUT_3D_DOC}. If return_intermediates is True, also returns a list of intermediate layer outputs. Note
@@ -397,29 +446,25 @@ class Swin3DBlock(nn.Module):
         # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
         layer_outputs = []
+        capture_indices = get_capture_indices(capture_intermediates if return_intermediates else "none", 2)
 
         # First layer
-        hidden_states = self.w_layer(hidden_states, channels_first=False)
+        hidden_states = self.w_layer(hidden_states, channels_first=False, unpadded_grid_shape=unpadded_grid_shape)
         # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
-        layer_outputs.append(hidden_states)
+        if 0 in capture_indices:
+            layer_outputs.append(hidden_states)
 
-        # Shift windows
+        # Second layer with shifted windows. Shifting is fused with windowing inside the layer.
         window_size_z, window_size_y, window_size_x = self.config.window_size
         shifts = (window_size_z // 2, window_size_y // 2, window_size_x // 2)
-        hidden_states = torch.roll(hidden_states, shifts=shifts, dims=(1, 2, 3))
-        # (b, num_patches_z, num_patches_y, num_patches_x, dim)
-
-        # Second layer
-        hidden_states = self.sw_layer(hidden_states, channels_first=False)
-        # (b, num_patches_z, num_patches_y, num_patches_x, dim)
-
-        # Reverse window shift
-        shifts = tuple(-shift for shift in shifts)
-        hidden_states = torch.roll(hidden_states, shifts=shifts, dims=(1, 2, 3))
+        hidden_states = self.sw_layer(
+            hidden_states, channels_first=False, shifts=shifts, unpadded_grid_shape=unpadded_grid_shape
+        )
         # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
-        layer_outputs.append(hidden_states)
+        if 1 in capture_indices:
+            layer_outputs.append(hidden_states)
 
         hidden_states = rearrange_channels(hidden_states, False, channels_first)
         # (b, [dim], num_patches_z, num_patches_y, num_patches_x, [dim])
@@ -452,6 +497,43 @@ class Swin3DPatchMerging(nn.Module):
 
         self.checkpointing_level1 = ActivationCheckpointing(1, checkpointing_level)
 
+    def _fused_merge(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        """Equivalent of space-to-depth followed by self.layer_norm and self.proj, computed without materializing the
+        merged tensor. Expects channels_last input that is divisible by the merge window."""
+        # hidden_states: (b, num_patches_z, num_patches_y, num_patches_x, dim)
+
+        merge_window_size = tuple(self.config.merge_window_size)
+        dim = hidden_states.shape[-1]
+
+        x = hidden_states.permute(0, 4, 1, 2, 3)
+        # (b, dim, num_patches_z, num_patches_y, num_patches_x)
+
+        # Layer norm statistics of every merge window, computed from per-patch reductions
+        mean = F.avg_pool3d(x.mean(1, keepdim=True, dtype=torch.float32), merge_window_size)
+        mean_square = F.avg_pool3d(
+            torch.linalg.vector_norm(x, dim=1, keepdim=True, dtype=torch.float32).square() / dim, merge_window_size
+        )
+        rstd = torch.rsqrt((mean_square - mean.square()).clamp_min(0) + self.layer_norm.eps)
+        # (b, 1, new_num_patches_z, new_num_patches_y, new_num_patches_x)
+
+        # Fold the layer norm affine parameters into the projection, and reorder the input features from
+        # (window_size_z window_size_y window_size_x dim) to (dim window_size_z window_size_y window_size_x)
+        weight = self.proj.weight * self.layer_norm.weight
+        bias = self.proj.bias + self.proj.weight @ self.layer_norm.bias
+        weight = weight.reshape(-1, *merge_window_size, dim).permute(0, 4, 1, 2, 3)
+        weight = weight.reshape(weight.shape[0], -1, 1, 1, 1)
+        # (out_dim, dim * window_size_z * window_size_y * window_size_x, 1, 1, 1)
+
+        merged = pixel_unshuffle_conv3d(x, weight, None, merge_window_size)
+        # (b, out_dim, new_num_patches_z, new_num_patches_y, new_num_patches_x)
+
+        # Normalization is linear, so it can be applied after the projection
+        merged = (merged - mean * weight.sum((1, 2, 3, 4)).view(-1, 1, 1, 1)) * rstd + bias.view(-1, 1, 1, 1)
+        merged = merged.to(x.dtype).permute(0, 2, 3, 4, 1)
+        # (b, new_num_patches_z, new_num_patches_y, new_num_patches_x, out_dim)
+
+        return merged
+
     @populate_docstring
     def _forward(self, hidden_states: torch.Tensor, channels_first: bool = True) -> torch.Tensor:
         """Merge multiple patches into a single patch.
@@ -468,19 +550,20 @@ class Swin3DPatchMerging(nn.Module):
         hidden_states = rearrange_channels(hidden_states, channels_first, False)
         # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
-        window_size_z, window_size_y, window_size_x = self.config.merge_window_size
+        # Pad with the minimum number of patches required to make the input divisible by the merge window
+        hidden_states = pad_to_window_multiple_3d(hidden_states, self.config.merge_window_size)
+        # (b, padded_num_patches_z, padded_num_patches_y, padded_num_patches_x, dim)
 
-        hidden_states = rearrange(
-            hidden_states,
-            "b (new_num_patches_z window_size_z) (new_num_patches_y window_size_y) (new_num_patches_x window_size_x) dim -> "
-            "b new_num_patches_z new_num_patches_y new_num_patches_x (window_size_z window_size_y window_size_x dim)",
-            window_size_z=window_size_z,
-            window_size_y=window_size_y,
-            window_size_x=window_size_x,
-        ).contiguous()
+        if self.config.fused:
+            hidden_states = self._fused_merge(hidden_states)
+        else:
+            hidden_states = pixel_unshuffle_3d(hidden_states, self.config.merge_window_size, channels_first=False)
+            # (b, new_num_patches_z, new_num_patches_y, new_num_patches_x, window_size_z * window_size_y *
+            # window_size_x * dim)
 
-        hidden_states = self.layer_norm(hidden_states)
-        hidden_states = self.proj(hidden_states)
+            hidden_states = self.layer_norm(hidden_states)
+            hidden_states = self.proj(hidden_states)
+        # (b, new_num_patches_z, new_num_patches_y, new_num_patches_x, out_dim)
 
         hidden_states = rearrange_channels(hidden_states, False, channels_first)
         # (b, [dim], new_num_patches_z, new_num_patches_y, new_num_patches_x, [dim])
@@ -516,13 +599,39 @@ class Swin3DPatchSplitting(nn.Module):
 
         self.checkpointing_level1 = ActivationCheckpointing(1, checkpointing_level)
 
+    def _fused_split(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        """Equivalent of self.proj followed by depth-to-space, computed without materializing the tensor before
+        splitting. Expects channels_last input."""
+        # hidden_states: (b, num_patches_z, num_patches_y, num_patches_x, in_dim)
+
+        final_window_size = tuple(self.config.final_window_size)
+
+        # Reorder the output features from (window_size_z window_size_y window_size_x dim) to
+        # (dim window_size_z window_size_y window_size_x)
+        weight = self.proj.weight.reshape(*final_window_size, -1, self.config.in_dim).permute(3, 0, 1, 2, 4)
+        weight = weight.reshape(-1, self.config.in_dim, 1, 1, 1)
+        bias = self.proj.bias.reshape(*final_window_size, -1).permute(3, 0, 1, 2).reshape(-1)
+        # (out_dim * window_size_z * window_size_y * window_size_x, in_dim, 1, 1, 1)
+
+        split = conv3d_pixel_shuffle(hidden_states.permute(0, 4, 1, 2, 3), weight, bias, final_window_size)
+        # (b, out_dim, num_patches_z * window_size_z, num_patches_y * window_size_y, num_patches_x * window_size_x)
+
+        return split.permute(0, 2, 3, 4, 1)
+
     @populate_docstring
-    def _forward(self, hidden_states: torch.Tensor, channels_first: bool = True) -> torch.Tensor:
+    def _forward(
+        self,
+        hidden_states: torch.Tensor,
+        channels_first: bool = True,
+        output_grid_shape: tuple[int, int, int] | None = None,
+    ) -> torch.Tensor:
         """Split patches into multiple patches.
 
         Args:
             hidden_states: {INPUT_3D_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
+            output_grid_shape: If provided, the split patches are cropped to this grid shape. This is used to undo the
+                padding added by patch merging when the grid was not divisible by the merge window.
 
         Returns:
             {OUTPUT_3D_DOC}
@@ -533,18 +642,19 @@ class Swin3DPatchSplitting(nn.Module):
         # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
         hidden_states = self.layer_norm(hidden_states)
-        hidden_states = self.proj(hidden_states)
 
-        window_size_z, window_size_y, window_size_x = self.config.final_window_size
+        if self.config.fused:
+            hidden_states = self._fused_split(hidden_states)
+        else:
+            hidden_states = self.proj(hidden_states)
+            # (b, num_patches_z, num_patches_y, num_patches_x, window_size_z * window_size_y * window_size_x * dim)
+            hidden_states = pixel_shuffle_3d(hidden_states, self.config.final_window_size, channels_first=False)
+        # (b, num_patches_z * window_size_z, num_patches_y * window_size_y, num_patches_x * window_size_x, dim)
 
-        hidden_states = rearrange(
-            hidden_states,
-            "b num_patches_z num_patches_y num_patches_x (window_size_z window_size_y window_size_x dim) -> "
-            "b (num_patches_z window_size_z) (num_patches_y window_size_y) (num_patches_x window_size_x) dim",
-            window_size_z=window_size_z,
-            window_size_y=window_size_y,
-            window_size_x=window_size_x,
-        ).contiguous()
+        if output_grid_shape is not None and tuple(hidden_states.shape[1:4]) != tuple(output_grid_shape):
+            num_patches_z, num_patches_y, num_patches_x = output_grid_shape
+            hidden_states = hidden_states[:, :num_patches_z, :num_patches_y, :num_patches_x].contiguous()
+            # (b, output_num_patches_z, output_num_patches_y, output_num_patches_x, dim)
 
         hidden_states = rearrange_channels(hidden_states, False, channels_first)
         # (b, [dim], num_patches_z, num_patches_y, num_patches_x, [dim])
@@ -590,7 +700,12 @@ class Swin3DStage(nn.Module):
 
     @populate_docstring
     def _forward(
-        self, hidden_states: torch.Tensor, channels_first: bool = True, return_intermediates: bool = False
+        self,
+        hidden_states: torch.Tensor,
+        channels_first: bool = True,
+        return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
+        output_grid_shape: tuple[int, int, int] | None = None,
     ) -> torch.Tensor:
         """Merge patches if applicable (used by the encoder), perform a series of window and shifted window attention,
         and then split patches if applicable (used by the decoder).
@@ -599,6 +714,10 @@ class Swin3DStage(nn.Module):
             hidden_states: {INPUT_3D_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC} Layer indices are relative to this stage, with each
+                block contributing two layers.
+            output_grid_shape: Grid shape that the output of patch splitting is cropped to. Defaults to the input grid
+                shape if this stage also merges patches, so that padding added by merging is removed again.
 
         Returns:
             {OUTPUT_3D_DOC}. If return_intermediates is True, also returns a list of intermediate layer outputs. Note
@@ -610,17 +729,43 @@ class Swin3DStage(nn.Module):
         # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
         if self.patch_merging:
+            if output_grid_shape is None:
+                output_grid_shape = tuple(hidden_states.shape[1:4])
             hidden_states = self.patch_merging(hidden_states, channels_first=False)
             # (b, new_num_patches_z, new_num_patches_y, new_num_patches_x, new_dim)
 
+        # Pad only once for all blocks. Padded patches are masked out of attention in every layer.
+        num_patches_z, num_patches_y, num_patches_x = unpadded_grid_shape = tuple(hidden_states.shape[1:4])
+        hidden_states = pad_to_window_multiple_3d(hidden_states, self.config.window_size)
+        # (b, padded_num_patches_z, padded_num_patches_y, padded_num_patches_x, new_dim)
+
         layer_outputs = []
-        for layer_module in self.blocks:
-            hidden_states, _layer_outputs = layer_module(hidden_states, channels_first=False, return_intermediates=True)
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", 2 * len(self.blocks)
+        )
+        for i, layer_module in enumerate(self.blocks):
+            hidden_states, _layer_outputs = layer_module(
+                hidden_states,
+                channels_first=False,
+                return_intermediates=True,
+                capture_intermediates=get_local_capture_indices(capture_indices, 2 * i, 2 * i + 2),
+                unpadded_grid_shape=unpadded_grid_shape,
+            )
+            # (b, padded_num_patches_z, padded_num_patches_y, padded_num_patches_x, new_dim)
+            # Crops are made contiguous so that they do not keep the padded activations alive
+            layer_outputs.extend(
+                layer_output[:, :num_patches_z, :num_patches_y, :num_patches_x].contiguous()
+                for layer_output in _layer_outputs
+            )
+
+        if tuple(hidden_states.shape[1:4]) != unpadded_grid_shape:
+            hidden_states = hidden_states[:, :num_patches_z, :num_patches_y, :num_patches_x].contiguous()
             # (b, new_num_patches_z, new_num_patches_y, new_num_patches_x, new_dim)
-            layer_outputs.extend(_layer_outputs)
 
         if self.patch_splitting:
-            hidden_states = self.patch_splitting(hidden_states, channels_first=False)
+            hidden_states = self.patch_splitting(
+                hidden_states, channels_first=False, output_grid_shape=output_grid_shape
+            )
             # (b, new_num_patches_z, new_num_patches_y, new_num_patches_x, new_dim)
 
         hidden_states = rearrange_channels(hidden_states, False, channels_first)
@@ -657,7 +802,12 @@ class Swin3DEncoderDecoderBase(nn.Module, PyTorchModelHubMixin):
 
     @populate_docstring
     def _forward(
-        self, hidden_states: torch.Tensor, channels_first: bool = True, return_intermediates: bool = False
+        self,
+        hidden_states: torch.Tensor,
+        channels_first: bool = True,
+        return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
+        output_grid_shapes: list[tuple[int, int, int] | None] | None = None,
     ) -> torch.Tensor:
         """Encodes the input features using the Swin Transformer hierarchy.
 
@@ -665,22 +815,54 @@ class Swin3DEncoderDecoderBase(nn.Module, PyTorchModelHubMixin):
             hidden_states: {INPUT_3D_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC} Layer indices are counted across all stages, with
+                each block contributing two layers. Stage outputs are retained only for ``'all'``, ``'final'`` (last
+                stage) and ``'stages'``.
+            output_grid_shapes: Optional grid shape per stage that the output of its patch splitting is cropped to,
+                e.g. the grid shapes of the matching encoder stages when decoding inputs that were not divisible by
+                the merge windows. See :py:meth:`Swin3DStage._forward`.
 
         Returns:
-            {OUTPUT_3D_DOC}. If return_intermediates is True, also returns a list of intermediate layer outputs. Note
-            that the intermediate layer outputs returned will always be in ``channels_last`` format.
+            {OUTPUT_3D_DOC}. If return_intermediates is True, also returns a list of intermediate stage outputs and a
+            list of intermediate layer outputs. Note that the intermediate outputs returned will always be in
+            ``channels_last`` format.
         """
         # hidden_states: (b, [dim], num_patches_z, num_patches_y, num_patches_x, [dim])
 
         hidden_states = rearrange_channels(hidden_states, channels_first, False)
         # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
+        if not return_intermediates:
+            capture_intermediates = "none"
+        stage_num_layers = [2 * stage_config.depth for stage_config in self.config.stages]
+        stage_end_indices = [sum(stage_num_layers[: i + 1]) - 1 for i in range(len(stage_num_layers))]
+        capture_layer_indices = get_capture_indices(capture_intermediates, sum(stage_num_layers), stage_end_indices)
+        capture_stage_indices = get_capture_indices(
+            capture_intermediates if isinstance(capture_intermediates, str) else "none",
+            len(self.stages),
+            range(len(self.stages)),
+        )
+
+        if output_grid_shapes is None:
+            output_grid_shapes = [None] * len(self.stages)
+        assert len(output_grid_shapes) == len(self.stages), "output_grid_shapes must have one entry per stage"
+
         stage_outputs, layer_outputs = [], []
-        for stage_module in self.stages:
-            hidden_states, _layer_outputs = stage_module(hidden_states, channels_first=False, return_intermediates=True)
+        for i, stage_module in enumerate(self.stages):
+            start = stage_end_indices[i] + 1 - stage_num_layers[i]
+            hidden_states, _layer_outputs = stage_module(
+                hidden_states,
+                channels_first=False,
+                return_intermediates=True,
+                capture_intermediates=get_local_capture_indices(
+                    capture_layer_indices, start, stage_end_indices[i] + 1
+                ),
+                output_grid_shape=output_grid_shapes[i],
+            )
             # (b, new_num_patches_z, new_num_patches_y, new_num_patches_x, dim)
 
-            stage_outputs.append(hidden_states)
+            if i in capture_stage_indices:
+                stage_outputs.append(hidden_states)
             layer_outputs.extend(_layer_outputs)
 
         hidden_states = rearrange_channels(hidden_states, False, channels_first)
@@ -757,6 +939,7 @@ class Swin3DEncoderWithPatchEmbeddings(nn.Module, PyTorchModelHubMixin):
         crop_offsets: torch.Tensor = None,
         channels_first: bool = True,
         return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | tuple[torch.Tensor, list[torch.Tensor], list[torch.Tensor]]:
         """Patchify the input pixel values and then pass it through the Swin transformer.
 
@@ -767,6 +950,7 @@ class Swin3DEncoderWithPatchEmbeddings(nn.Module, PyTorchModelHubMixin):
                 coordinates will be offset accordingly.
             channels_first: {CHANNELS_FIRST_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC} See :py:meth:`Swin3DEncoderDecoderBase._forward`.
 
         Returns:
             {OUTPUT_3D_DOC}. If `return_intermediates` is True, also returns the intermediate stage outputs and layer
@@ -787,7 +971,10 @@ class Swin3DEncoderWithPatchEmbeddings(nn.Module, PyTorchModelHubMixin):
         # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
         encoded, stage_outputs, layer_outputs = self.encoder(
-            embeddings, channels_first=False, return_intermediates=True
+            embeddings,
+            channels_first=False,
+            return_intermediates=True,
+            capture_intermediates=capture_intermediates if return_intermediates else "none",
         )
         # encoded: (b, new_num_patches_z, new_num_patches_y, new_num_patches_x, dim)
         # stage_outputs, layer_outputs: list of (b, some_num_patches_z, some_num_patches_y, some_num_patches_x, dim)
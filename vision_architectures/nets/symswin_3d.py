@@ -5,30 +5,18 @@ __all__ = ['symmetry_attention_rearrange_forward', 'symmetry_attention_rearrange
 
 # %% ../../nbs/nets/10_symswin3d.ipynb #a9315f3a
 import torch
-from einops import rearrange
+
+from ..utils.windowing import window_partition_3d, window_unpartition_3d
 
 # %% ../../nbs/nets/10_symswin3d.ipynb #f84f2971
 def symmetry_attention_rearrange_forward(hidden_states: torch.Tensor):
     # hidden_states: (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
-    # Flip the second half of the patches along the x axis
-    last_dim_length = hidden_states.shape[-2]
-    hidden_states = torch.cat(
-        [
-            hidden_states[..., : last_dim_length // 2, :],
-            hidden_states[..., last_dim_length // 2 :, :].flip(-2),
-        ],
-        dim=-2,
-    )
-    # (b, num_patches_z, num_patches_y, num_patches_x_first_half + flipped_num_patches_second_half, dim)
-
-    # Rearrange the patches to alternate between the two halves along the x axis
-    hidden_states = rearrange(
-        hidden_states,
-        "b num_patches_z num_patches_y (two half_num_patches_x) dim -> "
-        "b num_patches_z num_patches_y (half_num_patches_x two) dim",
-        two=2,
-    ).contiguous()
+    # Flip the second half of the patches along the x axis and rearrange the patches to alternate between the two
+    # halves along the x axis. This is performed as a single gather with cached indices. Treating the entire grid as a
+    # single window ensures that no partitioning takes place.
+    grid_shape = tuple(hidden_states.shape[1:4])
+    hidden_states = window_partition_3d(hidden_states, grid_shape, symmetric=True)
     # (b, num_patches_z, num_patches_y, rearranged_num_patches_x, dim)
 
     return hidden_states
@@ -37,24 +25,10 @@ def symmetry_attention_rearrange_forward(hidden_states: torch.Tensor):
 def symmetry_attention_rearrange_backward(hidden_states: torch.Tensor):
     # hidden_states: (b, num_patches_z, num_patches_y, rearranged_num_patches_x, dim)
 
-    # Return the patches to their previous order along the x-axis
-    hidden_states = rearrange(
-        hidden_states,
-        "b num_patches_z num_patches_y (half_num_patches_x two) dim -> "
-        "b num_patches_z num_patches_y (two half_num_patches_x) dim",
-        two=2,
-    ).contiguous()
-    # (b, num_patches_z, num_patches_y, num_patches_x_first_half + flipped_num_patches_second_half, dim)
-
-    # Flip the second half of the patches along the x axis to return to the original state
-    last_dim_length = hidden_states.shape[-2]
-    hidden_states = torch.cat(
-        [
-            hidden_states[..., : last_dim_length // 2, :],
-            hidden_states[..., last_dim_length // 2 :, :].flip(-2),
-        ],
-        dim=-2,
-    )
+    # Return the patches to their previous order along the x-axis and flip the second half back, again as a single
+    # gather with cached indices.
+    grid_shape = tuple(hidden_states.shape[1:4])
+    hidden_states = window_unpartition_3d(hidden_states, grid_shape, symmetric=True)
     # (b, num_patches_z, num_patches_y, num_patches_x, dim)
 
     return hidden_states
@@ -12,6 +12,7 @@ from torch import nn
 from ..blocks.cnn import CNNBlock3D
 from ..docstrings import populate_docstring
 from ..utils.custom_base_model import CustomBaseModel, Field, model_validator
+from ..utils.label_maps import tiled_argmax
 
 # %% ../../nbs/nets/02_unetr_3d_decoder.ipynb #f0cd8496
 KernelSizeType = int | tuple[int, int, int]
@@ -175,17 +176,7 @@ class UNetR3DDecoder(nn.Module, PyTorchModelHubMixin):
             padding=tuple([k // 2 for k in self.config.decoder.final_layer_kernel_size]),
         )
 
-    @populate_docstring
-    def forward(self, embeddings, scan) -> torch.Tensor:
-        """Process the multi-scale input embeddings and scan datapoint.
-
-        Args:
-            embeddings: {INPUT_3D_DOC}
-            scan: {INPUT_3D_DOC}
-
-        Returns:
-            {OUTPUT_3D_DOC}
-        """
+    def _decode_embeddings(self, embeddings) -> torch.Tensor:
         # embeddings is a list of (B, C_layer, D_layer, W_layer, H_layer)
         embeddings = embeddings[::-1]
 
@@ -197,12 +188,59 @@ class UNetR3DDecoder(nn.Module, PyTorchModelHubMixin):
             else:
                 decoded = self.blocks[i](embedding, decoded)
 
+        return decoded
+
+    def _final_layers(self, scan, decoded) -> torch.Tensor:
         high_resolution_embeddings = self.scan_conv(scan)
         final_embeddings = torch.cat([high_resolution_embeddings, decoded], dim=1)
         decoded = self.final_conv(final_embeddings)
+        return decoded
+
+    @populate_docstring
+    def forward(self, embeddings, scan) -> torch.Tensor:
+        """Process the multi-scale input embeddings and scan datapoint.
+
+        Args:
+            embeddings: {INPUT_3D_DOC}
+            scan: {INPUT_3D_DOC}
+
+        Returns:
+            {OUTPUT_3D_DOC}
+        """
+        decoded = self._decode_embeddings(embeddings)
+        decoded = self._final_layers(scan, decoded)
 
         return decoded
 
+    @torch.no_grad()
+    @populate_docstring
+    def predict_labels(
+        self,
+        embeddings,
+        scan,
+        tile_size: int | tuple[int, int, int] = 64,
+        return_probabilities: bool = False,
+    ) -> torch.Tensor | tuple[torch.Tensor, torch.Tensor]:
+        """Predict the label map without materializing the logits of all outputs for the full scan. The final layers
+        are applied one tile at a time and their logits are reduced immediately. Should be used in eval mode.
+
+        Args:
+            embeddings: {INPUT_3D_DOC}
+            scan: {INPUT_3D_DOC}
+            tile_size: Size of the tiles of the scan on which logits are computed at once.
+            return_probabilities: Whether to return the softmax probabilities of the predicted classes too.
+
+        Returns:
+            Label map of shape (B, Z, Y, X), along with the float16 probabilities of the predicted classes of the same
+            shape if ``return_probabilities`` is True.
+        """
+        decoded = self._decode_embeddings(embeddings)
+
+        # Both the scan convolution and the final convolution need context around every tile
+        halo = tuple(p1 + p2 for p1, p2 in zip(self.scan_conv.padding, self.final_conv.padding))
+
+        return tiled_argmax(self._final_layers, [scan, decoded], tile_size, halo, 1, return_probabilities)
+
     @staticmethod
     def _reduce(loss, reduction):
         if reduction is None:
@@ -295,6 +333,9 @@ class UNetR3DDecoder(nn.Module, PyTorchModelHubMixin):
 
         prediction: probability scores for each class
         target: should be binary masks.
+
+        ``vision_architectures.losses.dice_ce_loss.DiceCELoss`` computes the same loss from logits and integer label
+        maps without one-hot targets.
         """
 
         loss1 = UNetR3DDecoder.soft_dice_loss_fn(
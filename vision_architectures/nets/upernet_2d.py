@@ -90,9 +90,39 @@ class UPerNet2DFusion(nn.Module):
             checkpointing_level=checkpointing_level,
         )
 
+        # A 1x1 convolution applied first in the block commutes with interpolation, as both are linear and interpolation
+        # acts on every channel independently. In that case, every feature map is projected with its slice of the
+        # convolution weights at its own resolution before being interpolated, and the concatenation of all feature maps
+        # at the fused resolution is never materialized. Other kernels fall back to concatenating first.
+        self.project_before_interpolation = self._can_project_before_interpolation()
+
         self.checkpointing_level1 = ActivationCheckpointing(1, checkpointing_level)
         self.checkpointing_level2 = ActivationCheckpointing(2, checkpointing_level)
 
+    def _can_project_before_interpolation(self) -> bool:
+        conv = self.conv.conv
+        return (
+            isinstance(conv, nn.Conv2d)
+            and all(kernel_size == 1 for kernel_size in conv.kernel_size)
+            and all(stride == 1 for stride in conv.stride)
+            and (conv.padding == "same" or all(padding == 0 for padding in conv.padding))
+            and conv.groups == 1
+            and self.conv.config.sequence.startswith("C")
+        )
+
+    def _get_fused_shape(
+        self, features: list[torch.Tensor], fused_shape: tuple[int, int] | None
+    ) -> tuple[int, int]:
+        if fused_shape is None:
+            fused_shape = self.config.fused_shape
+        if fused_shape is None:
+            fused_shape = features[0].shape[2:]
+            for feature in features:
+                resolution = feature.shape[2:].numel()
+                if resolution > fused_shape.numel():
+                    fused_shape = feature.shape[2:]
+        return fused_shape
+
     def concat_features(
         self, features: list[torch.Tensor], fused_shape: tuple[int, int, int] | None = None
     ) -> torch.Tensor:
@@ -109,14 +139,7 @@ class UPerNet2DFusion(nn.Module):
         """
         # features: List of [(b, dim, h1, w1), (b, dim, h2, h2), ...]
 
-        if fused_shape is None:
-            fused_shape = self.config.fused_shape
-        if fused_shape is None:
-            fused_shape = features[0].shape[2:]
-            for feature in features:
-                resolution = feature.shape[2:].numel()
-                if resolution > fused_shape.numel():
-                    fused_shape = feature.shape[2:]
+        fused_shape = self._get_fused_shape(features, fused_shape)
         # (h, w)
 
         for i in range(len(features)):
@@ -149,6 +172,48 @@ class UPerNet2DFusion(nn.Module):
 
         return fused_features
 
+    def project_and_interpolate_features(
+        self, features: list[torch.Tensor], fused_shape: tuple[int, int] | None = None
+    ) -> torch.Tensor:
+        """Fuse features from different resolutions when the fusion convolution is 1x1. This is equivalent to
+        ``fuse_features(concat_features(features, fused_shape))``, but every feature map is projected at its own
+        resolution and then interpolated and summed, so the concatenated feature map is never materialized.
+
+        Args:
+            features: A list of channels-first 2D multi-scale features of shapes
+                [(b, dim, h1, w1), (b, dim, h2, w2), ...] where h1 > h2 > ...
+            fused_shape: Shape to which all feature maps will be interpolated. If None, value entered in the config is
+                used. If that is None too, the shape of the largest feature map is used.
+
+        Returns:
+            A fused 2D feature map.
+        """
+        fused_shape = self._get_fused_shape(features, fused_shape)
+        # (h, w)
+
+        weights = self.conv.conv.weight.split(self.config.dim, dim=1)
+        # Each is (dim, dim, 1, 1)
+
+        fused_features = 0
+        for feature, weight in zip(features, weights):
+            projected_feature = F.conv2d(feature, weight)
+            # (b, dim, hi, wi)
+            fused_features = fused_features + F.interpolate(
+                projected_feature,
+                size=fused_shape,
+                mode=self.config.interpolation_mode,
+                align_corners=False,
+            )
+            # (b, dim, h, w)
+        if self.conv.conv.bias is not None:
+            fused_features = fused_features + self.conv.conv.bias.view(1, -1, 1, 1)
+
+        # Remaining layers of the block e.g. normalization and activation
+        fused_features = self.conv._apply_sequence(fused_features, self.conv.config.sequence[1:])
+        # (b, dim, h, w)
+
+        return fused_features
+
     @populate_docstring
     def _forward(
         self, features: list[torch.Tensor], fused_shape: tuple[int, int, int] | None = None, channels_first: bool = True
@@ -167,9 +232,12 @@ class UPerNet2DFusion(nn.Module):
         """
         features = [rearrange_channels(feature, channels_first, True) for feature in features]
         # [(b, dim, h1, w1), (b, dim, h2, w2), ...]
-        concatenated_features = self.checkpointing_level1(self.concat_features, features, fused_shape)
-        # (b, dim * num_features, h, w)
-        fused_features = self.checkpointing_level1(self.fuse_features, concatenated_features)
+        if self.project_before_interpolation:
+            fused_features = self.checkpointing_level1(self.project_and_interpolate_features, features, fused_shape)
+        else:
+            concatenated_features = self.checkpointing_level1(self.concat_features, features, fused_shape)
+            # (b, dim * num_features, h, w)
+            fused_features = self.checkpointing_level1(self.fuse_features, concatenated_features)
         # (b, dim, h, w)
         fused_features = rearrange_channels(fused_features, True, channels_first)
         # (b, [dim], h, w, [dim])
@@ -17,6 +17,7 @@ from ..docstrings import populate_docstring
 from .fpn_3d import FPN3D, FPN3DConfig
 from ..utils.activation_checkpointing import ActivationCheckpointing
 from ..utils.custom_base_model import Field, model_validator
+from ..utils.label_maps import tiled_argmax
 from ..utils.rearrange import rearrange_channels
 
 # %% ../../nbs/nets/09_upernet_3d.ipynb #b026b49f
@@ -88,9 +89,39 @@ class UPerNet3DFusion(nn.Module):
             checkpointing_level=checkpointing_level,
         )
 
+        # A 1x1 convolution applied first in the block commutes with interpolation, as both are linear and interpolation
+        # acts on every channel independently. In that case, every feature map is projected with its slice of the
+        # convolution weights at its own resolution before being interpolated, and the concatenation of all feature maps
+        # at the fused resolution is never materialized. Other kernels fall back to concatenating first.
+        self.project_before_interpolation = self._can_project_before_interpolation()
+
         self.checkpointing_level1 = ActivationCheckpointing(1, checkpointing_level)
         self.checkpointing_level2 = ActivationCheckpointing(2, checkpointing_level)
 
+    def _can_project_before_interpolation(self) -> bool:
+        conv = self.conv.conv
+        return (
+            isinstance(conv, nn.Conv3d)
+            and all(kernel_size == 1 for kernel_size in conv.kernel_size)
+            and all(stride == 1 for stride in conv.stride)
+            and (conv.padding == "same" or all(padding == 0 for padding in conv.padding))
+            and conv.groups == 1
+            and self.conv.config.sequence.startswith("C")
+        )
+
+    def _get_fused_shape(
+        self, features: list[torch.Tensor], fused_shape: tuple[int, int, int] | None
+    ) -> tuple[int, int, int]:
+        if fused_shape is None:
+            fused_shape = self.config.fused_shape
+        if fused_shape is None:
+            fused_shape = features[0].shape[2:]
+            for feature in features:
+                resolution = feature.shape[2:].numel()
+                if resolution > fused_shape.numel():
+                    fused_shape = feature.shape[2:]
+        return fused_shape
+
     def concat_features(
         self, features: list[torch.Tensor], fused_shape: tuple[int, int, int] | None = None
     ) -> torch.Tensor:
@@ -107,14 +138,7 @@ class UPerNet3DFusion(nn.Module):
         """
         # features: List of [(b, dim, d1, h1, w1), (b, dim, d2, h2, w2), ...]
 
-        if fused_shape is None:
-            fused_shape = self.config.fused_shape
-        if fused_shape is None:
-            fused_shape = features[0].shape[2:]
-            for feature in features:
-                resolution = feature.shape[2:].numel()
-                if resolution > fused_shape.numel():
-                    fused_shape = feature.shape[2:]
+        fused_shape = self._get_fused_shape(features, fused_shape)
         # (d, h, w)
 
         for i in range(len(features)):
@@ -147,6 +171,48 @@ class UPerNet3DFusion(nn.Module):
 
         return fused_features
 
+    def project_and_interpolate_features(
+        self, features: list[torch.Tensor], fused_shape: tuple[int, int, int] | None = None
+    ) -> torch.Tensor:
+        """Fuse features from different resolutions when the fusion convolution is 1x1. This is equivalent to
+        ``fuse_features(concat_features(features, fused_shape))``, but every feature map is projected at its own
+        resolution and then interpolated and summed, so the concatenated feature map is never materialized.
+
+        Args:
+            features: A list of channels-first 3D multi-scale features of shapes
+                [(b, dim, d1, h1, w1), (b, dim, d2, h2, w2), ...] where d1 > d2 > ...
+            fused_shape: Shape to which all feature maps will be interpolated. If None, value entered in the config is
+                used. If that is None too, the shape of the largest feature map is used.
+
+        Returns:
+            A fused 3D feature map.
+        """
+        fused_shape = self._get_fused_shape(features, fused_shape)
+        # (d, h, w)
+
+        weights = self.conv.conv.weight.split(self.config.dim, dim=1)
+        # Each is (dim, dim, 1, 1, 1)
+
+        fused_features = 0
+        for feature, weight in zip(features, weights):
+            projected_feature = F.conv3d(feature, weight)
+            # (b, dim, di, hi, wi)
+            fused_features = fused_features + F.interpolate(
+                projected_feature,
+                size=fused_shape,
+                mode=self.config.interpolation_mode,
+                align_corners=False,
+            )
+            # (b, dim, d, h, w)
+        if self.conv.conv.bias is not None:
+            fused_features = fused_features + self.conv.conv.bias.view(1, -1, 1, 1, 1)
+
+        # Remaining layers of the block e.g. normalization and activation
+        fused_features = self.conv._apply_sequence(fused_features, self.conv.config.sequence[1:])
+        # (b, dim, d, h, w)
+
+        return fused_features
+
     @populate_docstring
     def _forward(
         self, features: list[torch.Tensor], fused_shape: tuple[int, int, int] | None = None, channels_first: bool = True
@@ -165,9 +231,12 @@ class UPerNet3DFusion(nn.Module):
         """
         features = [rearrange_channels(feature, channels_first, True) for feature in features]
         # [(b, dim, d1, h1, w1), (b, dim, d2, h2, w2), ...]
-        concatenated_features = self.checkpointing_level1(self.concat_features, features, fused_shape)
-        # (b, dim * num_features, d, h, w)
-        fused_features = self.checkpointing_level1(self.fuse_features, concatenated_features)
+        if self.project_before_interpolation:
+            fused_features = self.checkpointing_level1(self.project_and_interpolate_features, features, fused_shape)
+        else:
+            concatenated_features = self.checkpointing_level1(self.concat_features, features, fused_shape)
+            # (b, dim * num_features, d, h, w)
+            fused_features = self.checkpointing_level1(self.fuse_features, concatenated_features)
         # (b, dim, d, h, w)
         fused_features = rearrange_channels(fused_features, True, channels_first)
         # (b, [dim], d, h, w, [dim])
@@ -261,10 +330,7 @@ class UPerNet3D(nn.Module, PyTorchModelHubMixin):
         #   ...
         # ] where d1 > d2 > ...
 
-        features = [rearrange_channels(feature, channels_first, True) for feature in features]
-        # [(b, in_dim1, d1, h1, w1), (b, in_dim2, d2, h2, w2), ...]
-
-        features = self.fpn(features, channels_first=True)
+        features = self._fpn_features(features, channels_first)
         # features: [
         #   (b, fpn_dim, d1, h1, w1),
         #   (b, fpn_dim, d2, h2, w2),
@@ -283,3 +349,61 @@ class UPerNet3D(nn.Module, PyTorchModelHubMixin):
             output["object"] = object_logits
 
         return output
+
+    def _fpn_features(self, features: list[torch.Tensor], channels_first: bool) -> list[torch.Tensor]:
+        features = [rearrange_channels(feature, channels_first, True) for feature in features]
+        # [(b, in_dim1, d1, h1, w1), (b, in_dim2, d2, h2, w2), ...]
+
+        features = self.fpn(features, channels_first=True)
+        # [(b, fpn_dim, d1, h1, w1), (b, fpn_dim, d2, h2, w2), ...]
+
+        return features
+
+    @torch.no_grad()
+    @populate_docstring
+    def predict_labels(
+        self,
+        features: list[torch.Tensor],
+        fusion_shape: tuple[int, int, int] = None,
+        channels_first: bool = True,
+        tile_size: int | tuple[int, int, int] = 64,
+        return_probabilities: bool = False,
+    ) -> dict[str, torch.Tensor]:
+        """Return label maps instead of logits for the enabled outputs. The heads are applied one tile of the fused
+        features at a time and their logits are reduced immediately, so the logits of all classes never exist for the
+        full volume. Should be used in eval mode.
+
+        Args:
+            features: List of feature maps from the FPN. {INPUT_3D_DOC}
+            fusion_shape: Desired output shape for the feature fusion. If None and not specified in the config, the
+                highest shape of the highest resolution feature map is used.
+            channels_first: {CHANNELS_FIRST_DOC}
+            tile_size: Size of the tiles of the fused features on which logits are computed at once.
+            return_probabilities: Whether to return the softmax probabilities of the predicted classes too.
+
+        Returns:
+            A dictionary of label maps of shape (b, d1, h1, w1) for each output type. If ``return_probabilities`` is
+            True, the float16 probabilities of the predicted classes are added with a ``_probabilities`` suffix.
+        """
+        features = self._fpn_features(features, channels_first)
+        # [(b, fpn_dim, d1, h1, w1), (b, fpn_dim, d2, h2, w2), ...]
+
+        output = {}
+
+        if self.fusion is not None:
+            fused_features = self.fusion(features, fusion_shape)
+            # (b, fpn_dim, d1, h1, w1)
+
+            # Every convolution of the head needs context around every tile
+            halo = [0, 0, 0]
+            for block in self.object_head:
+                halo = [h + kernel_size // 2 for h, kernel_size in zip(halo, block.conv.kernel_size)]
+
+            object_labels = tiled_argmax(self.object_head, fused_features, tile_size, halo, 1, return_probabilities)
+            # (b, d1, h1, w1)
+
+            if return_probabilities:
+                object_labels, output["object_probabilities"] = object_labels
+            output["object"] = object_labels
+
+        return output
@@ -28,6 +28,7 @@ from vision_architectures.layers.embeddings import (
 )
 from ..utils.activation_checkpointing import ActivationCheckpointing
 from ..utils.custom_base_model import Field
+from ..utils.intermediates import CaptureIntermediatesPolicy, get_capture_indices
 from ..utils.rearrange import rearrange_channels
 
 # %% ../../nbs/nets/04_vit_3d.ipynb #4318d302
@@ -83,6 +84,7 @@ class ViT3DEncoder(nn.Module, PyTorchModelHubMixin):
         channels_first: bool = True,
         query_grid_shape: tuple[int, int, int] | None = None,
         key_grid_shape: tuple[int, int, int] | None = None,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | tuple[torch.Tensor, list[torch.Tensor]]:
         """Pass the input embeddings through the ViT encoder (self attention).
 
@@ -92,6 +94,7 @@ class ViT3DEncoder(nn.Module, PyTorchModelHubMixin):
             channels_first: {CHANNELS_FIRST_DOC}
             query_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
             key_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC}
 
         Returns:
             {OUTPUT_3D_OR_1D_DOC} If `return_intermediates` is True, returns a tuple of the output embeddings and a list of
@@ -104,13 +107,17 @@ class ViT3DEncoder(nn.Module, PyTorchModelHubMixin):
             # (b, z, y, x, dim)
 
         layer_outputs = []
-        for encoder_layer in self.layers:
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.layers)
+        )
+        for i, encoder_layer in enumerate(self.layers):
             embeddings = encoder_layer(
                 qkv=embeddings, channels_first=False, query_grid_shape=query_grid_shape, key_grid_shape=key_grid_shape
             )
             # (b, T, dim) or (b, z, y, x, dim)
 
-            layer_outputs.append(embeddings)
+            if i in capture_indices:
+                layer_outputs.append(embeddings)
 
         if embeddings.ndim == 5:
             embeddings = rearrange_channels(embeddings, False, channels_first)
@@ -160,6 +167,7 @@ class ViT3DDecoder(nn.Module, PyTorchModelHubMixin):
         channels_first: bool = True,
         q_grid_shape: tuple[int, int, int] | None = None,
         kv_grid_shape: tuple[int, int, int] | None = None,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> torch.Tensor | tuple[torch.Tensor, list[torch.Tensor]]:
         """Pass the input embeddings through the ViT decoder (self attention + cross attention).
 
@@ -170,6 +178,7 @@ class ViT3DDecoder(nn.Module, PyTorchModelHubMixin):
             channels_first: {CHANNELS_FIRST_DOC}
             q_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
             kv_grid_shape: {ROTARY_POSITION_EMBEDDINGS_GRID_SHAPE_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC}
 
         Returns:
             {OUTPUT_3D_OR_1D_DOC} If `return_intermediates` is True, returns a tuple of the output embeddings and a
@@ -187,7 +196,10 @@ class ViT3DDecoder(nn.Module, PyTorchModelHubMixin):
         embeddings = q
 
         layer_outputs = []
-        for decoder_layer in self.layers:
+        capture_indices = get_capture_indices(
+            capture_intermediates if return_intermediates else "none", len(self.layers)
+        )
+        for i, decoder_layer in enumerate(self.layers):
             embeddings = decoder_layer(
                 q=embeddings,
                 kv=kv,
@@ -197,7 +209,8 @@ class ViT3DDecoder(nn.Module, PyTorchModelHubMixin):
             )
             # (b, T, dim) or (b, q_z, q_y, q_x, dim)
 
-            layer_outputs.append(embeddings)
+            if i in capture_indices:
+                layer_outputs.append(embeddings)
 
         if embeddings.ndim == 5:
             embeddings = rearrange_channels(embeddings, False, channels_first)
@@ -249,6 +262,7 @@ class ViT3DEncoderWithPatchEmbeddings(nn.Module, PyTorchModelHubMixin):
         spacings: torch.Tensor | None = None,
         channels_first: bool = True,
         return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> tuple[torch.Tensor, list[torch.Tensor]] | tuple[torch.Tensor, list[torch.Tensor], list[torch.Tensor]]:
         """Patchify the input datapoint and then pass through the ViT encoder (self attention).
 
@@ -257,6 +271,7 @@ class ViT3DEncoderWithPatchEmbeddings(nn.Module, PyTorchModelHubMixin):
             spacings: {SPACINGS_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC}
 
         Returns:
             {OUTPUT_3D_DOC} If `return_intermediates` is True, returns a tuple of the output embeddings and a list of
@@ -285,7 +300,12 @@ class ViT3DEncoderWithPatchEmbeddings(nn.Module, PyTorchModelHubMixin):
             embeddings = torch.cat([class_tokens, embeddings], dim=1)
             # (b, num_class_tokens + num_tokens, dim)
 
-        encoded, layer_outputs = self.encoder(embeddings, return_intermediates=True, query_grid_shape=query_grid_shape)
+        encoded, layer_outputs = self.encoder(
+            embeddings,
+            return_intermediates=True,
+            query_grid_shape=query_grid_shape,
+            capture_intermediates=capture_intermediates if return_intermediates else "none",
+        )
         # encoded: (b, (num_class_tokens +) num_tokens, dim)
         # layer_outputs: list of (b, (num_class_tokens +) num_tokens, dim)
 
@@ -336,6 +356,7 @@ class ViT3DDecoderWithPatchEmbeddings(nn.Module, PyTorchModelHubMixin):
         spacings: torch.Tensor | None = None,
         channels_first: bool = True,
         return_intermediates: bool = False,
+        capture_intermediates: CaptureIntermediatesPolicy = "all",
     ) -> tuple[torch.Tensor, list[torch.Tensor]] | tuple[torch.Tensor, list[torch.Tensor], list[torch.Tensor]]:
         """Patchify the input datapoint and then pass through the ViT encoder (self attention).
 
@@ -345,6 +366,7 @@ class ViT3DDecoderWithPatchEmbeddings(nn.Module, PyTorchModelHubMixin):
             spacings: {SPACINGS_DOC}
             channels_first: {CHANNELS_FIRST_DOC}
             return_intermediates: {RETURN_INTERMEDIATES_DOC}
+            capture_intermediates: {CAPTURE_INTERMEDIATES_DOC}
 
         Returns:
             {OUTPUT_3D_DOC} If `return_intermediates` is True, returns a tuple of the output embeddings and a list of
@@ -380,7 +402,12 @@ class ViT3DDecoderWithPatchEmbeddings(nn.Module, PyTorchModelHubMixin):
             # (b, num_class_tokens + num_q_tokens, dim)
 
         encoded, layer_outputs = self.decoder(
-            q=embeddings, kv=kv, return_intermediates=True, q_grid_shape=q_grid_shape, kv_grid_shape=kv_grid_shape
+            q=embeddings,
+            kv=kv,
+            return_intermediates=True,
+            q_grid_shape=q_grid_shape,
+            kv_grid_shape=kv_grid_shape,
+            capture_intermediates=capture_intermediates if return_intermediates else "none",
         )
         # encoded: (b, (num_class_tokens +) num_q_tokens, dim)
         # layer_outputs: list of (b, (num_class_tokens +) num_q_tokens, dim)
@@ -0,0 +1,358 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/utils/16_bbox_ops.ipynb.
+
+# %% auto #0
+__all__ = ['BBoxMode', 'convert_bboxes', 'bbox_iou', 'bbox_giou', 'pairwise_bbox_iou', 'pairwise_bbox_giou', 'batched_nms',
+           'weighted_box_fusion']
+
+# %% ../../nbs/utils/16_bbox_ops.ipynb #6b2e9d14
+from typing import Literal
+
+import torch
+
+# %% ../../nbs/utils/16_bbox_ops.ipynb #c41f7a08
+BBoxMode = Literal["cccwhd", "xyzxyz", "ccwh", "xyxy"]
+
+
+def _to_corners(bboxes: torch.Tensor, mode: BBoxMode) -> tuple[torch.Tensor, torch.Tensor]:
+    # Minimum and maximum corners of the bounding boxes, computed in at least float32 precision
+    if mode not in ("cccwhd", "xyzxyz", "ccwh", "xyxy"):
+        raise ValueError(f"Invalid mode: {mode}. Should be one of cccwhd, xyzxyz, ccwh, xyxy.")
+    num_dims = len(mode) // 2
+    if bboxes.shape[-1] != 2 * num_dims:
+        raise ValueError(f"Bounding boxes in {mode} mode must have {2 * num_dims} parameters, got {bboxes.shape[-1]}")
+
+    bboxes = bboxes.to(torch.promote_types(bboxes.dtype, torch.float32))
+    if mode in ("cccwhd", "ccwh"):
+        centers, sizes = bboxes[..., :num_dims], bboxes[..., num_dims:]
+        return centers - sizes / 2, centers + sizes / 2
+    return bboxes[..., :num_dims], bboxes[..., num_dims:]
+
+
+def _from_corners(mins: torch.Tensor, maxs: torch.Tensor, mode: BBoxMode) -> torch.Tensor:
+    if mode in ("cccwhd", "ccwh"):
+        return torch.cat([(mins + maxs) / 2, maxs - mins], dim=-1)
+    return torch.cat([mins, maxs], dim=-1)
+
+
+def _overlaps(
+    mins1: torch.Tensor, maxs1: torch.Tensor, mins2: torch.Tensor, maxs2: torch.Tensor, generalized: bool
+) -> torch.Tensor:
+    # IoUs (or GIoUs) between boxes given by their corners. All leading dimensions are broadcast, so pairwise overlaps
+    # are obtained by unsqueezing the inputs appropriately.
+    eps = torch.finfo(mins1.dtype).eps
+
+    volumes1 = (maxs1 - mins1).clamp(min=0).prod(dim=-1)
+    volumes2 = (maxs2 - mins2).clamp(min=0).prod(dim=-1)
+    intersection = (torch.minimum(maxs1, maxs2) - torch.maximum(mins1, mins2)).clamp(min=0).prod(dim=-1)
+    union = volumes1 + volumes2 - intersection
+
+    ious = intersection / (union + eps)
+    if not generalized:
+        return ious
+
+    # Smallest enclosing box
+    enclosing = (torch.maximum(maxs1, maxs2) - torch.minimum(mins1, mins2)).clamp(min=0).prod(dim=-1)
+    return ious - (enclosing - union) / (enclosing + eps)
+
+# %% ../../nbs/utils/16_bbox_ops.ipynb #e8a3d5f1
+def convert_bboxes(bboxes: torch.Tensor, in_mode: BBoxMode, out_mode: BBoxMode) -> torch.Tensor:
+    """Convert bounding boxes between center-size and corner formats without going through MONAI.
+
+    Args:
+        bboxes: Tensor of shape ``(..., 6)`` or ``(..., 4)`` containing the bounding boxes.
+        in_mode: Format of the input bounding boxes. ``cccwhd`` and ``ccwh`` are (centers, sizes), ``xyzxyz`` and
+            ``xyxy`` are (minimum corner, maximum corner).
+        out_mode: Format of the output bounding boxes. Must have the same number of dimensions as ``in_mode``.
+
+    Returns:
+        Tensor of the same shape as ``bboxes`` containing the converted bounding boxes.
+    """
+    if len(in_mode) != len(out_mode):
+        raise ValueError(f"Cannot convert bounding boxes from {in_mode} to {out_mode}")
+    if in_mode == out_mode:
+        return bboxes
+    return _from_corners(*_to_corners(bboxes, in_mode), out_mode)
+
+
+def bbox_iou(bboxes1: torch.Tensor, bboxes2: torch.Tensor, mode: BBoxMode = "cccwhd") -> torch.Tensor:
+    """Compute the IoUs between matched pairs of bounding boxes.
+
+    Args:
+        bboxes1: Tensor of shape ``(..., 6)`` or ``(..., 4)`` containing the first bounding boxes.
+        bboxes2: Tensor broadcastable with ``bboxes1`` containing the second bounding boxes.
+        mode: Format of the bounding boxes. One of ``cccwhd``, ``xyzxyz``, ``ccwh`` or ``xyxy``.
+
+    Returns:
+        Tensor of shape ``(...)`` containing the IoU of every pair.
+    """
+    return _overlaps(*_to_corners(bboxes1, mode), *_to_corners(bboxes2, mode), generalized=False)
+
+
+def bbox_giou(bboxes1: torch.Tensor, bboxes2: torch.Tensor, mode: BBoxMode = "cccwhd") -> torch.Tensor:
+    """Compute the Generalized IoUs between matched pairs of bounding boxes.
+
+    Args:
+        bboxes1: Tensor of shape ``(..., 6)`` or ``(..., 4)`` containing the first bounding boxes.
+        bboxes2: Tensor broadcastable with ``bboxes1`` containing the second bounding boxes.
+        mode: Format of the bounding boxes. One of ``cccwhd``, ``xyzxyz``, ``ccwh`` or ``xyxy``.
+
+    Returns:
+        Tensor of shape ``(...)`` containing the GIoU of every pair.
+    """
+    return _overlaps(*_to_corners(bboxes1, mode), *_to_corners(bboxes2, mode), generalized=True)
+
+
+def _pairwise_overlaps(
+    bboxes1: torch.Tensor,
+    bboxes2: torch.Tensor,
+    mode: BBoxMode,
+    mask1: torch.Tensor | None,
+    mask2: torch.Tensor | None,
+    generalized: bool,
+) -> torch.Tensor:
+    mins1, maxs1 = _to_corners(bboxes1.unsqueeze(-2), mode)
+    # (..., N, 1, d) each
+    mins2, maxs2 = _to_corners(bboxes2.unsqueeze(-3), mode)
+    # (..., 1, M, d) each
+    overlaps = _overlaps(mins1, maxs1, mins2, maxs2, generalized)
+    # (..., N, M)
+
+    # Pairs involving padding get the lowest possible value
+    if mask1 is not None:
+        overlaps = overlaps.masked_fill(~mask1.unsqueeze(-1), -1.0 if generalized else 0.0)
+    if mask2 is not None:
+        overlaps = overlaps.masked_fill(~mask2.unsqueeze(-2), -1.0 if generalized else 0.0)
+
+    return overlaps
+
+
+def pairwise_bbox_iou(
+    bboxes1: torch.Tensor,
+    bboxes2: torch.Tensor,
+    mode: BBoxMode = "cccwhd",
+    mask1: torch.Tensor | None = None,
+    mask2: torch.Tensor | None = None,
+) -> torch.Tensor:
+    """Compute the IoUs between all combinations of two sets of bounding boxes, for any number of batch dimensions at
+    once.
+
+    Args:
+        bboxes1: Tensor of shape ``(..., N, 6)`` or ``(..., N, 4)`` containing the first set of bounding boxes.
+        bboxes2: Tensor of shape ``(..., M, 6)`` or ``(..., M, 4)`` containing the second set of bounding boxes.
+        mode: Format of the bounding boxes. One of ``cccwhd``, ``xyzxyz``, ``ccwh`` or ``xyxy``.
+        mask1: Boolean tensor of shape ``(..., N)``. Boxes that are False are treated as padding, e.g. when batching
+            images with different numbers of boxes, and have an IoU of 0 with every box. If None, all boxes are valid.
+        mask2: Boolean tensor of shape ``(..., M)``, same as ``mask1`` for the second set of bounding boxes.
+
+    Returns:
+        Tensor of shape ``(..., N, M)`` containing the IoUs of all combinations.
+    """
+    return _pairwise_overlaps(bboxes1, bboxes2, mode, mask1, mask2, generalized=False)
+
+
+def pairwise_bbox_giou(
+    bboxes1: torch.Tensor,
+    bboxes2: torch.Tensor,
+    mode: BBoxMode = "cccwhd",
+    mask1: torch.Tensor | None = None,
+    mask2: torch.Tensor | None = None,
+) -> torch.Tensor:
+    """Compute the Generalized IoUs between all combinations of two sets of bounding boxes, for any number of batch
+    dimensions at once.
+
+    Args:
+        bboxes1: Tensor of shape ``(..., N, 6)`` or ``(..., N, 4)`` containing the first set of bounding boxes.
+        bboxes2: Tensor of shape ``(..., M, 6)`` or ``(..., M, 4)`` containing the second set of bounding boxes.
+        mode: Format of the bounding boxes. One of ``cccwhd``, ``xyzxyz``, ``ccwh`` or ``xyxy``.
+        mask1: Boolean tensor of shape ``(..., N)``. Boxes that are False are treated as padding, e.g. when batching
+            images with different numbers of boxes, and have a GIoU of -1 with every box. If None, all boxes are valid.
+        mask2: Boolean tensor of shape ``(..., M)``, same as ``mask1`` for the second set of bounding boxes.
+
+    Returns:
+        Tensor of shape ``(..., N, M)`` containing the GIoUs of all combinations.
+    """
+    return _pairwise_overlaps(bboxes1, bboxes2, mode, mask1, mask2, generalized=True)
+
+# %% ../../nbs/utils/16_bbox_ops.ipynb #9d0b6c24
+def _sort_by_scores(
+    bboxes: torch.Tensor, scores: torch.Tensor, classes: torch.Tensor | None, mask: torch.Tensor
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor | None, torch.Tensor, torch.Tensor]:
+    # Sort boxes of every batch element by descending score. Padding is moved to the end and ties keep their order.
+    order = scores.masked_fill(~mask, -torch.inf).argsort(dim=1, descending=True, stable=True)
+    # (B, N)
+    bboxes = bboxes.gather(1, order.unsqueeze(-1).expand_as(bboxes))
+    scores = scores.gather(1, order)
+    if classes is not None:
+        classes = classes.gather(1, order)
+    mask = mask.gather(1, order)
+    return bboxes, scores, classes, mask, order
+
+
+def batched_nms(
+    bboxes: torch.Tensor,
+    scores: torch.Tensor,
+    iou_threshold: float,
+    classes: torch.Tensor | None = None,
+    mask: torch.Tensor | None = None,
+    mode: BBoxMode = "cccwhd",
+    max_outputs: int | None = None,
+) -> torch.Tensor:
+    """Greedy non-maximum suppression for a batch of images at once, without any device synchronization. Boxes are
+    considered in descending order of their scores, and a box is suppressed if it overlaps a kept box of the same class
+    with an IoU above ``iou_threshold``.
+
+    Args:
+        bboxes: Tensor of shape ``(B, N, 6)`` or ``(N, 6)`` (or 4 instead of 6 for 2D) containing the bounding boxes.
+        scores: Tensor of shape ``(B, N)`` or ``(N,)`` containing the confidence scores of the bounding boxes.
+        iou_threshold: Boxes overlapping a kept box with an IoU greater than this are suppressed.
+        classes: Tensor of shape ``(B, N)`` or ``(N,)`` containing the class of every bounding box. Boxes only suppress
+            boxes of the same class. If None, suppression is class agnostic.
+        mask: Boolean tensor of shape ``(B, N)`` or ``(N,)``. Boxes that are False are treated as padding and are never
+            kept. If None, all boxes are valid.
+        mode: Format of the bounding boxes. One of ``cccwhd``, ``xyzxyz``, ``ccwh`` or ``xyxy``.
+        max_outputs: If not None, keep at most these many boxes per batch element (the ones with the highest scores).
+
+    Returns:
+        Boolean tensor of the same shape as ``scores`` which is True for the boxes that are kept.
+    """
+    is_unbatched = scores.ndim == 1
+    if is_unbatched:
+        bboxes = bboxes.unsqueeze(0)
+        scores = scores.unsqueeze(0)
+        classes = classes.unsqueeze(0) if classes is not None else None
+        mask = mask.unsqueeze(0) if mask is not None else None
+    if mask is None:
+        mask = torch.ones_like(scores, dtype=torch.bool)
+
+    B, N = scores.shape
+
+    bboxes, scores, classes, mask, order = _sort_by_scores(bboxes, scores, classes, mask)
+    # (B, N, 6), (B, N), (B, N), (B, N), (B, N)
+
+    is_suppressing = pairwise_bbox_iou(bboxes, bboxes, mode) > iou_threshold
+    if classes is not None:
+        is_suppressing &= classes.unsqueeze(2) == classes.unsqueeze(1)
+    # (B, N, N)
+
+    # When box i is reached, whether it is kept is final, so it can suppress the lower scored boxes
+    keep = mask.clone()
+    for i in range(N - 1):
+        keep[:, i + 1 :] &= ~(is_suppressing[:, i, i + 1 :] & keep[:, i : i + 1])
+    if max_outputs is not None:
+        keep &= keep.cumsum(dim=1) <= max_outputs
+    # (B, N)
+
+    # Back to the original order
+    keep = torch.zeros_like(keep).scatter_(1, order, keep)
+
+    if is_unbatched:
+        keep = keep.squeeze(0)
+    return keep
+
+# %% ../../nbs/utils/16_bbox_ops.ipynb #f27c4e90
+def weighted_box_fusion(
+    bboxes: torch.Tensor,
+    scores: torch.Tensor,
+    iou_threshold: float = 0.55,
+    classes: torch.Tensor | None = None,
+    mask: torch.Tensor | None = None,
+    mode: BBoxMode = "cccwhd",
+    num_sources: int | None = None,
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor | None, torch.Tensor]:
+    """Weighted box fusion (WBF) for a batch of images at once, without any device synchronization. Unlike NMS, which
+    discards overlapping boxes, WBF merges them: boxes are considered in descending order of their scores and are added
+    to the cluster of the same class whose fused box overlaps them the most with an IoU above ``iou_threshold``, or
+    start a new cluster otherwise. Fused boxes are the score weighted averages of the corners of the boxes in the
+    cluster. This is useful to combine predictions from overlapping tiles or from multiple models.
+
+    Args:
+        bboxes: Tensor of shape ``(B, N, 6)`` or ``(N, 6)`` (or 4 instead of 6 for 2D) containing the bounding boxes.
+        scores: Tensor of shape ``(B, N)`` or ``(N,)`` containing the confidence scores of the bounding boxes.
+        iou_threshold: Boxes overlapping a fused box with an IoU greater than this are fused into it.
+        classes: Tensor of shape ``(B, N)`` or ``(N,)`` containing the class of every bounding box. Only boxes of the
+            same class are fused. If None, fusion is class agnostic.
+        mask: Boolean tensor of shape ``(B, N)`` or ``(N,)``. Boxes that are False are treated as padding and are
+            ignored. If None, all boxes are valid.
+        mode: Format of the bounding boxes. One of ``cccwhd``, ``xyzxyz``, ``ccwh`` or ``xyxy``.
+        num_sources: Number of sources (e.g. models or overlapping tiles) that can predict the same object. If not None,
+            scores of clusters with fewer than these many boxes are scaled down proportionally.
+
+    Returns:
+        A tuple of fused bounding boxes, fused scores, fused classes (None if ``classes`` is None) and a boolean mask,
+        with the same shapes as the inputs. Fused boxes occupy the first positions of every batch element in
+        descending order of their highest scores, and the mask is False for the remaining (padding) positions.
+    """
+    is_unbatched = scores.ndim == 1
+    if is_unbatched:
+        bboxes = bboxes.unsqueeze(0)
+        scores = scores.unsqueeze(0)
+        classes = classes.unsqueeze(0) if classes is not None else None
+        mask = mask.unsqueeze(0) if mask is not None else None
+    if mask is None:
+        mask = torch.ones_like(scores, dtype=torch.bool)
+
+    B, N = scores.shape
+    device = scores.device
+
+    bboxes, scores, classes, mask, _ = _sort_by_scores(bboxes, scores, classes, mask)
+    mins, maxs = _to_corners(bboxes, mode)
+    corners = torch.cat([mins, maxs], dim=-1)
+    scores = scores.to(corners.dtype)
+    d = mins.shape[-1]
+    eps = torch.finfo(corners.dtype).eps
+    # (B, N, 2d), (B, N)
+
+    weighted_corners_sums = torch.zeros_like(corners)
+    scores_sums = torch.zeros_like(scores)
+    counts = torch.zeros((B, N), dtype=torch.long, device=device)
+    fused_classes = torch.zeros_like(classes) if classes is not None else None
+    num_clusters = torch.zeros(B, dtype=torch.long, device=device)
+    batch_indices = torch.arange(B, device=device)
+    # (B, N, 2d), (B, N), (B, N), (B, N), (B,), (B,)
+
+    for i in range(N):
+        fused_corners = weighted_corners_sums / scores_sums.clamp(min=eps).unsqueeze(-1)
+        ious = _overlaps(
+            fused_corners[..., :d],
+            fused_corners[..., d:],
+            corners[:, i : i + 1, :d],
+            corners[:, i : i + 1, d:],
+            generalized=False,
+        )
+        is_candidate = (counts > 0) & (ious > iou_threshold)
+        if classes is not None:
+            is_candidate &= fused_classes == classes[:, i : i + 1]
+        # (B, N)
+
+        # Add to the best matching cluster or start a new one. Padding boxes contribute nothing.
+        has_match = is_candidate.any(dim=1)
+        clusters = torch.where(has_match, ious.masked_fill(~is_candidate, -1.0).argmax(dim=1), num_clusters)
+        is_valid = mask[:, i]
+        is_new = is_valid & ~has_match
+        # (B,)
+
+        weights = scores[:, i] * is_valid
+        weighted_corners_sums[batch_indices, clusters] += weights.unsqueeze(-1) * corners[:, i]
+        scores_sums[batch_indices, clusters] += weights
+        counts[batch_indices, clusters] += is_valid.long()
+        if classes is not None:
+            fused_classes[batch_indices, clusters] = torch.where(
+                is_new, classes[:, i], fused_classes[batch_indices, clusters]
+            )
+        num_clusters += is_new.long()
+
+    fused_mask = counts > 0
+    fused_corners = weighted_corners_sums / scores_sums.clamp(min=eps).unsqueeze(-1)
+    fused_bboxes = _from_corners(fused_corners[..., :d], fused_corners[..., d:], mode)
+    fused_bboxes = fused_bboxes.masked_fill(~fused_mask.unsqueeze(-1), 0.0)
+    fused_scores = scores_sums / counts.clamp(min=1)
+    if num_sources is not None:
+        fused_scores = fused_scores * counts.clamp(max=num_sources) / num_sources
+    # (B, N, 2d), (B, N)
+
+    if is_unbatched:
+        fused_bboxes = fused_bboxes.squeeze(0)
+        fused_scores = fused_scores.squeeze(0)
+        fused_classes = fused_classes.squeeze(0) if fused_classes is not None else None
+        fused_mask = fused_mask.squeeze(0)
+    return fused_bboxes, fused_scores, fused_classes, fused_mask
@@ -1,69 +1,83 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/utils/11_bounding_boxes.ipynb.
 
 # %% auto #0
-__all__ = ['get_tps_fps_fns']
+__all__ = ['BBoxMatching', 'match_bboxes', 'get_tps_fps_fns']
 
 # %% ../../nbs/utils/11_bounding_boxes.ipynb #718d4b11
-from typing import Literal
+from collections.abc import Sequence
+from typing import Literal, NamedTuple
 
+import numpy as np
 import torch
-from monai.data.box_utils import box_iou
 from scipy.optimize import linear_sum_assignment
+from torch.nn.utils.rnn import pad_sequence
+
+from .bbox_ops import pairwise_bbox_iou
 
 # %% ../../nbs/utils/11_bounding_boxes.ipynb #a0bc5f4f
-class _IndexedConfidenceScore:
-    def __init__(self, confidence: float, batch_index: int, offset_index: int, class_index: int | None = None):
-        self.confidence = confidence
-        self.batch_index = batch_index
-        self.offset_index = offset_index
-        self.class_index = class_index
-
-    @classmethod
-    def from_batch(cls, confidence_scores: torch.Tensor, batch_index: int, class_index: int | None = None):
-        return [
-            cls(
-                confidence=confidence_scores[i].detach().cpu().item(),
-                batch_index=batch_index,
-                offset_index=i,
-                class_index=class_index,
-            )
-            for i in range(len(confidence_scores))
-        ]
-
-    def __gt__(self, other: "_IndexedConfidenceScore"):
-        return self.confidence > other.confidence
-
-    def __lt__(self, other: "_IndexedConfidenceScore"):
-        return self.confidence < other.confidence
-
-    def __ge__(self, other: "_IndexedConfidenceScore"):
-        return self.confidence >= other.confidence
-
-    def __le__(self, other: "_IndexedConfidenceScore"):
-        return self.confidence <= other.confidence
-
-    def __repr__(self):
-        _repr = f"_IndexedConfidenceScore(confidence={self.confidence}, batch_index={self.batch_index}, offset_index={self.offset_index})"
-        if self.class_index is not None:
-            _repr += f", class_index={self.class_index}"
-        return _repr
+class BBoxMatching(NamedTuple):
+    """Matching of predicted bounding boxes to target bounding boxes across a batch. Every array has one entry per
+    considered prediction, in the order in which predictions are considered i.e. by descending confidence score. If
+    the matching was done for multiple IOU thresholds at once, the arrays that depend on the threshold have an
+    additional leading dimension for the thresholds.
 
-# %% ../../nbs/utils/11_bounding_boxes.ipynb #48f6af72
-def get_tps_fps_fns(
+    Attributes:
+        batch_indices: Batch index of every prediction.
+        pred_indices: Index of every prediction within its batch element.
+        target_indices: Index of the target box matched to every prediction within its batch element, or -1 if the
+            prediction is a false positive. Depends on the threshold.
+        confidence_scores: Confidence score of every prediction.
+        cumulative_tps: Number of true positives after every prediction is considered. Depends on the threshold.
+        cumulative_fps: Number of false positives after every prediction is considered. Depends on the threshold.
+        cumulative_fns: Number of false negatives after every prediction is considered. Depends on the threshold.
+        num_targets: Number of target boxes in every batch element.
+    """
+
+    batch_indices: np.ndarray
+    pred_indices: np.ndarray
+    target_indices: np.ndarray
+    confidence_scores: np.ndarray
+    cumulative_tps: np.ndarray
+    cumulative_fps: np.ndarray
+    cumulative_fns: np.ndarray
+    num_targets: np.ndarray
+
+
+def _greedy_match(ious: np.ndarray, iou_thresholds: np.ndarray) -> np.ndarray:
+    # COCO-style greedy matching, done for all IOU thresholds at once. Predictions, in the order of rows of ious, are
+    # matched to the unmatched target with the highest IOU above the threshold. Returns the matched target of every
+    # prediction (or -1) for every threshold.
+    T = len(iou_thresholds)
+    threshold_indices = np.arange(T)
+
+    matches = np.full((T, ious.shape[0]), -1, dtype=np.int64)
+    is_taken = np.zeros((T, ious.shape[1]), dtype=bool)
+    # (T, NP), (T, NT)
+
+    # Predictions without any target above the lowest threshold can never be matched, so they are skipped
+    for p in np.flatnonzero((ious >= iou_thresholds.min()).any(axis=1)):
+        pred_ious = np.where(is_taken | (ious[p] < iou_thresholds[:, None]), -1.0, ious[p])
+        # (T, NT)
+        t = pred_ious.argmax(axis=1)
+        is_matched = pred_ious[threshold_indices, t] >= 0.0
+        # (T,)
+        matches[is_matched, p] = t[is_matched]
+        is_taken[threshold_indices[is_matched], t[is_matched]] = True
+
+    return matches
+
+# %% ../../nbs/utils/11_bounding_boxes.ipynb #3c5e8d21
+def match_bboxes(
     pred_bboxes: list[torch.Tensor],
     pred_confidence_scores: list[torch.Tensor],
     target_bboxes: list[torch.Tensor],
-    iou_threshold: float,
+    iou_threshold: float | Sequence[float],
     matching_method: Literal["coco", "hungarian"] = "coco",
     min_confidence_threshold: float = 0.0,
     max_bboxes_per_image: int | None = None,
-    return_intermediate_counts: bool = False,
-) -> (
-    tuple[set[tuple[int, int, int]], set[tuple[int, int]], set[tuple[int, int]]]
-    | tuple[set, set, set, list[tuple[int, int, int]]]
-):
-    """Given predicted and target bounding boxes, their confidence scores, and an IOU threshold, get a matching of
-    true positives, and a set of false positives and false negatives.
+) -> BBoxMatching:
+    """Given predicted and target bounding boxes, their confidence scores, and an IOU threshold, match predicted boxes
+    to target boxes. Predictions are considered in descending order of their confidence scores across the batch.
 
     Args:
         pred_bboxes: A list of length B containing tensors of shape (NP, 4) or (NP, 6) containing the predicted bounding
@@ -72,23 +86,19 @@ def get_tps_fps_fns(
             scores for the corresponding bounding boxes.
         target_bboxes: A list of length B containing tensors of shape (NT, 4) or (NT, 6) containing the target bounding
             box parameters in xyxy or xyzxyz format.
-        iou_threshold: The IOU threshold above which a predicted box is considered a match for a target box.
+        iou_threshold: The IOU threshold above which a predicted box is considered a match for a target box. If a
+            sequence of thresholds is provided, matching is done for all of them at once, reusing the IOUs and the
+            order of predictions.
         matching_method: The method to use for matching predicted boxes to target boxes. 'coco' implements the greedy
             matching algorithm used in the COCO dataset. 'hungarian' implements the Hungarian algorithm for optimal
             matching. Note that 'hungarian' is more computationally expensive and may not scale well to large numbers of
             boxes.
         min_confidence_threshold: Minimum confidence score for a predicted box to be considered for matching.
         max_bboxes_per_image: If not None, consider only the top K predicted boxes per image based on confidence scores.
-        return_intermediate_counts: Whether to return intermediate counts of true positives, false positives and false
-            negatives after each prediction is considered. Useful for plotting precision-recall curves.
 
     Returns:
-        The first set contains tuples of (b, p, t) where b is the batch index, p is the index of the predicted box
-        and t is the index of the matched target box. The second set contains tuples of (b, p) where b is the batch
-        index and p is the index of the false positive predicted box. The third set contains tuples of (b, t) where b
-        is the batch index and t is the index of the false negative target box.
-        If `return_intermediate_counts` is True, also returns a list of tuples of (TP, FP, FN) counts after each
-        prediction.
+        The matching of all considered predictions as a BBoxMatching of NumPy arrays. Arrays that depend on the IOU
+        threshold have a leading dimension of the number of thresholds if a sequence of thresholds was provided.
     """
     assert (
         len(pred_bboxes) == len(pred_confidence_scores) == len(target_bboxes)
@@ -106,84 +116,167 @@ def get_tps_fps_fns(
     ), "Target bounding boxes must have shape (NT, 4) or (NT, 6)."
 
     B = len(pred_bboxes)
+    is_single_threshold = np.ndim(iou_threshold) == 0
+    iou_thresholds = np.atleast_1d(np.asarray(iou_threshold, dtype=np.float64))
+    T = len(iou_thresholds)
 
-    # Join all confidence scores and keep track of which batch and which box they correspond to
-    all_pred_confidence_scores = []
-    for b in range(B):
-        _confidence_scores = _IndexedConfidenceScore.from_batch(pred_confidence_scores[b], batch_index=b)
-        if max_bboxes_per_image is not None and len(_confidence_scores) > max_bboxes_per_image:
-            _confidence_scores = sorted(_confidence_scores, reverse=True)[:max_bboxes_per_image]
-        all_pred_confidence_scores.extend(_confidence_scores)
-    all_pred_confidence_scores = sorted(all_pred_confidence_scores, reverse=True)
-
-    # Calculate IOUs between all predicted and target boxes
-    ious = []
-    hungarian_matchings = []
+    # Calculate IOUs between all predicted and target boxes of all batch elements at once, with a single copy to the CPU
+    all_ious = np.empty((B, 0, 0), dtype=np.float32)
+    if B > 0:
+        mode = "xyzxyz" if pred_bboxes[0].shape[1] == 6 else "xyxy"
+        all_ious = pairwise_bbox_iou(
+            pad_sequence(list(pred_bboxes), batch_first=True),
+            pad_sequence(list(target_bboxes), batch_first=True),
+            mode=mode,
+        )
+        all_ious = all_ious.detach().cpu().numpy()
+    # (B, max NP, max NT)
+
+    # Match every batch element independently, as matching only depends on the order of predictions within an element
+    batch_indices = [np.empty(0, dtype=np.int64)]
+    pred_indices = [np.empty(0, dtype=np.int64)]
+    target_indices = [np.empty((T, 0), dtype=np.int64)]
+    confidence_scores = [np.empty(0, dtype=np.float64)]
     for b in range(B):
-        _ious = box_iou(pred_bboxes[b], target_bboxes[b])
-        ious.append(_ious)
+        _confidence_scores = pred_confidence_scores[b].detach().cpu().double().numpy()
+        # (NP,)
+
+        # Sort predictions by descending confidence score, keeping the original order for ties
+        order = np.argsort(-_confidence_scores, kind="stable")
+        if max_bboxes_per_image is not None:
+            order = order[:max_bboxes_per_image]
+        # Do not consider predictions if confidence score is below threshold
+        order = order[_confidence_scores[order] >= min_confidence_threshold]
+        # (NP',)
+
+        ious = all_ious[b, : pred_bboxes[b].shape[0], : target_bboxes[b].shape[0]]
         # (NP, NT), where NP is number of predicted boxes and NT is number of target boxes
 
-        if matching_method == "hungarian":
-            if _ious.numel() > 0:
-                # Calculate optimal matching using Hungarian algorithm
-                _matching = linear_sum_assignment(-_ious.cpu().numpy())
-                hungarian_matchings.append(_matching)
-            else:
-                hungarian_matchings.append((torch.tensor([], dtype=torch.int64), torch.tensor([], dtype=torch.int64)))
-
-    matched_target_indices = [set() for _ in range(B)]
-    tps, fps, fns = set(), set(), {(b, i) for b in range(B) for i in range(len(target_bboxes[b]))}
-
-    # In descending order, update tp, fp, fn and calculate precision and recall at each step
-    intermediate_counts = []
-    for indexed_confidence_score in all_pred_confidence_scores:
-        confidence_score, b, pred_offset = (
-            indexed_confidence_score.confidence,
-            indexed_confidence_score.batch_index,
-            indexed_confidence_score.offset_index,
-        )
+        # Compare IOUs with thresholds in the precision of the IOUs
+        _iou_thresholds = iou_thresholds.astype(ious.dtype)
 
-        if confidence_score < min_confidence_threshold:
-            # Do not consider this and following predictions if confidence score is below threshold
-            break
-
-        if matching_method == "coco":
-            # COCO-style greedy matching
-            pred_ious: torch.Tensor = ious[b][pred_offset].clone()
-            # (NT,)
-
-            if pred_ious.numel() > 0:
-                if matched_target_indices[b]:
-                    # Exclude already matched target boxes
-                    pred_ious[list(matched_target_indices[b])] = -1.0
-                # Exclude target boxes below IOU threshold
-                pred_ious[pred_ious < iou_threshold] = -1.0
-
-            if pred_ious.numel() == 0 or pred_ious.amax() < 0.0:
-                # No valid target box to match with
-                fps.add((b, pred_offset))
-            else:
-                target_offset = pred_ious.argmax().item()
-                matched_target_indices[b].add(target_offset)
-                tps.add((b, pred_offset, target_offset))
-                fns.discard((b, target_offset))
-        else:
-            matched_pred_offsets, matched_target_offsets = hungarian_matchings[b]
-            if pred_offset in matched_pred_offsets:
-                target_offset_index = (matched_pred_offsets == pred_offset).nonzero()[0].item()
-                target_offset = matched_target_offsets[target_offset_index]
-                if ious[b][pred_offset, target_offset] >= iou_threshold:
-                    tps.add((b, pred_offset, target_offset))
-                    fns.discard((b, target_offset))
-                else:
-                    fps.add((b, pred_offset))
+        matches = np.full((T, len(order)), -1, dtype=np.int64)
+        if ious.size > 0 and len(order) > 0:
+            if matching_method == "coco":
+                matches = _greedy_match(ious[order], _iou_thresholds)
             else:
-                fps.add((b, pred_offset))
+                # Calculate optimal matching using Hungarian algorithm and keep matches above the IOU thresholds
+                matched_pred_offsets, matched_target_offsets = linear_sum_assignment(-ious)
+                pred_to_target = np.full(ious.shape[0], -1, dtype=np.int64)
+                pred_to_target[matched_pred_offsets] = matched_target_offsets
+                pred_to_target = pred_to_target[order]
+                # (NP',)
+                matched_ious = np.where(pred_to_target >= 0, ious[order, pred_to_target], -1.0)
+                matches = np.where(matched_ious >= _iou_thresholds[:, None], pred_to_target, -1)
+        # (T, NP')
+
+        batch_indices.append(np.full(len(order), b, dtype=np.int64))
+        pred_indices.append(order.astype(np.int64))
+        target_indices.append(matches)
+        confidence_scores.append(_confidence_scores[order])
+
+    batch_indices = np.concatenate(batch_indices)
+    pred_indices = np.concatenate(pred_indices)
+    target_indices = np.concatenate(target_indices, axis=1)
+    confidence_scores = np.concatenate(confidence_scores)
+
+    # Join all batch elements in descending order of confidence scores. Ties are resolved by batch index.
+    order = np.argsort(-confidence_scores, kind="stable")
+    batch_indices = batch_indices[order]
+    pred_indices = pred_indices[order]
+    target_indices = target_indices[:, order]
+    confidence_scores = confidence_scores[order]
 
-        if return_intermediate_counts:
-            intermediate_counts.append((len(tps), len(fps), len(fns)))
+    # Count tp, fp, fn after every prediction is considered
+    num_targets = np.array([target_bbox.shape[0] for target_bbox in target_bboxes], dtype=np.int64)
+    is_tp = target_indices >= 0
+    cumulative_tps = np.cumsum(is_tp, axis=1)
+    cumulative_fps = np.cumsum(~is_tp, axis=1)
+    cumulative_fns = num_targets.sum() - cumulative_tps
+    # (T, NP'')
+
+    if is_single_threshold:
+        target_indices = target_indices[0]
+        cumulative_tps = cumulative_tps[0]
+        cumulative_fps = cumulative_fps[0]
+        cumulative_fns = cumulative_fns[0]
+
+    return BBoxMatching(
+        batch_indices=batch_indices,
+        pred_indices=pred_indices,
+        target_indices=target_indices,
+        confidence_scores=confidence_scores,
+        cumulative_tps=cumulative_tps,
+        cumulative_fps=cumulative_fps,
+        cumulative_fns=cumulative_fns,
+        num_targets=num_targets,
+    )
+
+# %% ../../nbs/utils/11_bounding_boxes.ipynb #48f6af72
+def get_tps_fps_fns(
+    pred_bboxes: list[torch.Tensor],
+    pred_confidence_scores: list[torch.Tensor],
+    target_bboxes: list[torch.Tensor],
+    iou_threshold: float,
+    matching_method: Literal["coco", "hungarian"] = "coco",
+    min_confidence_threshold: float = 0.0,
+    max_bboxes_per_image: int | None = None,
+    return_intermediate_counts: bool = False,
+) -> (
+    tuple[set[tuple[int, int, int]], set[tuple[int, int]], set[tuple[int, int]]]
+    | tuple[set, set, set, list[tuple[int, int, int]]]
+):
+    """Given predicted and target bounding boxes, their confidence scores, and an IOU threshold, get a matching of
+    true positives, and a set of false positives and false negatives.
+
+    Args:
+        pred_bboxes: A list of length B containing tensors of shape (NP, 4) or (NP, 6) containing the predicted bounding
+            box parameters in xyxy or xyzxyz format.
+        pred_confidence_scores: A list of length B containing tensors of shape (NP,) containing the predicted confidence
+            scores for the corresponding bounding boxes.
+        target_bboxes: A list of length B containing tensors of shape (NT, 4) or (NT, 6) containing the target bounding
+            box parameters in xyxy or xyzxyz format.
+        iou_threshold: The IOU threshold above which a predicted box is considered a match for a target box.
+        matching_method: The method to use for matching predicted boxes to target boxes. 'coco' implements the greedy
+            matching algorithm used in the COCO dataset. 'hungarian' implements the Hungarian algorithm for optimal
+            matching. Note that 'hungarian' is more computationally expensive and may not scale well to large numbers of
+            boxes.
+        min_confidence_threshold: Minimum confidence score for a predicted box to be considered for matching.
+        max_bboxes_per_image: If not None, consider only the top K predicted boxes per image based on confidence scores.
+        return_intermediate_counts: Whether to return intermediate counts of true positives, false positives and false
+            negatives after each prediction is considered. Useful for plotting precision-recall curves.
+
+    Returns:
+        The first set contains tuples of (b, p, t) where b is the batch index, p is the index of the predicted box
+        and t is the index of the matched target box. The second set contains tuples of (b, p) where b is the batch
+        index and p is the index of the false positive predicted box. The third set contains tuples of (b, t) where b
+        is the batch index and t is the index of the false negative target box.
+        If `return_intermediate_counts` is True, also returns a list of tuples of (TP, FP, FN) counts after each
+        prediction.
+    """
+    matching = match_bboxes(
+        pred_bboxes,
+        pred_confidence_scores,
+        target_bboxes,
+        iou_threshold,
+        matching_method=matching_method,
+        min_confidence_threshold=min_confidence_threshold,
+        max_bboxes_per_image=max_bboxes_per_image,
+    )
+
+    is_tp = matching.target_indices >= 0
+    batch_indices = matching.batch_indices.tolist()
+    pred_indices = matching.pred_indices.tolist()
+    target_indices = matching.target_indices.tolist()
+
+    tps = {(b, p, t) for b, p, t, tp in zip(batch_indices, pred_indices, target_indices, is_tp) if tp}
+    fps = {(b, p) for b, p, tp in zip(batch_indices, pred_indices, is_tp) if not tp}
+    fns = {(b, t) for b in range(len(target_bboxes)) for t in range(matching.num_targets[b])}
+    fns -= {(b, t) for b, _, t in tps}
 
     if return_intermediate_counts:
+        intermediate_counts = list(
+            zip(matching.cumulative_tps.tolist(), matching.cumulative_fps.tolist(), matching.cumulative_fns.tolist())
+        )
         return tps, fps, fns, intermediate_counts
     return tps, fps, fns
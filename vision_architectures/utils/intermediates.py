@@ -0,0 +1,68 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/utils/14_intermediates.ipynb.
+
+# %% auto #0
+__all__ = ['CaptureIntermediatesPolicy', 'get_capture_indices', 'get_local_capture_indices']
+
+# %% ../../nbs/utils/14_intermediates.ipynb #6a1f0c2e
+from collections.abc import Iterable, Sequence
+from typing import Literal
+
+# %% ../../nbs/utils/14_intermediates.ipynb #b83e5d41
+CaptureIntermediatesPolicy = Literal["all", "none", "final", "stages"] | Sequence[int]
+
+# %% ../../nbs/utils/14_intermediates.ipynb #0f9c27a6
+def get_capture_indices(
+    policy: CaptureIntermediatesPolicy, num_layers: int, stage_end_indices: Iterable[int] | None = None
+) -> tuple[int, ...]:
+    """Get the indices of the layer outputs that should be retained for a given capture policy. Layer outputs that are
+    not captured are released as soon as the next layer has consumed them, which reduces peak memory.
+
+    Args:
+        policy: Which intermediate outputs to retain. One of:
+
+            - ``"all"``: Retain all layer outputs.
+            - ``"none"``: Retain no layer outputs.
+            - ``"final"``: Retain only the output of the last layer.
+            - ``"stages"``: Retain only the output of the last layer of every stage. For networks without stages,
+              this is equivalent to ``"final"``.
+            - A sequence of layer indices: Retain only these layer outputs. Negative indices are supported.
+        num_layers: Total number of layers.
+        stage_end_indices: Index of the last layer of every stage. If None, the network is treated as a single stage.
+
+    Returns:
+        Sorted tuple of non-negative layer indices to retain.
+    """
+    if isinstance(policy, str):
+        if policy == "all":
+            return tuple(range(num_layers))
+        if policy == "none":
+            return ()
+        if policy == "final":
+            return (num_layers - 1,) if num_layers > 0 else ()
+        if policy == "stages":
+            if stage_end_indices is None:
+                return (num_layers - 1,) if num_layers > 0 else ()
+            return tuple(sorted(set(stage_end_indices)))
+        raise ValueError(f"Invalid capture policy: {policy}. Should be one of all, none, final, stages or a sequence.")
+
+    indices = set()
+    for index in policy:
+        if not -num_layers <= index < num_layers:
+            raise IndexError(f"Layer index {index} is out of range for a network with {num_layers} layers")
+        indices.add(index % num_layers)
+    return tuple(sorted(indices))
+
+# %% ../../nbs/utils/14_intermediates.ipynb #d7406b18
+def get_local_capture_indices(capture_indices: Sequence[int], start: int, stop: int) -> tuple[int, ...]:
+    """Select the capture indices that fall in the layer range ``[start, stop)`` and make them relative to ``start``.
+    Useful to pass the indices obtained from :py:func:`get_capture_indices` on to a sub-module, such as a stage.
+
+    Args:
+        capture_indices: Non-negative layer indices to retain, as returned by :py:func:`get_capture_indices`.
+        start: Index of the first layer of the sub-module.
+        stop: Index of the layer after the last layer of the sub-module.
+
+    Returns:
+        Tuple of layer indices relative to the sub-module.
+    """
+    return tuple(index - start for index in capture_indices if start <= index < stop)
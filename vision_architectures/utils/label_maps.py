@@ -0,0 +1,111 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/utils/17_label_maps.ipynb.
+
+# %% auto #0
+__all__ = ['tiled_argmax']
+
+# %% ../../nbs/utils/17_label_maps.ipynb #4b1e7c93
+from collections.abc import Callable, Sequence
+from itertools import product
+
+import torch
+
+# %% ../../nbs/utils/17_label_maps.ipynb #e6a2c8d5
+def _to_tuple(value: int | Sequence[int], spatial_dims: int) -> tuple[int, ...]:
+    if isinstance(value, int):
+        return (value,) * spatial_dims
+    if len(value) != spatial_dims:
+        raise ValueError(f"Expected {spatial_dims} values, got {tuple(value)}")
+    return tuple(value)
+
+
+@torch.no_grad()
+def tiled_argmax(
+    fn: Callable[..., torch.Tensor],
+    inputs: torch.Tensor | Sequence[torch.Tensor],
+    tile_size: int | Sequence[int],
+    halo: int | Sequence[int] = 0,
+    scale_factor: int | Sequence[int] = 1,
+    return_probabilities: bool = False,
+) -> torch.Tensor | tuple[torch.Tensor, torch.Tensor]:
+    """Compute the label map of the logits produced by ``fn`` one tile at a time, so that the dense logits of all
+    classes never exist for the full volume. Every tile of the inputs is extended by ``halo`` voxels on each side
+    (clipped at the borders of the inputs), passed through ``fn``, cropped back to the tile and reduced immediately.
+
+    The result is exact as long as the receptive field of ``fn`` is covered by ``halo`` and ``fn`` does not mix
+    information across the batch or across the entire volume, e.g. convolutions, interpolations and normalizations in
+    eval mode.
+
+    Args:
+        fn: Function mapping tiles of ``inputs`` to logits of shape ``(b, num_classes, *tile_spatial_shape)``, with
+            the spatial shape multiplied by ``scale_factor``.
+        inputs: Channels-first input of shape ``(b, c, *spatial_shape)`` or a sequence of such inputs that share the
+            same spatial shape. Each tile of every input is passed to ``fn`` as a separate argument.
+        tile_size: Size of the tiles in voxels of the inputs.
+        halo: Number of context voxels of the inputs required on each side of a tile to compute its logits exactly.
+        scale_factor: Integer factor by which ``fn`` upsamples the spatial dimensions.
+        return_probabilities: Whether to return the softmax probability of the predicted class too.
+
+    Returns:
+        Label map of shape ``(b, *spatial_shape * scale_factor)`` of dtype uint8 (int64 if there are more than 256
+        classes). If ``return_probabilities`` is True, the float16 probabilities of the predicted classes of the same
+        shape are returned too.
+    """
+    if isinstance(inputs, torch.Tensor):
+        inputs = [inputs]
+
+    spatial_shape = tuple(inputs[0].shape[2:])
+    spatial_dims = len(spatial_shape)
+    if any(tuple(x.shape[2:]) != spatial_shape for x in inputs):
+        raise ValueError(f"All inputs must have the same spatial shape, got {[tuple(x.shape) for x in inputs]}")
+    if any(size == 0 for size in spatial_shape):
+        raise ValueError(f"Inputs must not be empty, got spatial shape {spatial_shape}")
+
+    tile_size = _to_tuple(tile_size, spatial_dims)
+    halo = _to_tuple(halo, spatial_dims)
+    scale_factor = _to_tuple(scale_factor, spatial_dims)
+    output_shape = tuple(size * factor for size, factor in zip(spatial_shape, scale_factor))
+
+    labels = None
+    probabilities = None
+    for starts in product(*[range(0, size, tile) for size, tile in zip(spatial_shape, tile_size)]):
+        ends = [min(start + tile, size) for start, tile, size in zip(starts, tile_size, spatial_shape)]
+        read_starts = [max(start - h, 0) for start, h in zip(starts, halo)]
+        read_ends = [min(end + h, size) for end, h, size in zip(ends, halo, spatial_shape)]
+
+        input_slices = (slice(None), slice(None), *[slice(start, end) for start, end in zip(read_starts, read_ends)])
+        logits = fn(*[x[input_slices] for x in inputs])
+        # (b, num_classes, *read_spatial_shape * scale_factor)
+
+        crop_slices = (
+            slice(None),
+            slice(None),
+            *[
+                slice((start - read_start) * factor, (end - read_start) * factor)
+                for start, end, read_start, factor in zip(starts, ends, read_starts, scale_factor)
+            ],
+        )
+        logits = logits[crop_slices]
+        # (b, num_classes, *tile_spatial_shape * scale_factor)
+
+        if labels is None:
+            batch_size, num_classes = logits.shape[:2]
+            labels_dtype = torch.uint8 if num_classes <= 256 else torch.long
+            labels = torch.empty((batch_size, *output_shape), dtype=labels_dtype, device=logits.device)
+            if return_probabilities:
+                probabilities = torch.empty((batch_size, *output_shape), dtype=torch.float16, device=logits.device)
+
+        output_slices = (
+            slice(None),
+            *[slice(start * factor, end * factor) for start, end, factor in zip(starts, ends, scale_factor)],
+        )
+        if return_probabilities:
+            tile_probabilities, tile_labels = logits.float().softmax(dim=1).max(dim=1)
+            probabilities[output_slices] = tile_probabilities
+        else:
+            tile_labels = logits.argmax(dim=1)
+        labels[output_slices] = tile_labels
+        # (b, *tile_spatial_shape * scale_factor)
+
+    if return_probabilities:
+        return labels, probabilities
+    return labels
@@ -0,0 +1,216 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/utils/15_linear_assignment.ipynb.
+
+# %% auto #0
+__all__ = ['auction_linear_sum_assignment', 'batched_linear_sum_assignment']
+
+# %% ../../nbs/utils/15_linear_assignment.ipynb #3f7a1c52
+import math
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal
+
+import torch
+from scipy.optimize import linear_sum_assignment
+
+# %% ../../nbs/utils/15_linear_assignment.ipynb #a8d2e4b6
+def _auction_phase(
+    benefit: torch.Tensor, prices: torch.Tensor, epsilon: torch.Tensor, check_every: int = 8
+) -> torch.Tensor:
+    # Jacobi (all unassigned persons bid simultaneously) forward auction on a square problem, as described by
+    # Bertsekas. Rows are persons and columns are objects. prices are updated in-place.
+    B, N, _ = benefit.shape
+    device = benefit.device
+
+    # An extra slot at the end acts as a sink for scatters of invalid indices
+    person_to_object = torch.full((B, N + 1), -1, dtype=torch.long, device=device)
+    object_to_person = torch.full((B, N + 1), -1, dtype=torch.long, device=device)
+    person_indices = torch.arange(N, device=device).expand(B, N)
+
+    iteration = 0
+    while True:
+        # Checking for convergence requires a device sync, so it is done only once every few iterations. Iterations
+        # after convergence are no-ops as there are no bidders.
+        if iteration % check_every == 0 and not (person_to_object[:, :N] < 0).any():
+            break
+        iteration += 1
+
+        unassigned = person_to_object[:, :N] < 0
+        # (B, N)
+
+        values = benefit - prices[:, None, :]
+        # (B, N persons, N objects)
+        if N > 1:
+            top_values, top_objects = values.topk(2, dim=-1)
+            increment = top_values[..., 0] - top_values[..., 1] + epsilon
+        else:
+            top_objects = torch.zeros((B, N, 1), dtype=torch.long, device=device)
+            increment = epsilon.expand(B, N)
+        best_objects = top_objects[..., 0]
+        # (B, N)
+
+        bids = prices.gather(1, best_objects) + increment
+        bids = bids.masked_fill(~unassigned, -torch.inf)
+        # (B, N)
+
+        # Every object goes to its highest bidder (ties are resolved in favour of the highest person index)
+        object_bids = torch.full_like(prices, -torch.inf).scatter_reduce(1, best_objects, bids, "amax")
+        is_winner = unassigned & (bids == object_bids.gather(1, best_objects))
+        winners = torch.full((B, N), -1, dtype=torch.long, device=device).scatter_reduce(
+            1, best_objects, torch.where(is_winner, person_indices, -1), "amax"
+        )
+        won = winners >= 0
+        # (B, N objects)
+
+        # Previous owners of the won objects lose them
+        previous_owners = torch.where(won, object_to_person[:, :N], -1)
+        person_to_object.scatter_(1, torch.where(previous_owners >= 0, previous_owners, N), -1)
+
+        # Winners get the objects
+        object_to_person[:, :N] = torch.where(won, winners, object_to_person[:, :N])
+        object_indices = torch.arange(N, device=device).expand(B, N)
+        person_to_object.scatter_(1, torch.where(won, winners, N), object_indices)
+        prices.copy_(torch.where(won, object_bids, prices))
+
+    return person_to_object[:, :N]
+
+
+@torch.no_grad()
+def auction_linear_sum_assignment(
+    cost_matrix: torch.Tensor,
+    column_mask: torch.Tensor | None = None,
+    tolerance: float = 1e-3,
+    epsilon_scaling_factor: float = 4.0,
+) -> torch.Tensor:
+    """Solve a batch of linear sum assignment problems on the device of ``cost_matrix`` using the auction algorithm with
+    epsilon scaling. Unlike :py:func:`scipy.optimize.linear_sum_assignment`, this does not require copying the cost
+    matrices to the CPU and solves all problems of the batch together.
+
+    The solution is approximate: its total cost is within ``tolerance`` times the range of costs of the optimal total
+    cost. Rectangular problems are solved by padding them to square ones. Dummy rows cost nothing, while assigning a
+    row to a dummy or masked column costs more than any valid assignment, so that it only happens to rows left over
+    when there are more rows than valid columns.
+
+    Args:
+        cost_matrix: Tensor of shape ``(B, R, C)`` containing the cost of assigning every row to every column.
+        column_mask: Boolean tensor of shape ``(B, C)``. Columns that are False are treated as padding and are never
+            assigned, e.g. to batch problems with different numbers of columns together. If None, all columns are valid.
+        tolerance: Relative tolerance of the solution, see above. Smaller values are more accurate but slower.
+        epsilon_scaling_factor: Factor by which epsilon is reduced between consecutive auction phases.
+
+    Returns:
+        Tensor of shape ``(B, R)`` containing the column assigned to every row, or -1 if the row is unassigned.
+    """
+    if cost_matrix.ndim != 3:
+        raise ValueError(f"cost_matrix must be of shape (B, R, C), got {tuple(cost_matrix.shape)}")
+
+    B, R, C = cost_matrix.shape
+    N = max(R, C)
+    device = cost_matrix.device
+
+    if column_mask is None:
+        column_mask = torch.ones((B, C), dtype=torch.bool, device=device)
+    if R == 0 or N == 0:
+        return torch.full((B, R), -1, dtype=torch.long, device=device)
+
+    # Assigning a row to a dummy or masked column costs more than any valid assignment. The margin also exceeds the
+    # error of the approximate solution, so rows never take such columns while valid ones are left to dummy rows.
+    cost_matrix = cost_matrix.float()
+    is_valid = column_mask[:, None, :].expand(B, R, C)
+    has_valid = column_mask.any(dim=1)
+    max_cost = torch.where(has_valid, cost_matrix.masked_fill(~is_valid, -torch.inf).amax(dim=(1, 2)), 0.0)
+    min_cost = torch.where(has_valid, cost_matrix.masked_fill(~is_valid, torch.inf).amin(dim=(1, 2)), 0.0)
+    margin = max_cost.abs() + min_cost.abs()
+    invalid_cost = (max_cost + torch.where(margin > 0, margin, 1.0))[:, None, None]
+    # (B, 1, 1)
+
+    # Pad to a square problem where dummy rows cost nothing
+    benefit = torch.zeros((B, N, N), dtype=torch.float32, device=device)
+    benefit[:, :R] = -invalid_cost
+    benefit[:, :R, :C] = -torch.where(is_valid, cost_matrix, invalid_cost)
+    # (B, N, N)
+
+    # Epsilon is scaled to the range of the costs of each problem
+    cost_range = (benefit.amax(dim=(1, 2)) - benefit.amin(dim=(1, 2))).clamp(min=torch.finfo(torch.float32).eps)
+    final_epsilon = (cost_range * tolerance / N)[:, None]
+    epsilon = (cost_range / 2)[:, None]
+    # (B, 1)
+
+    # epsilon / final_epsilon is the same for all problems, so the number of phases is known without a device sync
+    num_phases = max(math.ceil(math.log(N / (2 * tolerance), epsilon_scaling_factor)), 0) + 1
+
+    prices = torch.zeros((B, N), dtype=torch.float32, device=device)
+    for _ in range(num_phases - 1):
+        _auction_phase(benefit, prices, epsilon)
+        epsilon = torch.maximum(epsilon / epsilon_scaling_factor, final_epsilon)
+    row_to_column = _auction_phase(benefit, prices, final_epsilon)
+    # (B, N)
+
+    row_to_column = row_to_column[:, :R]
+    # Assignments to dummy or masked columns are not assignments
+    is_valid_column = torch.zeros((B, N + 1), dtype=torch.bool, device=device)
+    is_valid_column[:, :C] = column_mask
+    row_to_column = torch.where(is_valid_column.gather(1, row_to_column), row_to_column, -1)
+    # (B, R)
+
+    return row_to_column
+
+# %% ../../nbs/utils/15_linear_assignment.ipynb #5c09b7e3
+def batched_linear_sum_assignment(
+    cost_matrix: torch.Tensor,
+    num_columns: Sequence[int] | None = None,
+    solver: Literal["scipy", "auction"] = "scipy",
+    num_threads: int = 4,
+    auction_tolerance: float = 1e-3,
+) -> list[tuple[list[int], list[int]]]:
+    """Solve a batch of linear sum assignment problems (minimizing total cost) whose cost matrices have been computed
+    together in a single padded tensor.
+
+    Args:
+        cost_matrix: Tensor of shape ``(B, R, C)`` containing the cost of assigning every row to every column.
+        num_columns: Number of valid columns of every problem. Columns after these are treated as padding. If None, all
+            columns are valid.
+        solver: ``"scipy"`` copies all cost matrices to the CPU at once and solves them concurrently in a thread pool
+            with :py:func:`scipy.optimize.linear_sum_assignment`. ``"auction"`` solves them on the device of
+            ``cost_matrix`` with :py:func:`auction_linear_sum_assignment`, which is approximate.
+        num_threads: Number of threads used by the ``"scipy"`` solver.
+        auction_tolerance: Relative tolerance used by the ``"auction"`` solver.
+
+    Returns:
+        A list of length ``B`` containing tuples of the form ``(row_indices, column_indices)``, sorted by row index, in
+        the same format as :py:func:`scipy.optimize.linear_sum_assignment`.
+    """
+    B, R, C = cost_matrix.shape
+    if num_columns is None:
+        num_columns = [C] * B
+    if len(num_columns) != B:
+        raise ValueError(f"num_columns must have {B} elements, got {len(num_columns)}")
+
+    if solver == "scipy":
+        cost_matrix = cost_matrix.detach().float().cpu().numpy()  # Single device to host copy for the entire batch
+
+        def solve(i: int) -> tuple[list[int], list[int]]:
+            if R == 0 or num_columns[i] == 0:
+                return [], []
+            row_indices, column_indices = linear_sum_assignment(cost_matrix[i, :, : num_columns[i]])
+            return row_indices.tolist(), column_indices.tolist()
+
+        if num_threads <= 1 or B <= 1:
+            return [solve(i) for i in range(B)]
+        with ThreadPoolExecutor(max_workers=min(num_threads, B)) as executor:
+            return list(executor.map(solve, range(B)))
+
+    if solver == "auction":
+        column_mask = torch.arange(C, device=cost_matrix.device) < torch.tensor(
+            num_columns, device=cost_matrix.device
+        ).unsqueeze(1)
+        # (B, C)
+        row_to_column = auction_linear_sum_assignment(cost_matrix.detach(), column_mask, tolerance=auction_tolerance)
+        row_to_column = row_to_column.cpu().tolist()
+
+        matched_indices = []
+        for assignment in row_to_column:
+            row_indices = [row for row, column in enumerate(assignment) if column >= 0]
+            matched_indices.append((row_indices, [assignment[row] for row in row_indices]))
+        return matched_indices
+
+    raise ValueError(f"Invalid solver: {solver}. Should be one of scipy, auction.")
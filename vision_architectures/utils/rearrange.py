@@ -1,7 +1,7 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/utils/06_rearrange.ipynb.
 
 # %% auto #0
-__all__ = ['make_channels_first', 'make_channels_last', 'rearrange_channels']
+__all__ = ['make_channels_first', 'make_channels_last', 'rearrange_channels', 'pixel_unshuffle_3d', 'pixel_shuffle_3d']
 
 # %% ../../nbs/utils/06_rearrange.ipynb #1da1a79c
 import numpy as np
@@ -59,3 +59,69 @@ def rearrange_channels(x: torch.Tensor | np.ndarray, cur_channels_first: bool, n
         return make_channels_last(x)
     else:
         return make_channels_first(x)
+
+# %% ../../nbs/utils/06_rearrange.ipynb #c3a1f5e9
+def _scale_factor_3d(scale_factor: int | tuple[int, int, int]) -> tuple[int, int, int]:
+    if isinstance(scale_factor, int):
+        return (scale_factor, scale_factor, scale_factor)
+    return tuple(scale_factor)
+
+
+def pixel_unshuffle_3d(
+    x: torch.Tensor, scale_factor: int | tuple[int, int, int], channels_first: bool = True
+) -> torch.Tensor:
+    """Move non-overlapping 3D blocks of voxels into the channel dimension (space-to-depth).
+
+    For ``channels_first`` inputs, channels are packed as ``(c s_z s_y s_x)``, the same as
+    ``torch.nn.PixelUnshuffle``. For ``channels_last`` inputs, channels are packed as ``(s_z s_y s_x c)`` so that
+    every voxel of a block stays a contiguous chunk of channels.
+
+    Args:
+        x: The input tensor of shape ``(b, [c], z, y, x, [c])``. Spatial dimensions should be divisible by
+            ``scale_factor``.
+        scale_factor: Size of the blocks along (z, y, x).
+        channels_first: Whether the input is in channels first format. The output uses the same format.
+
+    Returns:
+        Tensor of shape ``(b, [c * s_z * s_y * s_x], z // s_z, y // s_y, x // s_x, [c * s_z * s_y * s_x])``.
+    """
+    s_z, s_y, s_x = _scale_factor_3d(scale_factor)
+
+    if channels_first:
+        b, c, z, y, x_ = x.shape
+        x = x.reshape(b, c, z // s_z, s_z, y // s_y, s_y, x_ // s_x, s_x)
+        x = x.permute(0, 1, 3, 5, 7, 2, 4, 6)
+        return x.reshape(b, c * s_z * s_y * s_x, z // s_z, y // s_y, x_ // s_x)
+
+    b, z, y, x_, c = x.shape
+    x = x.reshape(b, z // s_z, s_z, y // s_y, s_y, x_ // s_x, s_x, c)
+    x = x.permute(0, 1, 3, 5, 2, 4, 6, 7)
+    return x.reshape(b, z // s_z, y // s_y, x_ // s_x, s_z * s_y * s_x * c)
+
+# %% ../../nbs/utils/06_rearrange.ipynb #7d2b04e8
+def pixel_shuffle_3d(
+    x: torch.Tensor, scale_factor: int | tuple[int, int, int], channels_first: bool = True
+) -> torch.Tensor:
+    """Move groups of channels into non-overlapping 3D blocks of voxels (depth-to-space). This is the inverse of
+    :py:func:`pixel_unshuffle_3d` and uses the same channel packing.
+
+    Args:
+        x: The input tensor of shape ``(b, [c * s_z * s_y * s_x], z, y, x, [c * s_z * s_y * s_x])``.
+        scale_factor: Size of the blocks along (z, y, x).
+        channels_first: Whether the input is in channels first format. The output uses the same format.
+
+    Returns:
+        Tensor of shape ``(b, [c], z * s_z, y * s_y, x * s_x, [c])``.
+    """
+    s_z, s_y, s_x = _scale_factor_3d(scale_factor)
+
+    if channels_first:
+        b, c, z, y, x_ = x.shape
+        x = x.reshape(b, c // (s_z * s_y * s_x), s_z, s_y, s_x, z, y, x_)
+        x = x.permute(0, 1, 5, 2, 6, 3, 7, 4)
+        return x.reshape(b, c // (s_z * s_y * s_x), z * s_z, y * s_y, x_ * s_x)
+
+    b, z, y, x_, c = x.shape
+    x = x.reshape(b, z, y, x_, s_z, s_y, s_x, c // (s_z * s_y * s_x))
+    x = x.permute(0, 1, 4, 2, 5, 3, 6, 7)
+    return x.reshape(b, z * s_z, y * s_y, x_ * s_x, c // (s_z * s_y * s_x))
@@ -1,13 +1,16 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/utils/09_splitter_merger.ipynb.
 
 # %% auto #0
-__all__ = ['SplitterConfig', 'Splitter', 'Merger']
+__all__ = ['SplitterConfig', 'MergerConfig', 'ArraySource', 'Splitter', 'Merger']
 
 # %% ../../nbs/utils/09_splitter_merger.ipynb #2379b9ae
-from collections.abc import Generator
+from collections import deque
+from collections.abc import Callable, Generator
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from typing import Literal
+from typing import Literal, Protocol
 
+import numpy as np
 import torch
 from einops import rearrange
 from torch.nn import functional as F
@@ -47,6 +50,51 @@ class SplitterConfig(CustomBaseModel):
 
         return self
 
+# %% ../../nbs/utils/09_splitter_merger.ipynb #c6e1a4f3
+class MergerConfig(SplitterConfig):
+    blending: Literal["constant", "gaussian", "linear"] = Field(
+        "constant",
+        description=(
+            "How overlapping splits are weighted when merged. 'constant' averages them, 'gaussian' weights every split "
+            "by a Gaussian centered on it, and 'linear' ramps the weights down linearly over the overlapping region."
+        ),
+    )
+    gaussian_sigma_scale: float = Field(
+        0.125, description="Standard deviation of the Gaussian weights relative to the split size."
+    )
+
+    @model_validator(mode="after")
+    def validate(self):
+        super().validate()
+        assert self.gaussian_sigma_scale > 0, "gaussian_sigma_scale must be positive."
+        return self
+
+# %% ../../nbs/utils/09_splitter_merger.ipynb #b7d3e6a0
+class ArraySource(Protocol):
+    """Any array that can be read lazily region by region, e.g. a NumPy memmap or a safetensors slice obtained with
+    ``safe_open(...).get_slice(key)``. Indexing it with a tuple of slices must return a NumPy array or a tensor
+    containing only that region. Safetensors slices expose ``get_shape()`` instead of ``shape``, which is supported too.
+    """
+
+    @property
+    def shape(self) -> tuple[int, ...]: ...
+
+    def __getitem__(self, slices: tuple[slice, ...]) -> np.ndarray | torch.Tensor: ...
+
+
+def _get_source_shape(x: torch.Tensor | ArraySource) -> tuple[int, ...]:
+    if hasattr(x, "shape"):
+        return tuple(x.shape)
+    return tuple(x.get_shape())
+
+
+def _read_source(x: torch.Tensor | ArraySource, slices: tuple[slice, ...]) -> torch.Tensor:
+    region = x[slices]
+    if isinstance(region, torch.Tensor):
+        return region
+    # Copying forces the region to actually be read, e.g. from a memmap
+    return torch.from_numpy(np.array(region))
+
 # %% ../../nbs/utils/09_splitter_merger.ipynb #88ac9d3b
 class Splitter:
     def __init__(self, config: SplitterConfig = {}, **kwargs):
@@ -105,6 +153,9 @@ class Splitter:
 
         expanded_shape = self.get_expanded_shape(input_shape)
 
+        return self._get_positions(expanded_shape)
+
+    def _get_positions(self, expanded_shape: list[int]) -> torch.Tensor:
         positions = []
         for i in range(self.config.split_dims):
             total_length = expanded_shape[i]
@@ -157,38 +208,160 @@ class Splitter:
                     padding = (0, 0) * (self.config.split_dims - i - 1) + (expansion // 2, expansion - expansion // 2)
                     x = F.pad(x, padding)
                 elif self.config.extend_mode == "wrap":
-                    x = torch.cat([x, x.narrow(dim, 0, expansion)], dim=dim)
+                    # The input is repeated from its start as often as needed to cover the expansion
+                    length = x.shape[dim]
+                    x = torch.cat([x] * (1 + expansion // length) + [x.narrow(dim, 0, expansion % length)], dim=dim)
                 elif self.config.extend_mode is None:
                     assert expansion == 0, "Exact divisibility is expected when extend_mode is None."
 
         return x
 
-    def split(self, x: torch.Tensor) -> Generator[tuple[torch.Tensor, torch.Tensor], None, None]:
-        """Split the input tensor into smaller tensors using the config.
+    def split(self, x: torch.Tensor | ArraySource) -> Generator[tuple[torch.Tensor, torch.Tensor], None, None]:
+        """Split the input tensor into smaller tensors using the config. The input is not expanded as a whole, instead
+        only the region covered by every split is read, and only the splits touching the border are padded / wrapped.
+        Splits of tensors that lie entirely inside the input are views.
 
         Args:
-            x: The input tensor. Any arbitrary shape is acceptable as long as there are at least ``split_dims``
+            x: The input tensor, or an ArraySource such as a NumPy memmap or a safetensors slice, which is read only
+                region by region. Any arbitrary shape is acceptable as long as there are at least ``split_dims``
                 dimensions. The last ``split_dims`` dimensions are split.
 
         Yields:
             A tensor of shape (*split_size) for each split and it's corresponding position in the input.
         """
-        input_shape = x.shape
-        x = self.expand(x)
-        positions = self.get_positions(input_shape)
+        expanded_shape = self.get_expanded_shape(_get_source_shape(x))
+        positions = self._get_positions(expanded_shape)
 
         for position in positions:
-            starts = position.tolist()
-            ends = [start + size for start, size in zip(starts, self.config.split_size)]
+            yield self._get_split(x, position.tolist(), expanded_shape), position
+
+    def split_batched(
+        self,
+        x: torch.Tensor | ArraySource,
+        batch_size: int,
+        device: torch.device | str | None = None,
+        pin_memory: bool = False,
+        prefetch: int = 1,
+        transform: Callable[[torch.Tensor], torch.Tensor] | None = None,
+    ) -> Generator[tuple[torch.Tensor, torch.Tensor], None, None]:
+        """Split the input tensor into batches of smaller tensors using the config, e.g. to keep a model busy during
+        tiled inference. Like ``split``, only the region covered by every split is read, and the input is never
+        expanded as a whole. Together with an ArraySource input and prefetching, this allows reading, preprocessing
+        and inference to run as a pipeline with only a few batches in memory at a time.
 
-            slices = [slice(None)] * (x.ndim - self.config.split_dims)
-            slices += [slice(starts[d], ends[d]) for d in range(self.config.split_dims)]
-            yield x[tuple(slices)], position
+        Args:
+            x: The input tensor, or an ArraySource such as a NumPy memmap or a safetensors slice, which is read only
+                region by region. Any arbitrary shape is acceptable as long as there are at least ``split_dims``
+                dimensions. The last ``split_dims`` dimensions are split.
+            batch_size: Maximum number of splits in every batch.
+            device: If not None, batches are moved to this device.
+            pin_memory: Whether to pin batches created on the CPU before moving them to ``device``, so that the copy is
+                asynchronous.
+            prefetch: Number of batches that are read (and moved and transformed) ahead in a background thread while
+                the current one is being processed. If 0, batches are created only when requested.
+            transform: A function applied to every batch of splits after it has been moved to ``device``, e.g. for
+                intensity normalization.
+
+        Yields:
+            A tensor of shape (num_splits_in_batch, *x.shape[:-split_dims], *split_size) containing a batch of splits,
+            and a tensor of shape (num_splits_in_batch, split_dims) containing their positions in the input.
+        """
+        assert batch_size > 0, "batch_size must be positive."
+        assert prefetch >= 0, "prefetch must be non-negative."
+
+        expanded_shape = self.get_expanded_shape(_get_source_shape(x))
+        positions = self._get_positions(expanded_shape)
+
+        def get_batch(batch_positions: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+            splits = torch.stack(
+                [self._get_split(x, position.tolist(), expanded_shape) for position in batch_positions]
+            )
+            if pin_memory and splits.device.type == "cpu":
+                splits = splits.pin_memory()
+            if device is not None:
+                splits = splits.to(device, non_blocking=pin_memory)
+            if transform is not None:
+                splits = transform(splits)
+            return splits, batch_positions
+
+        all_batch_positions = iter(positions.split(batch_size))
+        if prefetch == 0:
+            for batch_positions in all_batch_positions:
+                yield get_batch(batch_positions)
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending_batches = deque(
+                executor.submit(get_batch, batch_positions)
+                for _, batch_positions in zip(range(prefetch), all_batch_positions)
+            )
+            while pending_batches:
+                batch = pending_batches.popleft().result()
+                batch_positions = next(all_batch_positions, None)
+                if batch_positions is not None:
+                    pending_batches.append(executor.submit(get_batch, batch_positions))
+                yield batch
 
     @wraps(split)
     def __call__(self, *args, **kwargs):
         return self.split(*args, **kwargs)
 
+    def _get_split(
+        self, x: torch.Tensor | ArraySource, position: list[int], expanded_shape: list[int]
+    ) -> torch.Tensor:
+        # Get the split at the given position of the expanded input without expanding the input. Only the region of the
+        # input covered by the split is read, and the parts of the split that lie outside the input are padded / wrapped
+        # afterwards.
+        input_shape = _get_source_shape(x)
+        num_leading_dims = len(input_shape) - self.config.split_dims
+
+        # Contiguous segments of the input to read and padding to add along every dimension
+        segments, padding = [], []
+        for i in range(self.config.split_dims):
+            length = input_shape[num_leading_dims + i]
+            size = self.config.split_size[i]
+
+            # Coordinates of the split in the input
+            start = position[i]
+            if self.config.extend_mode == "pad":
+                start -= (expanded_shape[i] - length) // 2  # Padding is split equally on both sides
+            end = start + size
+
+            if start >= 0 and end <= length:
+                segments.append([(start, end)])
+                padding.append((0, 0))
+            elif self.config.extend_mode == "pad":
+                inside_start = min(max(start, 0), length)
+                inside_end = max(min(end, length), inside_start)
+                segments.append([(inside_start, inside_end)])
+                padding.append((inside_start - start, end - inside_end))
+            elif self.config.extend_mode == "wrap":
+                # Parts beyond the end are read from the start of the input again
+                dim_segments = []
+                while start < end:
+                    segment_start = start % length
+                    segment_end = min(segment_start + end - start, length)
+                    dim_segments.append((segment_start, segment_end))
+                    start += segment_end - segment_start
+                segments.append(dim_segments)
+                padding.append((0, 0))
+            else:
+                raise ValueError("Exact divisibility is expected when extend_mode is None.")
+
+        def read(dim_segments: list[tuple[int, int]]) -> torch.Tensor:
+            i = len(dim_segments)
+            if i == self.config.split_dims:
+                slices = (slice(None),) * num_leading_dims + tuple(slice(start, end) for start, end in dim_segments)
+                return _read_source(x, slices)
+            parts = [read(dim_segments + [segment]) for segment in segments[i]]
+            return parts[0] if len(parts) == 1 else torch.cat(parts, dim=num_leading_dims + i)
+
+        split = read([])
+        if any(before or after for before, after in padding):
+            split = F.pad(split, tuple(p for before_after in reversed(padding) for p in before_after))
+
+        return split
+
     def _check_input_shape(self, input_shape: tuple[int, ...]):
         # Some checks
         assert (
@@ -197,5 +370,159 @@ class Splitter:
 
 # %% ../../nbs/utils/09_splitter_merger.ipynb #200ab24d
 class Merger:
-    def __init__(self):
-        raise NotImplementedError("Merger is yet to be implemented.")
+    def __init__(
+        self,
+        input_shape: tuple[int, ...] | torch.Size | torch.Tensor,
+        config: MergerConfig = {},
+        device: torch.device | str | None = None,
+        **kwargs,
+    ):
+        """Merge splits generated by a Splitter back into a single tensor. Splits are accepted one by one as they are
+        produced, and accumulated into a preallocated output and weight map. Overlapping regions are blended, and the
+        padding / wrapping added by the Splitter is removed at the end.
+
+        Args:
+            input_shape: The shape of the tensor that was split. Only the last "split_dims" dimensions are considered.
+                If a tensor is passed, its shape will be used.
+            config: Config of the merger. The config of the Splitter can be used directly as a base.
+            device: Device on which the output and weight map are accumulated, e.g. CPU to save accelerator memory. If
+                None, the device of the first split is used.
+            **kwargs: Additional keyword arguments for the config.
+        """
+        if isinstance(config, SplitterConfig):
+            # Allows reusing the config of the Splitter that produced the splits
+            config = config.model_dump()
+        self.config = MergerConfig.model_validate(config | kwargs)
+
+        if isinstance(input_shape, torch.Tensor):
+            input_shape = input_shape.shape
+        self._splitter = Splitter(self.config)
+        self._splitter._check_input_shape(input_shape)
+        self.input_shape = tuple(input_shape[-self.config.split_dims :])
+        self.expanded_shape = tuple(self._splitter.get_expanded_shape(input_shape))
+        self.device = device
+
+        self.reset()
+
+    def reset(self):
+        """Clear the accumulated splits so that the merger can be reused for another tensor of the same shape."""
+        self.output: torch.Tensor | None = None
+        self.weights: torch.Tensor | None = None
+        self._output_dtype: torch.dtype | None = None
+        self._split_weights: torch.Tensor | None = None
+
+    def get_split_weights(self, device: torch.device | str | None = None) -> torch.Tensor:
+        """Get the blending weights applied to every split.
+
+        Args:
+            device: Device on which to create the weights.
+
+        Returns:
+            A tensor of shape (*split_size) containing the weight of every element of a split.
+        """
+        weights_1d = []
+        for size, stride in zip(self.config.split_size, self.config.stride):
+            coordinates = torch.arange(size, dtype=torch.float32, device=device)
+            if self.config.blending == "gaussian":
+                sigma = size * self.config.gaussian_sigma_scale
+                dim_weights = torch.exp(-((coordinates - (size - 1) / 2) ** 2) / (2 * sigma**2))
+            elif self.config.blending == "linear":
+                # Ramp up from both edges over the overlap with the neighbouring splits
+                overlap = max(size - stride, 0)
+                dim_weights = torch.minimum(coordinates + 1, size - coordinates) / (overlap + 1)
+                dim_weights = dim_weights.clamp(max=1.0)
+            else:
+                dim_weights = torch.ones(size, dtype=torch.float32, device=device)
+            weights_1d.append(dim_weights)
+
+        weights = weights_1d[0]
+        for dim_weights in weights_1d[1:]:
+            weights = weights.unsqueeze(-1) * dim_weights
+        # (*split_size)
+
+        return weights
+
+    def add(self, split: torch.Tensor, position: torch.Tensor | tuple[int, ...]):
+        """Accumulate a split into the output.
+
+        Args:
+            split: A tensor whose last "split_dims" dimensions are of size ``split_size``. The remaining leading
+                dimensions may differ from those of the tensor that was split (e.g. a different number of channels)
+                but must be the same for all splits.
+            position: The top-left coordinates of the split as yielded by the Splitter.
+        """
+        split_dims = self.config.split_dims
+        if tuple(split.shape[-split_dims:]) != tuple(self.config.split_size):
+            raise ValueError(
+                f"Split must have spatial shape {tuple(self.config.split_size)}, got {tuple(split.shape[-split_dims:])}"
+            )
+
+        # Lazily allocate the accumulators as the leading dimensions are only known once the first split is seen
+        if self.output is None:
+            device = self.device if self.device is not None else split.device
+            accumulation_dtype = torch.promote_types(split.dtype, torch.float32)
+            self.output = torch.zeros(
+                (*split.shape[:-split_dims], *self.expanded_shape), dtype=accumulation_dtype, device=device
+            )
+            self.weights = torch.zeros(self.expanded_shape, dtype=torch.float32, device=device)
+            self._output_dtype = split.dtype
+            self._split_weights = self.get_split_weights(device)
+
+        if isinstance(position, torch.Tensor):
+            position = position.tolist()
+        slices = tuple(slice(start, start + size) for start, size in zip(position, self.config.split_size))
+
+        split = split.to(device=self.output.device, dtype=self.output.dtype)
+        self.output[(..., *slices)] += split * self._split_weights
+        self.weights[slices] += self._split_weights
+
+    def add_batched(self, splits: torch.Tensor, positions: torch.Tensor):
+        """Accumulate a batch of splits into the output, e.g. as yielded by ``Splitter.split_batched``.
+
+        Args:
+            splits: A tensor of shape (num_splits, ...) whose elements are splits as accepted by ``add``.
+            positions: A tensor of shape (num_splits, split_dims) containing the top-left coordinates of the splits.
+        """
+        for split, position in zip(splits, positions):
+            self.add(split, position)
+
+    def merge(self) -> torch.Tensor:
+        """Normalize the accumulated splits by their weights and remove the padding / wrapping added by the Splitter.
+
+        Returns:
+            A tensor with the leading dimensions of the splits and the spatial shape of the tensor that was split.
+        """
+        if self.output is None:
+            raise RuntimeError("No splits have been added to the merger.")
+
+        output, weights = self.output, self.weights
+        split_dims = self.config.split_dims
+        for i in range(split_dims):
+            dim = output.ndim - split_dims + i
+            actual_length = self.input_shape[i]
+            expansion = self.expanded_shape[i] - actual_length
+            if expansion == 0:
+                continue
+
+            if self.config.extend_mode == "pad":
+                # Padding is split equally on both sides
+                output = output.narrow(dim, expansion // 2, actual_length)
+                weights = weights.narrow(i, expansion // 2, actual_length)
+            elif self.config.extend_mode == "wrap":
+                # The wrapped region repeats the input from its start (several times if the expansion is larger than
+                # the input), so its contributions are folded back onto the input one segment at a time
+                folded_output = output.narrow(dim, 0, actual_length)
+                folded_weights = weights.narrow(i, 0, actual_length)
+                for segment_start in range(actual_length, actual_length + expansion, actual_length):
+                    segment_length = min(actual_length, actual_length + expansion - segment_start)
+                    padding = (0, 0) * (split_dims - i - 1) + (0, actual_length - segment_length)
+                    folded_output = folded_output + F.pad(output.narrow(dim, segment_start, segment_length), padding)
+                    folded_weights = folded_weights + F.pad(weights.narrow(i, segment_start, segment_length), padding)
+                output, weights = folded_output, folded_weights
+
+        merged = output / weights.clamp(min=torch.finfo(torch.float32).tiny)
+        return merged.to(self._output_dtype)
+
+    @wraps(add)
+    def __call__(self, *args, **kwargs):
+        return self.add(*args, **kwargs)
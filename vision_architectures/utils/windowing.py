@@ -0,0 +1,291 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/utils/13_windowing.ipynb.
+
+# %% auto #0
+__all__ = ['get_window_partition_indices', 'window_partition_3d', 'window_unpartition_3d', 'pad_to_window_multiple_3d',
+           'get_window_attention_mask']
+
+# %% ../../nbs/utils/13_windowing.ipynb #5d1c2e7a
+from functools import lru_cache
+from typing import Literal
+
+import torch
+import torch.nn.functional as F
+
+# %% ../../nbs/utils/13_windowing.ipynb #8e0f6b21
+@lru_cache(maxsize=64)
+def get_window_partition_indices(
+    grid_shape: tuple[int, int, int],
+    window_size: tuple[int, int, int],
+    shifts: tuple[int, int, int] = (0, 0, 0),
+    pattern: Literal["block", "grid"] = "block",
+    symmetric: bool = False,
+    device: torch.device | None = None,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Get the gather indices that move tokens of a 3D grid into window-major order and back. The results are cached
+    per set of arguments, so they are computed only once for every (shape, window_size, shift, pattern) combination.
+
+    The forward indices combine the following operations (in this order) into a single permutation:
+
+    1. ``symmetric``: Flip the second half of the grid along the x axis and interleave it with the first half. See
+       :py:func:`~vision_architectures.nets.symswin_3d.symmetry_attention_rearrange_forward`.
+    2. ``shifts``: Roll the grid by ``shifts`` along (z, y, x), similar to ``torch.roll``.
+    3. ``pattern``: Partition the grid into windows. ``"block"`` groups consecutive tokens into a window (window
+       attention in Swin), whereas ``"grid"`` groups tokens that are ``num_windows`` apart (grid attention in MaxViT).
+
+    Args:
+        grid_shape: Shape of the token grid (z, y, x).
+        window_size: Size of each window (z, y, x). Should divide ``grid_shape``.
+        shifts: Number of tokens the grid is rolled by along each axis before partitioning.
+        pattern: Partitioning pattern. One of ``"block"`` or ``"grid"``.
+        symmetric: Whether to apply the symmetry rearrangement along the x axis before partitioning.
+        device: Device to place the indices on.
+
+    Returns:
+        A tuple of forward and reverse indices, each of shape ``(z * y * x,)``. Gathering the flattened grid with the
+        forward indices produces tokens in window-major order i.e. ``(num_windows, window_size_z, window_size_y,
+        window_size_x)``. Gathering window-major tokens with the reverse indices restores the original grid.
+    """
+    if any(g % w != 0 for g, w in zip(grid_shape, window_size)):
+        raise ValueError(f"grid_shape {grid_shape} should be divisible by window_size {window_size}")
+    if symmetric and grid_shape[2] % 2 != 0:
+        raise ValueError(f"grid_shape {grid_shape} should have an even number of tokens along x for symmetry")
+
+    coords = []
+    for axis, (grid_length, window_length, shift) in enumerate(zip(grid_shape, window_size, shifts)):
+        num_windows = grid_length // window_length
+
+        window_index = torch.arange(num_windows).view([1] * axis + [num_windows] + [1] * (5 - axis))
+        position_in_window = torch.arange(window_length).view([1] * (3 + axis) + [window_length] + [1] * (2 - axis))
+        # (num_windows_z, num_windows_y, num_windows_x, window_size_z, window_size_y, window_size_x) with ones
+
+        if pattern == "block":
+            coord = window_index * window_length + position_in_window
+        elif pattern == "grid":
+            coord = position_in_window * num_windows + window_index
+        else:
+            raise ValueError(f"pattern must be one of 'block' or 'grid', got {pattern}")
+
+        # A roll moves the token at position i - shift to position i
+        coord = (coord - shift) % grid_length
+        coords.append(coord)
+
+    z, y, x = coords
+    if symmetric:
+        # Even positions hold the first half in order, odd positions hold the second half in reverse order
+        x = torch.where(x % 2 == 0, x // 2, grid_shape[2] - 1 - x // 2)
+
+    forward_indices = ((z * grid_shape[1] + y) * grid_shape[2] + x).flatten()
+    # (z * y * x,)
+
+    reverse_indices = torch.empty_like(forward_indices)
+    reverse_indices[forward_indices] = torch.arange(forward_indices.numel())
+    # (z * y * x,)
+
+    return forward_indices.to(device), reverse_indices.to(device)
+
+# %% ../../nbs/utils/13_windowing.ipynb #2b7d94c3
+def window_partition_3d(
+    hidden_states: torch.Tensor,
+    window_size: tuple[int, int, int],
+    shifts: tuple[int, int, int] = (0, 0, 0),
+    pattern: Literal["block", "grid"] = "block",
+    symmetric: bool = False,
+) -> torch.Tensor:
+    """Partition a channels_last 3D grid of tokens into windows using a single gather. Rolling, symmetry
+    rearrangement and partitioning are fused into one copy. See :py:func:`get_window_partition_indices` for details.
+
+    Args:
+        hidden_states: Tensor of shape `(B, Z, Y, X, C)` representing the input features.
+        window_size: Size of each window (z, y, x).
+        shifts: Number of tokens the grid is rolled by along each axis before partitioning.
+        pattern: Partitioning pattern. One of ``"block"`` or ``"grid"``.
+        symmetric: Whether to apply the symmetry rearrangement along the x axis before partitioning.
+
+    Returns:
+        Tensor of shape `(B * num_windows, window_size_z, window_size_y, window_size_x, C)` representing the windows.
+    """
+    # hidden_states: (b, num_patches_z, num_patches_y, num_patches_x, dim)
+    b, *grid_shape, dim = hidden_states.shape
+
+    forward_indices, _ = get_window_partition_indices(
+        tuple(grid_shape), tuple(window_size), tuple(shifts), pattern, symmetric, hidden_states.device
+    )
+
+    windows = hidden_states.reshape(b, -1, dim).index_select(1, forward_indices)
+    # (b, num_windows * window_size_z * window_size_y * window_size_x, dim)
+
+    windows = windows.view(-1, *window_size, dim)
+    # (b * num_windows, window_size_z, window_size_y, window_size_x, dim)
+
+    return windows
+
+# %% ../../nbs/utils/13_windowing.ipynb #c6a4e019
+def window_unpartition_3d(
+    windows: torch.Tensor,
+    grid_shape: tuple[int, int, int],
+    shifts: tuple[int, int, int] = (0, 0, 0),
+    pattern: Literal["block", "grid"] = "block",
+    symmetric: bool = False,
+) -> torch.Tensor:
+    """Reverse :py:func:`window_partition_3d` using a single gather i.e. merge windows, undo the roll, and undo the
+    symmetry rearrangement in one copy.
+
+    Args:
+        windows: Tensor of shape `(B * num_windows, window_size_z, window_size_y, window_size_x, C)` representing the
+            windows.
+        grid_shape: Shape of the token grid (z, y, x) to restore.
+        shifts: Number of tokens the grid was rolled by along each axis before partitioning.
+        pattern: Partitioning pattern that was used. One of ``"block"`` or ``"grid"``.
+        symmetric: Whether the symmetry rearrangement was applied before partitioning.
+
+    Returns:
+        Tensor of shape `(B, Z, Y, X, C)` representing the output features.
+    """
+    # windows: (b * num_windows, window_size_z, window_size_y, window_size_x, dim)
+    window_size = tuple(windows.shape[1:4])
+    dim = windows.shape[-1]
+
+    _, reverse_indices = get_window_partition_indices(
+        tuple(grid_shape), window_size, tuple(shifts), pattern, symmetric, windows.device
+    )
+
+    hidden_states = windows.reshape(-1, reverse_indices.numel(), dim).index_select(1, reverse_indices)
+    # (b, num_patches_z * num_patches_y * num_patches_x, dim)
+
+    hidden_states = hidden_states.view(-1, *grid_shape, dim)
+    # (b, num_patches_z, num_patches_y, num_patches_x, dim)
+
+    return hidden_states
+
+# %% ../../nbs/utils/13_windowing.ipynb #7f3e9a52
+def pad_to_window_multiple_3d(hidden_states: torch.Tensor, window_size: tuple[int, int, int]) -> torch.Tensor:
+    """Pad a channels_last 3D grid of tokens at the end of each spatial axis with the minimum number of zero tokens
+    required to make it divisible by ``window_size``. No copy is made if the grid is already divisible.
+
+    Args:
+        hidden_states: Tensor of shape `(B, Z, Y, X, C)` representing the input features.
+        window_size: Size of each window (z, y, x).
+
+    Returns:
+        Tensor of shape `(B, Z', Y', X', C)` where each spatial dimension is the smallest multiple of the corresponding
+        window size that is greater than or equal to the input dimension.
+    """
+    grid_shape = hidden_states.shape[1:4]
+    pad_z, pad_y, pad_x = [
+        (-grid_length) % window_length for grid_length, window_length in zip(grid_shape, window_size)
+    ]
+
+    if pad_z == pad_y == pad_x == 0:
+        return hidden_states
+
+    hidden_states = F.pad(hidden_states, (0, 0, 0, pad_x, 0, pad_y, 0, pad_z))
+    # (b, padded_num_patches_z, padded_num_patches_y, padded_num_patches_x, dim)
+
+    return hidden_states
+
+# %% ../../nbs/utils/13_windowing.ipynb #e41b08d6
+@lru_cache(maxsize=64)
+def _get_window_token_regions(
+    grid_shape: tuple[int, int, int],
+    padded_grid_shape: tuple[int, int, int],
+    window_size: tuple[int, int, int],
+    shifts: tuple[int, int, int],
+    pattern: Literal["block", "grid"],
+    mask_shifted_windows: bool,
+    device: torch.device | None,
+) -> torch.Tensor | None:
+    # Compact and cached description of the window attention mask: the region id of every token in window-major
+    # order, or -1 for padding tokens. Tokens can attend to each other only if they lie in the same region.
+    is_padded = tuple(grid_shape) != tuple(padded_grid_shape)
+    mask_shifted_windows = mask_shifted_windows and any(shift != 0 for shift in shifts)
+    if not is_padded and not mask_shifted_windows:
+        return None
+
+    forward_indices, _ = get_window_partition_indices(padded_grid_shape, window_size, shifts, pattern)
+    # (num_windows * T,)
+
+    # Compute the source coordinates of every token in window-major order
+    _, padded_y, padded_x = padded_grid_shape
+    source_z = forward_indices // (padded_y * padded_x)
+    source_y = (forward_indices // padded_x) % padded_y
+    source_x = forward_indices % padded_x
+    source_coords = (source_z, source_y, source_x)
+
+    region = torch.zeros_like(forward_indices)
+    if mask_shifted_windows:
+        # Tokens from the last `shift` positions along an axis are the ones that get wrapped around to the start
+        for coord, padded_grid_length, shift in zip(source_coords, padded_grid_shape, shifts):
+            region = region * 2 + (coord >= padded_grid_length - shift).long()
+    # (num_windows * T,)
+
+    for coord, grid_length in zip(source_coords, grid_shape):
+        region = region.masked_fill(coord >= grid_length, -1)
+    # (num_windows * T,)
+
+    num_tokens_per_window = int(torch.tensor(window_size).prod())
+    region = region.to(torch.int8).view(-1, num_tokens_per_window)
+    # (num_windows, T)
+
+    return region.to(device)
+
+
+def get_window_attention_mask(
+    grid_shape: tuple[int, int, int],
+    padded_grid_shape: tuple[int, int, int],
+    window_size: tuple[int, int, int],
+    shifts: tuple[int, int, int] = (0, 0, 0),
+    pattern: Literal["block", "grid"] = "block",
+    mask_shifted_windows: bool = False,
+    device: torch.device | None = None,
+    dtype: torch.dtype | None = None,
+) -> torch.Tensor | None:
+    """Get an additive attention mask for windows produced by :py:func:`window_partition_3d` on a padded grid. Only a
+    compact region id per token is cached per set of arguments; the dense mask is built on every call so that it is
+    not kept in memory between forward passes.
+
+    Two kinds of pairs are masked:
+
+    - Keys that are padding tokens i.e. lie outside ``grid_shape``. Padding queries are allowed to attend to everything
+      as their outputs are discarded anyway; this avoids rows that are entirely masked.
+    - If ``mask_shifted_windows`` is True, tokens that were wrapped around to the opposite boundary by the window
+      shift and tokens that were not. These are not neighbours in the original grid (shifted window masking in the
+      Swin paper).
+
+    Args:
+        grid_shape: Shape of the valid (unpadded) token grid (z, y, x).
+        padded_grid_shape: Shape of the padded token grid (z, y, x). Should be divisible by ``window_size``.
+        window_size: Size of each window (z, y, x).
+        shifts: Number of tokens the grid is rolled by along each axis before partitioning.
+        pattern: Partitioning pattern. One of ``"block"`` or ``"grid"``.
+        mask_shifted_windows: Whether to mask attention across the boundary introduced by the window shift.
+        device: Device to place the mask on.
+        dtype: Data type of the mask.
+
+    Returns:
+        ``None`` if nothing needs to be masked. Otherwise, a tensor of shape `(num_windows, 1, T, T)` where `T` is the
+        number of tokens in a window, containing 0 where attention is allowed and ``-inf`` where it is not. Windows
+        are ordered as in the output of :py:func:`window_partition_3d` (for a single batch element). The attention
+        layers broadcast it over the batch without copying it.
+    """
+    region = _get_window_token_regions(
+        tuple(grid_shape),
+        tuple(padded_grid_shape),
+        tuple(window_size),
+        tuple(shifts),
+        pattern,
+        mask_shifted_windows,
+        device,
+    )
+    if region is None:
+        return None
+    # (num_windows, T)
+
+    is_padding = region == -1
+    allowed = (region[:, :, None] == region[:, None, :]) | is_padding[:, :, None]
+    # (num_windows, T, T)
+
+    mask = torch.zeros(allowed.shape, dtype=dtype, device=allowed.device).masked_fill(~allowed, float("-inf"))
+    mask = mask.unsqueeze(1)
+    # (num_windows, 1, T, T)
+
+    return mask